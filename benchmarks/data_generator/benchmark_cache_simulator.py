@@ -0,0 +1,127 @@
+# SPDX-FileCopyrightText: Copyright (c) 2025 NVIDIA CORPORATION & AFFILIATES. All rights reserved.
+# SPDX-License-Identifier: Apache-2.0
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+Throughput benchmark for the CacheSimulator.
+
+Replays a synthetic trace against every combination of eviction and routing policy,
+and reports the requests replayed per minute and the hit rate of each. Half of the
+blocks of every request are a prefix shared with other requests, drawn from a Zipf
+distribution, and the other half are unique to the request.
+
+Example usage:
+python -m data_generator.benchmark_cache_simulator --num-workers 16 --cache-size 2000
+"""
+
+import time
+
+import numpy as np
+from data_generator.cache_simulator import (
+    EVICTION_POLICIES,
+    ROUTING_POLICIES,
+    CacheSimulator,
+)
+
+
+def generate_blocks(
+    num_requests: int,
+    num_blocks: int,
+    blocks_per_request: int,
+    num_prefixes: int = 2000,
+    seed: int = 0,
+) -> tuple[np.ndarray, np.ndarray]:
+    """Block indices of the requests concatenated, and the offsets of each request"""
+    rng = np.random.default_rng(seed)
+    prefix_length = blocks_per_request // 2
+    prefixes = rng.integers(0, num_blocks // 2, size=(num_prefixes, prefix_length))
+    shared = prefixes[rng.zipf(1.2, size=num_requests) % num_prefixes]
+    unique = rng.integers(
+        num_blocks // 2,
+        num_blocks,
+        size=(num_requests, blocks_per_request - prefix_length),
+    )
+    block_idx = np.concatenate([shared, unique], axis=1).ravel()
+    offsets = np.arange(num_requests + 1) * blocks_per_request
+    return block_idx, offsets
+
+
+def main():
+    import argparse
+
+    from tabulate import tabulate
+
+    parser = argparse.ArgumentParser(description="Benchmark CacheSimulator throughput")
+    parser.add_argument(
+        "--num-requests",
+        type=int,
+        default=100_000,
+        help="Number of requests to replay (default: 100000)",
+    )
+    parser.add_argument(
+        "--num-blocks",
+        type=int,
+        default=200_000,
+        help="Number of distinct blocks (default: 200000)",
+    )
+    parser.add_argument(
+        "--blocks-per-request",
+        type=int,
+        default=20,
+        help="Number of blocks of each request (default: 20)",
+    )
+    parser.add_argument(
+        "--num-workers",
+        type=int,
+        default=16,
+        help="Number of workers (default: 16)",
+    )
+    parser.add_argument(
+        "--cache-size",
+        type=int,
+        default=2000,
+        help="Number of blocks in the cache of each worker (default: 2000)",
+    )
+    args = parser.parse_args()
+
+    block_idx, offsets = generate_blocks(
+        args.num_requests, args.num_blocks, args.blocks_per_request
+    )
+    rows = []
+    for eviction in EVICTION_POLICIES:
+        for routing in ROUTING_POLICIES:
+            simulator = CacheSimulator(
+                args.num_blocks,
+                args.cache_size,
+                num_workers=args.num_workers,
+                eviction=eviction,
+                routing=routing,
+            )
+            start = time.perf_counter()
+            hit_rates = simulator.process(block_idx, offsets)
+            elapsed = time.perf_counter() - start
+            rows.append(
+                {
+                    "Eviction": eviction,
+                    "Routing": routing,
+                    "Requests/min (M)": args.num_requests / elapsed * 60 / 1e6,
+                    "Hit Rate": hit_rates.mean(),
+                }
+            )
+
+    print(tabulate(rows, headers="keys", tablefmt="github", floatfmt=".2f"))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,141 @@
+# SPDX-FileCopyrightText: Copyright (c) 2025 NVIDIA CORPORATION & AFFILIATES. All rights reserved.
+# SPDX-License-Identifier: Apache-2.0
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+Scaling benchmark for the Synthesizer.
+
+Generates mooncake-style traces of increasing size and reports, for each size,
+the time to learn the radix tree and samplers from the trace, the peak RSS
+of the process doing so, and the time to synthesize a fixed number of requests.
+Every size runs in a fresh process so that peak RSS is not polluted by the
+previous runs.
+
+Example usage:
+python -m data_generator.benchmark_synthesizer --num-requests 10000 100000 1000000
+"""
+
+import json
+import multiprocessing as mp
+import os
+import tempfile
+import time
+
+import numpy as np
+from data_generator.logging_utils import get_peak_memory_mb
+
+
+def generate_trace(
+    path: str, num_requests: int, block_size: int = 512, seed: int = 0
+) -> None:
+    """
+    Write a synthetic mooncake-style trace with a realistic prefix-sharing structure.
+
+    Each request either extends a random prefix of a previously seen request (shared
+    context) or starts a new tree, followed by a few unique blocks (user prompt).
+    """
+    rng = np.random.default_rng(seed)
+    contexts: list[list[int]] = [[]]
+    next_id = 0
+    timestamp = 0
+    with open(path, "w") as f:
+        for _ in range(num_requests):
+            context = contexts[rng.integers(len(contexts))]
+            hash_ids = context[: int(rng.integers(0, len(context) + 1))]
+            num_unique = int(rng.integers(0 if hash_ids else 1, 12))
+            hash_ids = hash_ids + list(range(next_id, next_id + num_unique))
+            next_id += num_unique
+            if len(contexts) < 4096 and rng.random() < 0.1:
+                contexts.append(hash_ids)
+
+            if rng.random() < 0.5:
+                timestamp += int(rng.integers(1, 3000))
+            request = {
+                "timestamp": timestamp,
+                "input_length": (len(hash_ids) - 1) * block_size
+                + int(rng.integers(1, block_size + 1)),
+                "output_length": int(rng.integers(10, 1000)),
+                "hash_ids": hash_ids,
+            }
+            f.write(json.dumps(request) + "\n")
+
+
+def _build(trace_file: str, block_size: int, num_synth: int) -> dict[str, float]:
+    from data_generator.synthesizer import Synthesizer
+
+    baseline_rss = get_peak_memory_mb()
+    start = time.perf_counter()
+    synthesizer = Synthesizer(trace_file, block_size=block_size)
+    build_time = time.perf_counter() - start
+    build_rss = get_peak_memory_mb()
+
+    start = time.perf_counter()
+    synthesizer.synthesize_requests(num_synth)
+    synth_time = time.perf_counter() - start
+    return {
+        "Build Time (s)": build_time,
+        "Peak RSS (MB)": build_rss,
+        "RSS Increase (MB)": build_rss - baseline_rss,
+        "Core Tree Size": len(synthesizer.tree) - 1,
+        f"Synthesize {num_synth} (s)": synth_time,
+    }
+
+
+def main():
+    import argparse
+
+    from tabulate import tabulate
+
+    parser = argparse.ArgumentParser(description="Benchmark Synthesizer scaling")
+    parser.add_argument(
+        "--num-requests",
+        type=int,
+        nargs="+",
+        default=[10_000, 100_000, 1_000_000],
+        help="Trace sizes (in requests) to benchmark (default: 10000 100000 1000000)",
+    )
+    parser.add_argument(
+        "--block-size",
+        type=int,
+        default=512,
+        help="Block size for prefilling and decoding (default: 512)",
+    )
+    parser.add_argument(
+        "--num-synth",
+        type=int,
+        default=1_000_000,
+        help="Number of requests to synthesize from each trace (default: 1000000)",
+    )
+    args = parser.parse_args()
+
+    ctx = mp.get_context("spawn")
+    rows = []
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        for num_requests in args.num_requests:
+            trace_file = os.path.join(tmp_dir, f"trace_{num_requests}.jsonl")
+            print(f"generating trace with {num_requests} requests...", flush=True)
+            generate_trace(trace_file, num_requests, block_size=args.block_size)
+
+            with ctx.Pool(1) as pool:
+                result = pool.apply(
+                    _build, (trace_file, args.block_size, args.num_synth)
+                )
+            rows.append({"Requests": num_requests, **result})
+            os.unlink(trace_file)
+
+    print(tabulate(rows, headers="keys", tablefmt="github", floatfmt=".2f"))
+
+
+if __name__ == "__main__":
+    main()
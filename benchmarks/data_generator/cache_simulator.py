@@ -0,0 +1,444 @@
+# SPDX-FileCopyrightText: Copyright (c) 2025 NVIDIA CORPORATION & AFFILIATES. All rights reserved.
+# SPDX-License-Identifier: Apache-2.0
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+Replay of a trace against finite KV caches spread over several workers.
+
+Every request is routed to a worker, hits the longest prefix of its blocks that is
+cached on that worker, and then writes its missing blocks into that worker's cache,
+evicting blocks if the cache is over capacity.
+
+The cache state is held in dense (num_workers, num_blocks) NumPy arrays indexed by
+block index rather than in per-worker sets. Every access gets a unique, increasing
+stamp, and is appended to an append-only log of (stamp, block) entries, so that the
+log is sorted by recency: LRU evicts from the head of the log of the worker, and LFU
+from the head of the log of the lowest access count. Entries superseded by a later
+access are skipped lazily. Both the appends and the evictions are vectorized, so each
+request costs a few array operations whatever the size of the caches.
+
+The work that does not depend on the cache state is done once per batch of requests
+rather than per request: the stamps and the reversed block order of the accesses,
+the detection of requests repeating a block, and the routing by the policies that
+ignore the cache state (see BATCH_ROUTING_POLICIES).
+"""
+
+import heapq
+from dataclasses import dataclass, field
+from typing import Any, Callable, Optional
+
+import numpy as np
+
+EVICTION_POLICIES = ("lru", "lfu")
+
+MIN_LOG_SIZE = 64
+
+
+def _route_random(simulator: "CacheSimulator", block_idx: np.ndarray) -> int:
+    return int(simulator.rng.integers(simulator.num_workers))
+
+
+def _route_round_robin(simulator: "CacheSimulator", block_idx: np.ndarray) -> int:
+    return simulator.num_requests % simulator.num_workers
+
+
+def _route_prefix_overlap(simulator: "CacheSimulator", block_idx: np.ndarray) -> int:
+    """Route to the worker with the longest cached prefix, then with the fewest requests."""
+    overlaps = simulator.prefix_overlaps(block_idx)
+    # a single argmax orders the workers by overlap, then by fewest requests
+    scores = overlaps * (simulator.num_requests + 1) - simulator.requests_per_worker
+    return int(scores.argmax())
+
+
+def _route_batch_random(simulator: "CacheSimulator", lengths: np.ndarray) -> np.ndarray:
+    workers = np.zeros(len(lengths), dtype=np.int64)
+    non_empty = lengths > 0
+    workers[non_empty] = simulator.rng.integers(
+        simulator.num_workers, size=int(non_empty.sum())
+    )
+    return workers
+
+
+def _route_batch_round_robin(
+    simulator: "CacheSimulator", lengths: np.ndarray
+) -> np.ndarray:
+    # requests without blocks are skipped, so they do not take a turn
+    turns = simulator.num_requests + np.cumsum(lengths > 0) - 1
+    return turns % simulator.num_workers
+
+
+# Routing policies take the simulator and the block indices of a request, and return
+# the worker to route the request to. Register new policies here.
+ROUTING_POLICIES: dict[str, Callable[["CacheSimulator", np.ndarray], int]] = {
+    "random": _route_random,
+    "round_robin": _route_round_robin,
+    "prefix_overlap": _route_prefix_overlap,
+}
+
+# Policies that do not depend on the cache state can also route a whole batch at once:
+# they take the simulator and the number of blocks of each request of the batch, and
+# return the worker of each request, ignored for the requests without blocks.
+BATCH_ROUTING_POLICIES: dict[
+    str, Callable[["CacheSimulator", np.ndarray], np.ndarray]
+] = {
+    "random": _route_batch_random,
+    "round_robin": _route_batch_round_robin,
+}
+
+
+class _StampLog:
+    """
+    Append-only log of (stamp, block) accesses in increasing stamp order.
+
+    An entry is current if the block was not accessed nor evicted since, i.e. if its
+    stamp is still the last stamp of the block. Entries before `head` were consumed.
+    """
+
+    def __init__(self) -> None:
+        self.stamps = np.zeros(MIN_LOG_SIZE, dtype=np.int64)
+        self.blocks = np.zeros(MIN_LOG_SIZE, dtype=np.int64)
+        self.head = 0
+        self.tail = 0
+
+    def append(
+        self, stamps: np.ndarray, blocks: np.ndarray, last_stamps: np.ndarray
+    ) -> None:
+        tail = self.tail + len(stamps)
+        if tail > len(self.stamps):
+            self._compact(last_stamps, len(stamps))
+            tail = self.tail + len(stamps)
+        self.stamps[self.tail : tail] = stamps
+        self.blocks[self.tail : tail] = blocks
+        self.tail = tail
+
+    def _compact(self, last_stamps: np.ndarray, extra: int) -> None:
+        # drop the consumed and superseded entries, and grow if still over half full
+        stamps = self.stamps[self.head : self.tail]
+        blocks = self.blocks[self.head : self.tail]
+        current = last_stamps[blocks] == stamps
+        size = len(self.stamps)
+        while 2 * (int(current.sum()) + extra) > size:
+            size *= 2
+        self.stamps = np.zeros(size, dtype=np.int64)
+        self.blocks = np.zeros(size, dtype=np.int64)
+        self.head = 0
+        self.tail = int(current.sum())
+        self.stamps[: self.tail] = stamps[current]
+        self.blocks[: self.tail] = blocks[current]
+
+    def pop_current(self, count: int, last_stamps: np.ndarray) -> np.ndarray:
+        """Consume the oldest entries until `count` current ones are found, and return their blocks."""
+        popped = []
+        while count and self.head < self.tail:
+            end = min(self.tail, self.head + max(2 * count, MIN_LOG_SIZE))
+            blocks = self.blocks[self.head : end]
+            found = (last_stamps[blocks] == self.stamps[self.head : end]).nonzero()[0]
+            if len(found) >= count:
+                found = found[:count]
+                end = self.head + int(found[-1]) + 1
+            popped.append(blocks[found])
+            count -= len(found)
+            self.head = end
+        if len(popped) == 1:
+            return popped[0]
+        return np.concatenate(popped) if popped else np.zeros(0, dtype=np.int64)
+
+
+@dataclass
+class CacheTimeline:
+    """Cache activity aggregated over consecutive time windows."""
+
+    window: float  # length of a window, in the unit of the trace timestamps
+    requests: np.ndarray = field(default_factory=lambda: np.zeros(0, dtype=np.int64))
+    blocks: np.ndarray = field(default_factory=lambda: np.zeros(0, dtype=np.int64))
+    hit_blocks: np.ndarray = field(default_factory=lambda: np.zeros(0, dtype=np.int64))
+    evictions: np.ndarray = field(default_factory=lambda: np.zeros(0, dtype=np.int64))
+    transferred: np.ndarray = field(default_factory=lambda: np.zeros(0, dtype=np.int64))
+
+    def __len__(self) -> int:
+        return len(self.requests)
+
+    def add(
+        self,
+        timestamps: np.ndarray,
+        blocks: np.ndarray,
+        hit_blocks: np.ndarray,
+        evictions: np.ndarray,
+        transferred: np.ndarray,
+    ) -> None:
+        windows = (np.asarray(timestamps) // self.window).astype(np.int64)
+        size = max(len(self), int(windows.max()) + 1 if len(windows) else 0)
+        for name, weights in [
+            ("requests", None),
+            ("blocks", blocks),
+            ("hit_blocks", hit_blocks),
+            ("evictions", evictions),
+            ("transferred", transferred),
+        ]:
+            counts = np.bincount(windows, weights=weights, minlength=size)
+            totals = getattr(self, name)
+            totals = np.pad(totals, (0, size - len(totals)))
+            setattr(self, name, totals + counts.astype(np.int64))
+
+    def hit_rates(self) -> np.ndarray:
+        """Fraction of the blocks of each window that were cache hits."""
+        return self.hit_blocks / np.maximum(self.blocks, 1)
+
+    def rows(self) -> list[dict[str, Any]]:
+        """Non-empty windows as table rows."""
+        hit_rates = self.hit_rates()
+        return [
+            {
+                "Window Start": i * self.window,
+                "Requests": self.requests[i],
+                "Hit Rate": hit_rates[i],
+                "Evictions": self.evictions[i],
+                "Blocks Transferred": self.transferred[i],
+            }
+            for i in np.flatnonzero(self.requests)
+        ]
+
+
+class CacheSimulator:
+    """
+    Simulates the prefix caches of `num_workers` workers with `capacity` blocks each.
+
+    Blocks are identified by dense indices in [0, num_blocks), e.g. the positions of
+    the hash ids of a trace in the sorted array of its unique hash ids. A request hits
+    the blocks before its first block missing from the cache of its worker; every
+    block it is missing is transferred into that cache. Blocks of the same request
+    are stamped so that its tail is evicted before its head, as prefix caches do.
+    """
+
+    def __init__(
+        self,
+        num_blocks: int,
+        capacity: Optional[int],
+        num_workers: int = 1,
+        eviction: str = "lru",
+        routing: str = "prefix_overlap",
+        window: float = 60_000,
+        seed: int = 0,
+    ):
+        """
+        Args:
+            num_blocks (int): Number of distinct blocks, i.e. one more than the largest block index.
+            capacity (int, optional): Blocks per worker cache. None for infinite caches.
+            num_workers (int): Number of workers.
+            eviction (str): Eviction policy, one of EVICTION_POLICIES.
+            routing (str): Routing policy, one of the keys of ROUTING_POLICIES.
+            window (float): Length of the windows of the timeline, in the unit of the
+                trace timestamps (milliseconds for mooncake traces).
+            seed (int): Seed of the random routing policy.
+        """
+        if eviction not in EVICTION_POLICIES:
+            raise ValueError(
+                f"Unknown eviction policy {eviction}, expected one of {EVICTION_POLICIES}"
+            )
+        if routing not in ROUTING_POLICIES:
+            raise ValueError(
+                f"Unknown routing policy {routing}, expected one of {list(ROUTING_POLICIES)}"
+            )
+        if capacity is not None and capacity <= 0:
+            raise ValueError(f"capacity must be positive, got {capacity}")
+
+        self.num_blocks = num_blocks
+        self.capacity = capacity
+        self.num_workers = num_workers
+        self.eviction = eviction
+        self.route = ROUTING_POLICIES[routing]
+        self.route_batch = BATCH_ROUTING_POLICIES.get(routing)
+        self.rng = np.random.default_rng(seed)
+
+        # stamp of the last access of each block on each worker, -1 if not cached
+        self.stamps = np.full((num_workers, num_blocks), -1, dtype=np.int64)
+        # number of accesses since the block was cached, for LFU
+        self.freqs = (
+            np.zeros((num_workers, num_blocks), dtype=np.int32)
+            if eviction == "lfu"
+            else None
+        )
+        self.cache_sizes = np.zeros(num_workers, dtype=np.int64)
+        self.requests_per_worker = np.zeros(num_workers, dtype=np.int64)
+        self.num_requests = 0
+        self.timeline = CacheTimeline(window)
+
+        self._clock = 0
+        # one log per worker for LRU, one log per worker and access count for LFU
+        self._logs: list[dict[int, _StampLog]] = [{} for _ in range(num_workers)]
+        # min-heap of the levels that have a log, so that LFU evicts from the lowest
+        self._levels: list[list[int]] = [[] for _ in range(num_workers)]
+
+    def prefix_overlaps(self, block_idx: np.ndarray) -> np.ndarray:
+        """Number of leading blocks of a request cached on each worker."""
+        # a last column of misses, so that argmin finds the first miss of every row
+        cached = np.zeros((self.num_workers, len(block_idx) + 1), dtype=bool)
+        np.greater_equal(self.stamps[:, block_idx], 0, out=cached[:, :-1])
+        return cached.argmin(axis=1)
+
+    def _log(self, worker: int, level: int) -> _StampLog:
+        logs = self._logs[worker]
+        if level not in logs:
+            logs[level] = _StampLog()
+            heapq.heappush(self._levels[worker], level)
+        return logs[level]
+
+    def _touch(self, worker: int, blocks: np.ndarray, stamps: np.ndarray) -> None:
+        """Access the blocks of a request, in reverse order with increasing stamps."""
+        last_stamps = self.stamps[worker]
+        last_stamps[blocks] = stamps
+        if self.capacity is None:
+            return
+
+        if self.freqs is None:
+            self._log(worker, 0).append(stamps, blocks, last_stamps)
+            return
+
+        freqs = self.freqs[worker]
+        freqs[blocks] += 1
+        levels = freqs[blocks]
+        # the accesses go to the log of their level, in runs of consecutive accesses
+        # of the same level: the runs are appended in stamp order, so every log
+        # stays sorted. A request usually has a run of new blocks at level 1 and a
+        # run of prefix blocks accessed together, so there are few runs.
+        changes = (levels[1:] != levels[:-1]).nonzero()[0]
+        if not len(changes):
+            self._log(worker, int(levels[0])).append(stamps, blocks, last_stamps)
+            return
+        bounds = [0, *(changes + 1).tolist(), len(levels)]
+        for start, end in zip(bounds[:-1], bounds[1:]):
+            self._log(worker, int(levels[start])).append(
+                stamps[start:end], blocks[start:end], last_stamps
+            )
+
+    def _evict(self, worker: int, num_evictions: int) -> None:
+        last_stamps = self.stamps[worker]
+        logs = self._logs[worker]
+        levels = self._levels[worker]
+        while num_evictions:
+            level = levels[0]
+            evicted = logs[level].pop_current(num_evictions, last_stamps)
+            last_stamps[evicted] = -1
+            if self.freqs is not None:
+                self.freqs[worker, evicted] = 0
+            num_evictions -= len(evicted)
+            if num_evictions:
+                # the log of this level is exhausted, move on to the next one
+                del logs[heapq.heappop(levels)]
+
+    @staticmethod
+    def _has_duplicates(
+        block_idx: np.ndarray, offsets: np.ndarray, requests: np.ndarray
+    ) -> np.ndarray:
+        """Whether each request holds a block more than once."""
+        ids = block_idx[offsets[0] : offsets[-1]]
+        # sorting (request, block) keys brings the repeated blocks of a request together
+        num_blocks = int(ids.max()) + 1 if len(ids) else 1
+        keys = np.sort(requests * num_blocks + ids)
+        repeated = (keys[1:] == keys[:-1]).nonzero()[0]
+        duplicates = np.zeros(len(offsets) - 1, dtype=bool)
+        duplicates[keys[repeated] // num_blocks] = True
+        return duplicates
+
+    def process(
+        self,
+        block_idx: np.ndarray,
+        offsets: np.ndarray,
+        timestamps: Optional[np.ndarray] = None,
+    ) -> np.ndarray:
+        """
+        Replay a batch of requests, in order, and add their activity to the timeline.
+
+        Args:
+            block_idx (np.ndarray): Block indices of all requests concatenated.
+            offsets (np.ndarray): The blocks of request `i` are
+                `block_idx[offsets[i] : offsets[i + 1]]`.
+            timestamps (np.ndarray, optional): Arrival time of each request, used to
+                bucket the timeline. All requests fall in the first window if not given.
+
+        Returns:
+            np.ndarray: Hit rate of each request, skipping requests without blocks.
+        """
+        num_requests = len(offsets) - 1
+        offsets = np.asarray(offsets, dtype=np.int64)
+        blocks = np.diff(offsets)
+        hit_blocks = [0] * num_requests
+        evictions = [0] * num_requests
+        transferred = [0] * num_requests
+
+        # per batch: the blocks of each request in reverse order, with increasing
+        # stamps from the tail of the request so that it is evicted first
+        requests = np.repeat(np.arange(num_requests), blocks)
+        positions = np.arange(offsets[0], offsets[-1])
+        reversed_blocks = block_idx[
+            offsets[requests] + offsets[requests + 1] - 1 - positions
+        ]
+        access_stamps = self._clock + positions - offsets[0]
+        self._clock += int(offsets[-1] - offsets[0])
+        has_duplicates = self._has_duplicates(block_idx, offsets, requests).tolist()
+        workers = (
+            self.route_batch(self, blocks).tolist()
+            if self.route_batch is not None
+            else None
+        )
+
+        capacity = self.capacity
+        cache_sizes = self.cache_sizes.tolist()
+        bounds = offsets.tolist()
+        for i in range(num_requests):
+            start, end = bounds[i], bounds[i + 1]
+            if start == end:
+                continue
+            ids = block_idx[start:end]
+
+            worker = workers[i] if workers is not None else self.route(self, ids)
+            cached = self.stamps[worker, ids] >= 0
+            # argmin finds the first miss, and is 0 if all blocks are cached
+            first_miss = int(cached.argmin())
+            hit_blocks[i] = end - start if cached[first_miss] else first_miss
+            if has_duplicates[i]:
+                num_new = len(set(ids[~cached].tolist()))
+            else:
+                num_new = end - start - int(cached.sum())
+
+            self._touch(
+                worker,
+                reversed_blocks[start - bounds[0] : end - bounds[0]],
+                access_stamps[start - bounds[0] : end - bounds[0]],
+            )
+            cache_size = cache_sizes[worker] + num_new
+            transferred[i] = num_new
+            if capacity is not None and cache_size > capacity:
+                evictions[i] = cache_size - capacity
+                self._evict(worker, cache_size - capacity)
+                cache_size = capacity
+            cache_sizes[worker] = cache_size
+
+            self.requests_per_worker[worker] += 1
+            self.num_requests += 1
+
+        self.cache_sizes[:] = cache_sizes
+        if timestamps is None:
+            timestamps = np.zeros(num_requests)
+        hit_blocks_array = np.array(hit_blocks, dtype=np.int64)
+        self.timeline.add(
+            timestamps,
+            blocks,
+            hit_blocks_array,
+            np.array(evictions, dtype=np.int64),
+            np.array(transferred, dtype=np.int64),
+        )
+
+        non_empty = blocks > 0
+        return hit_blocks_array[non_empty] / blocks[non_empty]
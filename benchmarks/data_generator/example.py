@@ -38,13 +38,14 @@ synthesizer = Synthesizer(
     prompt_len_multiplier=0.5,  # shorten prompt lengths to make prefix ratio even larger
 )
 
-# generate requests
-requests_synth = synthesizer.synthesize_requests(
+# generate requests, returned as columnar numpy arrays
+requests_batch = synthesizer.synthesize_requests(
     num_requests=100,
     input_len_filter=(
         16384 - 1000
     ),  # this is what most model defaults to, leaving some room for outpputs
 )
+requests_synth = list(requests_batch.to_records())
 
 # convert the hashes into random texts (lorem ipsum), respecting the prefix structure
 tokenizer = "deepseek-ai/DeepSeek-R1-Distill-Llama-8B"
@@ -13,105 +13,338 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
-import networkx as nx
+from dataclasses import dataclass, field
+from typing import Optional
+
 import numpy as np
 from data_generator.protocols import CACHE_END, END_NODE, SUPER_ROOT
-from data_generator.sampler import get_cdf
+
+ROOT_INDEX = 0  # SUPER_ROOT always lives at row 0 of the node arrays
 
 
-def _verify_tree(G: nx.DiGraph) -> None:
-    invalid_nodes = [(node, d) for node, d in G.in_degree() if d > 1]
-    if invalid_nodes:
+@dataclass
+class RadixTree:
+    """
+    Array-backed prefix (radix) tree.
+
+    Every node is a row in a set of NumPy columns. Row 0 is always SUPER_ROOT, and the
+    rows are kept in order of first appearance in the trace, so a parent always precedes
+    its children. The children of each node and the transition CDFs are stored in
+    CSR form (offset arrays into flat value arrays), filled in by
+    `_precompute_transition_cdfs`.
+
+    Attributes:
+        node_ids: Hash id (label) of each node.
+        parent: Row index of the parent of each node (-1 for SUPER_ROOT).
+        visited: Number of paths passing through each node.
+        end: Number of paths terminating at each node.
+        to_leaf: Number of paths branching off into a unique (visited once) child.
+        length: Number of original nodes contracted into each node.
+        rank: Sort key of each node among its siblings.
+        child_offsets: CSR offsets of the children of each node.
+        children: Row indices of the children, grouped by parent.
+        out_offsets: CSR offsets of the outgoing transitions of each node.
+        out_nodes: Transition targets, either a row index or CACHE_END / END_NODE.
+        out_cdf: Transition CDF values aligned with `out_nodes`.
+        out_cdf_shifted: `out_cdf` shifted by the row of each node, so that the CDFs of
+            all nodes form one sorted array and can be searched in a single call.
+    """
+
+    node_ids: np.ndarray
+    parent: np.ndarray
+    visited: np.ndarray
+    end: np.ndarray
+    to_leaf: np.ndarray
+    length: np.ndarray
+    rank: np.ndarray
+    child_offsets: np.ndarray = field(default_factory=lambda: np.zeros(0, np.int64))
+    children: np.ndarray = field(default_factory=lambda: np.zeros(0, np.int64))
+    out_offsets: np.ndarray = field(default_factory=lambda: np.zeros(0, np.int64))
+    out_nodes: np.ndarray = field(default_factory=lambda: np.zeros(0, np.int64))
+    out_cdf: np.ndarray = field(default_factory=lambda: np.zeros(0, np.float64))
+    out_cdf_shifted: np.ndarray = field(default_factory=lambda: np.zeros(0, np.float64))
+
+    def __len__(self) -> int:
+        return len(self.node_ids)
+
+    def index(self, node_id: int) -> int:
+        """Return the row index of the node labelled `node_id`."""
+        rows = np.flatnonzero(self.node_ids == node_id)
+        if len(rows) == 0:
+            raise KeyError(node_id)
+        return int(rows[0])
+
+    def successors(self, node: int) -> list[int]:
+        """Return the row indices of the children of row `node`, in sampling order."""
+        return self.children[
+            self.child_offsets[node] : self.child_offsets[node + 1]
+        ].tolist()
+
+    def depths(self) -> np.ndarray:
+        """Return the depth of every node, counted in radix-tree hops from SUPER_ROOT."""
+        depth = np.zeros(len(self), dtype=np.int64)
+        frontier = np.array([ROOT_INDEX], dtype=np.int64)
+        level = 0
+        while len(frontier):
+            depth[frontier] = level
+            starts = self.child_offsets[frontier]
+            counts = self.child_offsets[frontier + 1] - starts
+            frontier = self.children[_segment_positions(starts, counts)]
+            level += 1
+        return depth
+
+
+def _segment_positions(starts: np.ndarray, counts: np.ndarray) -> np.ndarray:
+    """Flat indices covering the segments [start, start + count) for every pair."""
+    total = int(counts.sum())
+    if total == 0:
+        return np.zeros(0, dtype=np.int64)
+    seg_starts = np.cumsum(counts) - counts
+    return np.repeat(starts - seg_starts, counts) + np.arange(total, dtype=np.int64)
+
+
+def _compact(tree: RadixTree, keep: np.ndarray, parent: np.ndarray) -> RadixTree:
+    """Drop the rows not in `keep`, remapping `parent` (given in old row indices)."""
+    new_index = np.cumsum(keep) - 1
+    new_parent = parent[keep]
+    has_parent = new_parent >= 0
+    new_parent[has_parent] = new_index[new_parent[has_parent]]
+    return RadixTree(
+        node_ids=tree.node_ids[keep],
+        parent=new_parent,
+        visited=tree.visited[keep],
+        end=tree.end[keep],
+        to_leaf=tree.to_leaf[keep],
+        length=tree.length[keep],
+        rank=tree.rank[keep],
+    )
+
+
+@dataclass
+class EdgeCounts:
+    """
+    The distinct (child, parent) transitions of a trace, with their traversal counts.
+
+    This is all the information needed to build the prefix tree, and can be accumulated
+    chunk by chunk with `_count_edges`, in memory proportional to the number of distinct
+    hash ids rather than to the size of the trace.
+
+    Attributes:
+        child: Hash id of the child of each edge.
+        parent: Hash id of the parent of each edge (SUPER_ROOT at the start of paths).
+        first_seen: Position in the trace of the first traversal of each edge.
+        visited: Number of traversals of each edge.
+        end: Number of paths ending with each edge.
+        num_paths: Number of paths seen so far.
+        num_tokens: Number of hash ids seen so far.
+    """
+
+    child: np.ndarray = field(default_factory=lambda: np.zeros(0, np.int64))
+    parent: np.ndarray = field(default_factory=lambda: np.zeros(0, np.int64))
+    first_seen: np.ndarray = field(default_factory=lambda: np.zeros(0, np.int64))
+    visited: np.ndarray = field(default_factory=lambda: np.zeros(0, np.int64))
+    end: np.ndarray = field(default_factory=lambda: np.zeros(0, np.int64))
+    num_paths: int = 0
+    num_tokens: int = 0
+
+
+def _count_edges(
+    hash_ids: np.ndarray, offsets: np.ndarray, counts: Optional[EdgeCounts] = None
+) -> EdgeCounts:
+    """
+    Count the edges of a chunk of paths, merged into the counts of the previous chunks.
+
+    Args:
+        hash_ids (np.ndarray): All hash ids of the chunk, concatenated.
+        offsets (np.ndarray): Offsets of each path into `hash_ids`, of length num_paths + 1.
+        counts (EdgeCounts, optional): The counts of the previous chunks, if any.
+
+    Returns:
+        EdgeCounts: The merged counts.
+    """
+    counts = counts if counts is not None else EdgeCounts()
+    hash_ids = np.asarray(hash_ids, dtype=np.int64)
+    offsets = np.asarray(offsets, dtype=np.int64)
+
+    # the predecessor of every hash id, SUPER_ROOT at the start of each path
+    starts, stops = offsets[:-1], offsets[1:]
+    non_empty = stops > starts
+    parents = np.empty_like(hash_ids)
+    parents[1:] = hash_ids[:-1]
+    parents[starts[non_empty]] = SUPER_ROOT
+    end = np.zeros(len(hash_ids), dtype=np.int64)
+    end[stops[non_empty] - 1] = 1
+
+    child = np.concatenate((counts.child, hash_ids))
+    parent = np.concatenate((counts.parent, parents))
+    first_seen = np.concatenate(
+        (counts.first_seen, counts.num_tokens + np.arange(len(hash_ids)))
+    )
+    visited = np.concatenate((counts.visited, np.ones(len(hash_ids), dtype=np.int64)))
+    end = np.concatenate((counts.end, end))
+
+    # reduce over identical edges
+    order = np.lexsort((parent, child))
+    child, parent = child[order], parent[order]
+    new_edge = np.ones(len(child), dtype=bool)
+    new_edge[1:] = (child[1:] != child[:-1]) | (parent[1:] != parent[:-1])
+    edge_starts = np.flatnonzero(new_edge)
+    if len(edge_starts):
+        first_seen = np.minimum.reduceat(first_seen[order], edge_starts)
+        visited = np.add.reduceat(visited[order], edge_starts)
+        end = np.add.reduceat(end[order], edge_starts)
+
+    return EdgeCounts(
+        child=child[edge_starts],
+        parent=parent[edge_starts],
+        first_seen=first_seen,
+        visited=visited,
+        end=end,
+        num_paths=counts.num_paths + len(offsets) - 1,
+        num_tokens=counts.num_tokens + len(hash_ids),
+    )
+
+
+def _build_tree(edges: EdgeCounts) -> RadixTree:
+    """
+    Build the prefix tree of a trace from its edge counts.
+
+    Args:
+        edges (EdgeCounts): The edge counts of the whole trace.
+
+    Returns:
+        RadixTree: The (uncontracted) prefix tree, without transition CDFs.
+    """
+    _verify_tree(edges)
+
+    # rows are assigned in order of first appearance, after SUPER_ROOT
+    order = np.argsort(edges.first_seen, kind="stable")
+    num_nodes = len(order) + 1
+    row_of_edge = np.empty(len(order), dtype=np.int64)
+    row_of_edge[order] = np.arange(1, num_nodes)
+
+    # edges are sorted by child, and every child has a single edge
+    parent_rows = np.full(len(order), ROOT_INDEX, dtype=np.int64)
+    has_parent = edges.parent != SUPER_ROOT
+    parent_rows[has_parent] = row_of_edge[
+        np.searchsorted(edges.child, edges.parent[has_parent])
+    ]
+
+    parent = np.full(num_nodes, -1, dtype=np.int64)
+    parent[row_of_edge] = parent_rows
+    visited = np.zeros(num_nodes, dtype=np.int64)
+    visited[row_of_edge] = edges.visited
+    visited[ROOT_INDEX] = edges.num_paths
+    end = np.zeros(num_nodes, dtype=np.int64)
+    end[row_of_edge] = edges.end
+
+    return RadixTree(
+        node_ids=np.concatenate(([SUPER_ROOT], edges.child[order])).astype(np.int64),
+        parent=parent,
+        visited=visited,
+        end=end,
+        to_leaf=np.zeros(num_nodes, dtype=np.int64),
+        length=np.ones(num_nodes, dtype=np.int64),
+        rank=np.arange(num_nodes, dtype=np.int64),
+    )
+
+
+def _verify_tree(edges: EdgeCounts) -> None:
+    # edges are sorted by child, so multiple parents show up as repeated children
+    multiple = np.flatnonzero(edges.child[1:] == edges.child[:-1])
+    invalid_nodes = np.unique(edges.child[multiple])
+    if len(invalid_nodes):
         print("ERROR: The following nodes have multiple parents (in-degree > 1):")
-        for node, in_degree in invalid_nodes:
-            parents = list(G.predecessors(node))
-            print(f"  Node {node}: in-degree={in_degree}, parents={parents}")
+        for node in invalid_nodes:
+            parents = edges.parent[edges.child == node].tolist()
+            print(f"  Node {node}: in-degree={len(parents)}, parents={parents}")
         raise ValueError(
             "Graph is not a valid tree: nodes with multiple parents detected"
         )
 
 
-def _mark_visited(G: nx.DiGraph) -> None:
+def _mark_visited(tree: RadixTree) -> None:
     # visits to leaf nodes (non-core branches) are considered as ended
-    for node in G.nodes():
-        if "to_leaf" not in G.nodes[node]:
-            G.nodes[node]["to_leaf"] = 0
-        if G.nodes[node]["visited"] <= 1:
-            continue
-        for child in G.successors(node):
-            if G.nodes[child]["visited"] == 1:
-                G.nodes[node]["to_leaf"] += 1
+    children = np.flatnonzero(tree.parent >= 0)
+    parents = tree.parent[children]
+    mask = (tree.visited[children] == 1) & (tree.visited[parents] > 1)
+    tree.to_leaf += np.bincount(parents[mask], minlength=len(tree))
 
 
-def _merge_chains(G: nx.DiGraph) -> nx.DiGraph:
+def _merge_chains(tree: RadixTree) -> RadixTree:
     """
-    Make the graph radix-like (meaning all unary paths are contracted).
+    Make the tree radix-like (meaning all unary paths are contracted).
 
     This function transforms a prefix tree into a radix tree structure by contracting
-    unary paths (chains of nodes with exactly one predecessor and one successor).
+    unary paths (chains of nodes that are visited the same number of times).
     The resulting radix tree is significantly more compact than the original prefix tree,
     as it eliminates redundant intermediate nodes while preserving the structural
     information needed for path sampling.
 
-    This compression is particularly beneficial for efficient path sampling during data
-    synthesis. In addition, keep track of the contracted lengths in the 'length' attribute
-    of each node to preserve the original path information.
+    The contraction is vectorized: every node whose only child is visited as often as
+    itself is absorbed into that child, and the surviving end of each chain is linked
+    to the first non-absorbed ancestor by pointer jumping. In addition, keep track of
+    the contracted lengths in the `length` column to preserve the original path information.
+
+    Contracted chains are ordered after the untouched siblings (by visited count, then
+    by the hash id of the chain head), so that sampling order, and hence the synthesized
+    traces for a fixed seed, do not depend on the tree representation.
 
     Args:
-        G (networkx.DiGraph): A directed graph representing a prefix tree structure.
+        tree (RadixTree): A tree representing a prefix tree structure.
 
     Returns:
-        networkx.DiGraph: The resulting radix tree with unary paths contracted.
+        RadixTree: The resulting radix tree with unary paths contracted.
     """
-    for visited in sorted(np.unique([G.nodes[node]["visited"] for node in G.nodes()])):
-        sub_nodes = [node for node in G.nodes() if G.nodes[node]["visited"] == visited]
-        subgraph = G.subgraph(sub_nodes)
-        if len(subgraph) == 1:
-            continue
-
-        chain_nodes = [
-            node
-            for node in subgraph.nodes()
-            if G.in_degree(node) == 1 and G.out_degree(node) == 1
-        ]
-        if not chain_nodes:
-            continue
-        chain_nodes = sorted(chain_nodes)
-
-        nodes_rm = []
-        for node in chain_nodes:
-            node_pred = list(G.predecessors(node))[0]
-            # find the parent node source
-            if G.nodes[node_pred]["visited"] == visited and node_pred != SUPER_ROOT:
-                continue
-            weight = G[node_pred][node]["weight"]
-
-            end_node = node
-            chain_len = 1
-            succ = list(G.successors(end_node))
-
-            # find the end of the chain
-            while succ and G.nodes[succ[0]]["visited"] == visited:
-                nodes_rm.append(end_node)
-                end_node = succ[0]
-                chain_len += 1
-                succ = list(G.successors(end_node))
-
-            G.add_edge(
-                node_pred, end_node, weight=weight
-            )  # may overwrite the edge (should be harmless)
-            G.nodes[end_node]["length"] = chain_len
-
-        G.remove_nodes_from(nodes_rm)
-
-    for node in G.nodes():
-        if "length" not in G.nodes[node]:
-            G.nodes[node]["length"] = 1
-
-    return G
-
-
-def _remove_leaves(G: nx.DiGraph) -> tuple[nx.DiGraph, list[int]]:
+    num_nodes = len(tree)
+    children = np.flatnonzero(tree.parent >= 0)
+    parents = tree.parent[children]
+    out_degree = np.bincount(parents, minlength=num_nodes)
+
+    # a node is absorbed into its only child if both are visited equally often
+    absorbed = np.zeros(num_nodes, dtype=bool)
+    absorb = (
+        (parents != ROOT_INDEX)
+        & (out_degree[parents] == 1)
+        & (tree.visited[children] == tree.visited[parents])
+    )
+    absorbed[parents[absorb]] = True
+    if not absorbed.any():
+        return tree
+
+    # for every absorbed node, jump to the top of its run of absorbed ancestors
+    top = np.arange(num_nodes, dtype=np.int64)
+    hops = np.zeros(num_nodes, dtype=np.int64)
+    rows = np.flatnonzero(absorbed)
+    step_up = absorbed[tree.parent[rows]] & (tree.parent[rows] >= 0)
+    top[rows[step_up]] = tree.parent[rows[step_up]]
+    hops[rows[step_up]] = 1
+    while True:
+        next_top = top[top]
+        if np.array_equal(next_top, top):
+            break
+        hops = hops + hops[top]
+        top = next_top
+
+    # chain ends are the surviving children of absorbed nodes
+    ends = children[absorbed[parents] & ~absorbed[children]]
+    heads = top[tree.parent[ends]]
+    parent = tree.parent.copy()
+    parent[ends] = tree.parent[heads]
+    tree.length[ends] = hops[tree.parent[ends]] + 2
+
+    contracted = np.zeros(num_nodes, dtype=bool)
+    contracted[ends] = True
+    visited_key = np.where(contracted, tree.visited, 0)
+    label_key = tree.rank.copy()
+    label_key[ends] = tree.node_ids[heads]
+    order = np.lexsort((label_key, visited_key, contracted))
+    tree.rank[order] = np.arange(num_nodes, dtype=np.int64)
+
+    return _compact(tree, ~absorbed, parent)
+
+
+def _remove_leaves(tree: RadixTree) -> tuple[RadixTree, list[int]]:
     """
     Remove all nodes that are only visited once from the tree.
 
@@ -121,59 +354,79 @@ def _remove_leaves(G: nx.DiGraph) -> tuple[nx.DiGraph, list[int]]:
     were accessed only once and don't contribute to the core structural patterns.
 
     Args:
-        G (networkx.DiGraph): A directed graph representing a radix tree structure.
+        tree (RadixTree): A tree representing a radix tree structure.
 
     Returns:
-        tuple[networkx.DiGraph, list[int]]: A tuple containing:
-            - The modified graph with unique nodes removed
+        tuple[RadixTree, list[int]]: A tuple containing:
+            - The tree with unique nodes removed
             - A list of lengths of the removed leaf nodes
     """
-    leaves = {
-        node: G.nodes[node]["length"]
-        for node in G.nodes()
-        if G.nodes[node]["visited"] == 1
-    }
-    leaves_id = list(leaves.keys())
-    leaves_len = list(leaves.values())
-    G.remove_nodes_from(leaves_id)
-    return G, leaves_len
-
-
-def _precompute_transition_cdfs(G: nx.DiGraph) -> nx.DiGraph:
-    for node in G.nodes():
-        out_edges = list(G.out_edges(node))
-        weights = [G[edge[0]][edge[1]]["weight"] for edge in out_edges] + [
-            G.nodes[node]["to_leaf"],
-            G.nodes[node]["end"],
-        ]
-        G.nodes[node]["out_cdf"] = get_cdf(weights)
-        G.nodes[node]["out_nodes"] = [edge[1] for edge in out_edges] + [
-            CACHE_END,
-            END_NODE,
-        ]
-
-    return G
-
-
-def _validate_graph(G: nx.DiGraph) -> bool:
-    for node in G.nodes():
-        # Skip nodes without parents or children
-        if G.in_degree(node) == 0 or G.out_degree(node) == 0:
-            continue
-
-        # Get incoming edge weight (should only be one parent)
-        parent = list(G.predecessors(node))[0]
-        in_weight = G[parent][node]["weight"]
-
-        # Sum outgoing edge weights
-        out_weights = [G[node][child]["weight"] for child in G.successors(node)]
-        out_weights += [G.nodes[node]["to_leaf"], G.nodes[node]["end"]]
-
-        # Compare weights (using np.isclose for float comparison)
-        if not in_weight == sum(out_weights):
-            raise ValueError(
-                f"Weight mismatch at node {node}: "
-                f"incoming weight {in_weight} != sum of outgoing weights {sum(out_weights)}"
-            )
+    leaves = tree.visited == 1
+    leaves[ROOT_INDEX] = False
+    leaves_len = tree.length[leaves].tolist()
+    return _compact(tree, ~leaves, tree.parent), leaves_len
+
+
+def _precompute_transition_cdfs(tree: RadixTree) -> RadixTree:
+    num_nodes = len(tree)
+    children = np.flatnonzero(tree.parent >= 0)
+    parents = tree.parent[children]
+    order = np.lexsort((tree.rank[children], parents))
+    children, parents = children[order], parents[order]
+
+    num_children = np.bincount(parents, minlength=num_nodes)
+    tree.child_offsets = np.concatenate(([0], np.cumsum(num_children)))
+    tree.children = children
+
+    # every node transitions to its children, then to CACHE_END and END_NODE
+    num_out = num_children + 2
+    tree.out_offsets = np.concatenate(([0], np.cumsum(num_out)))
+    child_pos = (
+        tree.out_offsets[parents]
+        + np.arange(len(children))
+        - tree.child_offsets[parents]
+    )
+    cache_end_pos = tree.out_offsets[:-1] + num_children
+    end_node_pos = cache_end_pos + 1
+
+    total = int(tree.out_offsets[-1])
+    out_nodes = np.empty(total, dtype=np.int64)
+    weights = np.empty(total, dtype=np.int64)
+    out_nodes[child_pos] = children
+    weights[child_pos] = tree.visited[children]
+    out_nodes[cache_end_pos] = CACHE_END
+    weights[cache_end_pos] = tree.to_leaf
+    out_nodes[end_node_pos] = END_NODE
+    weights[end_node_pos] = tree.end
+
+    # per-node cumulative sums, normalized by the total weight of each node
+    cumsum = np.cumsum(weights)
+    base = np.concatenate(([0], cumsum))[tree.out_offsets[:-1]]
+    segment = np.repeat(np.arange(num_nodes), num_out)
+    local_cumsum = cumsum - base[segment]
+    tree.out_nodes = out_nodes
+    tree.out_cdf = local_cumsum / local_cumsum[tree.out_offsets[1:] - 1][segment]
+    tree.out_cdf_shifted = tree.out_cdf + segment
+
+    return tree
+
+
+def _validate_graph(tree: RadixTree) -> bool:
+    has_parent = tree.parent >= 0
+    out_degree = np.bincount(tree.parent[has_parent], minlength=len(tree))
+    child_weights = np.bincount(
+        tree.parent[has_parent], weights=tree.visited[has_parent], minlength=len(tree)
+    ).astype(np.int64)
+    out_weights = child_weights + tree.to_leaf + tree.end
+
+    # skip nodes without parents or children
+    checked = has_parent & (out_degree > 0)
+    mismatch = np.flatnonzero(checked & (out_weights != tree.visited))
+    if len(mismatch):
+        node = mismatch[0]
+        raise ValueError(
+            f"Weight mismatch at node {tree.node_ids[node]}: "
+            f"incoming weight {tree.visited[node]} != sum of outgoing weights {out_weights[node]}"
+        )
 
     return True
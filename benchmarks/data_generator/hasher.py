@@ -13,8 +13,13 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
+import hashlib
+import multiprocessing as mp
+import os
 import re
-from typing import Dict, List, Union, cast
+from concurrent.futures import ProcessPoolExecutor
+from itertools import repeat
+from typing import Dict, List, Optional, Tuple, Union, cast
 
 import numpy as np
 from transformers import AutoTokenizer, PreTrainedTokenizerBase
@@ -29,68 +34,201 @@ lorem_text = (
 )
 words = np.array(list(set(re.findall(r"\b[a-zA-Z]+\b", lorem_text))))
 
+DEFAULT_SHARD_SIZE = 1024  # texts per task sent to a worker process
+HASH_DIGEST_SIZE = 8  # bytes, so that block hashes fit in a uint64
+
+# tokenizer of the current worker process, set once by _init_worker
+_worker_tokenizer: Optional[PreTrainedTokenizerBase] = None
+
+
+def _load_tokenizer(
+    tokenizer: Union[str, PreTrainedTokenizerBase],
+) -> PreTrainedTokenizerBase:
+    if isinstance(tokenizer, str):
+        return cast(PreTrainedTokenizerBase, AutoTokenizer.from_pretrained(tokenizer))
+    return tokenizer
+
+
+def _init_worker(tokenizer: Union[str, PreTrainedTokenizerBase]) -> None:
+    global _worker_tokenizer
+    _worker_tokenizer = _load_tokenizer(tokenizer)
+
+
+def _hash_blocks(
+    tokenizer: PreTrainedTokenizerBase, texts: List[str], block_size: int
+) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Tokenize texts and compute the rolling hash of every block of every text.
+
+    The hash of a block is the blake2b digest of the hash of its parent block followed
+    by its tokens, so it identifies the whole prefix ending with the block. Unlike the
+    builtin `hash`, it does not depend on the process or on PYTHONHASHSEED, so hashes
+    computed by different workers (or runs) can be merged.
+
+    Returns:
+        Tuple[np.ndarray, np.ndarray]: The block hashes of all texts concatenated as
+            uint64, and the offsets of the blocks of each text in that array.
+    """
+    # Batch tokenize for efficiency
+    batch_encoding = tokenizer(
+        texts,
+        add_special_tokens=False,
+        return_attention_mask=False,
+        return_token_type_ids=False,
+    )
+    # batch_encoding["input_ids"] is a List[List[int]]
+    all_tokens: List[List[int]] = batch_encoding["input_ids"]
+
+    digests: List[bytes] = []
+    num_blocks: List[int] = []
+    block_bytes = block_size * 8
+    for tokens in all_tokens:
+        data = np.asarray(tokens, dtype=np.int64).tobytes()
+        parent_hash = b""
+        for i in range(0, len(data), block_bytes):
+            parent_hash = hashlib.blake2b(
+                parent_hash + data[i : i + block_bytes], digest_size=HASH_DIGEST_SIZE
+            ).digest()
+            digests.append(parent_hash)
+        num_blocks.append(-(-len(tokens) // block_size))
+
+    hashes = np.frombuffer(b"".join(digests), dtype=np.uint64)
+    offsets = np.concatenate(([0], np.cumsum(num_blocks, dtype=np.int64)))
+    return hashes, offsets
+
+
+def _hash_shard(texts: List[str], block_size: int) -> Tuple[np.ndarray, np.ndarray]:
+    assert _worker_tokenizer is not None
+    return _hash_blocks(_worker_tokenizer, texts, block_size)
+
 
 def texts_to_hashes(
     tokenizer: Union[str, PreTrainedTokenizerBase],
     texts: List[str],
     block_size: int = 512,
+    num_workers: Optional[int] = None,
+    shard_size: int = DEFAULT_SHARD_SIZE,
 ) -> List[List[int]]:
     """
     Tokenizes a list of strings (without special tokens), splits tokens into blocks,
     computes rolling hashes, and returns a list of lists of integer-mapped rolling hashes
     for each input string.
 
+    The texts are split into shards of consecutive texts that are tokenized and hashed
+    in parallel by a pool of worker processes. The rolling hashes are then mapped to
+    consecutive integers in order of first appearance, so the result does not depend
+    on the number of workers.
+
     Args:
         tokenizer: Tokenizer object with a .encode method or string name to load from HuggingFace.
         texts (List[str]): List of input strings.
         block_size (int): Size of each token block for hashing.
+        num_workers (int, optional): Number of worker processes. Defaults to the number of CPUs.
+            The texts are processed in the current process if there is only one shard.
+        shard_size (int): Number of texts per shard.
 
     Returns:
         List[List[int]]: List of lists of integer-mapped rolling hashes for each block of each input string.
     """
-    # Load tokenizer if string is provided
-    if isinstance(tokenizer, str):
-        tokenizer = cast(
-            PreTrainedTokenizerBase, AutoTokenizer.from_pretrained(tokenizer)
-        )
+    if not texts:
+        return []
+    if num_workers is None:
+        num_workers = os.cpu_count() or 1
+    shards = [texts[i : i + shard_size] for i in range(0, len(texts), shard_size)]
 
-    # Batch tokenize for efficiency
-    batch_encoding = tokenizer(
-        texts,
-        add_special_tokens=False,
-        return_attention_mask=False,
-        return_token_type_ids=False,
-    )
-    # batch_encoding["input_ids"] is a List[List[int]]
-    all_tokens: List[List[int]] = batch_encoding["input_ids"]
+    if num_workers <= 1 or len(shards) <= 1:
+        results = [_hash_blocks(_load_tokenizer(tokenizer), texts, block_size)]
+    else:
+        # spawn, as forking after the tokenizer has been used can deadlock it
+        with ProcessPoolExecutor(
+            max_workers=min(num_workers, len(shards)),
+            mp_context=mp.get_context("spawn"),
+            initializer=_init_worker,
+            initargs=(tokenizer,),
+        ) as executor:
+            results = list(executor.map(_hash_shard, shards, repeat(block_size)))
 
-    results: List[List[int]] = []
-    hash_to_int: Dict[int, int] = {}
-    next_int = 0
+    hashes = np.concatenate([shard_hashes for shard_hashes, _ in results])
+    num_blocks = np.concatenate([np.diff(offsets) for _, offsets in results])
 
-    for tokens in all_tokens:
-        blocks: List[List[int]] = [
-            tokens[i : i + block_size] for i in range(0, len(tokens), block_size)
-        ]
+    # Map each hash to a unique integer, in order of first appearance
+    _, first_index, inverse = np.unique(hashes, return_index=True, return_inverse=True)
+    rank = np.empty(len(first_index), dtype=np.int64)
+    rank[np.argsort(first_index)] = np.arange(len(first_index))
+    hash_ids = rank[inverse.reshape(-1)].tolist()
 
-        parent_hash = 0
-        hashes: List[int] = []
+    offsets = np.concatenate(([0], np.cumsum(num_blocks))).tolist()
+    return [hash_ids[offsets[i] : offsets[i + 1]] for i in range(len(texts))]
 
-        for block in blocks:
-            combined = (parent_hash, hash(tuple(block)))
-            global_hash = hash(combined)
 
-            # Map global_hash to a unique integer
-            if global_hash not in hash_to_int:
-                hash_to_int[global_hash] = next_int
-                next_int += 1
+def _block_cache_path(
+    cache_dir: str,
+    tokenizer: PreTrainedTokenizerBase,
+    block_size: int,
+    cache_key: str,
+) -> str:
+    name = getattr(tokenizer, "name_or_path", "") or type(tokenizer).__name__
+    name = name.strip("/").replace("/", "--")
+    # hash IDs are only meaningful within a trace, so the cache is per trace
+    key = hashlib.blake2b(cache_key.encode(), digest_size=HASH_DIGEST_SIZE).hexdigest()
+    return os.path.join(cache_dir, f"{name}_block{block_size}_{key}.npz")
 
-            hashes.append(hash_to_int[global_hash])
-            parent_hash = global_hash
 
-        results.append(hashes)
+def _hash_set_key(block_lengths: Dict[int, int]) -> str:
+    """Digest of the hash IDs and their block lengths, identifying a trace"""
+    pairs = np.array(sorted(block_lengths.items()), dtype=np.int64).reshape(-1, 2)
+    return hashlib.blake2b(pairs.tobytes(), digest_size=HASH_DIGEST_SIZE).hexdigest()
 
-    return results
+
+def _load_block_cache(path: str) -> Dict[int, np.ndarray]:
+    if not os.path.exists(path):
+        return {}
+    with np.load(path) as data:
+        tokens = np.split(data["tokens"], data["offsets"][1:-1])
+        return dict(zip(data["hash_ids"].tolist(), tokens))
+
+
+def _save_block_cache(path: str, blocks: Dict[int, np.ndarray]) -> None:
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    lengths = [len(tokens) for tokens in blocks.values()]
+    tmp_path = f"{path}.{os.getpid()}.tmp.npz"
+    np.savez(
+        tmp_path,
+        hash_ids=np.fromiter(blocks.keys(), dtype=np.int64, count=len(blocks)),
+        offsets=np.concatenate(([0], np.cumsum(lengths, dtype=np.int64))),
+        tokens=(
+            np.concatenate(list(blocks.values()))
+            if blocks
+            else np.zeros(0, dtype=np.int32)
+        ),
+    )
+    # atomic, so that concurrent runs never see a partially written cache
+    os.replace(tmp_path, path)
+
+
+def _generate_blocks(
+    tokenizer: PreTrainedTokenizerBase, block_lengths: Dict[int, int]
+) -> Dict[int, np.ndarray]:
+    """Generate random token arrays of the given lengths by tokenizing sampled words."""
+    hash_ids = list(block_lengths)
+    sampled_texts = [
+        " ".join(np.random.choice(words, size=block_lengths[hash_id]))
+        for hash_id in hash_ids
+    ]
+    all_tokens = tokenizer(
+        sampled_texts,
+        add_special_tokens=False,
+        return_attention_mask=False,
+        return_token_type_ids=False,
+    )["input_ids"]
+
+    blocks: Dict[int, np.ndarray] = {}
+    for hash_id, tokens in zip(hash_ids, all_tokens):
+        token_array = np.array(tokens[: block_lengths[hash_id]], dtype=np.int32)
+        if getattr(tokenizer, "bos_token_id", None) is not None:
+            token_array[0] = tokenizer.bos_token_id
+        blocks[hash_id] = token_array
+    return blocks
 
 
 def hashes_to_texts(
@@ -98,28 +236,35 @@ def hashes_to_texts(
     hash_ids_list: List[List[int]],
     input_lengths: List[int],
     block_size: int = 512,
+    cache_dir: Optional[str] = None,
+    cache_key: Optional[str] = None,
 ) -> List[str]:
     """
     Converts a list of hash ID sequences back to text strings using a global token mapping.
 
+    The token arrays of all new hash IDs are generated with a single batched tokenizer
+    call, and all texts are decoded with a single batched decode call.
+
     Args:
         tokenizer: Tokenizer object with a .decode method or string name to load from HuggingFace.
         hash_ids_list (List[List[int]]): List of hash ID sequences for each input.
         input_lengths (List[int]): Target input lengths for each sequence.
         block_size (int): Size of each token block for reconstruction.
+        cache_dir (str, optional): Directory in which to cache the token array of each
+            hash ID, per tokenizer, block size and trace. Repeated runs reuse the cached
+            arrays instead of generating them, so the same hash ID maps to the same text.
+        cache_key (str, optional): Identifies the trace the hash IDs come from, e.g. its
+            path, as hash IDs of different traces are unrelated. Defaults to a digest of
+            the hash IDs and their lengths, so that only the same requests share a cache.
 
     Returns:
         List[str]: List of reconstructed text strings.
     """
     # Load tokenizer if string is provided
-    if isinstance(tokenizer, str):
-        tokenizer = cast(
-            PreTrainedTokenizerBase, AutoTokenizer.from_pretrained(tokenizer)
-        )
-
-    results: List[str] = []
-    _hash_id_to_tokens: Dict[int, np.ndarray] = {}
+    tokenizer = _load_tokenizer(tokenizer)
 
+    # Determine the number of tokens of each hash_id
+    block_lengths: Dict[int, int] = {}
     for hash_ids, input_len in zip(hash_ids_list, input_lengths):
         # Verify constraint: len(hash_ids) * block_size <= input_len
         if len(hash_ids) * block_size < input_len:
@@ -127,40 +272,53 @@ def hashes_to_texts(
                 f"Constraint violation: len(hash_ids) * block_size ({len(hash_ids) * block_size}) > input_len ({input_len})"
             )
 
-        token_arrays: List[np.ndarray] = []
-
         for i, hash_id in enumerate(hash_ids):
-            # Determine the block size for this hash_id
-            remaining_tokens = input_len - sum(len(arr) for arr in token_arrays)
-            current_block_size = min(block_size, remaining_tokens)
-
+            current_block_size = min(block_size, input_len - i * block_size)
             if current_block_size <= 0:
                 break
 
-            # Check if hash_id already exists in global dict
-            if hash_id in _hash_id_to_tokens:
-                # Use existing array, but assert it matches current_block_size
-                existing_array = _hash_id_to_tokens[hash_id]
-                assert (
-                    len(existing_array) == current_block_size
-                ), f"Existing array length {len(existing_array)} does not match current block size {current_block_size}"
-                token_array = existing_array
-            else:
-                # Generate new random array by sampling words, tokenizing, and taking first tokens
-                sampled_words = np.random.choice(words, size=current_block_size)
-                sampled_text = " ".join(sampled_words)
-                tokens = tokenizer.encode(sampled_text, add_special_tokens=False)
-                token_array = np.array(tokens[:current_block_size], dtype=np.int32)
-                if getattr(tokenizer, "bos_token_id", None) is not None:
-                    token_array[0] = tokenizer.bos_token_id
-                _hash_id_to_tokens[hash_id] = token_array
-
-            token_arrays.append(token_array)
-
-        all_tokens = np.concatenate(token_arrays)
-
-        # Decode to text
-        text = tokenizer.decode(all_tokens, skip_special_tokens=False)
-        results.append(text)
-
-    return results
+            # Check if hash_id already appeared, and assert it matches current_block_size
+            existing_size = block_lengths.setdefault(hash_id, current_block_size)
+            assert (
+                existing_size == current_block_size
+            ), f"Existing array length {existing_size} does not match current block size {current_block_size}"
+
+    cache_path = (
+        _block_cache_path(
+            cache_dir,
+            tokenizer,
+            block_size,
+            cache_key if cache_key is not None else _hash_set_key(block_lengths),
+        )
+        if cache_dir
+        else None
+    )
+    cache = _load_block_cache(cache_path) if cache_path else {}
+
+    _hash_id_to_tokens = {
+        hash_id: cache[hash_id]
+        for hash_id, length in block_lengths.items()
+        if hash_id in cache and len(cache[hash_id]) == length
+    }
+    missing = {
+        hash_id: length
+        for hash_id, length in block_lengths.items()
+        if hash_id not in _hash_id_to_tokens
+    }
+    if missing:
+        new_blocks = _generate_blocks(tokenizer, missing)
+        _hash_id_to_tokens.update(new_blocks)
+        if cache_path:
+            cache.update(new_blocks)
+            _save_block_cache(cache_path, cache)
+
+    all_tokens: List[np.ndarray] = []
+    for hash_ids, input_len in zip(hash_ids_list, input_lengths):
+        num_blocks = -(-input_len // block_size)
+        token_arrays = [_hash_id_to_tokens[h] for h in hash_ids[:num_blocks]]
+        all_tokens.append(
+            np.concatenate(token_arrays) if token_arrays else np.zeros(0, np.int32)
+        )
+
+    # Decode to text
+    return tokenizer.batch_decode(all_tokens, skip_special_tokens=False)
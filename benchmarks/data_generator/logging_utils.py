@@ -13,29 +13,59 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
-from typing import Dict, List
+import resource
+from typing import Any, Mapping, Sequence, Union
 
 import numpy as np
 import pandas as pd
+from data_generator.sampler import StreamingHistogram
 from tabulate import tabulate
 
 
-def calculate_and_print_statistics(metrics: Dict[str, List[float]]) -> pd.DataFrame:
+def get_peak_memory_mb() -> float:
+    """Return the peak resident set size of the current process, in MB."""
+    # ru_maxrss is reported in kilobytes on Linux
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def print_peak_memory() -> None:
+    print(f"peak memory usage: {get_peak_memory_mb():.1f} MB")
+
+
+def _histogram_statistics(histogram: StreamingHistogram) -> dict[str, float]:
+    return {
+        "Mean": histogram.mean(),
+        "Std Dev": histogram.std(),
+        "Min": histogram.percentile(0),
+        "P25": histogram.percentile(25),
+        "Median": histogram.percentile(50),
+        "P75": histogram.percentile(75),
+        "Max": histogram.percentile(100),
+    }
+
+
+def calculate_and_print_statistics(
+    metrics: Mapping[str, Union[Sequence[float], np.ndarray, StreamingHistogram]]
+) -> pd.DataFrame:
     """
     Calculate statistics for a dictionary of metrics and print them in a tabular format.
 
     Args:
-        metrics: Dictionary where keys are metric names and values are lists of metric values
+        metrics: Dictionary where keys are metric names and values are lists of metric values,
+            or histograms of the metric values accumulated while streaming
 
     Returns:
         pandas.DataFrame: DataFrame containing the calculated statistics
     """
     metric_names = []
-    stats_data = []
+    stats_data: list[dict[str, Any]] = []
 
     # Calculate statistics for each metric
     for metric_name, values in metrics.items():
         metric_names.append(metric_name)
+        if isinstance(values, StreamingHistogram):
+            stats_data.append(_histogram_statistics(values))
+            continue
         stats_data.append(
             {
                 "Mean": np.mean(values),
@@ -14,14 +14,30 @@
 # limitations under the License.
 
 import json
-from collections import Counter
-
-from data_generator.logging_utils import calculate_and_print_statistics
+from typing import Optional
+
+import numpy as np
+from data_generator.cache_simulator import (
+    EVICTION_POLICIES,
+    ROUTING_POLICIES,
+    CacheSimulator,
+)
+from data_generator.logging_utils import (
+    calculate_and_print_statistics,
+    print_peak_memory,
+)
+from data_generator.sampler import StreamingHistogram
+from data_generator.trace_io import TraceBatch, iter_trace_chunks
+from tabulate import tabulate
 
 
 class PrefixAnalyzer:
     """
     A class for analyzing dataset characteristics related to prefixes, hash IDs, and cache hit rates.
+
+    The dataset is streamed twice in chunks: a first pass counts the occurrences of
+    each hash ID, and a second pass computes the per-row metrics. Only the per hash ID
+    counts are held in memory, never the dataset itself.
     """
 
     def __init__(self, dataset_path, block_size=1):
@@ -29,89 +45,142 @@ class PrefixAnalyzer:
         Initialize the analyzer with dataset path and block size.
 
         Args:
-            dataset_path: Path to the JSONL dataset file
+            dataset_path: Path to the JSONL (or Parquet) dataset file
             block_size: Size of each block for prefix calculation
         """
         self.dataset_path = dataset_path
         self.block_size = block_size
-        self.dataset = self._load_dataset()
-        self.hash_counter = self._build_hash_counter()
-        self.repeated_hash_ids = {
-            hash_id for hash_id, count in self.hash_counter.items() if count > 1
-        }
-
-    def _load_dataset(self) -> list:
+        self.num_rows = 0
+
+        # sorted unique hash IDs, with their number of occurrences and the first row they appear in
+        self.hash_ids = np.zeros(0, dtype=np.int64)
+        self.hash_counts = np.zeros(0, dtype=np.int64)
+        self.hash_first_rows = np.zeros(0, dtype=np.int64)
+        self._build_hash_counter()
+
+    @staticmethod
+    def _reduce_hash_runs(
+        hash_ids: np.ndarray, first_rows: np.ndarray, counts: np.ndarray
+    ) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """Sorted unique hash IDs, with their total count and earliest row"""
+        # group by hash ID, with the earliest row first within each group
+        order = np.lexsort((first_rows, hash_ids))
+        hash_ids = hash_ids[order]
+        starts = np.flatnonzero(np.r_[True, hash_ids[1:] != hash_ids[:-1]])
+        if not len(starts):
+            empty = np.zeros(0, dtype=np.int64)
+            return empty, empty, empty
+        return (
+            hash_ids[starts],
+            first_rows[order][starts],
+            np.add.reduceat(counts[order], starts),
+        )
+
+    def _build_hash_counter(self) -> None:
         print(f"Loading dataset from {self.dataset_path}...")
-        dataset = []
-        with open(self.dataset_path, "r") as f:
-            for line in f:
-                dataset.append(json.loads(line))
-        print(f"Dataset loaded: {len(dataset)} examples")
-        return dataset
-
-    def _build_hash_counter(self) -> Counter:
-        all_hash_ids = []
-        for item in self.dataset:
-            all_hash_ids.extend(item["hash_ids"])
-        counter = Counter(all_hash_ids)
-        print(f"Hash counter built: {len(counter)} unique hash IDs")
-        return counter
-
-    def analyze(self) -> dict[str, list]:
+        # per-chunk runs of (hash ID, first row, count), merged into the reduced
+        # arrays only once they outgrow them, so that each hash ID is re-sorted a
+        # logarithmic number of times rather than once per chunk
+        runs: list[tuple[np.ndarray, np.ndarray, np.ndarray]] = []
+        num_pending = 0
+        for chunk in iter_trace_chunks(self.dataset_path):
+            rows = self.num_rows + np.repeat(
+                np.arange(len(chunk)), np.diff(chunk.hash_ids_offsets)
+            )
+            run = self._reduce_hash_runs(
+                chunk.hash_ids, rows, np.ones(len(chunk.hash_ids), dtype=np.int64)
+            )
+            runs.append(run)
+            num_pending += len(run[0])
+            self.num_rows += len(chunk)
+            if num_pending > len(self.hash_ids):
+                self._merge_hash_runs(runs)
+                runs, num_pending = [], 0
+        self._merge_hash_runs(runs)
+
+        print(f"Dataset loaded: {self.num_rows} examples")
+        print(f"Hash counter built: {len(self.hash_ids)} unique hash IDs")
+
+    def _merge_hash_runs(
+        self, runs: list[tuple[np.ndarray, np.ndarray, np.ndarray]]
+    ) -> None:
+        if not runs:
+            return
+        hash_ids, first_rows, counts = (
+            np.concatenate(arrays)
+            for arrays in zip(
+                (self.hash_ids, self.hash_first_rows, self.hash_counts), *runs
+            )
+        )
+        self.hash_ids, self.hash_first_rows, self.hash_counts = self._reduce_hash_runs(
+            hash_ids, first_rows, counts
+        )
+
+    def _lookup(self, hash_ids: np.ndarray) -> np.ndarray:
+        return np.searchsorted(self.hash_ids, hash_ids)
+
+    def analyze(self) -> dict[str, StreamingHistogram]:
         """
         Analyze dataset to extract various length metrics and print statistics.
 
         Returns:
-            Tuple of lists: (input_lengths, prefix_lengths, user_prompt_lengths, output_lengths)
+            dict[str, StreamingHistogram]: The distribution of each metric, keyed by name
         """
-        # Extract input and output lengths directly from fields
-        input_lengths = [item["input_length"] for item in self.dataset]
-        output_lengths = [item["output_length"] for item in self.dataset]
-
-        # Calculate prefix length and user prompt length for each row
-        prefix_lengths = []
-        user_prompt_lengths = []
-
-        for i, item in enumerate(self.dataset):
-            input_len = item["input_length"]
-            hash_ids = item["hash_ids"]
-            assert len(hash_ids) * self.block_size >= input_len
-
-            # Special case: if all hash IDs in the row are repeated elsewhere
-            if all(hash_id in self.repeated_hash_ids for hash_id in hash_ids):
-                prefix_len = input_len  # Set prefix length to input length
-                user_prompt_len = 0  # Set user prompt length to 0
-            else:
-                # Count how many hash IDs in this row are repeated elsewhere in the dataset
-                repeated_count = sum(
-                    1 for hash_id in hash_ids if hash_id in self.repeated_hash_ids
-                )
-                prefix_len = repeated_count * self.block_size
-                user_prompt_len = input_len - prefix_len
+        metrics = {
+            "Input Length": StreamingHistogram(),
+            "Context Length": StreamingHistogram(),
+            "Unique Prompt Length": StreamingHistogram(),
+            "Output Length": StreamingHistogram(),
+            "Theoretical Hit Rates": StreamingHistogram(),
+        }
 
-            prefix_lengths.append(prefix_len)
-            user_prompt_lengths.append(user_prompt_len)
+        row_offset = 0
+        for chunk in iter_trace_chunks(self.dataset_path):
+            input_lens = chunk.input_length
+            path_lens = np.diff(chunk.hash_ids_offsets)
+            assert np.all(path_lens * self.block_size >= input_lens)
+
+            # Count how many hash IDs in each row are repeated elsewhere in the dataset
+            row_index = np.repeat(np.arange(len(chunk)), path_lens)
+            idx = self._lookup(chunk.hash_ids)
+            repeated_count = np.bincount(
+                row_index, weights=self.hash_counts[idx] > 1, minlength=len(chunk)
+            ).astype(np.int64)
+
+            # Special case: if all hash IDs in the row are repeated elsewhere,
+            # the whole input is context and there is no user prompt
+            all_repeated = repeated_count == path_lens
+            prefix_lens = np.where(
+                all_repeated, input_lens, repeated_count * self.block_size
+            )
+            user_prompt_lens = input_lens - prefix_lens
 
             # Check if prefix length is greater than input length
-            if prefix_len > input_len:
-                print(f"WARNING: Line {i}: {json.dumps(item)}")
-
-        cache_hit_rates = self._analyze_cache_hit_rates()
+            for i in np.flatnonzero(prefix_lens > input_lens):
+                self._warn_row(chunk, int(i), row_offset)
+
+            metrics["Input Length"].update(input_lens)
+            metrics["Context Length"].update(prefix_lens)
+            metrics["Unique Prompt Length"].update(user_prompt_lens)
+            metrics["Output Length"].update(chunk.output_length)
+            metrics["Theoretical Hit Rates"].update(
+                self._analyze_cache_hit_rates(chunk, idx, row_offset)
+            )
+            row_offset += len(chunk)
 
         # Print statistics table
-        metrics = {
-            "Input Length": input_lengths,
-            "Context Length": prefix_lengths,
-            "Unique Prompt Length": user_prompt_lengths,
-            "Output Length": output_lengths,
-            "Theoretical Hit Rates": cache_hit_rates,
-        }
-
         calculate_and_print_statistics(metrics)
 
         return metrics
 
-    def _analyze_cache_hit_rates(self) -> list[float]:
+    def _warn_row(self, chunk: TraceBatch, i: int, row_offset: int) -> None:
+        item = {name: int(values[i]) for name, values in chunk.columns().items()}
+        item["hash_ids"] = chunk.get_hash_ids(i).tolist()
+        print(f"WARNING: Line {row_offset + i}: {json.dumps(item)}")
+
+    def _analyze_cache_hit_rates(
+        self, chunk: TraceBatch, idx: Optional[np.ndarray] = None, row_offset: int = 0
+    ) -> np.ndarray:
         """
         Analyze theoretical cache hit rates based on hash ID repetition.
 
@@ -120,37 +189,104 @@ class PrefixAnalyzer:
         similar to how KV caching would work in real life.
         Assumes the cache is infinite in size (hence "theoretical"), so no hash IDs are ever evicted.
 
-        Returns:
-            List of cache hit rates for each row in the dataset
-        """
-        # Set to track all hash IDs we've seen
-        seen_hash_ids = set()
-
-        # Store cache hit rates for each row
-        cache_hit_rates = []
+        A hash ID is therefore cached in a row if and only if its first appearance
+        is in an earlier row, which lets every row of the chunk be handled at once.
 
-        for item in self.dataset:
-            hash_ids = item["hash_ids"]
-
-            # Skip if there are no hash IDs
-            if len(hash_ids) == 0:
-                continue
+        Args:
+            chunk: A chunk of the dataset
+            idx: Positions of the chunk's hash IDs in `self.hash_ids`, looked up if not given
+            row_offset: Row number of the first request of the chunk in the dataset
 
-            # Find the first index where the hash ID hasn't been seen before
-            first_unseen_idx = len(hash_ids)  # Default if all are seen
-            for idx, hash_id in enumerate(hash_ids):
-                if hash_id not in seen_hash_ids:
-                    first_unseen_idx = idx
-                    break
+        Returns:
+            Cache hit rates for each row of the chunk, skipping rows without hash IDs
+        """
+        if idx is None:
+            idx = self._lookup(chunk.hash_ids)
+        offsets = chunk.hash_ids_offsets
+        path_lens = np.diff(offsets)
+        # Skip if there are no hash IDs
+        non_empty = np.flatnonzero(path_lens)
+        if len(non_empty) == 0:
+            return np.zeros(0)
+
+        rows = row_offset + np.repeat(np.arange(len(chunk)), path_lens)
+        positions = np.arange(len(chunk.hash_ids)) - offsets[:-1].repeat(path_lens)
+        unseen = self.hash_first_rows[idx] == rows
+
+        # Find the first index where the hash ID hasn't been seen before
+        first_unseen_idx = np.minimum.reduceat(
+            np.where(unseen, positions, np.iinfo(np.int64).max), offsets[non_empty]
+        )
+        first_unseen_idx = np.minimum(first_unseen_idx, path_lens[non_empty])
+        return first_unseen_idx / path_lens[non_empty]
+
+    def simulate_cache(
+        self,
+        capacity: Optional[int],
+        num_workers: int = 1,
+        eviction: str = "lru",
+        routing: str = "prefix_overlap",
+        window: float = 60_000,
+        seed: int = 0,
+    ) -> CacheSimulator:
+        """
+        Replay the dataset against finite KV caches and print the resulting hit rates.
 
-            # Calculate cache hit rate
-            cache_hit_rate = first_unseen_idx / len(hash_ids)
-            cache_hit_rates.append(cache_hit_rate)
+        Unlike `_analyze_cache_hit_rates`, each of the `num_workers` workers has a cache
+        of `capacity` blocks, from which blocks are evicted with the given policy, and
+        requests only hit the cache of the worker they are routed to.
 
-            # Add all hash IDs from this row to the seen set
-            seen_hash_ids.update(hash_ids)
+        Args:
+            capacity: Number of blocks in the cache of each worker, None for infinite caches
+            num_workers: Number of workers
+            eviction: Eviction policy, "lru" or "lfu"
+            routing: Routing policy, "random", "round_robin" or "prefix_overlap"
+            window: Length of the windows over which the timeline is reported, in milliseconds
+            seed: Seed for the random routing policy
 
-        return cache_hit_rates
+        Returns:
+            The simulator after the replay, whose `timeline` holds the cache activity over time
+        """
+        simulator = CacheSimulator(
+            len(self.hash_ids),
+            capacity,
+            num_workers=num_workers,
+            eviction=eviction,
+            routing=routing,
+            window=window,
+            seed=seed,
+        )
+        hit_rates = StreamingHistogram()
+        for chunk in iter_trace_chunks(self.dataset_path):
+            hit_rates.update(
+                simulator.process(
+                    self._lookup(chunk.hash_ids),
+                    chunk.hash_ids_offsets,
+                    chunk.timestamp,
+                )
+            )
+
+        timeline = simulator.timeline
+        print(
+            f"Cache simulation: {num_workers} worker(s), "
+            f"{capacity if capacity is not None else 'infinite'} blocks each, "
+            f"{eviction} eviction, {routing} routing"
+        )
+        calculate_and_print_statistics({"Simulated Hit Rates": hit_rates})
+        print(
+            tabulate(
+                timeline.rows(),
+                headers="keys",
+                tablefmt="pretty",
+                floatfmt=".4f",
+            )
+        )
+        print(
+            f"Total: hit rate {timeline.hit_blocks.sum() / max(timeline.blocks.sum(), 1):.4f}, "
+            f"{timeline.evictions.sum()} evictions, "
+            f"{timeline.transferred.sum()} blocks transferred"
+        )
+        return simulator
 
 
 def main():
@@ -169,6 +305,38 @@ def main():
         default=512,
         help="Block size for prefix calculation (default: 512)",
     )
+    parser.add_argument(
+        "--cache-size",
+        type=int,
+        default=None,
+        help="Blocks per worker cache. If set, also replays the dataset against finite caches (default: None)",
+    )
+    parser.add_argument(
+        "--num-workers",
+        type=int,
+        default=1,
+        help="Number of workers for the cache simulation (default: 1)",
+    )
+    parser.add_argument(
+        "--eviction",
+        type=str,
+        choices=EVICTION_POLICIES,
+        default="lru",
+        help="Eviction policy for the cache simulation (default: lru)",
+    )
+    parser.add_argument(
+        "--routing",
+        type=str,
+        choices=list(ROUTING_POLICIES),
+        default="prefix_overlap",
+        help="Routing policy for the cache simulation (default: prefix_overlap)",
+    )
+    parser.add_argument(
+        "--window",
+        type=float,
+        default=60.0,
+        help="Window over which the cache simulation is reported, in seconds (default: 60)",
+    )
     args = parser.parse_args()
 
     block_size = args.block_size
@@ -181,6 +349,16 @@ def main():
     # Create analyzer instance
     analyzer = PrefixAnalyzer(dataset_path, block_size=block_size)
     analyzer.analyze()
+    if args.cache_size is not None:
+        print()
+        analyzer.simulate_cache(
+            args.cache_size,
+            num_workers=args.num_workers,
+            eviction=args.eviction,
+            routing=args.routing,
+            window=args.window * 1000,
+        )
+    print_peak_memory()
 
 
 if __name__ == "__main__":
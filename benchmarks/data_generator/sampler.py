@@ -23,7 +23,7 @@ from numpy.random import Generator
 logger = logging.getLogger(__name__)
 
 
-def get_cdf(weights: List[float]) -> np.ndarray:
+def get_cdf(weights: Union[List[float], np.ndarray]) -> np.ndarray:
     cumsum = np.cumsum(weights)
     return cumsum / cumsum[-1]
 
@@ -36,7 +36,7 @@ def data_to_cdf(data: np.ndarray) -> Tuple[List[Any], np.ndarray]:
 
 
 def sample_from_cdf(
-    data: List[Any], cdf: np.ndarray, rng: Optional[Generator] = None
+    data: Union[List[Any], np.ndarray], cdf: np.ndarray, rng: Optional[Generator] = None
 ) -> Any:
     # NOTE: assumes (but does not verify) that the CDF is valid
     # CDF stands for cumulative distribution function
@@ -47,23 +47,81 @@ def sample_from_cdf(
         return data[np.searchsorted(cdf, np.random.rand())]
 
 
+class StreamingHistogram:
+    """
+    Counts of the distinct values seen in a stream of data, accumulated chunk by chunk.
+
+    Memory is proportional to the number of distinct values rather than to the number
+    of samples, and the summary statistics are exact.
+    """
+
+    def __init__(self) -> None:
+        self.values: np.ndarray = np.zeros(0, dtype=np.int64)
+        self.counts: np.ndarray = np.zeros(0, dtype=np.int64)
+
+    def __len__(self) -> int:
+        return int(self.counts.sum())
+
+    def update(self, data: Union[List[Any], np.ndarray]) -> None:
+        data = np.asarray(data)
+        if len(data) == 0:
+            return
+        values = data if len(self.values) == 0 else np.concatenate((self.values, data))
+        weights = np.concatenate((self.counts, np.ones(len(data), dtype=np.int64)))
+        self.values, inverse = np.unique(values, return_inverse=True)
+        self.counts = np.bincount(
+            inverse.reshape(-1), weights=weights, minlength=len(self.values)
+        ).astype(np.int64)
+
+    def mean(self) -> float:
+        return float(np.dot(self.values, self.counts) / len(self))
+
+    def std(self) -> float:
+        variance = np.dot((self.values - self.mean()) ** 2, self.counts) / len(self)
+        return float(np.sqrt(variance))
+
+    def percentile(self, q: float) -> float:
+        # linear interpolation between order statistics, as np.percentile does
+        rank = q / 100 * (len(self) - 1)
+        cumcounts = np.cumsum(self.counts)
+        lower, upper = self.values[
+            np.searchsorted(cumcounts, [np.floor(rank), np.ceil(rank)], side="right")
+        ]
+        return float(lower + (upper - lower) * (rank - np.floor(rank)))
+
+
 class EmpiricalSampler:
     """
     Takes data, learns from the pure empirical distribution, and samples directly from it.
 
     Args:
         data (Union[List[Any], np.ndarray]): The input data to learn the distribution from.
+        counts (Optional[np.ndarray]): If given, `data` holds distinct values and `counts`
+            the number of times each was observed, e.g. from a `StreamingHistogram`.
     """
 
-    def __init__(self, data: Union[List[Any], np.ndarray]) -> None:
+    def __init__(
+        self, data: Union[List[Any], np.ndarray], counts: Optional[np.ndarray] = None
+    ) -> None:
         self.rng = np.random.default_rng(0)
         self.empty_data = len(data) == 0
         if self.empty_data:
             logger.warning("Empty data provided to EmpiricalSampler")
+        elif counts is None:
+            data_unique, self.cdf = data_to_cdf(np.array(data))
+            self.data = np.array(data_unique)
         else:
-            self.data, self.cdf = data_to_cdf(np.array(data))
+            order = np.argsort(data, kind="stable")
+            self.data = np.asarray(data)[order]
+            self.cdf = get_cdf(np.asarray(counts)[order])
 
     def sample(self) -> Any:
         if self.empty_data:
             return 0
         return sample_from_cdf(self.data, self.cdf, self.rng)
+
+    def sample_batch(self, size: int) -> np.ndarray:
+        """Draw `size` samples at once with a single vectorized CDF lookup."""
+        if self.empty_data:
+            return np.zeros(size, dtype=np.int64)
+        return self.data[np.searchsorted(self.cdf, self.rng.random(size))]
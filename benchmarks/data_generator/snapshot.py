@@ -0,0 +1,99 @@
+# SPDX-FileCopyrightText: Copyright (c) 2025 NVIDIA CORPORATION & AFFILIATES. All rights reserved.
+# SPDX-License-Identifier: Apache-2.0
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+Snapshots of named NumPy arrays in a single file that can be memory-mapped.
+
+Snapshots are uncompressed `.npz` archives, so they can be inspected with `np.load`.
+`np.load` reads every array of an archive into memory though, so `load_arrays`
+instead locates the data of each array inside the archive and maps it read-only
+with `np.memmap`: loading is then independent of the size of the snapshot, and
+processes loading the same snapshot share its pages.
+"""
+
+import os
+import struct
+import zipfile
+from typing import Mapping
+
+import numpy as np
+
+# size of the fixed part of a zip local file header, followed by the name and extra field
+_LOCAL_HEADER_SIZE = 30
+
+
+def save_arrays(path: str, arrays: Mapping[str, np.ndarray]) -> None:
+    """Write the arrays to an uncompressed `.npz` file, atomically replacing `path`."""
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, "wb") as f:
+        np.savez(f, **arrays)  # type: ignore[arg-type]
+    os.replace(tmp_path, path)
+
+
+def _member_array(f, archive: zipfile.ZipFile, info: zipfile.ZipInfo) -> np.ndarray:
+    if info.compress_type != zipfile.ZIP_STORED:
+        raise ValueError(f"{info.filename} is compressed and cannot be memory-mapped")
+
+    f.seek(info.header_offset)
+    local_header = f.read(_LOCAL_HEADER_SIZE)
+    name_len, extra_len = struct.unpack("<HH", local_header[26:30])
+    f.seek(info.header_offset + _LOCAL_HEADER_SIZE + name_len + extra_len)
+
+    version = np.lib.format.read_magic(f)
+    if version == (1, 0):
+        shape, fortran_order, dtype = np.lib.format.read_array_header_1_0(f)
+    else:
+        shape, fortran_order, dtype = np.lib.format.read_array_header_2_0(f)
+
+    if dtype.hasobject:
+        raise ValueError(f"{info.filename} holds Python objects")
+    if not shape or 0 in shape:
+        # nothing worth mapping, and np.memmap rejects empty arrays
+        with archive.open(info) as member:
+            return np.lib.format.read_array(member)
+    return np.asarray(
+        np.memmap(
+            f.name,
+            dtype=dtype,
+            mode="r",
+            offset=f.tell(),
+            shape=shape,
+            order="F" if fortran_order else "C",
+        )
+    )
+
+
+def load_arrays(path: str, mmap: bool = True) -> dict[str, np.ndarray]:
+    """
+    Load the arrays of a snapshot written by `save_arrays`.
+
+    Args:
+        path (str): The snapshot file.
+        mmap (bool, optional): Map the arrays read-only instead of reading them into
+            memory. Defaults to True.
+
+    Returns:
+        dict[str, np.ndarray]: The arrays, by name.
+    """
+    if not mmap:
+        with np.load(path) as data:
+            return {name: data[name] for name in data.files}
+
+    arrays = {}
+    with zipfile.ZipFile(path) as archive, open(path, "rb") as f:
+        for info in archive.infolist():
+            name = info.filename.removesuffix(".npy")
+            arrays[name] = _member_array(f, archive, info)
+    return arrays
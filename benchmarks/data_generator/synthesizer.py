@@ -13,22 +13,54 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
-import json
-from collections import Counter
-from typing import Any, Optional
+from dataclasses import dataclass, fields, replace
+from typing import Iterator, Optional
 
-import networkx as nx
 import numpy as np
 import pandas as pd
 from data_generator.graph_utils import (
+    ROOT_INDEX,
+    EdgeCounts,
+    RadixTree,
+    _build_tree,
+    _count_edges,
     _mark_visited,
     _merge_chains,
     _precompute_transition_cdfs,
     _remove_leaves,
-    _verify_tree,
+    _segment_positions,
 )
 from data_generator.protocols import CACHE_END, END_NODE, SUPER_ROOT
-from data_generator.sampler import EmpiricalSampler, sample_from_cdf
+from data_generator.sampler import (
+    EmpiricalSampler,
+    StreamingHistogram,
+    sample_from_cdf,
+)
+from data_generator.snapshot import load_arrays, save_arrays
+from data_generator.trace_io import TraceBatch, iter_trace_chunks, write_trace
+
+DEFAULT_BATCH_SIZE = 1 << 20  # requests per batch when streaming synthesized requests
+SNAPSHOT_VERSION = 1
+
+# distributions learned from the trace, each stored as distinct values and their counts
+LEARNED_DISTRIBUTIONS = (
+    "leaves_lens",
+    "request_counts",
+    "timedeltas",
+    "input_lens_mod",
+    "output_lens",
+)
+
+
+@dataclass
+class RequestBatch(TraceBatch):
+    """
+    Columnar batch of synthesized requests, in the mooncake trace format with the
+    context length and unique user prompt length of every request added.
+    """
+
+    context_len: np.ndarray
+    unique_user_prompt_len: np.ndarray
 
 
 class Synthesizer:
@@ -50,8 +82,11 @@ class Synthesizer:
         any block that is (can possibly be) visited more than once, while a prompt
         is considered to be unique and only visited once (user prompt).
 
+        The trace file is streamed in chunks, and only the aggregated prefix tree edges and
+        histograms of the request statistics are kept in memory.
+
         Args:
-            dataset_file (str): The mooncake trace file in jsonl format.
+            dataset_file (str): The mooncake trace file in jsonl (or Parquet) format.
             block_size (int, optional): The block size for prefilling and decoding.
                 Defaults to 512.
             speedup_ratio (int, optional): For speeding up the request intervals.
@@ -73,6 +108,24 @@ class Synthesizer:
             cannot be mixed and matched with the original trace file,
             as the hash ids will be relabeled.
         """
+        self._set_knobs(
+            block_size,
+            speedup_ratio,
+            prefix_root_multiplier,
+            prefix_len_multiplier,
+            prompt_len_multiplier,
+        )
+        self._learn(dataset_file)
+        self._apply_knobs()
+
+    def _set_knobs(
+        self,
+        block_size: int,
+        speedup_ratio: float,
+        prefix_root_multiplier: int,
+        prefix_len_multiplier: float,
+        prompt_len_multiplier: float,
+    ) -> None:
         self.block_size = block_size
         self.num_copies = prefix_root_multiplier
         self.speedup_ratio = float(speedup_ratio)
@@ -95,99 +148,192 @@ class Synthesizer:
             and self.prompt_len_multiplier > 0
         ), "prompt_len_multiplier must be a positive float"
 
-        # extract data from json file
-        with open(dataset_file, "r") as f:
-            hash_ids_list = []
-            timestamps = []
-            input_lens = []
-            output_lens = []
-            for line in f:
-                data = json.loads(line)
-                hash_ids_list.append(np.array(data["hash_ids"]))
-                timestamps.append(int(data["timestamp"]))
-                input_lens.append(np.array(data["input_length"]))
-                output_lens.append(int(data["output_length"]))
-
-        # represent prefix-tree as directed graph
-        self.G = nx.DiGraph()
+    def _learn(self, dataset_file: str) -> None:
+        """
+        Learn the core radix tree and the request statistics from the trace, independently
+        of the knobs, which are applied on top of them by `_apply_knobs`.
+        """
+        block_size = self.block_size
+
+        # stream the trace, accumulating the prefix tree edges and request statistics
+        edges = EdgeCounts()
+        timestamps = StreamingHistogram()
+        timedeltas = StreamingHistogram()
+        input_lens_mod = StreamingHistogram()
+        output_lens = StreamingHistogram()
         max_hash_id = SUPER_ROOT
-        num_paths = 0
+        last_timestamp = None
+
+        for chunk in iter_trace_chunks(dataset_file):
+            edges = _count_edges(chunk.hash_ids, chunk.hash_ids_offsets, edges)
+            max_hash_id = max(max_hash_id, int(chunk.hash_ids.max(initial=SUPER_ROOT)))
+
+            timestamps.update(chunk.timestamp)
+            if last_timestamp is not None:
+                chunk_timedeltas = np.diff(chunk.timestamp, prepend=last_timestamp)
+            else:
+                chunk_timedeltas = np.diff(chunk.timestamp)
+            timedeltas.update(chunk_timedeltas[chunk_timedeltas > 0])
+            last_timestamp = chunk.timestamp[-1]
+
+            chunk_input_lens_mod = (
+                chunk.input_length - (np.diff(chunk.hash_ids_offsets) - 1) * block_size
+            )
+            assert np.all(0 < chunk_input_lens_mod) and np.all(
+                chunk_input_lens_mod <= block_size
+            )
+            input_lens_mod.update(chunk_input_lens_mod)
+            output_lens.update(chunk.output_length)
+
+        # represent prefix-tree as array-backed tree, rows in order of first appearance
+        tree = _build_tree(edges)
+        del edges
+        _mark_visited(tree)
+        tree = _merge_chains(tree)  # make tree radix-like
+        tree, leaves_lens = _remove_leaves(tree)
+        # the transition CDFs only depend on the visit counts, not on the knobs
+        self._learned_tree = _precompute_transition_cdfs(tree)
+        self._learned_max_hash_id = max_hash_id
+
+        leaves_lens_histogram = StreamingHistogram()
+        leaves_lens_histogram.update(leaves_lens)
+        request_counts = StreamingHistogram()
+        request_counts.update(timestamps.counts)
+        histograms = {
+            "leaves_lens": leaves_lens_histogram,
+            "request_counts": request_counts,
+            "timedeltas": timedeltas,
+            "input_lens_mod": input_lens_mod,
+            "output_lens": output_lens,
+        }
+        self._learned_distributions = {
+            name: (histogram.values, histogram.counts)
+            for name, histogram in histograms.items()
+        }
 
-        self.G.add_node(-1, end=0)
-        for hash_ids in hash_ids_list:
-            num_paths += 1
-            for i in range(len(hash_ids)):
-                u = hash_ids[i - 1] if i > 0 else SUPER_ROOT
-                v = hash_ids[i]
-                max_hash_id = max(v, max_hash_id)
+    def _apply_knobs(self) -> None:
+        """Build the sampling state from the learned state and the knobs."""
+        # the learned tree is left untouched (and may be read-only if memory-mapped)
+        self.tree = replace(self._learned_tree)
+        self.max_hash_id = self._learned_max_hash_id
+        distributions = self._learned_distributions
 
-                if v in self.G:
-                    self.G.nodes[v]["visited"] += 1
-                else:
-                    self.G.add_node(v, visited=1, end=0)
+        # Apply prompt_len_multiplier to leaves_lens
+        leaves_lens, leaves_counts = distributions["leaves_lens"]
+        if self.prompt_len_multiplier != 1:
+            leaves_lens, inverse = np.unique(
+                np.maximum(1, np.round(leaves_lens * self.prompt_len_multiplier)),
+                return_inverse=True,
+            )
+            leaves_counts = np.bincount(inverse.reshape(-1), weights=leaves_counts)
+            leaves_lens = leaves_lens.astype(np.int64)
 
-                if self.G.has_edge(u, v):
-                    self.G[u][v]["weight"] += 1
-                else:
-                    self.G.add_edge(u, v, weight=1)
+        self.leaves_lens_sampler = EmpiricalSampler(leaves_lens, leaves_counts)
+        self._relabel_nodes()
 
-            self.G.nodes[v]["end"] += 1
+        # copies of the core radix tree are offset by multiples of this stride,
+        # and new leaf hash ids are allocated past the last copy
+        self.copy_stride = self.max_hash_id + 1
+        self.max_hash_id = self.num_copies * self.copy_stride - 1
 
-        self.G.nodes[SUPER_ROOT]["visited"] = num_paths
-        self.max_hash_id = max_hash_id
+        # get statistics of timing, request counts, ISL, and OSL
+        self.request_counts_sampler = EmpiricalSampler(*distributions["request_counts"])
+        self.timedeltas_sampler = EmpiricalSampler(*distributions["timedeltas"])
+        self.input_lens_mod_sampler = EmpiricalSampler(*distributions["input_lens_mod"])
+        self.output_lens_sampler = EmpiricalSampler(*distributions["output_lens"])
 
-        _verify_tree(self.G)
-        _mark_visited(self.G)
-        self.G = _merge_chains(self.G)  # make graph radix-like
-        self.G, leaves_lens = _remove_leaves(self.G)
+    def save(self, snapshot_file: str) -> None:
+        """
+        Save the state learned from the trace to a snapshot file, so that it can be loaded
+        with `Synthesizer.load` without re-reading the trace.
 
-        # Apply prompt_len_multiplier to leaves_lens
-        if self.prompt_len_multiplier != 1:
-            leaves_lens = [
-                max(1, round(length * self.prompt_len_multiplier))
-                for length in leaves_lens
-            ]
+        The knobs are not part of the snapshot, so the same snapshot can be loaded with
+        different knobs.
 
-        self.leaves_lens_sampler = EmpiricalSampler(leaves_lens)
-        self._relabel_nodes()
-        self.G = _precompute_transition_cdfs(self.G)
+        Args:
+            snapshot_file (str): The snapshot file, in uncompressed `.npz` format.
+        """
+        arrays = {
+            "version": np.array(SNAPSHOT_VERSION),
+            "block_size": np.array(self.block_size),
+            "max_hash_id": np.array(self._learned_max_hash_id),
+        }
+        for f in fields(RadixTree):
+            arrays[f"tree.{f.name}"] = getattr(self._learned_tree, f.name)
+        for name, (values, counts) in self._learned_distributions.items():
+            arrays[f"{name}.values"] = values
+            arrays[f"{name}.counts"] = counts
+        save_arrays(snapshot_file, arrays)
+
+    @classmethod
+    def load(
+        cls,
+        snapshot_file: str,
+        speedup_ratio: float = 1.0,
+        prefix_root_multiplier: int = 1,
+        prefix_len_multiplier: float = 1.0,
+        prompt_len_multiplier: float = 1.0,
+        mmap: bool = True,
+    ) -> "Synthesizer":
+        """
+        Create a synthesizer from a snapshot written by `save`, with the given knobs.
 
-        # get statistics of timing, request counts, ISL, and OSL
-        request_counts = list(Counter(timestamps).values())
-        self.request_counts_sampler = EmpiricalSampler(request_counts)
-        timedeltas = np.diff(timestamps)
-        timedeltas = timedeltas[timedeltas > 0]
-        self.timedeltas_sampler = EmpiricalSampler(timedeltas)
-        input_lens_mod = np.array(
-            [
-                input_len - (len(hash_ids) - 1) * block_size
-                for input_len, hash_ids in zip(input_lens, hash_ids_list)
-            ]
+        Args:
+            snapshot_file (str): The snapshot file.
+            speedup_ratio, prefix_root_multiplier, prefix_len_multiplier,
+                prompt_len_multiplier: The knobs, as in `__init__`. The block size is the
+                one the snapshot was learned with.
+            mmap (bool, optional): Memory-map the snapshot rather than reading it, so that
+                loading is nearly instant and processes share the same pages.
+                Defaults to True.
+
+        Returns:
+            Synthesizer: The synthesizer.
+        """
+        arrays = load_arrays(snapshot_file, mmap=mmap)
+        version = int(arrays["version"])
+        if version != SNAPSHOT_VERSION:
+            raise ValueError(
+                f"Unsupported snapshot version {version}, expected {SNAPSHOT_VERSION}"
+            )
+
+        synthesizer = cls.__new__(cls)
+        synthesizer._set_knobs(
+            int(arrays["block_size"]),
+            speedup_ratio,
+            prefix_root_multiplier,
+            prefix_len_multiplier,
+            prompt_len_multiplier,
+        )
+        synthesizer._learned_tree = RadixTree(
+            **{f.name: arrays[f"tree.{f.name}"] for f in fields(RadixTree)}
         )
-        assert np.all(0 < input_lens_mod) and np.all(input_lens_mod <= self.block_size)
-        self.input_lens_mod_sampler = EmpiricalSampler(input_lens_mod)
-        self.output_lens_sampler = EmpiricalSampler(output_lens)
+        synthesizer._learned_max_hash_id = int(arrays["max_hash_id"])
+        synthesizer._learned_distributions = {
+            name: (arrays[f"{name}.values"], arrays[f"{name}.counts"])
+            for name in LEARNED_DISTRIBUTIONS
+        }
+        synthesizer._apply_knobs()
+        return synthesizer
 
     def _relabel_nodes(self) -> None:
         # Scale node labels by length multiplier if needed
         if self.prefix_len_multiplier > 1:
             multiplier = int(np.ceil(self.prefix_len_multiplier))
 
-            # Create mapping for relabeling, preserving -1 and -2
-            mapping = {
-                node: (node if node < 0 else node * multiplier + multiplier)
-                for node in self.G.nodes()
-            }
-            self.G = nx.relabel_nodes(self.G, mapping)
+            # Relabel nodes, preserving the (negative) special nodes
+            node_ids = self.tree.node_ids
+            self.tree.node_ids = np.where(
+                node_ids >= 0, node_ids * multiplier + multiplier, node_ids
+            )
             # Update max_hash_id
             self.max_hash_id = multiplier * self.max_hash_id + multiplier
 
         # Shrink the lengths, but no need to relabel nodes
         elif self.prefix_len_multiplier < 1:
-            for node in self.G.nodes():
-                self.G.nodes[node]["length"] = max(
-                    round(self.G.nodes[node]["length"] * self.prefix_len_multiplier), 1
-                )
+            self.tree.length = np.maximum(
+                np.round(self.tree.length * self.prefix_len_multiplier), 1
+            ).astype(np.int64)
 
     def _synthesize_leaf_path(self) -> list[int]:
         # Sample the leaf path length
@@ -212,17 +358,20 @@ class Synthesizer:
                 - bool: Whether the path contains a leaf path (i.e., new unique hash_ids were appended).
                 - int: The context length, defined as the number of cached hash_ids multiplied by block_size.
         """
+        tree = self.tree
+
         # Start from root node (-1)
-        current_node = SUPER_ROOT
+        current_node = ROOT_INDEX
         path: list[int] = []
         context_len = 0
 
         # Continue until we reach a node with no outgoing edges
         while True:
             # Use precomputed CDFs for efficient sampling
+            start = tree.out_offsets[current_node]
+            stop = tree.out_offsets[current_node + 1]
             next_node = sample_from_cdf(
-                self.G.nodes[current_node]["out_nodes"],
-                self.G.nodes[current_node]["out_cdf"],
+                tree.out_nodes[start:stop], tree.out_cdf[start:stop]
             )
 
             # end early
@@ -236,12 +385,13 @@ class Synthesizer:
             # otherwise continue down prefix tree
 
             # Get the length of the contracted path
-            length = self.G.nodes[next_node]["length"]
+            length = int(tree.length[next_node])
             context_len += length * self.block_size
 
             # Add all intermediate nodes
+            node_id = int(tree.node_ids[next_node])
             for i in range(length):
-                path.append(int(next_node - (length - 1) + i))
+                path.append(node_id - (length - 1) + i)
 
             current_node = next_node
 
@@ -249,72 +399,187 @@ class Synthesizer:
         # Append a leaf path at the end
         return path + unique_user_prompt, True, context_len
 
-    def synthesize_requests(
-        self, num_requests: int, input_len_filter: Optional[int] = None
-    ) -> list[dict[str, Any]]:
-        timestamp = 0
+    def synthesize_paths(
+        self, num_paths: int
+    ) -> tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+        """
+        Batched version of `synthesize_path`. All paths are sampled at once by advancing
+        one walker per path through the core radix tree level by level, sampling the next
+        node of every walker with a single `np.searchsorted` over the transition CDFs.
 
-        requests: list[dict[str, Any]] = []
-        request_id = 0
-
-        while request_id < num_requests:
-            requests_per_interval = self.request_counts_sampler.sample()
-
-            for _ in range(requests_per_interval):
-                path, leaf_flag, context_len = self.synthesize_path()
-                if leaf_flag:
-                    input_len = (
-                        len(path) - 1
-                    ) * self.block_size + self.input_lens_mod_sampler.sample()
-                else:
-                    input_len = len(path) * self.block_size
-                output_len = self.output_lens_sampler.sample()
-
-                if input_len_filter is not None and input_len > input_len_filter:
-                    continue
-                requests.append(
-                    {
-                        "timestamp": int(timestamp),
-                        "input_length": int(input_len),
-                        "output_length": int(output_len),
-                        "hash_ids": path,
-                        "context_len": int(context_len),
-                        "unique_user_prompt_len": int(input_len - context_len),
-                    }
-                )
-                request_id += 1
-                if request_id >= num_requests:
-                    break
+        Args:
+            num_paths (int): Number of paths to synthesize.
+
+        Returns:
+            tuple:
+                - np.ndarray: The hash_ids of all paths, concatenated.
+                - np.ndarray: Offsets of each path into the hash_ids, of length num_paths + 1.
+                - np.ndarray: Whether each path contains a leaf path.
+                - np.ndarray: The context length of each path.
+        """
+        tree = self.tree
+
+        walkers = np.arange(num_paths)
+        nodes = np.full(num_paths, ROOT_INDEX, dtype=np.int64)
+        leaf_flags = np.zeros(num_paths, dtype=bool)
+        visit_walkers = []
+        visit_nodes = []
+
+        while len(walkers):
+            # sample in (0, 1], so that no walker falls onto the CDF of the previous row
+            rand = 1.0 - np.random.random(len(walkers))
+            pos = np.searchsorted(tree.out_cdf_shifted, nodes + rand)
+            pos = np.clip(pos, tree.out_offsets[nodes], tree.out_offsets[nodes + 1] - 1)
+            next_nodes = tree.out_nodes[pos]
+
+            leaf_flags[walkers[next_nodes == CACHE_END]] = True
+            descend = next_nodes >= 0
+            walkers, nodes = walkers[descend], next_nodes[descend]
+            visit_walkers.append(walkers)
+            visit_nodes.append(nodes)
+
+        # group the visited nodes by walker, keeping them in level order
+        walker_of_visit = np.concatenate(visit_walkers)
+        order = np.argsort(walker_of_visit, kind="stable")
+        walker_of_visit = walker_of_visit[order]
+        node_of_visit = np.concatenate(visit_nodes)[order]
+
+        lengths = tree.length[node_of_visit]
+        core_lens = np.bincount(
+            walker_of_visit, weights=lengths, minlength=num_paths
+        ).astype(np.int64)
+        leaf_lens = np.zeros(num_paths, dtype=np.int64)
+        leaf_lens[leaf_flags] = self.leaves_lens_sampler.sample_batch(
+            int(leaf_flags.sum())
+        )
+        offsets = np.concatenate(([0], np.cumsum(core_lens + leaf_lens)))
+        hash_ids = np.empty(offsets[-1], dtype=np.int64)
+
+        # every visited node expands into `length` consecutive hash ids ending at its label
+        visit_pos = np.cumsum(lengths) - lengths
+        visit_pos -= (np.cumsum(core_lens) - core_lens)[walker_of_visit]
+        hash_ids[
+            _segment_positions(offsets[walker_of_visit] + visit_pos, lengths)
+        ] = np.repeat(tree.node_ids[node_of_visit] - (lengths - 1), lengths) + (
+            _segment_positions(np.zeros_like(lengths), lengths)
+        )
+
+        # leaf paths get new unique hash ids starting from max_hash_id + 1
+        num_leaf_ids = int(leaf_lens.sum())
+        hash_ids[_segment_positions(offsets[:-1] + core_lens, leaf_lens)] = (
+            self.max_hash_id + 1 + np.arange(num_leaf_ids)
+        )
+        self.max_hash_id += num_leaf_ids
+
+        return hash_ids, offsets, leaf_flags, core_lens * self.block_size
+
+    def iter_requests(
+        self,
+        num_requests: int,
+        input_len_filter: Optional[int] = None,
+        batch_size: int = DEFAULT_BATCH_SIZE,
+    ) -> Iterator[RequestBatch]:
+        """
+        Synthesize requests in batches of at most `batch_size`, so that arbitrarily many
+        requests can be streamed out in bounded memory.
+
+        Args:
+            num_requests (int): Total number of requests to synthesize.
+            input_len_filter (int, optional): Drop requests with a longer input length.
+            batch_size (int, optional): Maximum number of requests per batch.
 
-            timestamp += round(self.timedeltas_sampler.sample() / self.speedup_ratio)
+        Yields:
+            RequestBatch: The next batch of requests, in timestamp order.
+        """
+        timestamp = 0
+        num_accepted = 0
+        accept_rate = 1.0
+
+        while num_accepted < num_requests:
+            remaining = min(num_requests - num_accepted, batch_size)
+
+            # every interval holds at least one request, so this many always suffice
+            counts = self.request_counts_sampler.sample_batch(remaining)
+            deltas = np.round(
+                self.timedeltas_sampler.sample_batch(remaining) / self.speedup_ratio
+            ).astype(np.int64)
+            num_intervals = min(
+                int(np.searchsorted(np.cumsum(counts), remaining / accept_rate)) + 1,
+                remaining,
+            )
+            counts, deltas = counts[:num_intervals], deltas[:num_intervals]
+            interval_starts = timestamp + np.cumsum(deltas) - deltas
+            timestamp += int(deltas.sum())
 
-        # Adjust hash_ids if num_copies > 1
-        if self.num_copies > 1:
-            for request in requests:
-                offset = (np.random.randint(0, self.num_copies)) * (
-                    self.max_hash_id + 1
+            num_candidates = int(counts.sum())
+            hash_ids, offsets, leaf_flags, context_lens = self.synthesize_paths(
+                num_candidates
+            )
+            path_lens = np.diff(offsets)
+            input_lens = path_lens * self.block_size
+            # like the per-request path, only leaf paths draw the last block length
+            input_lens[leaf_flags] += (
+                self.input_lens_mod_sampler.sample_batch(int(leaf_flags.sum()))
+                - self.block_size
+            )
+            output_lens = self.output_lens_sampler.sample_batch(num_candidates)
+
+            if input_len_filter is not None:
+                accepted = np.flatnonzero(input_lens <= input_len_filter)[:remaining]
+            else:
+                accepted = np.arange(min(num_candidates, remaining))
+            accept_rate = max(len(accepted), 1) / max(num_candidates, 1)
+            num_accepted += len(accepted)
+            if len(accepted) == 0:
+                continue
+
+            path_lens = path_lens[accepted]
+            batch_offsets = np.concatenate(([0], np.cumsum(path_lens)))
+            batch_hash_ids = hash_ids[_segment_positions(offsets[accepted], path_lens)]
+            context_lens = context_lens[accepted]
+
+            # Move the cached part of each path to a random copy of the core radix tree
+            if self.num_copies > 1:
+                core_lens = context_lens // self.block_size
+                copy_offsets = (
+                    np.random.randint(0, self.num_copies, size=len(accepted))
+                    * self.copy_stride
                 )
-                request["hash_ids"] = [
-                    int(hash_id + offset) for hash_id in request["hash_ids"]
-                ]
+                batch_hash_ids[
+                    _segment_positions(batch_offsets[:-1], core_lens)
+                ] += np.repeat(copy_offsets, core_lens)
+
+            yield RequestBatch(
+                timestamp=np.repeat(interval_starts, counts)[accepted],
+                input_length=input_lens[accepted],
+                output_length=output_lens[accepted].astype(np.int64),
+                hash_ids=batch_hash_ids,
+                hash_ids_offsets=batch_offsets,
+                context_len=context_lens,
+                unique_user_prompt_len=input_lens[accepted] - context_lens,
+            )
 
-        return requests
+    def synthesize_requests(
+        self, num_requests: int, input_len_filter: Optional[int] = None
+    ) -> RequestBatch:
+        return RequestBatch.concat(
+            list(self.iter_requests(num_requests, input_len_filter))
+        )
 
     def __repr__(self) -> str:
-        path_lengths = nx.single_source_shortest_path_length(self.G, -1)
-        core_radix_tree_size = len(self.G) - 1
-        core_radix_tree_depth = max(path_lengths.values()) if path_lengths else 0
+        core_radix_tree_size = len(self.tree) - 1
+        core_radix_tree_depth = int(self.tree.depths().max())
 
         rep = "MooncakeSynth("
         rep += f"core_radix_tree_size={core_radix_tree_size}, "
         rep += f"core_radix_tree_depth={core_radix_tree_depth}, "
         rep += f"block_size={self.block_size})"
 
-        children = list(self.G.successors(-1))
+        children = self.tree.successors(ROOT_INDEX)
         data = {
-            "Child Node": children,
-            "Visited Count": [self.G.nodes[child]["visited"] for child in children],
-            "Length": [self.G.nodes[child].get("length", "N/A") for child in children],
+            "Child Node": self.tree.node_ids[children],
+            "Visited Count": self.tree.visited[children],
+            "Length": self.tree.length[children],
         }
         df = pd.DataFrame(data)
         df = df[df["Visited Count"] >= 5]
@@ -334,7 +599,10 @@ def main():
     import argparse
     from pathlib import Path
 
-    from data_generator.logging_utils import calculate_and_print_statistics
+    from data_generator.logging_utils import (
+        calculate_and_print_statistics,
+        print_peak_memory,
+    )
 
     parser = argparse.ArgumentParser(description="Synthesize Mooncake-Esque dataset")
     parser.add_argument(
@@ -391,9 +659,28 @@ def main():
         default=None,
         help="Path to the output file (default: None, no output)",
     )
+    parser.add_argument(
+        "--output-format",
+        type=str,
+        choices=["jsonl", "parquet"],
+        default=None,
+        help="Format of the output file (default: inferred from the output file suffix, jsonl otherwise)",
+    )
+    parser.add_argument(
+        "--save-snapshot",
+        type=str,
+        default=None,
+        help="Save the state learned from the input file to this snapshot file (default: None)",
+    )
+    parser.add_argument(
+        "--load-snapshot",
+        type=str,
+        default=None,
+        help="Load the learned state from this snapshot file instead of learning from the input file (default: None)",
+    )
     args = parser.parse_args()
 
-    dataset_file = Path(args.input_file).resolve()
+    dataset_file = Path(args.load_snapshot or args.input_file).resolve()
     if args.output_file is None:
         output_file = dataset_file.with_stem(
             f"{dataset_file.stem}_synth"
@@ -401,41 +688,64 @@ def main():
             + f"_speedup{args.speedup_ratio}"
             + f"_maxisl{args.max_isl}"
         )
+        if args.output_format == "parquet":
+            output_file = output_file.with_suffix(".parquet")
     else:
         output_file = Path(args.output_file).resolve()
 
-    print("learning from dataset...", flush=True)
-    synthesizer = Synthesizer(
-        str(dataset_file),
-        block_size=args.block_size,
-        speedup_ratio=args.speedup_ratio,
-        prefix_len_multiplier=args.prefix_len_multiplier,
-        prefix_root_multiplier=args.prefix_root_multiplier,
-        prompt_len_multiplier=args.prompt_len_multiplier,
-    )
+    if args.load_snapshot is not None:
+        print(f"loading snapshot {dataset_file}...", flush=True)
+        synthesizer = Synthesizer.load(
+            str(dataset_file),
+            speedup_ratio=args.speedup_ratio,
+            prefix_len_multiplier=args.prefix_len_multiplier,
+            prefix_root_multiplier=args.prefix_root_multiplier,
+            prompt_len_multiplier=args.prompt_len_multiplier,
+        )
+        if synthesizer.block_size != args.block_size:
+            print(f"using block size {synthesizer.block_size} from the snapshot")
+    else:
+        print("learning from dataset...", flush=True)
+        synthesizer = Synthesizer(
+            str(dataset_file),
+            block_size=args.block_size,
+            speedup_ratio=args.speedup_ratio,
+            prefix_len_multiplier=args.prefix_len_multiplier,
+            prefix_root_multiplier=args.prefix_root_multiplier,
+            prompt_len_multiplier=args.prompt_len_multiplier,
+        )
+    if args.save_snapshot is not None:
+        synthesizer.save(args.save_snapshot)
+        print(f"snapshot saved at {Path(args.save_snapshot).resolve()}")
 
     print("synthesizing requests...", flush=True)
-    requests = synthesizer.synthesize_requests(args.num_requests, args.max_isl)
-    print(f"synthesized {len(requests)} requests")
+    metrics = {
+        "Input Length": StreamingHistogram(),
+        "Context Length": StreamingHistogram(),
+        "Unique Prompt Length": StreamingHistogram(),
+        "Output Length": StreamingHistogram(),
+    }
+
+    def stream_requests() -> Iterator[TraceBatch]:
+        # collect the statistics while the requests are streamed to the output file
+        for batch in synthesizer.iter_requests(args.num_requests, args.max_isl):
+            metrics["Input Length"].update(batch.input_length)
+            metrics["Context Length"].update(batch.context_len)
+            metrics["Unique Prompt Length"].update(batch.unique_user_prompt_len)
+            metrics["Output Length"].update(batch.output_length)
+            yield batch
+
+    num_written = write_trace(stream_requests(), str(output_file), args.output_format)
+    print(f"synthesized {num_written} requests")
 
     # Print statistics in a single table with metrics as rows and statistics as columns
     print("\n###### Synthesized Statistics ######")
 
-    # Extract all values first
-    metrics = {
-        "Input Length": [req["input_length"] for req in requests],
-        "Context Length": [req["context_len"] for req in requests],
-        "Unique Prompt Length": [req["unique_user_prompt_len"] for req in requests],
-        "Output Length": [req["output_length"] for req in requests],
-    }
-
     # Calculate statistics for each metric
     calculate_and_print_statistics(metrics)
 
-    with open(output_file, "w") as f:
-        for request in requests:
-            f.write(json.dumps(request) + "\n")
     print(f"synthetic dataset saved at {Path(output_file).resolve()}")
+    print_peak_memory()
 
 
 if __name__ == "__main__":
@@ -0,0 +1,120 @@
+# SPDX-FileCopyrightText: Copyright (c) 2025 NVIDIA CORPORATION & AFFILIATES. All rights reserved.
+# SPDX-License-Identifier: Apache-2.0
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import numpy as np
+import pytest
+from data_generator.cache_simulator import CacheSimulator
+
+
+def to_batch(paths):
+    block_idx = np.array([block for path in paths for block in path], dtype=np.int64)
+    offsets = np.concatenate(([0], np.cumsum([len(path) for path in paths])))
+    return block_idx, offsets
+
+
+def reference_hit_rates(paths, capacity, eviction):
+    """Replay on a single worker with a dict, scanning for the victim."""
+    cache: dict[int, tuple[int, int]] = {}  # block -> (frequency, stamp)
+    clock = 0
+    hit_rates = []
+    for path in paths:
+        hits = 0
+        while hits < len(path) and path[hits] in cache:
+            hits += 1
+        hit_rates.append(hits / len(path))
+        for j, block in enumerate(path):
+            frequency = cache[block][0] + 1 if block in cache else 1
+            cache[block] = (frequency, clock + len(path) - 1 - j)
+        clock += len(path)
+        while len(cache) > capacity:
+            if eviction == "lru":
+                victim = min(cache, key=lambda block: cache[block][1])
+            else:
+                victim = min(cache, key=lambda block: cache[block])
+            del cache[victim]
+    return np.array(hit_rates)
+
+
+@pytest.mark.parametrize("eviction", ["lru", "lfu"])
+def test_matches_reference(eviction):
+    rng = np.random.default_rng(0)
+    prefixes = [
+        list(rng.choice(50, size=rng.integers(1, 6), replace=False)) for _ in range(10)
+    ]
+    paths = []
+    for _ in range(500):
+        prefix = prefixes[rng.integers(len(prefixes))]
+        paths.append(
+            prefix + list(rng.choice(np.arange(50, 200), size=3, replace=False))
+        )
+
+    simulator = CacheSimulator(200, capacity=20, eviction=eviction)
+    hit_rates = simulator.process(*to_batch(paths))
+
+    np.testing.assert_array_equal(hit_rates, reference_hit_rates(paths, 20, eviction))
+    assert simulator.cache_sizes[0] == 20
+    assert (simulator.stamps[0] >= 0).sum() == 20
+
+
+def test_infinite_capacity():
+    paths = [[0, 1, 2], [0, 1, 3], [], [4], [0, 1, 3, 5]]
+    block_idx, offsets = to_batch(paths)
+    simulator = CacheSimulator(6, capacity=None)
+    hit_rates = simulator.process(block_idx, offsets, np.array([0, 0, 0, 1, 2]))
+
+    np.testing.assert_allclose(hit_rates, [0, 2 / 3, 0, 3 / 4])
+    assert simulator.timeline.evictions.sum() == 0
+    assert simulator.timeline.transferred.sum() == 6
+    assert simulator.timeline.requests.sum() == 5
+
+
+def test_prefix_overlap_routing():
+    paths = [[0, 1], [2, 3], [0, 1, 4], [2, 3, 5]]
+    simulator = CacheSimulator(
+        6, capacity=None, num_workers=2, routing="prefix_overlap"
+    )
+    hit_rates = simulator.process(*to_batch(paths))
+
+    # the first two requests are spread, the next two follow their prefixes
+    np.testing.assert_allclose(hit_rates, [0, 0, 2 / 3, 2 / 3])
+    assert simulator.requests_per_worker.tolist() == [2, 2]
+
+    # round robin alternates whatever the prefixes
+    paths = [[0, 1], [0, 1, 4], [0, 1, 5]]
+    simulator = CacheSimulator(6, capacity=None, num_workers=2, routing="round_robin")
+    hit_rates = simulator.process(*to_batch(paths))
+    np.testing.assert_allclose(hit_rates, [0, 0, 2 / 3])
+
+
+def test_timeline_windows():
+    paths = [[0, 1], [0, 1], [2, 3], [0, 2]]
+    block_idx, offsets = to_batch(paths)
+    simulator = CacheSimulator(4, capacity=2, window=10)
+    simulator.process(block_idx, offsets, np.array([0, 5, 12, 35]))
+
+    timeline = simulator.timeline
+    assert timeline.requests.tolist() == [2, 1, 0, 1]
+    assert timeline.hit_blocks.tolist() == [2, 0, 0, 0]
+    assert timeline.evictions.tolist() == [0, 2, 0, 1]
+    assert [row["Window Start"] for row in timeline.rows()] == [0, 10, 30]
+
+
+def test_invalid_policies():
+    with pytest.raises(ValueError):
+        CacheSimulator(10, capacity=5, eviction="fifo")
+    with pytest.raises(ValueError):
+        CacheSimulator(10, capacity=5, routing="least_loaded")
+    with pytest.raises(ValueError):
+        CacheSimulator(10, capacity=0)
@@ -16,6 +16,7 @@
 import math
 import random
 
+import numpy as np
 import pytest
 from data_generator.hasher import hashes_to_texts, texts_to_hashes
 from tokenizers import Tokenizer, decoders, models, normalizers, pre_tokenizers
@@ -62,6 +63,54 @@ def test_texts_to_hashes_blocks(dummy_tokenizer):
     assert result == expected, f"Expected {expected}, got {result}"
 
 
+def test_texts_to_hashes_multiprocess(dummy_tokenizer):
+    dum1 = "a b c d"
+    dum2 = "e f g h"
+    dum3 = "i j k l"
+
+    texts = [dum1, dum1 + " " + dum2, dum1 + " " + dum3, dum2 + " " + dum1, dum3]
+    expected = texts_to_hashes(dummy_tokenizer, texts, block_size=4, num_workers=1)
+
+    # hashes from different shards must be merged into the same IDs
+    result = texts_to_hashes(
+        dummy_tokenizer, texts, block_size=4, num_workers=2, shard_size=2
+    )
+    assert result == expected, f"Expected {expected}, got {result}"
+
+
+def test_hashes_to_texts_cache(dummy_tokenizer, tmp_path):
+    hash_ids_list = [[0, 1, 2], [0, 1, 3], [0, 4]]
+    input_lengths = [10, 12, 5]
+
+    np.random.seed(0)
+    texts = hashes_to_texts(
+        dummy_tokenizer, hash_ids_list, input_lengths, 4, cache_dir=str(tmp_path)
+    )
+    for text, expected_length in zip(texts, input_lengths):
+        tokens = dummy_tokenizer(text, add_special_tokens=False)["input_ids"]
+        assert len(tokens) == expected_length
+
+    # a different seed reuses the cached blocks rather than sampling new ones
+    np.random.seed(1)
+    cached_texts = hashes_to_texts(
+        dummy_tokenizer, hash_ids_list, input_lengths, 4, cache_dir=str(tmp_path)
+    )
+    assert cached_texts == texts
+
+    assert len(list(tmp_path.iterdir())) == 1
+
+    # the same hash IDs of another trace are not read from this cache
+    hashes_to_texts(
+        dummy_tokenizer,
+        hash_ids_list,
+        input_lengths,
+        4,
+        cache_dir=str(tmp_path),
+        cache_key="other_trace.jsonl",
+    )
+    assert len(list(tmp_path.iterdir())) == 2
+
+
 def test_hashes_to_texts_with_deepseek(deepseek_tokenizer):
     """Test hashes_to_texts with deepseek tokenizer using increasing hash IDs globally."""
     # Test parameters
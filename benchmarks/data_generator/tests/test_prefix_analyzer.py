@@ -0,0 +1,58 @@
+# SPDX-FileCopyrightText: Copyright (c) 2025 NVIDIA CORPORATION & AFFILIATES. All rights reserved.
+# SPDX-License-Identifier: Apache-2.0
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+from collections import Counter
+
+import numpy as np
+from data_generator import prefix_analyzer
+from data_generator.prefix_analyzer import PrefixAnalyzer
+from data_generator.trace_io import TraceBatch
+
+
+def make_chunks(num_chunks, rng):
+    chunks = []
+    for _ in range(num_chunks):
+        path_lens = rng.integers(0, 6, 8)
+        chunks.append(
+            TraceBatch(
+                timestamp=np.zeros(8, dtype=np.int64),
+                input_length=path_lens * 16,
+                output_length=np.ones(8, dtype=np.int64),
+                hash_ids=rng.integers(0, 50, path_lens.sum()),
+                hash_ids_offsets=np.concatenate(([0], np.cumsum(path_lens))),
+            )
+        )
+    return chunks
+
+
+def test_hash_counter_across_chunks(monkeypatch):
+    chunks = make_chunks(40, np.random.default_rng(0))
+    monkeypatch.setattr(prefix_analyzer, "iter_trace_chunks", lambda path: chunks)
+    analyzer = PrefixAnalyzer("trace.jsonl", block_size=16)
+
+    counts: Counter = Counter()
+    first_rows: dict[int, int] = {}
+    row = 0
+    for chunk in chunks:
+        for i in range(len(chunk)):
+            for hash_id in chunk.get_hash_ids(i).tolist():
+                counts[hash_id] += 1
+                first_rows.setdefault(hash_id, row)
+            row += 1
+
+    assert analyzer.num_rows == row
+    assert analyzer.hash_ids.tolist() == sorted(counts)
+    assert analyzer.hash_counts.tolist() == [counts[h] for h in sorted(counts)]
+    assert analyzer.hash_first_rows.tolist() == [first_rows[h] for h in sorted(counts)]
@@ -16,7 +16,7 @@
 from collections import Counter
 
 import numpy as np
-from data_generator.sampler import EmpiricalSampler
+from data_generator.sampler import EmpiricalSampler, StreamingHistogram
 
 
 def test_empirical_sampler_distribution():
@@ -44,3 +44,35 @@ def test_empirical_sampler_distribution():
         2,
         3,
     }, f"Unexpected values in samples: {set(counts.keys()) - {1, 2, 3}}"
+
+
+def test_empirical_sampler_batch_distribution():
+    sampler = EmpiricalSampler(np.array([1, 2, 3, 1, 2, 3, 1, 2, 3]))
+
+    samples = sampler.sample_batch(3000)
+    counts = Counter(samples.tolist())
+
+    assert len(samples) == 3000
+    assert set(counts.keys()) == {1, 2, 3}
+    for value in [1, 2, 3]:
+        assert (
+            900 <= counts[value] <= 1100
+        ), f"Value {value} appeared {counts[value]} times, expected 900-1100 times"
+
+
+def test_streaming_histogram_matches_numpy():
+    rng = np.random.default_rng(0)
+    data = rng.integers(0, 50, size=1000)
+
+    histogram = StreamingHistogram()
+    for chunk in np.array_split(data, 7):
+        histogram.update(chunk)
+
+    assert len(histogram) == len(data)
+    assert np.isclose(histogram.mean(), np.mean(data))
+    assert np.isclose(histogram.std(), np.std(data))
+    for q in [0, 25, 50, 75, 100]:
+        assert np.isclose(histogram.percentile(q), np.percentile(data, q))
+
+    sampler = EmpiricalSampler(histogram.values, histogram.counts)
+    assert set(sampler.sample_batch(100).tolist()) <= set(data.tolist())
@@ -18,7 +18,10 @@ import os
 import random
 import tempfile
 import unittest
+from typing import Any
 
+import numpy as np
+import pytest
 from data_generator.synthesizer import Synthesizer
 
 
@@ -38,15 +41,17 @@ def dump_record(handle, hash_ids, block_size=512):
 
 
 def check_attributes(
-    graph,
+    tree,
     node,
     expected_children,
     expected_visited=None,
     expected_length=None,
     expected_to_leaf=None,
 ):
+    row = tree.index(node)
+
     # Check children
-    actual_children = list(graph.successors(node))
+    actual_children = tree.node_ids[tree.successors(row)].tolist()
     assert sorted(actual_children) == sorted(
         expected_children
     ), f"Node {node} has children {actual_children}, expected {expected_children}"
@@ -54,20 +59,20 @@ def check_attributes(
     # Check 'visited' attribute if expected
     if expected_visited is not None:
         assert (
-            graph.nodes[node].get("visited") == expected_visited
-        ), f"Node {node} has 'visited' value {graph.nodes[node].get('visited')}, expected {expected_visited}"
+            tree.visited[row] == expected_visited
+        ), f"Node {node} has 'visited' value {tree.visited[row]}, expected {expected_visited}"
 
     # Check 'length' attribute if expected
     if expected_length is not None:
         assert (
-            graph.nodes[node].get("length") == expected_length
-        ), f"Node {node} has 'length' value {graph.nodes[node].get('length')}, expected {expected_length}"
+            tree.length[row] == expected_length
+        ), f"Node {node} has 'length' value {tree.length[row]}, expected {expected_length}"
 
     # Check 'to_leaf' attribute if expected
     if expected_to_leaf is not None:
         assert (
-            graph.nodes[node].get("to_leaf") == expected_to_leaf
-        ), f"Node {node} has 'to_leaf' value {graph.nodes[node].get('to_leaf')}, expected {expected_to_leaf}"
+            tree.to_leaf[row] == expected_to_leaf
+        ), f"Node {node} has 'to_leaf' value {tree.to_leaf[row]}, expected {expected_to_leaf}"
 
     return True
 
@@ -84,17 +89,131 @@ def test_graph_structure():
 
     # Create the Synthesizer with the temporary file
     synthesizer = Synthesizer(tmp.name, block_size=512)
-    G = synthesizer.G
+    tree = synthesizer.tree
 
-    # Verify the graph structure
-    check_attributes(G, -1, [1, 8], 6, None, 1)
-    check_attributes(G, 1, [4], 3, 2, 0)
-    check_attributes(G, 4, [], 2, 3, 1)
-    check_attributes(G, 8, [], 2, 2, 1)
+    # Verify the tree structure
+    check_attributes(tree, -1, [1, 8], 6, None, 1)
+    check_attributes(tree, 1, [4], 3, 2, 0)
+    check_attributes(tree, 4, [], 2, 3, 1)
+    check_attributes(tree, 8, [], 2, 2, 1)
 
     # Clean up
     os.unlink(tmp.name)
 
 
+def test_contracted_children_order():
+    # contracted chains are sampled after their untouched siblings
+    with tempfile.NamedTemporaryFile(mode="w", suffix=".jsonl", delete=False) as tmp:
+        dump_record(tmp, [0, 1])
+        dump_record(tmp, [0, 1])
+        dump_record(tmp, [2])
+        dump_record(tmp, [2, 3])
+        dump_record(tmp, [2, 4])
+
+    synthesizer = Synthesizer(tmp.name, block_size=512)
+    tree = synthesizer.tree
+
+    check_attributes(tree, 1, [], 2, 2, 0)
+    assert tree.node_ids[tree.successors(tree.index(-1))].tolist() == [2, 1]
+
+    os.unlink(tmp.name)
+
+
+def test_synthesize_requests():
+    with tempfile.NamedTemporaryFile(mode="w", suffix=".jsonl", delete=False) as tmp:
+        for _ in range(10):
+            dump_record(tmp, [0, 1])
+            dump_record(tmp, [0, 1, 2, 3, 4])
+            dump_record(tmp, [7, 8])
+        for i in range(10):
+            dump_record(tmp, [0, 1, 100 + 2 * i, 101 + 2 * i])
+
+    np.random.seed(0)
+    synthesizer = Synthesizer(tmp.name, block_size=512)
+    requests = synthesizer.synthesize_requests(1000, input_len_filter=4 * 512)
+
+    assert len(requests) == 1000
+    assert np.all(requests.input_length <= 4 * 512)
+    assert np.all(np.diff(requests.timestamp) >= 0)
+    assert np.all(
+        requests.unique_user_prompt_len == requests.input_length - requests.context_len
+    )
+    for i, request in enumerate(requests.to_records()):
+        hash_ids = request["hash_ids"]
+        assert hash_ids == requests.get_hash_ids(i).tolist()
+        assert len(hash_ids) * 512 >= request["input_length"]
+        # cached prefixes follow the core radix tree
+        assert hash_ids[: request["context_len"] // 512] in (
+            [],
+            [0, 1],
+            [0, 1, 2, 3, 4],
+            [7, 8],
+        )
+        # user prompts are made of new, unique hash ids
+        assert all(
+            hash_id > 101 + 2 * 9
+            for hash_id in hash_ids[request["context_len"] // 512 :]
+        )
+
+    leaf_ids = np.concatenate(
+        [
+            requests.get_hash_ids(i)[requests.context_len[i] // 512 :]
+            for i in range(len(requests))
+        ]
+    )
+    assert len(np.unique(leaf_ids)) == len(leaf_ids)
+
+    os.unlink(tmp.name)
+
+
+@pytest.mark.parametrize("mmap", [True, False])
+def test_snapshot_roundtrip(mmap):
+    with tempfile.NamedTemporaryFile(mode="w", suffix=".jsonl", delete=False) as tmp:
+        for i in range(10):
+            dump_record(tmp, [0, 1, 2, 3, 4])
+            dump_record(tmp, [0, 1, 100 + 2 * i, 101 + 2 * i])
+            dump_record(tmp, [7, 8, 200 + i])
+
+    knobs: dict[str, Any] = dict(
+        speedup_ratio=2.0,
+        prefix_root_multiplier=2,
+        prefix_len_multiplier=2.0,
+        prompt_len_multiplier=0.5,
+    )
+    synthesizer = Synthesizer(tmp.name, block_size=512, **knobs)
+    snapshot_file = tmp.name.replace(".jsonl", ".npz")
+    synthesizer.save(snapshot_file)
+    loaded = Synthesizer.load(snapshot_file, mmap=mmap, **knobs)
+
+    assert loaded.block_size == 512
+    assert loaded.max_hash_id == synthesizer.max_hash_id
+    np.testing.assert_array_equal(loaded.tree.node_ids, synthesizer.tree.node_ids)
+
+    np.random.seed(0)
+    expected = synthesizer.synthesize_requests(100)
+    np.random.seed(0)
+    requests = loaded.synthesize_requests(100)
+    for name, values in expected.columns().items():
+        np.testing.assert_array_equal(getattr(requests, name), values)
+    np.testing.assert_array_equal(requests.hash_ids, expected.hash_ids)
+
+    # the same snapshot can be loaded with other knobs
+    assert Synthesizer.load(snapshot_file, mmap=mmap).max_hash_id < loaded.max_hash_id
+
+    os.unlink(tmp.name)
+    os.unlink(snapshot_file)
+
+
+def test_invalid_tree():
+    with tempfile.NamedTemporaryFile(mode="w", suffix=".jsonl", delete=False) as tmp:
+        dump_record(tmp, [0, 1])
+        dump_record(tmp, [2, 1])
+
+    with pytest.raises(ValueError):
+        Synthesizer(tmp.name, block_size=512)
+
+    os.unlink(tmp.name)
+
+
 if __name__ == "__main__":
     unittest.main()
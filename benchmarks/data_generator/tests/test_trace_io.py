@@ -0,0 +1,80 @@
+# SPDX-FileCopyrightText: Copyright (c) 2025 NVIDIA CORPORATION & AFFILIATES. All rights reserved.
+# SPDX-License-Identifier: Apache-2.0
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import json
+from typing import Any
+
+import pytest
+from data_generator.trace_io import TraceBatch, iter_trace_chunks, write_trace
+
+RECORDS: list[dict[str, Any]] = [
+    {"timestamp": 0, "input_length": 1000, "output_length": 10, "hash_ids": [0, 1]},
+    {"timestamp": 5, "input_length": 300, "output_length": 20, "hash_ids": [0]},
+    {"timestamp": 5, "input_length": 0, "output_length": 30, "hash_ids": []},
+    {"timestamp": 9, "input_length": 1500, "output_length": 40, "hash_ids": [2, 3, 4]},
+]
+
+
+@pytest.fixture
+def trace_file(tmp_path):
+    path = tmp_path / "trace.jsonl"
+    path.write_text("".join(json.dumps(record) + "\n" for record in RECORDS))
+    return str(path)
+
+
+def test_read_jsonl(trace_file):
+    batch = TraceBatch.concat(list(iter_trace_chunks(trace_file, chunk_size=3)))
+    assert list(batch.to_records()) == RECORDS
+    assert batch.get_hash_ids(3).tolist() == [2, 3, 4]
+
+
+def test_read_jsonl_float_timestamps(tmp_path, monkeypatch):
+    path = tmp_path / "trace.jsonl"
+    records = [dict(record, timestamp=record["timestamp"] + 0.5) for record in RECORDS]
+    path.write_text("".join(json.dumps(record) + "\n" for record in records))
+
+    batch = TraceBatch.concat(list(iter_trace_chunks(str(path))))
+    assert list(batch.to_records()) == RECORDS
+
+    # same truncation when parsing line by line, without pyarrow
+    monkeypatch.setattr("data_generator.trace_io.pa", None)
+    batch = TraceBatch.concat(list(iter_trace_chunks(str(path))))
+    assert list(batch.to_records()) == RECORDS
+
+
+@pytest.mark.parametrize("suffix", [".jsonl", ".parquet"])
+def test_write_roundtrip(trace_file, tmp_path, suffix):
+    if suffix == ".parquet":
+        pytest.importorskip("pyarrow")
+
+    output_file = str(tmp_path / f"output{suffix}")
+    chunks = list(iter_trace_chunks(trace_file, chunk_size=3))
+    assert write_trace(chunks, output_file) == len(RECORDS)
+
+    batch = TraceBatch.concat(list(iter_trace_chunks(output_file)))
+    assert list(batch.to_records()) == RECORDS
+
+
+def test_write_unknown_format(tmp_path):
+    with pytest.raises(ValueError):
+        write_trace([], str(tmp_path / "output.csv"), output_format="csv")
+
+
+def test_write_parquet_large_offsets(trace_file, tmp_path):
+    pq = pytest.importorskip("pyarrow.parquet")
+    out = str(tmp_path / "trace.parquet")
+    write_trace(iter_trace_chunks(trace_file), out)
+    # 64-bit list offsets, so that a batch can hold more than 2^31 hash IDs
+    assert str(pq.read_schema(out).field("hash_ids").type).startswith("large_list")
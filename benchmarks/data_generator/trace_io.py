@@ -0,0 +1,280 @@
+# SPDX-FileCopyrightText: Copyright (c) 2025 NVIDIA CORPORATION & AFFILIATES. All rights reserved.
+# SPDX-License-Identifier: Apache-2.0
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+Streaming reader and writer for trace files in the mooncake format.
+
+Traces are read in chunks straight into NumPy columns and written out batch by
+batch, so that memory does not grow with the size of the trace file. Parsing
+uses pyarrow if installed, then orjson, then the standard library json module.
+Parquet files can be read and written when pyarrow is installed.
+"""
+
+import json
+from dataclasses import dataclass, fields
+from pathlib import Path
+from typing import Any, Iterable, Iterator, Optional, Type, TypeVar
+
+import numpy as np
+
+try:
+    import pyarrow as pa
+    import pyarrow.json as pa_json
+    import pyarrow.parquet as pq
+except ImportError:
+    pa = None
+
+try:
+    import orjson
+except ImportError:
+    orjson = None  # type: ignore[assignment]
+
+DEFAULT_CHUNK_SIZE = 1 << 16  # lines per chunk when parsing line by line
+ARROW_BLOCK_SIZE = 1 << 24  # bytes per chunk when parsing with pyarrow
+
+TRACE_COLUMNS = ("timestamp", "input_length", "output_length")
+
+T = TypeVar("T", bound="TraceBatch")
+
+
+@dataclass
+class TraceBatch:
+    """
+    Columnar batch of requests in the mooncake trace format.
+
+    Every attribute holds one value per request, except for `hash_ids`, which holds the
+    hash ids of all requests concatenated: the hash ids of request `i` are
+    `hash_ids[hash_ids_offsets[i] : hash_ids_offsets[i + 1]]`. Subclasses may add
+    further per-request columns, which are written after `hash_ids`.
+    """
+
+    timestamp: np.ndarray
+    input_length: np.ndarray
+    output_length: np.ndarray
+    hash_ids: np.ndarray
+    hash_ids_offsets: np.ndarray
+
+    def __len__(self) -> int:
+        return len(self.timestamp)
+
+    def get_hash_ids(self, i: int) -> np.ndarray:
+        return self.hash_ids[self.hash_ids_offsets[i] : self.hash_ids_offsets[i + 1]]
+
+    def columns(self) -> dict[str, np.ndarray]:
+        """Return the per-request columns in output order, without the hash ids."""
+        return {
+            f.name: getattr(self, f.name)
+            for f in fields(self)
+            if f.name not in ("hash_ids", "hash_ids_offsets")
+        }
+
+    def to_records(self) -> Iterator[dict[str, Any]]:
+        """Yield the requests one at a time as dicts in the trace format."""
+        columns = {name: values.tolist() for name, values in self.columns().items()}
+        extra_names = [name for name in columns if name not in TRACE_COLUMNS]
+        hash_ids = self.hash_ids.tolist()
+        offsets = self.hash_ids_offsets.tolist()
+        for i in range(len(self)):
+            record: dict[str, Any] = {name: columns[name][i] for name in TRACE_COLUMNS}
+            record["hash_ids"] = hash_ids[offsets[i] : offsets[i + 1]]
+            for name in extra_names:
+                record[name] = columns[name][i]
+            yield record
+
+    @classmethod
+    def concat(cls: Type[T], batches: list[T]) -> T:
+        """Concatenate batches of the same type into a single batch."""
+        names = [f.name for f in fields(cls) if f.name != "hash_ids_offsets"]
+        if not batches:
+            empty = {name: np.zeros(0, dtype=np.int64) for name in names}
+            return cls(hash_ids_offsets=np.zeros(1, dtype=np.int64), **empty)
+
+        path_lens = np.concatenate([np.diff(b.hash_ids_offsets) for b in batches])
+        return cls(
+            hash_ids_offsets=np.concatenate(([0], np.cumsum(path_lens))),
+            **{
+                name: np.concatenate([getattr(b, name) for b in batches])
+                for name in names
+            },
+        )
+
+
+def _is_parquet(path: str) -> bool:
+    return Path(path).suffix == ".parquet"
+
+
+def _require_pyarrow(what: str) -> None:
+    if pa is None:
+        raise ImportError(
+            f"{what} requires pyarrow, install it with `pip install pyarrow`"
+        )
+
+
+def _batch_from_arrow(record_batch: Any) -> TraceBatch:
+    hash_ids = record_batch.column("hash_ids")
+    offsets = hash_ids.offsets.to_numpy().astype(np.int64)
+    values = hash_ids.values.to_numpy()[offsets[0] : offsets[-1]]
+    return TraceBatch(
+        hash_ids=values.astype(np.int64),
+        hash_ids_offsets=offsets - offsets[0],
+        **{
+            name: record_batch.column(name).to_numpy().astype(np.int64)
+            for name in TRACE_COLUMNS
+        },
+    )
+
+
+def _arrow_schema() -> Any:
+    # timestamps may be written as floats, they are truncated to int64 in TraceBatch
+    # as when parsing line by line
+    return pa.schema(
+        [
+            (name, pa.float64() if name == "timestamp" else pa.int64())
+            for name in TRACE_COLUMNS
+        ]
+        + [("hash_ids", pa.list_(pa.int64()))]
+    )
+
+
+def _iter_arrow_json_chunks(path: str) -> Iterator[TraceBatch]:
+    reader = pa_json.open_json(
+        path,
+        read_options=pa_json.ReadOptions(block_size=ARROW_BLOCK_SIZE),
+        parse_options=pa_json.ParseOptions(
+            explicit_schema=_arrow_schema(), unexpected_field_behavior="ignore"
+        ),
+    )
+    for record_batch in reader:
+        if record_batch.num_rows:
+            yield _batch_from_arrow(record_batch)
+
+
+def _iter_line_chunks(path: str, chunk_size: int) -> Iterator[TraceBatch]:
+    loads = orjson.loads if orjson is not None else json.loads
+    with open(path, "rb") as f:
+        while True:
+            lines = [line for _, line in zip(range(chunk_size), f) if line.strip()]
+            if not lines:
+                break
+
+            columns: dict[str, list[int]] = {name: [] for name in TRACE_COLUMNS}
+            hash_ids: list[int] = []
+            path_lens: list[int] = []
+            for line in lines:
+                data = loads(line)
+                for name in TRACE_COLUMNS:
+                    columns[name].append(int(data[name]))
+                hash_ids.extend(data["hash_ids"])
+                path_lens.append(len(data["hash_ids"]))
+
+            yield TraceBatch(
+                hash_ids=np.array(hash_ids, dtype=np.int64),
+                hash_ids_offsets=np.concatenate(([0], np.cumsum(path_lens))).astype(
+                    np.int64
+                ),
+                **{
+                    name: np.array(values, dtype=np.int64)
+                    for name, values in columns.items()
+                },
+            )
+
+
+def iter_trace_chunks(
+    path: str, chunk_size: int = DEFAULT_CHUNK_SIZE
+) -> Iterator[TraceBatch]:
+    """
+    Read a trace file chunk by chunk as columnar batches.
+
+    Args:
+        path (str): The trace file, in jsonl format, or in Parquet format if the
+            file ends with `.parquet`.
+        chunk_size (int, optional): Number of lines per chunk when parsing line by line.
+            Chunks are sized in bytes instead when parsing with pyarrow.
+
+    Yields:
+        TraceBatch: The next chunk of requests.
+    """
+    if _is_parquet(path):
+        _require_pyarrow("Reading Parquet traces")
+        for record_batch in pq.ParquetFile(path).iter_batches(
+            batch_size=chunk_size, columns=[*TRACE_COLUMNS, "hash_ids"]
+        ):
+            yield _batch_from_arrow(record_batch)
+    elif pa is not None:
+        yield from _iter_arrow_json_chunks(path)
+    else:
+        yield from _iter_line_chunks(path, chunk_size)
+
+
+def _dumps(record: dict[str, Any]) -> bytes:
+    if orjson is not None:
+        return orjson.dumps(record)
+    return json.dumps(record).encode()
+
+
+def _write_parquet(batches: Iterable[TraceBatch], path: str) -> int:
+    _require_pyarrow("Writing Parquet traces")
+    num_written = 0
+    writer = None
+    try:
+        for batch in batches:
+            arrays = {
+                name: pa.array(values, type=pa.int64())
+                for name, values in batch.columns().items()
+            }
+            # 64-bit offsets, a batch can hold more than 2^31 hash IDs
+            arrays["hash_ids"] = pa.LargeListArray.from_arrays(
+                pa.array(batch.hash_ids_offsets, type=pa.int64()),
+                pa.array(batch.hash_ids, type=pa.int64()),
+            )
+            table = pa.table(arrays)
+            if writer is None:
+                writer = pq.ParquetWriter(path, table.schema)
+            writer.write_table(table)
+            num_written += len(batch)
+    finally:
+        if writer is not None:
+            writer.close()
+    return num_written
+
+
+def write_trace(
+    batches: Iterable[TraceBatch], path: str, output_format: Optional[str] = None
+) -> int:
+    """
+    Stream batches of requests to a trace file.
+
+    Args:
+        batches (Iterable[TraceBatch]): The batches to write, typically a generator.
+        path (str): The output file.
+        output_format (str, optional): Either "jsonl" or "parquet". Inferred from the
+            file suffix if not given.
+
+    Returns:
+        int: The number of requests written.
+    """
+    if output_format is None:
+        output_format = "parquet" if _is_parquet(path) else "jsonl"
+    if output_format == "parquet":
+        return _write_parquet(batches, path)
+    if output_format != "jsonl":
+        raise ValueError(f"Unsupported output format: {output_format}")
+
+    num_written = 0
+    with open(path, "wb") as f:
+        for batch in batches:
+            f.writelines(_dumps(record) + b"\n" for record in batch.to_records())
+            num_written += len(batch)
+    return num_written
@@ -43,8 +43,10 @@ class SLAPlannerDefaults(BasePlannerDefaults):
     osl = 150  # in number of tokens
     ttft = 0.5  # in seconds
     itl = 0.05  # in seconds
-    load_predictor = "arima"  # ["constant", "arima", "prophet"]
+    load_predictor = "arima"  # ["constant", "arima", "prophet", "ewma", "holt_winters", "kalman", "online_arima"]
     load_prediction_window_size = 50  # predict load using how many recent load samples
+    prediction_timeout = 30.0  # in seconds, then the last prediction is used
+    scaling_timeout = 600.0  # in seconds, to wait for a new replica to be ready
 
 
 class VllmV0ComponentName:
@@ -14,7 +14,7 @@
 # limitations under the License.
 
 import asyncio
-from typing import Optional
+from typing import Dict, Optional
 
 from kubernetes import client, config
 
@@ -117,7 +117,25 @@ class KubernetesAPI:
         self, graph_deployment_name: str, component_name: str, replicas: int
     ) -> None:
         """Update the replicas count for a component in a DynamoGraphDeployment"""
-        patch = {"spec": {"services": {component_name: {"replicas": replicas}}}}
+        await self.update_graph_replicas_batch(
+            graph_deployment_name, {component_name: replicas}
+        )
+
+    async def update_graph_replicas_batch(
+        self, graph_deployment_name: str, replicas: Dict[str, int]
+    ) -> None:
+        """
+        Update the replicas counts of several components of a DynamoGraphDeployment
+        in a single patch, so that the operator reconciles them at once
+        """
+        patch = {
+            "spec": {
+                "services": {
+                    component_name: {"replicas": component_replicas}
+                    for component_name, component_replicas in replicas.items()
+                }
+            }
+        }
         self.custom_api.patch_namespaced_custom_object(
             group="nvidia.com",
             version="v1alpha1",
@@ -13,31 +13,54 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
+import asyncio
+import logging
+from collections import defaultdict
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Dict, Optional, cast
+
 from .kube import KubernetesAPI
-from .planner_connector import PlannerConnector
+from .planner_connector import PlannerConnector, Transaction, active_transaction
+
+logger = logging.getLogger(__name__)
+
+
+class _ReplicaBatch(Transaction):
+    """Replica changes requested within a transaction, applied when it ends"""
+
+    def __init__(self, connector: "KubernetesConnector"):
+        super().__init__(connector)
+        self.deltas: Dict[str, int] = defaultdict(int)
+        self.blocking = False
 
 
 class KubernetesConnector(PlannerConnector):
     def __init__(self, namespace: str):
         self.kube_api = KubernetesAPI()
         self.namespace = namespace
+        # serializes the read-modify-write of the replica counts, so that concurrent
+        # operations do not overwrite each other
+        self._replicas_lock = asyncio.Lock()
 
     async def add_component(self, component_name: str, blocking: bool = True):
         """Add a component by increasing its replica count by 1"""
-        deployment = await self.kube_api.get_graph_deployment(
-            component_name, self.namespace
-        )
-        if deployment is None:
-            raise ValueError(
-                f"Graph not found for component {component_name} in dynamo namespace {self.namespace}"
+        if self._record(component_name, 1, blocking):
+            return True
+        async with self._replicas_lock:
+            deployment = await self.kube_api.get_graph_deployment(
+                component_name, self.namespace
+            )
+            if deployment is None:
+                raise ValueError(
+                    f"Graph not found for component {component_name} in dynamo namespace {self.namespace}"
+                )
+            # get current replicas or 1 if not found
+            current_replicas = self._get_current_replicas(deployment, component_name)
+            await self.kube_api.update_graph_replicas(
+                self._get_graph_deployment_name(deployment),
+                component_name,
+                current_replicas + 1,
             )
-        # get current replicas or 1 if not found
-        current_replicas = self._get_current_replicas(deployment, component_name)
-        await self.kube_api.update_graph_replicas(
-            self._get_graph_deployment_name(deployment),
-            component_name,
-            current_replicas + 1,
-        )
         if blocking:
             await self.kube_api.wait_for_graph_deployment_ready(
                 self._get_graph_deployment_name(deployment)
@@ -45,25 +68,133 @@ class KubernetesConnector(PlannerConnector):
 
     async def remove_component(self, component_name: str, blocking: bool = True):
         """Remove a component by decreasing its replica count by 1"""
-        deployment = await self.kube_api.get_graph_deployment(
-            component_name, self.namespace
-        )
-        if deployment is None:
-            raise ValueError(
-                f"Graph {component_name} not found for namespace {self.namespace}"
+        if self._record(component_name, -1, blocking):
+            return True
+        async with self._replicas_lock:
+            deployment = await self.kube_api.get_graph_deployment(
+                component_name, self.namespace
             )
-        # get current replicas or 1 if not found
-        current_replicas = self._get_current_replicas(deployment, component_name)
-        if current_replicas > 0:
-            await self.kube_api.update_graph_replicas(
-                self._get_graph_deployment_name(deployment),
-                component_name,
-                current_replicas - 1,
+            if deployment is None:
+                raise ValueError(
+                    f"Graph {component_name} not found for namespace {self.namespace}"
+                )
+            # get current replicas or 1 if not found
+            current_replicas = self._get_current_replicas(deployment, component_name)
+            if current_replicas > 0:
+                await self.kube_api.update_graph_replicas(
+                    self._get_graph_deployment_name(deployment),
+                    component_name,
+                    current_replicas - 1,
+                )
+        if current_replicas > 0 and blocking:
+            await self.kube_api.wait_for_graph_deployment_ready(
+                self._get_graph_deployment_name(deployment)
+            )
+
+    async def set_replicas(
+        self, component_name: str, replicas: int, blocking: bool = True
+    ) -> int:
+        """
+        Set the replica count of a component in a single patch
+
+        Returns:
+            int: The change in the replica count of the component
+        """
+        changes = await self.apply_targets({component_name: replicas}, blocking)
+        return changes[component_name]
+
+    async def apply_targets(
+        self, targets: Dict[str, int], blocking: bool = True
+    ) -> Dict[str, int]:
+        """
+        Set the replica counts of several components, with a single patch per graph
+        deployment covering all the components of that graph whose count changes
+
+        Args:
+            targets: Target replica count of each component
+            blocking: Wait for the patched graph deployments to be ready
+
+        Returns:
+            Dict[str, int]: The change in the replica count of each component
+        """
+        return await self._patch_replicas(targets, relative=False, blocking=blocking)
+
+    async def _patch_replicas(
+        self, replicas_by_component: Dict[str, int], relative: bool, blocking: bool
+    ) -> Dict[str, int]:
+        """
+        Patch the replica counts of components, to the given counts, or to their
+        current counts plus the given changes if relative
+        """
+        async with self._replicas_lock:
+            deployments = await asyncio.gather(
+                *(
+                    self.kube_api.get_graph_deployment(component_name, self.namespace)
+                    for component_name in replicas_by_component
+                )
             )
-            if blocking:
-                await self.kube_api.wait_for_graph_deployment_ready(
-                    self._get_graph_deployment_name(deployment)
+            changes: Dict[str, int] = {}
+            patches: Dict[str, Dict[str, int]] = defaultdict(dict)
+            for (component_name, target), deployment in zip(
+                replicas_by_component.items(), deployments
+            ):
+                if deployment is None:
+                    raise ValueError(
+                        f"Graph not found for component {component_name} in dynamo namespace {self.namespace}"
+                    )
+                current_replicas = self._get_current_replicas(
+                    deployment, component_name
                 )
+                replicas = max(current_replicas + target if relative else target, 0)
+                changes[component_name] = replicas - current_replicas
+                if replicas != current_replicas:
+                    patches[self._get_graph_deployment_name(deployment)][
+                        component_name
+                    ] = replicas
+
+            for graph_deployment_name, replicas_patch in patches.items():
+                logger.info(
+                    f"Patching replicas of {graph_deployment_name}: {replicas_patch}"
+                )
+                await self.kube_api.update_graph_replicas_batch(
+                    graph_deployment_name, replicas_patch
+                )
+
+        if blocking:
+            await asyncio.gather(
+                *(
+                    self.kube_api.wait_for_graph_deployment_ready(graph_deployment_name)
+                    for graph_deployment_name in patches
+                )
+            )
+        return changes
+
+    @asynccontextmanager
+    async def _begin_transaction(self) -> AsyncIterator[_ReplicaBatch]:
+        """
+        Accumulate the add/remove operations issued within the transaction, and apply
+        their net change with a single patch per graph deployment when it ends
+        """
+        batch = _ReplicaBatch(self)
+        yield batch
+        await self._patch_replicas(
+            {
+                component_name: delta
+                for component_name, delta in batch.deltas.items()
+                if delta != 0
+            },
+            relative=True,
+            blocking=batch.blocking,
+        )
+
+    def _record(self, component_name: str, delta: int, blocking: bool) -> bool:
+        """Record an operation in the batch of the running transaction, if any"""
+        batch = cast(Optional[_ReplicaBatch], active_transaction(self))
+        if batch is None:
+            return False
+        batch.deltas[component_name] += delta
+        batch.blocking |= blocking
+        return True
 
     def _get_current_replicas(self, deployment: dict, component_name: str) -> int:
         """Get the current replicas for a component in a graph deployment"""
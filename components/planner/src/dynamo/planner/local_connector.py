@@ -18,18 +18,21 @@ import json
 import logging
 import os
 from pathlib import Path
-from typing import Any, Dict, List
-
-import filelock
+from typing import Any, AsyncContextManager, Dict, List
 
 from dynamo.planner.circusd import CircusController
+from dynamo.planner.local_state import LocalStateStore, StateTransaction
 from dynamo.planner.planner_connector import PlannerConnector
+from dynamo.planner.utils.worker_membership import WorkerMembership
 from dynamo.runtime import DistributedRuntime
 from dynamo.runtime.logging import configure_dynamo_logging
 
 configure_dynamo_logging()
 logger = logging.getLogger(__name__)
 
+# endpoint whose instances are counted for each component
+COUNTED_ENDPOINTS = {"VllmWorker": "generate", "PrefillWorker": "mock"}
+
 
 class LocalConnector(PlannerConnector):
     def __init__(self, namespace: str, runtime: DistributedRuntime):
@@ -44,24 +47,18 @@ class LocalConnector(PlannerConnector):
         self.runtime = runtime
         self.state_file = Path.home() / ".dynamo" / "state" / f"{namespace}.json"
         self.circus = CircusController.from_state_file(namespace)
-        self._lockfile = self.state_file.with_suffix(".lock")
-        self._file_lock = filelock.FileLock(self._lockfile)
-        self.worker_client: Any | None = None
-        self.prefill_client: Any | None = None
+        self.store = LocalStateStore(self.state_file)
+        self._state_lock = asyncio.Lock()
         self.etcd_client: Any | None = None
+        self.membership: WorkerMembership | None = None
 
     async def _load_state(self) -> Dict[str, Any]:
-        """Load state from state file.
+        """Load state, from the state file only if it changed since it was cached.
 
         Returns:
             State dictionary
         """
-        if not self.state_file.exists():
-            raise FileNotFoundError(f"State file not found: {self.state_file}")
-
-        with self._file_lock:
-            with open(self.state_file, "r") as f:
-                return json.load(f)
+        return self.store.load()
 
     async def _save_state(self, state: Dict[str, Any]) -> bool:
         """Save state to state file.
@@ -73,9 +70,7 @@ class LocalConnector(PlannerConnector):
             True if successful
         """
         try:
-            with self._file_lock:
-                with open(self.state_file, "w") as f:
-                    json.dump(state, f, indent=2)
+            self.store.save(state)
             return True
         except Exception as e:
             logger.error(f"Failed to save state: {e}")
@@ -87,21 +82,17 @@ class LocalConnector(PlannerConnector):
         Returns:
             List of available GPU IDs
         """
-        state = await self._load_state()
-        system_resources = state.get("environment", {}).get("SYSTEM_RESOURCES", {})
-        all_gpus = set(str(gpu) for gpu in system_resources.get("gpu_info", []))
-
-        allocated_gpus: set[str] = set()
-        for component_info in state.get("components", {}).values():
-            resources = component_info.get("resources", {})
-            gpu_list = resources.get("allocated_gpus", [])
-            allocated_gpus.update(str(gpu) for gpu in gpu_list)
-
-        logger.info(f"Allocated GPUs: {allocated_gpus}")
-        available = sorted(list(all_gpus - allocated_gpus))
+        available = self.store.available_gpus()
         logger.info(f"Available GPUs: {available}")
         return available
 
+    def _begin_transaction(self) -> AsyncContextManager[StateTransaction]:
+        """
+        Save the state changes of the operations issued within the transaction in a
+        single write of the state file
+        """
+        return self.store.transaction()
+
     async def add_component(self, component_name: str, blocking: bool = True) -> bool:
         """
         Add a component. The steps are as follows:
@@ -117,80 +108,89 @@ class LocalConnector(PlannerConnector):
         Returns:
             True if successful
         """
-        state = await self._load_state()
-        # Find max suffix
-        max_suffix = 0
-        for watcher_name in state["components"].keys():
-            if watcher_name.startswith(f"{self.namespace}_{component_name}_"):
-                suffix = int(
-                    watcher_name.replace(f"{self.namespace}_{component_name}_", "")
+        # serialize the read-modify-write of the state, so that concurrent additions
+        # get distinct watcher names and GPUs
+        async with self.store.transaction() as transaction, self._state_lock:
+            state = transaction.state
+            # Find max suffix
+            max_suffix = 0
+            for watcher_name in state["components"].keys():
+                if watcher_name.startswith(f"{self.namespace}_{component_name}_"):
+                    suffix = int(
+                        watcher_name.replace(f"{self.namespace}_{component_name}_", "")
+                    )
+                    max_suffix = max(max_suffix, suffix)
+
+            watcher_name = f"{self.namespace}_{component_name}_{max_suffix + 1}"
+
+            if component_name not in [
+                c.replace(f"{self.namespace}_", "") for c in state["components"]
+            ]:
+                raise ValueError(
+                    f"Component {component_name} not found in state configuration"
                 )
-                max_suffix = max(max_suffix, suffix)
 
-        watcher_name = f"{self.namespace}_{component_name}_{max_suffix + 1}"
+            # Get base command and config
+            component_info = state["components"][f"{self.namespace}_{component_name}"]
+            base_cmd = component_info["cmd"].split("--worker-env")[0].strip()
 
-        if component_name not in [
-            c.replace(f"{self.namespace}_", "") for c in state["components"]
-        ]:
-            raise ValueError(
-                f"Component {component_name} not found in state configuration"
+            # Build environment
+            gpu_id = None
+            if component_name in ["VllmWorker", "PrefillWorker"]:
+                gpu_id = transaction.gpus.allocate()
+                if gpu_id is None:
+                    raise ValueError("No GPUs available for allocation")
+            watcher_env = self._watcher_env(
+                state, [gpu_id] if gpu_id is not None else []
             )
 
-        # Get base command and config
-        component_info = state["components"][f"{self.namespace}_{component_name}"]
-        base_cmd = component_info["cmd"].split("--worker-env")[0].strip()
-        service_config = state["environment"].get("DYNAMO_SERVICE_CONFIG")
+            # Build worker env list and command
+            worker_env_list = [watcher_env]
+            worker_env_arg = json.dumps(worker_env_list)
+            # We add a custom component name to ensure that the lease is attatched to this specific watcher
+            full_cmd = f"{base_cmd} --worker-env '{worker_env_arg}' --custom-component-name '{watcher_name}'"
 
-        # Build environment
-        watcher_env = os.environ.copy()
-        if component_name in ["VllmWorker", "PrefillWorker"]:
-            available_gpus = await self._get_available_gpus()
-            if not available_gpus:
-                raise ValueError("No GPUs available for allocation")
-            gpu_id = available_gpus[0]
-            watcher_env["CUDA_VISIBLE_DEVICES"] = gpu_id
-
-        watcher_env["DYNAMO_SERVICE_CONFIG"] = service_config
-
-        # Build worker env list and command
-        worker_env_list = [watcher_env]
-        worker_env_arg = json.dumps(worker_env_list)
-        # We add a custom component name to ensure that the lease is attatched to this specific watcher
-        full_cmd = f"{base_cmd} --worker-env '{worker_env_arg}' --custom-component-name '{watcher_name}'"
-
-        pre_add_endpoint_ids = await self._count_instance_ids(component_name)
-        logger.info(f"Pre-add endpoint IDs: {pre_add_endpoint_ids}")
-
-        logger.info(f"Adding watcher {watcher_name}")
-        success = await self.circus.add_watcher(
-            name=watcher_name, cmd=full_cmd, env=watcher_env, singleton=True
-        )
+            pre_add_endpoint_ids = await self._count_instance_ids(component_name)
+            logger.info(f"Pre-add endpoint IDs: {pre_add_endpoint_ids}")
 
-        if success:
-            resources = {}
-            if component_name in ["VllmWorker", "PrefillWorker"]:
-                resources["allocated_gpus"] = [gpu_id]
-
-            state["components"][watcher_name] = {
-                "watcher_name": watcher_name,
-                "cmd": full_cmd,
-                "resources": resources,
-            }
-            await self._save_state(state)
-            logger.info(
-                f"Succesfully created {watcher_name}. Waiting for worker to start..."
-            )
+            logger.info(f"Adding watcher {watcher_name}")
+            success = False
+            try:
+                success = await self.circus.add_watcher(
+                    name=watcher_name, cmd=full_cmd, env=watcher_env, singleton=True
+                )
+            finally:
+                if not success and gpu_id is not None:
+                    transaction.gpus.release([gpu_id])
+
+            if success:
+                # the state of a failed transaction is discarded, and the GPU with it,
+                # so the watcher must not keep running
+                transaction.on_rollback(
+                    lambda: self.circus.remove_watcher(name=watcher_name)
+                )
+                resources = {}
+                if gpu_id is not None:
+                    resources["allocated_gpus"] = [gpu_id]
+
+                state["components"][watcher_name] = {
+                    "watcher_name": watcher_name,
+                    "cmd": full_cmd,
+                    "resources": resources,
+                }
+                logger.info(
+                    f"Succesfully created {watcher_name}. Waiting for worker to start..."
+                )
 
         if blocking:
             required_endpoint_ids = pre_add_endpoint_ids + 1
-            while True:
-                current_endpoint_ids = await self._count_instance_ids(component_name)
-                if current_endpoint_ids == required_endpoint_ids:
-                    break
-                logger.info(
-                    f"Waiting for {component_name} to start. Current endpoint IDs: {current_endpoint_ids}, Required endpoint IDs: {required_endpoint_ids}"
-                )
-                await asyncio.sleep(5)
+            logger.info(
+                f"Waiting for {component_name} to start. Required endpoint IDs: {required_endpoint_ids}"
+            )
+            # completes as soon as the worker registers in etcd
+            await self._get_membership().wait_for_count(
+                component_name, required_endpoint_ids
+            )
 
         return success
 
@@ -210,50 +210,80 @@ class LocalConnector(PlannerConnector):
             True if successful
         """
         logger.info(f"Attempting to remove component {component_name}")
-        state = await self._load_state()
-        matching_components = {}
-
-        base_name = f"{self.namespace}_{component_name}"
-        base_name_with_underscore = f"{base_name}_"
-
-        for watcher_name in state["components"].keys():
-            if watcher_name == base_name:
-                matching_components[0] = watcher_name
-            elif watcher_name.startswith(base_name_with_underscore):
-                suffix = int(watcher_name.replace(base_name_with_underscore, ""))
-                matching_components[suffix] = watcher_name
+        async with self.store.transaction() as transaction, self._state_lock:
+            state = transaction.state
+            matching_components = {}
+
+            base_name = f"{self.namespace}_{component_name}"
+            base_name_with_underscore = f"{base_name}_"
+
+            for watcher_name in state["components"].keys():
+                if watcher_name == base_name:
+                    matching_components[0] = watcher_name
+                elif watcher_name.startswith(base_name_with_underscore):
+                    suffix = int(watcher_name.replace(base_name_with_underscore, ""))
+                    matching_components[suffix] = watcher_name
+
+            if not matching_components:
+                logger.error(f"No matching components found for {component_name}")
+                return False
+
+            highest_suffix = max(matching_components.keys())
+            target_watcher = matching_components[highest_suffix]
+            logger.info(f"Removing watcher {target_watcher}")
+
+            success = await self.circus.remove_watcher(
+                name=target_watcher, blocking=blocking
+            )
+            if not blocking:
+                logger.info(
+                    f"Circus remove_watcher for {target_watcher} {'succeeded' if success else 'failed'}"
+                )
 
-        if not matching_components:
-            logger.error(f"No matching components found for {component_name}")
-            return False
+            if success:
+                removed = state["components"].get(target_watcher, {})
+                allocated_gpus = removed.get("resources", {}).get("allocated_gpus", [])
+                # the state of a failed transaction is discarded, and still lists the
+                # watcher, so it is started again with the same GPUs
+                transaction.on_rollback(
+                    lambda: self.circus.add_watcher(
+                        name=target_watcher,
+                        cmd=removed["cmd"],
+                        env=self._watcher_env(state, allocated_gpus),
+                        singleton=True,
+                    )
+                )
+                transaction.gpus.release(allocated_gpus)
+                if highest_suffix > 0:  # Numbered watcher - remove entire entry
+                    if target_watcher in state["components"]:
+                        del state["components"][target_watcher]
+                else:  # Base watcher - just clear resources and lease
+                    if target_watcher in state["components"]:
+                        state["components"][target_watcher]["resources"] = {}
+                        state["components"][target_watcher]["lease"] = None
 
-        highest_suffix = max(matching_components.keys())
-        target_watcher = matching_components[highest_suffix]
-        logger.info(f"Removing watcher {target_watcher}")
+        return success
 
-        success = await self.circus.remove_watcher(
-            name=target_watcher, blocking=blocking
+    def _watcher_env(self, state: Dict[str, Any], gpus: List[str]) -> Dict[str, str]:
+        """Environment of a worker watcher running on the given GPUs"""
+        watcher_env = os.environ.copy()
+        if gpus:
+            watcher_env["CUDA_VISIBLE_DEVICES"] = ",".join(gpus)
+        watcher_env["DYNAMO_SERVICE_CONFIG"] = state["environment"].get(
+            "DYNAMO_SERVICE_CONFIG"
         )
-        if not blocking:
-            logger.info(
-                f"Circus remove_watcher for {target_watcher} {'succeeded' if success else 'failed'}"
-            )
+        return watcher_env
 
-        if success:
-            if highest_suffix > 0:  # Numbered watcher - remove entire entry
-                if target_watcher in state["components"]:
-                    del state["components"][target_watcher]
-            else:  # Base watcher - just clear resources and lease
-                if target_watcher in state["components"]:
-                    state["components"][target_watcher]["resources"] = {}
-                    state["components"][target_watcher]["lease"] = None
-            await self._save_state(state)
-
-        return success
+    def _get_membership(self) -> WorkerMembership:
+        if self.membership is None:
+            if self.etcd_client is None:
+                self.etcd_client = self.runtime.etcd_client()  # type: ignore
+            self.membership = WorkerMembership(self.etcd_client, self.namespace)
+        return self.membership
 
     async def _count_instance_ids(self, component_name: str) -> int:
         """
-        Count the instance IDs for the 'generate' endpoint of given component.
+        Count the instance IDs for the endpoint of given component, watched in etcd.
 
         Args:
             component_name: Name of the component
@@ -261,28 +291,11 @@ class LocalConnector(PlannerConnector):
         Returns:
             Number of endpoint IDs for a component
         """
-        if component_name == "VllmWorker":
-            if self.worker_client is None:
-                self.worker_client = (
-                    await self.runtime.namespace(self.namespace)
-                    .component(component_name)
-                    .endpoint("generate")
-                    .client()
-                )
-            worker_ids = self.worker_client.instance_ids()
-            return len(worker_ids)
-        elif component_name == "PrefillWorker":
-            if self.prefill_client is None:
-                self.prefill_client = (
-                    await self.runtime.namespace(self.namespace)
-                    .component(component_name)
-                    .endpoint("mock")
-                    .client()
-                )
-            prefill_ids = self.prefill_client.instance_ids()
-            return len(prefill_ids)
-        else:
+        if component_name not in COUNTED_ENDPOINTS:
             raise ValueError(f"Component {component_name} not supported")
+        membership = self._get_membership()
+        await membership.watch(component_name, COUNTED_ENDPOINTS[component_name])
+        return len(membership.instance_ids(component_name))
 
     async def _revoke_lease(self, lease_id: int) -> bool:
         """
@@ -0,0 +1,230 @@
+# SPDX-FileCopyrightText: Copyright (c) 2025 NVIDIA CORPORATION & AFFILIATES. All rights reserved.
+# SPDX-License-Identifier: Apache-2.0
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import asyncio
+import copy
+import json
+import logging
+import os
+from contextlib import asynccontextmanager
+from pathlib import Path
+from typing import (
+    Any,
+    AsyncIterator,
+    Awaitable,
+    Callable,
+    Dict,
+    Iterable,
+    List,
+    Optional,
+    Tuple,
+    cast,
+)
+
+import filelock
+
+from dynamo.planner.planner_connector import (
+    Transaction,
+    active_transaction,
+    join_transaction,
+)
+
+logger = logging.getLogger(__name__)
+
+
+class GpuBitmap:
+    """
+    Allocation of the GPUs of a local deployment, as a bitmap over the GPU IDs in
+    sorted order. The lowest free GPU is allocated first.
+    """
+
+    def __init__(self, gpus: Iterable[str]):
+        self.gpus = sorted(set(str(gpu) for gpu in gpus))
+        self.index = {gpu: idx for idx, gpu in enumerate(self.gpus)}
+        self.all = (1 << len(self.gpus)) - 1
+        self.allocated = 0
+
+    @classmethod
+    def from_state(cls, state: Dict[str, Any]) -> "GpuBitmap":
+        system_resources = state.get("environment", {}).get("SYSTEM_RESOURCES", {})
+        bitmap = cls(system_resources.get("gpu_info", []))
+        for component_info in state.get("components", {}).values():
+            resources = component_info.get("resources", {})
+            bitmap.mark(resources.get("allocated_gpus", []))
+        return bitmap
+
+    def mark(self, gpus: Iterable[str]):
+        for gpu in gpus:
+            # GPUs not in the system resources are ignored, as when listing them
+            if str(gpu) in self.index:
+                self.allocated |= 1 << self.index[str(gpu)]
+
+    def release(self, gpus: Iterable[str]):
+        for gpu in gpus:
+            if str(gpu) in self.index:
+                self.allocated &= ~(1 << self.index[str(gpu)])
+
+    def allocate(self) -> Optional[str]:
+        """Allocate the lowest free GPU, None if all GPUs are allocated"""
+        free = self.all & ~self.allocated
+        if not free:
+            return None
+        lowest = free & -free
+        self.allocated |= lowest
+        return self.gpus[lowest.bit_length() - 1]
+
+    def available(self) -> List[str]:
+        return [
+            gpu for idx, gpu in enumerate(self.gpus) if not self.allocated >> idx & 1
+        ]
+
+    def copy(self) -> "GpuBitmap":
+        return copy.copy(self)
+
+
+class StateTransaction(Transaction):
+    """
+    Working copy of the state, committed at once when the transaction ends. The
+    operations applied outside of the state, e.g. watchers started, register how to
+    undo them, so that nothing is applied when the transaction fails.
+    """
+
+    def __init__(
+        self, store: "LocalStateStore", state: Dict[str, Any], gpus: GpuBitmap
+    ):
+        super().__init__(store)
+        self.state = state
+        self.gpus = gpus
+        self.undo_operations: List[Callable[[], Awaitable[Any]]] = []
+
+    def on_rollback(self, undo: Callable[[], Awaitable[Any]]):
+        """Register how to undo an operation if the transaction fails"""
+        self.undo_operations.append(undo)
+
+    async def rollback(self):
+        for undo in reversed(self.undo_operations):
+            try:
+                await undo()
+            except Exception as e:
+                logger.error(f"Failed to undo an operation of the transaction: {e}")
+        self.undo_operations.clear()
+
+
+class LocalStateStore:
+    """
+    State file of a local deployment, cached in memory.
+
+    The file is only read again when it changed on disk, and is written atomically
+    (write to a temporary file, then rename) once per transaction however many
+    operations the transaction groups.
+    """
+
+    def __init__(self, state_file: Path):
+        self.state_file = state_file
+        self._file_lock = filelock.FileLock(state_file.with_suffix(".lock"))
+        # serializes the transactions of this process
+        self._lock = asyncio.Lock()
+        self._state: Optional[Dict[str, Any]] = None
+        self._gpus: Optional[GpuBitmap] = None
+        # (mtime, size) of the state file when it was last read or written
+        self._file_stat: Optional[Tuple[int, int]] = None
+
+    def _stat(self) -> Tuple[int, int]:
+        stat = os.stat(self.state_file)
+        return stat.st_mtime_ns, stat.st_size
+
+    def _refresh(self):
+        if not self.state_file.exists():
+            raise FileNotFoundError(f"State file not found: {self.state_file}")
+        if self._state is not None and self._stat() == self._file_stat:
+            return
+        with self._file_lock:
+            file_stat = self._stat()
+            with open(self.state_file, "r") as f:
+                state = json.load(f)
+        self._state, self._gpus, self._file_stat = (
+            state,
+            GpuBitmap.from_state(state),
+            file_stat,
+        )
+
+    def _active_transaction(self) -> Optional[StateTransaction]:
+        return cast(Optional[StateTransaction], active_transaction(self))
+
+    def load(self) -> Dict[str, Any]:
+        """Current state, as a copy that can be modified freely"""
+        transaction = self._active_transaction()
+        if transaction is not None:
+            return copy.deepcopy(transaction.state)
+        self._refresh()
+        return copy.deepcopy(self._state)  # type: ignore[arg-type]
+
+    def available_gpus(self) -> List[str]:
+        transaction = self._active_transaction()
+        if transaction is not None:
+            return transaction.gpus.available()
+        self._refresh()
+        return self._gpus.available()  # type: ignore[union-attr]
+
+    def save(self, state: Dict[str, Any]):
+        """Replace the state, writing it atomically"""
+        with self._file_lock:
+            tmp_file = self.state_file.with_name(
+                f".{self.state_file.name}.{os.getpid()}.tmp"
+            )
+            try:
+                with open(tmp_file, "w") as f:
+                    json.dump(state, f, indent=2)
+                    f.flush()
+                    os.fsync(f.fileno())
+                os.replace(tmp_file, self.state_file)
+            finally:
+                if tmp_file.exists():
+                    tmp_file.unlink()
+            file_stat = self._stat()
+        self._state, self._gpus, self._file_stat = (
+            copy.deepcopy(state),
+            GpuBitmap.from_state(state),
+            file_stat,
+        )
+
+    @asynccontextmanager
+    async def transaction(self) -> AsyncIterator[StateTransaction]:
+        """
+        Modify the state in a transaction. The changes made to the state of the
+        transaction are saved at once when the context exits. If it raises or the
+        state cannot be saved, they are discarded and the operations registered with
+        on_rollback are undone. Transactions opened within a transaction, including
+        by the tasks it starts, join it.
+        """
+        async with join_transaction(self, self._begin_transaction) as transaction:
+            yield transaction
+
+    @asynccontextmanager
+    async def _begin_transaction(self) -> AsyncIterator[StateTransaction]:
+        async with self._lock:
+            self._refresh()
+            transaction = StateTransaction(
+                self,
+                copy.deepcopy(self._state),  # type: ignore[arg-type]
+                self._gpus.copy(),  # type: ignore[union-attr]
+            )
+            try:
+                yield transaction
+                if transaction.state != self._state:
+                    self.save(transaction.state)
+            except BaseException:
+                await transaction.rollback()
+                raise
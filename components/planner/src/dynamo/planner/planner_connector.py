@@ -14,16 +14,85 @@
 # limitations under the License.
 
 from abc import ABC, abstractmethod
+from contextlib import asynccontextmanager, nullcontext
+from contextvars import ContextVar
+from typing import Any, AsyncContextManager, AsyncIterator, Callable, Optional, TypeVar
+
+
+class Transaction:
+    """Operations grouped by a transaction, until it is closed when its context exits"""
+
+    def __init__(self, owner: Any):
+        self.owner = owner
+        self.closed = False
+
+
+TransactionT = TypeVar("TransactionT", bound=Transaction)
+
+# transaction of the running task, inherited by the tasks it starts so that the
+# operations they issue concurrently join it
+_current_transaction: ContextVar[Optional[Transaction]] = ContextVar(
+    "planner_transaction", default=None
+)
+
+
+def active_transaction(owner: Any) -> Optional[Transaction]:
+    """Transaction of owner that the running task is in, if any"""
+    transaction = _current_transaction.get()
+    # tasks started in a transaction may outlive it
+    if transaction is None or transaction.owner is not owner or transaction.closed:
+        return None
+    return transaction
+
+
+@asynccontextmanager
+async def join_transaction(
+    owner: Any, begin: Callable[[], AsyncContextManager[TransactionT]]
+) -> AsyncIterator[TransactionT]:
+    """
+    Join the transaction of owner that the running task is in, or else begin one
+    with begin(), which commits it when its context exits without raising
+    """
+    transaction = active_transaction(owner)
+    if transaction is not None:
+        yield transaction  # type: ignore[misc]
+        return
+
+    async with begin() as transaction:
+        token = _current_transaction.set(transaction)
+        try:
+            yield transaction
+        finally:
+            transaction.closed = True
+            _current_transaction.reset(token)
 
 
 # TODO: add ability to scale component to X replicas
 class PlannerConnector(ABC):
     @abstractmethod
-    async def add_component(self, component_name):
+    async def add_component(self, component_name, blocking: bool = True):
         """Add a component to the planner"""
         pass
 
     @abstractmethod
-    async def remove_component(self, component_name):
+    async def remove_component(self, component_name, blocking: bool = True):
         """Remove a component from the planner"""
         pass
+
+    @asynccontextmanager
+    async def transaction(self):
+        """
+        Group the operations issued within the context, including concurrently, so
+        that connectors able to do so apply them at once. Transactions opened within
+        the context, including by the tasks it starts, join it.
+        """
+        async with join_transaction(self, self._begin_transaction) as transaction:
+            yield transaction
+
+    def _begin_transaction(self) -> AsyncContextManager[Transaction]:
+        """
+        New transaction of the connector, committed when the context exits without
+        raising. By default, nothing is committed: each operation is applied as it is
+        issued.
+        """
+        return nullcontext(Transaction(self))
@@ -101,6 +101,12 @@ class Planner:
                 "load-prediction-window-size",
                 SLAPlannerDefaults.load_prediction_window_size,
             ),
+            prediction_timeout=config_instance.get(
+                "prediction-timeout", SLAPlannerDefaults.prediction_timeout
+            ),
+            scaling_timeout=config_instance.get(
+                "scaling-timeout", SLAPlannerDefaults.scaling_timeout
+            ),
         )
 
     @async_on_start
@@ -17,8 +17,11 @@ import logging
 import math
 import warnings
 from abc import ABC, abstractmethod
+from collections import deque
 from datetime import datetime, timedelta
+from typing import Optional
 
+import numpy as np
 import pandas as pd
 import pmdarima
 from prophet import Prophet
@@ -152,8 +155,232 @@ class ProphetPredictor(BasePredictor):
         return forecast["yhat"].iloc[0]
 
 
+class IncrementalPredictor(BasePredictor):
+    """
+    Base class for predictors that fold every data point into a fixed-size state
+    instead of refitting a model on a buffer, so that both adding a data point and
+    predicting are O(1) in the length of the history
+    """
+
+    def __init__(self, minimum_data_points=5):
+        super().__init__(minimum_data_points=minimum_data_points)
+        self.num_data_points = 0
+        self.last_value = 0
+
+    def add_data_point(self, value):
+        value = 0 if math.isnan(value) else value
+        self.update(value)
+        self.num_data_points += 1
+        self.last_value = value
+
+    def get_last_value(self):
+        return self.last_value
+
+    def predict_next(self):
+        if self.num_data_points < self.minimum_data_points:
+            return self.get_last_value()
+        # load cannot be negative, whereas a trend extrapolation can be
+        return max(0.0, self.forecast())
+
+    @abstractmethod
+    def update(self, value):
+        """Fold a new data point into the state"""
+        pass
+
+    @abstractmethod
+    def forecast(self):
+        """Forecast the next value from the state"""
+        pass
+
+
+# Exponentially weighted moving average
+class EWMAPredictor(IncrementalPredictor):
+    def __init__(self, alpha=0.5, minimum_data_points=1, **kwargs):
+        super().__init__(minimum_data_points=minimum_data_points)
+        self.alpha = alpha
+        self.level: Optional[float] = None
+
+    def update(self, value):
+        if self.level is None:
+            self.level = value
+        else:
+            self.level = self.alpha * value + (1 - self.alpha) * self.level
+
+    def forecast(self):
+        if self.level is None:
+            return self.get_last_value()
+        return self.level
+
+
+# Additive Holt-Winters exponential smoothing, Holt's linear trend if season_length=0
+class HoltWintersPredictor(IncrementalPredictor):
+    def __init__(
+        self,
+        alpha=0.5,
+        beta=0.1,
+        gamma=0.1,
+        season_length=0,
+        minimum_data_points=2,
+        **kwargs,
+    ):
+        super().__init__(minimum_data_points=minimum_data_points)
+        self.alpha = alpha  # smoothing factor of the level
+        self.beta = beta  # smoothing factor of the trend
+        self.gamma = gamma  # smoothing factor of the seasonal components
+        self.season_length = season_length  # in adjustment intervals
+        self.seasonal = [0.0] * season_length
+        self.level: Optional[float] = None
+        self.trend = 0.0
+
+    def _season_index(self, step):
+        return step % self.season_length if self.season_length else None
+
+    def update(self, value):
+        i = self._season_index(self.num_data_points)
+        season = self.seasonal[i] if i is not None else 0.0
+        if self.level is None:
+            self.level = value - season
+            return
+
+        prev_level = self.level
+        self.level = self.alpha * (value - season) + (1 - self.alpha) * (
+            prev_level + self.trend
+        )
+        self.trend = (
+            self.beta * (self.level - prev_level) + (1 - self.beta) * self.trend
+        )
+        if i is not None:
+            self.seasonal[i] = (
+                self.gamma * (value - self.level) + (1 - self.gamma) * season
+            )
+
+    def forecast(self):
+        if self.level is None:
+            return self.get_last_value()
+        i = self._season_index(self.num_data_points)
+        season = self.seasonal[i] if i is not None else 0.0
+        return self.level + self.trend + season
+
+
+# Kalman filter of a local linear trend model, with the level and trend as state
+class KalmanPredictor(IncrementalPredictor):
+    def __init__(
+        self,
+        process_noise=0.1,
+        trend_noise=0.01,
+        minimum_data_points=2,
+        **kwargs,
+    ):
+        super().__init__(minimum_data_points=minimum_data_points)
+        # noise variances relative to the measurement noise, which is thus 1: the
+        # Kalman gain only depends on these ratios, so the filter is scale-free
+        self.process_noise = process_noise
+        self.trend_noise = trend_noise
+        self.level: Optional[float] = None
+        self.trend = 0.0
+        # state covariance [[p00, p01], [p01, p11]], the trend is unknown initially
+        self.p00, self.p01, self.p11 = 1.0, 0.0, 1e4
+
+    def update(self, value):
+        if self.level is None:
+            self.level = value
+            return
+
+        # predict: level += trend, P = F P F^T + Q
+        self.level += self.trend
+        p00 = self.p00 + 2 * self.p01 + self.p11 + self.process_noise
+        p01 = self.p01 + self.p11
+        p11 = self.p11 + self.trend_noise
+
+        # correct with the observed level
+        s = p00 + 1.0
+        k0, k1 = p00 / s, p01 / s
+        innovation = value - self.level
+        self.level += k0 * innovation
+        self.trend += k1 * innovation
+        self.p00, self.p01, self.p11 = (
+            (1 - k0) * p00,
+            (1 - k0) * p01,
+            p11 - k1 * p01,
+        )
+
+    def forecast(self):
+        if self.level is None:
+            return self.get_last_value()
+        return self.level + self.trend
+
+
+# Online ARIMA(p, d, 0): an AR(p) model with drift of the d-times differenced series,
+# fitted by exponentially weighted least squares. The weighted normal equations are
+# updated in O(p^2) per data point and carry over between predictions, so the fit is
+# warm-started from all the previous data rather than refitted on a window.
+class OnlineARIMAPredictor(IncrementalPredictor):
+    def __init__(
+        self,
+        window_size=100,
+        p=3,
+        d=1,
+        ridge=1e-2,
+        minimum_data_points=5,
+        **kwargs,
+    ):
+        super().__init__(minimum_data_points=minimum_data_points)
+        self.p = p
+        self.d = d
+        self.ridge = ridge
+        # weights decay by 1 - 1 / window_size per data point, so that the effective
+        # number of points fitted is about window_size
+        self.forgetting = 1 - 1 / window_size
+        # last value of the 0..d-1 times differenced series
+        self.levels: list[Optional[float]] = [None] * d
+        # last p values of the differenced series
+        self.lags: deque[float] = deque(maxlen=p)
+        self.xtx = np.zeros((p + 1, p + 1))
+        self.xty = np.zeros(p + 1)
+
+    def _features(self):
+        return np.array([1.0, *self.lags])
+
+    def update(self, value):
+        diff = value
+        for k in range(self.d):
+            prev, self.levels[k] = self.levels[k], diff
+            if prev is None:
+                return
+            diff -= prev
+
+        if len(self.lags) == self.p:
+            x = self._features()
+            self.xtx *= self.forgetting
+            self.xtx += np.outer(x, x)
+            self.xty *= self.forgetting
+            self.xty += diff * x
+        self.lags.appendleft(diff)
+
+    def forecast(self):
+        if len(self.lags) < self.p:
+            return self.get_last_value()
+
+        # ridge relative to each feature's scale keeps the fit scale-free and defined
+        # while the series is flat
+        diag = np.diag(self.xtx)
+        coefficients = np.linalg.solve(
+            self.xtx + np.diag(self.ridge * diag + 1e-12), self.xty
+        )
+        prediction = float(coefficients @ self._features())
+        for level in reversed(self.levels):
+            if level is None:
+                return self.get_last_value()
+            prediction += level
+        return prediction
+
+
 LOAD_PREDICTORS = {
     "constant": ConstantPredictor,
     "arima": ARIMAPredictor,
     "prophet": ProphetPredictor,
+    "ewma": EWMAPredictor,
+    "holt_winters": HoltWintersPredictor,
+    "kalman": KalmanPredictor,
+    "online_arima": OnlineARIMAPredictor,
 }
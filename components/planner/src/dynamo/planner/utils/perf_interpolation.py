@@ -15,12 +15,20 @@
 
 import numpy as np
 import scipy
+from numpy.typing import ArrayLike
+
+
+def _as_output(values: np.ndarray):
+    # scalar queries return a numpy scalar, array queries an array of the same shape
+    return values[()] if values.ndim == 0 else values
 
 
 class PrefillInterpolator:
     """
     Takes input from results of pre-deployment performance profiling to interpolate
     throughput/gpu and TTFT for a given ISL.
+
+    All the methods take either scalars or arrays of queries, which are evaluated at once.
     """
 
     def __init__(self, profile_results_dir: str):
@@ -44,19 +52,22 @@ class PrefillInterpolator:
             self.prefill_isl, self.prefill_thpt_per_gpu, kind="cubic"
         )
 
-    def interpolate_ttft(self, isl: float) -> float:
-        isl = max(self.min_isl, min(isl, self.max_isl))
-        return self.ttft_interpolator(isl)
+    def interpolate_ttft(self, isl: ArrayLike):
+        isl = np.clip(isl, self.min_isl, self.max_isl)
+        return _as_output(self.ttft_interpolator(isl))
 
-    def interpolate_thpt_per_gpu(self, isl: float) -> float:
-        isl = max(self.min_isl, min(isl, self.max_isl))
-        return self.thpt_interpolator(isl)
+    def interpolate_thpt_per_gpu(self, isl: ArrayLike):
+        isl = np.clip(isl, self.min_isl, self.max_isl)
+        return _as_output(self.thpt_interpolator(isl))
 
 
 class DecodeInterpolator:
     """
     Takes input from results of pre-deployment performance profiling to interpolate
     throughput/gpu and ITL for a given decode context length.
+
+    All the methods take either scalars or arrays of queries, which are broadcast
+    against each other and evaluated at once.
     """
 
     def __init__(self, profile_results_dir: str, resolution: int = 100):
@@ -113,49 +124,55 @@ class DecodeInterpolator:
             )
             self.thpt_interpolator[nan_mask] = thpt_nearest[nan_mask]
 
-    def compute_idx(self, concurrency: float, context_length: float) -> tuple[int, int]:
+        self._build_itl_envelope()
+
+    def _build_itl_envelope(self):
+        # the interpolated itl might not be monotonic in kv_usage, but its minimum over
+        # kv_usage >= x is, and is <= a target itl exactly up to the largest kv_usage
+        # with itl <= target, so this envelope can be binary searched
+        self.itl_envelope = np.minimum.accumulate(
+            self.itl_interpolator[:, ::-1], axis=1
+        )[:, ::-1]
+
+    def _grid_idx(self, values: ArrayLike, grid: np.ndarray) -> np.ndarray:
+        idx = np.round((np.asarray(values) - grid[0]) / (grid[1] - grid[0]))
+        return np.clip(idx, 0, self.resolution - 1).astype(np.intp)
+
+    def compute_idx(self, concurrency: ArrayLike, context_length: ArrayLike):
+        concurrency, context_length = np.broadcast_arrays(concurrency, context_length)
         kv_usage = concurrency * context_length / self.max_kv_tokens
         # Calculate x index (kv_usage)
-        ix = int(
-            np.clip(
-                np.round((kv_usage - self.xi[0]) / (self.xi[1] - self.xi[0])),
-                0,
-                self.resolution - 1,
-            )
-        )
+        ix = self._grid_idx(kv_usage, self.xi)
         # Calculate y index (context_length)
-        iy = int(
-            np.clip(
-                np.round((context_length - self.yi[0]) / (self.yi[1] - self.yi[0])),
-                0,
-                self.resolution - 1,
-            )
-        )
+        iy = self._grid_idx(context_length, self.yi)
+        if ix.ndim == 0:
+            return int(ix), int(iy)
         return ix, iy
 
-    def interpolate_itl(self, concurrency: float, context_length: float) -> float:
+    def interpolate_itl(self, concurrency: ArrayLike, context_length: ArrayLike):
         ix, iy = self.compute_idx(concurrency, context_length)
-        return self.itl_interpolator[iy, ix]
+        return _as_output(np.asarray(self.itl_interpolator[iy, ix]))
 
     def interpolate_thpt_per_gpu(
-        self, concurrency: float, context_length: float
-    ) -> float:
+        self, concurrency: ArrayLike, context_length: ArrayLike
+    ):
         ix, iy = self.compute_idx(concurrency, context_length)
-        return self.thpt_interpolator[iy, ix]
-
-    def find_best_throughput_per_gpu(self, itl: float, context_length: float) -> float:
-        # find the max kv_load that has itl <= target itl
-        # here we cannot use binary search as interpolated itl might not be monotonic
-        iy = int(
-            np.clip(
-                np.round((context_length - self.yi[0]) / (self.yi[1] - self.yi[0])),
-                0,
-                self.resolution - 1,
-            )
-        )
-        iy = max(0, min(iy, self.resolution - 1))
-
-        for ix in range(self.resolution - 1, -1, -1):
-            if self.itl_interpolator[iy, ix] <= itl:
-                return self.thpt_interpolator[iy, ix]
-        return self.thpt_interpolator[iy, 0]
+        return _as_output(np.asarray(self.thpt_interpolator[iy, ix]))
+
+    def find_best_throughput_per_gpu(self, itl: ArrayLike, context_length: ArrayLike):
+        # find the max kv_load that has itl <= target itl, falling back to the lowest
+        # kv_load if there is none
+        itl, context_length = np.broadcast_arrays(itl, context_length)
+        iy = self._grid_idx(context_length, self.yi)
+
+        # vectorized binary search of the number of envelope values <= itl in each row
+        lo = np.zeros(iy.shape, dtype=np.intp)
+        hi = np.full(iy.shape, self.resolution, dtype=np.intp)
+        while np.any(lo < hi):
+            active = lo < hi
+            mid = (lo + hi) // 2
+            below = self.itl_envelope[iy, np.minimum(mid, self.resolution - 1)] <= itl
+            lo = np.where(active & below, mid + 1, lo)
+            hi = np.where(active & ~below, mid, hi)
+        ix = np.maximum(lo - 1, 0)
+        return _as_output(np.asarray(self.thpt_interpolator[iy, ix]))
@@ -18,17 +18,22 @@ import asyncio
 import logging
 import math
 import time
+from concurrent.futures import ThreadPoolExecutor
 from dataclasses import dataclass
 from typing import Optional
 
-from dynamo.planner import KubernetesConnector, LocalConnector
+from tensorboardX import SummaryWriter
+
+from dynamo.planner import KubernetesConnector, LocalConnector, PlannerConnector
 from dynamo.planner.defaults import WORKER_COMPONENT_NAMES, SLAPlannerDefaults
-from dynamo.planner.utils.load_predictor import LOAD_PREDICTORS
+from dynamo.planner.utils.load_predictor import LOAD_PREDICTORS, BasePredictor
 from dynamo.planner.utils.perf_interpolation import (
     DecodeInterpolator,
     PrefillInterpolator,
 )
 from dynamo.planner.utils.prometheus import PrometheusAPIClient
+from dynamo.planner.utils.scaling_executor import ScalingExecutor
+from dynamo.planner.utils.worker_membership import WorkerMembership
 from dynamo.runtime import DistributedRuntime, dynamo_worker
 from dynamo.runtime.logging import configure_dynamo_logging
 
@@ -48,37 +53,135 @@ class Metrics:
     d_load: Optional[float] = None
 
 
+class PredictorRunner:
+    """
+    Runs the fits of a load predictor in a thread pool with a deadline, so that slow
+    models do not block the event loop. Data points are queued and added right before
+    the next fit, so that a predictor is never used by two threads at once, including
+    when a fit is still running past its deadline.
+    """
+
+    def __init__(self, name: str, predictor: BasePredictor, executor):
+        self.name = name
+        self.predictor = predictor
+        self.executor = executor
+        self.pending_data_points: list[float] = []
+        self.fit_future: Optional[asyncio.Future] = None
+        self.last_value = 0.0
+        self.last_prediction: Optional[float] = None
+
+    def add_data_point(self, value):
+        self.pending_data_points.append(value)
+        self.last_value = 0 if math.isnan(value) else value
+
+    def _fit(self, data_points):
+        for value in data_points:
+            self.predictor.add_data_point(value)
+        return self.predictor.predict_next()
+
+    def _fallback(self):
+        if self.last_prediction is not None:
+            return self.last_prediction
+        return self.last_value
+
+    async def predict_next(self, timeout: float):
+        """Predict the next value, or fall back to the last good prediction"""
+        if self.fit_future is not None and not self.fit_future.done():
+            logger.warning(
+                f"Previous {self.name} prediction is still running, using the last prediction"
+            )
+            return self._fallback()
+
+        data_points, self.pending_data_points = self.pending_data_points, []
+        self.fit_future = asyncio.get_running_loop().run_in_executor(
+            self.executor, self._fit, data_points
+        )
+        # a fit that finishes past its deadline still updates the last prediction
+        self.fit_future.add_done_callback(self._on_fit_done)
+        try:
+            # shield the fit so that it keeps running, and is known to be running,
+            # past the deadline
+            return await asyncio.wait_for(asyncio.shield(self.fit_future), timeout)
+        except asyncio.TimeoutError:
+            logger.warning(
+                f"{self.name} prediction missed its {timeout}s deadline, using the last prediction"
+            )
+            return self._fallback()
+        except Exception:
+            # logged by _on_fit_done
+            return self._fallback()
+
+    def _on_fit_done(self, fit_future: asyncio.Future):
+        if fit_future.cancelled():
+            return
+        if fit_future.exception() is not None:
+            logger.error(f"Failed to predict {self.name}: {fit_future.exception()}")
+        else:
+            self.last_prediction = fit_future.result()
+
+
 class Planner:
-    def __init__(self, runtime: DistributedRuntime, args: argparse.Namespace):
+    def __init__(
+        self,
+        runtime: DistributedRuntime,
+        args: argparse.Namespace,
+        connector: Optional[PlannerConnector] = None,
+        prometheus_api_client: Optional[PrometheusAPIClient] = None,
+    ):
         self.runtime = runtime
         self.args = args
         self.namespace = args.namespace
 
-        if not args.no_operation:
+        if connector is None and not args.no_operation:
             if args.environment == "local":
-                self.connector = LocalConnector(args.namespace, runtime)
+                connector = LocalConnector(args.namespace, runtime)
             elif args.environment == "kubernetes":
-                self.connector = KubernetesConnector(args.namespace)
+                connector = KubernetesConnector(args.namespace)
             else:
                 raise ValueError(f"Invalid environment: {args.environment}")
 
-        self.prometheus_api_client = PrometheusAPIClient(args.prometheus_endpoint)
+        self.scaling_executor: Optional[ScalingExecutor] = None
+        if connector is not None:
+            self.connector = connector
+            self.scaling_executor = ScalingExecutor(
+                connector, pending_timeout=args.scaling_timeout
+            )
+
+        self.prometheus_api_client = prometheus_api_client or PrometheusAPIClient(
+            args.prometheus_endpoint
+        )
 
-        self.num_req_predictor = LOAD_PREDICTORS[args.load_predictor](
-            window_size=args.load_prediction_window_size,
+        # one thread per predictor, so that the three fits run concurrently
+        self.predictor_executor = ThreadPoolExecutor(
+            max_workers=3, thread_name_prefix="planner-predictor"
         )
-        self.isl_predictor = LOAD_PREDICTORS[args.load_predictor](
-            window_size=args.load_prediction_window_size,
+        self.num_req_predictor = PredictorRunner(
+            "num_req",
+            LOAD_PREDICTORS[args.load_predictor](
+                window_size=args.load_prediction_window_size,
+            ),
+            self.predictor_executor,
         )
-        self.osl_predictor = LOAD_PREDICTORS[args.load_predictor](
-            window_size=args.load_prediction_window_size,
+        self.isl_predictor = PredictorRunner(
+            "isl",
+            LOAD_PREDICTORS[args.load_predictor](
+                window_size=args.load_prediction_window_size,
+            ),
+            self.predictor_executor,
+        )
+        self.osl_predictor = PredictorRunner(
+            "osl",
+            LOAD_PREDICTORS[args.load_predictor](
+                window_size=args.load_prediction_window_size,
+            ),
+            self.predictor_executor,
         )
 
         self.prefill_interpolator = PrefillInterpolator(args.profile_results_dir)
         self.decode_interpolator = DecodeInterpolator(args.profile_results_dir)
 
-        self.prefill_client = None
-        self.workers_client = None
+        # created on first use, as it needs the etcd client of the runtime
+        self.membership: Optional[WorkerMembership] = None
         self.p_endpoints = []  # type: ignore
         self.d_endpoints = []  # type: ignore
 
@@ -88,71 +191,65 @@ class Planner:
         self.p_correction_factor = 1.0
         self.d_correction_factor = 1.0
 
+        # time spent in each phase of the last adjustment, in seconds
+        self.phase_timings: dict[str, float] = {}
+        self.num_adjustments = 0
+        self.writer = SummaryWriter(args.log_dir) if args.log_dir else None
+
+    def _record_phase(self, phase: str, start: float):
+        self.phase_timings[phase] = time.perf_counter() - start
+
     async def get_workers_info(self):
+        names = WORKER_COMPONENT_NAMES[self.args.backend]
+        if self.membership is None:
+            self.membership = WorkerMembership(
+                self.runtime.etcd_client(), self.namespace
+            )
+            self.membership.subscribe(self._on_membership_change)
         try:
-            if self.prefill_client is None:
-                self.prefill_client = (
-                    await self.runtime.namespace(self.namespace)
-                    .component(WORKER_COMPONENT_NAMES[self.args.backend].prefill_worker)
-                    .endpoint(
-                        WORKER_COMPONENT_NAMES[
-                            self.args.backend
-                        ].prefill_worker_endpoint
-                    )
-                    .client()
-                )
-                # TODO: remove this sleep after rust client() is blocking until watching state
-                await asyncio.sleep(0.1)
-            # TODO: use etcd events instead of pulling instance_ids
-            p_endpoints = self.prefill_client.instance_ids()  # type: ignore
+            # returns immediately once watching, the instances are pushed by etcd
+            await self.membership.watch(
+                names.prefill_worker, names.prefill_worker_endpoint
+            )
+            p_endpoints = self.membership.instance_ids(names.prefill_worker)
         except Exception:
             p_endpoints = []
             logger.warning(
                 "No prefill workers found, aggregated mode is not supported yet"
             )
         try:
-            if self.workers_client is None:
-                self.workers_client = (
-                    await self.runtime.namespace(self.namespace)
-                    .component(WORKER_COMPONENT_NAMES[self.args.backend].decode_worker)
-                    .endpoint(
-                        WORKER_COMPONENT_NAMES[self.args.backend].decode_worker_endpoint
-                    )
-                    .client()
-                )
-                # TODO: remove this sleep after rust client() is blocking until watching state
-                await asyncio.sleep(0.1)
-            # TODO: use etcd events instead of pulling instance_ids
-            d_endpoints = self.workers_client.instance_ids()  # type: ignore
+            await self.membership.watch(
+                names.decode_worker, names.decode_worker_endpoint
+            )
+            d_endpoints = self.membership.instance_ids(names.decode_worker)
         except Exception as e:
             raise RuntimeError(f"Failed to get decode worker endpoints: {e}")
         return p_endpoints, d_endpoints
 
-    def observe_metrics(self):
-        self.last_metrics.ttft = self.prometheus_api_client.get_avg_time_to_first_token(
-            f"{self.args.adjustment_interval}s"
-        )
-        self.last_metrics.itl = self.prometheus_api_client.get_avg_inter_token_latency(
-            f"{self.args.adjustment_interval}s"
-        )
-        self.last_metrics.num_req = self.prometheus_api_client.get_avg_request_count(
-            f"{self.args.adjustment_interval}s"
-        )
-        self.last_metrics.request_duration = (
-            self.prometheus_api_client.get_avg_request_duration(
-                f"{self.args.adjustment_interval}s"
-            )
-        )
-        self.last_metrics.isl = (
-            self.prometheus_api_client.get_avg_input_sequence_tokens(
-                f"{self.args.adjustment_interval}s"
-            )
-        )
-        self.last_metrics.osl = (
-            self.prometheus_api_client.get_avg_output_sequence_tokens(
-                f"{self.args.adjustment_interval}s"
+    def get_num_ready(self, component: str) -> int:
+        """Number of ready workers of a component, as of now"""
+        if self.membership is not None:
+            return len(self.membership.instance_ids(component))
+        names = WORKER_COMPONENT_NAMES[self.args.backend]
+        if component == names.prefill_worker:
+            return len(self.p_endpoints)
+        return len(self.d_endpoints)
+
+    def _on_membership_change(self, component: str, joined: bool, instance_id: int):
+        # resolve the pending scaling operations as soon as workers join or leave
+        if self.scaling_executor is not None and self.membership is not None:
+            self.scaling_executor.observe(
+                component, len(self.membership.instance_ids(component))
             )
+
+    async def observe_metrics(self):
+        start = time.perf_counter()
+        metrics = await self.prometheus_api_client.get_metrics(
+            f"{self.args.adjustment_interval}s"
         )
+        for name, value in metrics.items():
+            setattr(self.last_metrics, name, value)
+        self._record_phase("observe", start)
 
         logger.info(
             f"Observed num_req: {self.last_metrics.num_req:.2f} isl: {self.last_metrics.isl:.2f} osl: {self.last_metrics.osl:.2f}"
@@ -167,7 +264,9 @@ class Planner:
 
     async def make_adjustments(self):
         try:
+            start = time.perf_counter()
             self.p_endpoints, self.d_endpoints = await self.get_workers_info()
+            self._record_phase("workers_info", start)
             logger.info(
                 f"Number of prefill workers: {len(self.p_endpoints)}, number of decode workers: {len(self.d_endpoints)}"
             )
@@ -195,10 +294,14 @@ class Planner:
             return
 
         try:
-            # predict the next load
-            next_num_req = self.num_req_predictor.predict_next()
-            next_isl = self.isl_predictor.predict_next()
-            next_osl = self.osl_predictor.predict_next()
+            # predict the next load, fitting the three predictors concurrently
+            start = time.perf_counter()
+            next_num_req, next_isl, next_osl = await asyncio.gather(
+                self.num_req_predictor.predict_next(self.args.prediction_timeout),
+                self.isl_predictor.predict_next(self.args.prediction_timeout),
+                self.osl_predictor.predict_next(self.args.prediction_timeout),
+            )
+            self._record_phase("predict", start)
             logger.info(
                 f"Predicted load: num_req={next_num_req:.2f}, isl={next_isl:.2f}, osl={next_osl:.2f}"
             )
@@ -207,6 +310,7 @@ class Planner:
             return
 
         try:
+            start = time.perf_counter()
             # compute how many replicas are needed for prefill
             # here we assume the prefill bias is purely due to request queueing
             # and we increase the number of prefill replicas linearly to account for the queueing delay
@@ -267,58 +371,84 @@ class Planner:
                 logger.warning(
                     f"Total number of GPUs required ({total_gpu_required}) exceeds the max GPU budget ({self.args.max_gpu_budget}), scaling down to {next_num_p} prefill and {next_num_d} decode replicas"
                 )
+            self._record_phase("compute_replicas", start)
         except Exception as e:
             logger.error(f"Failed to compute number of replicas: {e}")
             return
 
-        if not self.args.no_operation:
-            # scale up/down the number of prefill/decode non-blockingly
-            # TODO: add a check to avoid scaling before the previous scaling is completed
-            if next_num_p > len(self.p_endpoints):
-                for _ in range(next_num_p - len(self.p_endpoints)):
-                    self.connector.add_component(
-                        WORKER_COMPONENT_NAMES[self.args.backend].prefill_worker,
-                        blocking=False,
-                    )
-            elif next_num_p < len(self.p_endpoints):
-                for _ in range(len(self.p_endpoints) - next_num_p):
-                    self.connector.remove_component(
-                        WORKER_COMPONENT_NAMES[self.args.backend].prefill_worker,
-                        blocking=False,
-                    )
-
-            if next_num_d > len(self.d_endpoints):
-                for _ in range(next_num_d - len(self.d_endpoints)):
-                    self.connector.add_component(
-                        WORKER_COMPONENT_NAMES[self.args.backend].decode_worker,
-                        blocking=False,
-                    )
-            elif next_num_d < len(self.d_endpoints):
-                for _ in range(len(self.d_endpoints) - next_num_d):
-                    self.connector.remove_component(
-                        WORKER_COMPONENT_NAMES[self.args.backend].decode_worker,
-                        blocking=False,
-                    )
+        if self.scaling_executor is not None and not self.args.no_operation:
+            # scale prefill and decode concurrently, the executor accounts for the
+            # replicas still starting so that they are not requested again. Workers
+            # may have joined since get_workers_info, so they are counted again.
+            start = time.perf_counter()
+            names = WORKER_COMPONENT_NAMES[self.args.backend]
+            observed_at = self.scaling_executor.clock()
+            await self.scaling_executor.scale_all(
+                {
+                    names.prefill_worker: (
+                        next_num_p,
+                        self.get_num_ready(names.prefill_worker),
+                    ),
+                    names.decode_worker: (
+                        next_num_d,
+                        self.get_num_ready(names.decode_worker),
+                    ),
+                },
+                observed_at=observed_at,
+            )
+            self._record_phase("scale", start)
+
+    def export_phase_timings(self):
+        logger.info(
+            "Adjustment phase timings: "
+            + ", ".join(f"{k}={v:.3f}s" for k, v in self.phase_timings.items())
+        )
+        ready_times = (
+            self.scaling_executor.pop_ready_times()
+            if self.scaling_executor is not None
+            else []
+        )
+        if self.writer is not None:
+            for phase, duration in self.phase_timings.items():
+                self.writer.add_scalar(
+                    f"phase_time/{phase}", duration, self.num_adjustments
+                )
+            for component, time_to_ready in ready_times:
+                self.writer.add_scalar(
+                    f"time_to_ready/{component}", time_to_ready, self.num_adjustments
+                )
 
     async def run(self):
         """Main loop for the planner"""
 
         self.last_adjustment_time = time.time()
+        # adjustments are scheduled on a fixed grid, so that the time spent in an
+        # adjustment does not delay the following ones
+        next_adjustment_time = self.last_adjustment_time + self.args.adjustment_interval
 
         while True:
-            current_time = time.time()
-
-            if (
-                current_time - self.last_adjustment_time
-                >= self.args.adjustment_interval
-            ):
-                self.last_adjustment_time = time.time()
-                logger.info("New adjustment interval started!")
-                self.observe_metrics()
-                await self.make_adjustments()
-
-            # sleep for a while to avoid busy-waiting but not too long to miss the next adjustment
-            await asyncio.sleep(self.args.adjustment_interval / 10)
+            await asyncio.sleep(max(0.0, next_adjustment_time - time.time()))
+
+            self.last_adjustment_time = time.time()
+            logger.info("New adjustment interval started!")
+            self.phase_timings = {}
+            start = time.perf_counter()
+            await self.observe_metrics()
+            await self.make_adjustments()
+            self._record_phase("total", start)
+            self.export_phase_timings()
+            self.num_adjustments += 1
+
+            next_adjustment_time += self.args.adjustment_interval
+            if next_adjustment_time <= time.time():
+                # skip the adjustments missed while this one was running
+                missed = (
+                    time.time() - next_adjustment_time
+                ) // self.args.adjustment_interval + 1
+                logger.warning(
+                    f"Adjustment took longer than the adjustment interval, skipping {missed:.0f} adjustment(s)"
+                )
+                next_adjustment_time += missed * self.args.adjustment_interval
 
 
 async def start_sla_planner(runtime: DistributedRuntime, args: argparse.Namespace):
@@ -432,5 +562,17 @@ if __name__ == "__main__":
         default=SLAPlannerDefaults.load_prediction_window_size,
         help="Window size for load prediction",
     )
+    parser.add_argument(
+        "--prediction-timeout",
+        type=float,
+        default=SLAPlannerDefaults.prediction_timeout,
+        help="Deadline in seconds for fitting the load predictors, after which the last prediction is used",
+    )
+    parser.add_argument(
+        "--scaling-timeout",
+        type=float,
+        default=SLAPlannerDefaults.scaling_timeout,
+        help="Seconds after which a new replica that is still not ready is no longer waited for",
+    )
     args = parser.parse_args()
     asyncio.run(dynamo_worker()(start_sla_planner)(args))
@@ -0,0 +1,580 @@
+# SPDX-FileCopyrightText: Copyright (c) 2025 NVIDIA CORPORATION & AFFILIATES. All rights reserved.
+# SPDX-License-Identifier: Apache-2.0
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+Offline replay of the SLA planner against a simulated deployment.
+
+A mooncake-style trace is fed through a model of the prefill and decode pools built
+from the pre-deployment profiling results, and the real `Planner` observes the
+simulated metrics and scales the simulated pools every adjustment interval:
+
+- Prefill engines serve one request at a time from a shared FCFS queue, each taking
+  the profiled TTFT of its ISL.
+- Decode engines batch all the requests admitted to them. Every request generates
+  tokens at the profiled ITL of the engine's concurrency and average context length,
+  and requests are admitted to the engine with the fewest requests whose KV cache
+  can hold their ISL, waiting in FCFS order otherwise.
+- New engines take `--startup-delay` seconds to become ready, removed engines stop
+  taking requests and release their GPUs once drained.
+
+Decode is advanced in time steps of `--step` seconds and all requests in a step are
+updated at once, so hours of traffic replay in seconds.
+
+Example usage:
+python -m dynamo.planner.utils.planner_replay --trace mooncake_trace.jsonl \\
+    --profile-results-dir profiling_results --load-predictor constant arima kalman
+"""
+
+import argparse
+import asyncio
+import heapq
+import json
+import logging
+import time
+from dataclasses import dataclass
+from typing import Optional
+
+import numpy as np
+
+from dynamo.planner import PlannerConnector
+from dynamo.planner.defaults import WORKER_COMPONENT_NAMES, SLAPlannerDefaults
+from dynamo.planner.utils.perf_interpolation import (
+    DecodeInterpolator,
+    PrefillInterpolator,
+)
+from dynamo.planner.utils.planner_core import Planner
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class Trace:
+    arrival: np.ndarray  # in seconds since the first request
+    isl: np.ndarray
+    osl: np.ndarray
+
+
+def load_trace(path: str) -> Trace:
+    """Load a mooncake-style jsonl trace, sorted by arrival"""
+    timestamps, isls, osls = [], [], []
+    with open(path) as f:
+        for line in f:
+            if not line.strip():
+                continue
+            request = json.loads(line)
+            timestamps.append(request["timestamp"])
+            isls.append(request["input_length"])
+            osls.append(request["output_length"])
+    if not timestamps:
+        raise ValueError(f"No requests in {path}")
+
+    order = np.argsort(timestamps, kind="stable")
+    arrival = np.asarray(timestamps, dtype=np.float64)[order] / 1000
+    return Trace(
+        arrival=arrival - arrival[0],
+        isl=np.asarray(isls, dtype=np.int64)[order],
+        osl=np.asarray(osls, dtype=np.int64)[order],
+    )
+
+
+@dataclass
+class Engine:
+    added_time: float
+    ready_time: float
+    removed_time: Optional[float] = None
+    # time the engine released its GPUs, once removed and drained
+    stop_time: Optional[float] = None
+    # time the engine is done with the requests assigned to it (prefill only)
+    free_time: float = 0.0
+
+
+class ServingSimulator:
+    """Queueing model of the prefill and decode pools of a disaggregated deployment"""
+
+    def __init__(
+        self,
+        trace: Trace,
+        prefill_interpolator: PrefillInterpolator,
+        decode_interpolator: DecodeInterpolator,
+        prefill_engine_num_gpu: int = 1,
+        decode_engine_num_gpu: int = 1,
+        startup_delay: float = 60.0,
+        step: float = 0.1,
+    ):
+        self.trace = trace
+        self.decode_interpolator = decode_interpolator
+        self.num_gpu = {
+            "prefill": prefill_engine_num_gpu,
+            "decode": decode_engine_num_gpu,
+        }
+        self.startup_delay = startup_delay
+        self.step = step
+        self.max_kv_tokens = decode_interpolator.max_kv_tokens
+
+        num_requests = len(trace.arrival)
+        # profiled TTFT is in ms
+        self.prefill_time = (
+            np.asarray(prefill_interpolator.interpolate_ttft(trace.isl)) / 1000
+        )
+        self.prefill_done = np.full(num_requests, np.nan)
+        self.first_token = np.full(num_requests, np.nan)
+        self.finish = np.full(num_requests, np.nan)
+
+        self.now = 0.0
+        self.engines: dict[str, list[Engine]] = {"prefill": [], "decode": []}
+        self.next_request = 0  # next request to enter prefill
+        # (free time, engine index) of the prefill engines taking requests
+        self.prefill_heap: list[tuple[float, int]] = []
+        # (prefill done time, request index) of the requests waiting for decode
+        self.decode_queue: list[tuple[float, int]] = []
+        # requests being decoded
+        self.active_request = np.empty(0, dtype=np.intp)
+        self.active_engine = np.empty(0, dtype=np.intp)
+        self.active_context = np.empty(0)
+        self.active_remaining = np.empty(0)
+
+    @property
+    def done(self) -> bool:
+        return bool(np.all(~np.isnan(self.finish)))
+
+    def add_engine(self, kind: str, startup_delay: Optional[float] = None):
+        delay = self.startup_delay if startup_delay is None else startup_delay
+        engine = Engine(added_time=self.now, ready_time=self.now + delay)
+        engine.free_time = engine.ready_time
+        self.engines[kind].append(engine)
+        if kind == "prefill":
+            heapq.heappush(
+                self.prefill_heap, (engine.free_time, len(self.engines[kind]) - 1)
+            )
+
+    def remove_engine(self, kind: str) -> bool:
+        # remove the newest engine, which is the least likely to be serving requests
+        for idx in range(len(self.engines[kind]) - 1, -1, -1):
+            engine = self.engines[kind][idx]
+            if engine.removed_time is None:
+                break
+        else:
+            return False
+
+        engine.removed_time = self.now
+        if engine.ready_time > self.now:
+            engine.stop_time = self.now
+        elif kind == "prefill":
+            engine.stop_time = max(self.now, engine.free_time)
+        elif not np.any(self.active_engine == idx):
+            engine.stop_time = self.now
+        return True
+
+    def ready_engines(self, kind: str, at: Optional[float] = None) -> list[int]:
+        at = self.now if at is None else at
+        return [
+            idx
+            for idx, engine in enumerate(self.engines[kind])
+            if engine.ready_time <= at and engine.removed_time is None
+        ]
+
+    def _run_prefill(self, end: float):
+        arrival = self.trace.arrival
+        while self.next_request < len(arrival) and arrival[self.next_request] < end:
+            while self.prefill_heap and (
+                self.engines["prefill"][self.prefill_heap[0][1]].removed_time
+                is not None
+            ):
+                heapq.heappop(self.prefill_heap)
+            if not self.prefill_heap:
+                return
+
+            i = self.next_request
+            free_time, idx = self.prefill_heap[0]
+            start = max(arrival[i], free_time)
+            if start >= end:
+                # leave the request queued, engines may be added before it starts
+                return
+            done = start + self.prefill_time[i]
+            self.engines["prefill"][idx].free_time = done
+            heapq.heapreplace(self.prefill_heap, (done, idx))
+            self.prefill_done[i] = done
+            heapq.heappush(self.decode_queue, (done, i))
+            self.next_request += 1
+
+    def _admit(self, start: float, end: float):
+        ready = self.ready_engines("decode", at=start)
+        if not ready or not self.decode_queue:
+            return
+        num_engines = len(self.engines["decode"])
+        counts = np.bincount(self.active_engine, minlength=num_engines)
+        kv_tokens = np.bincount(
+            self.active_engine, weights=self.active_context, minlength=num_engines
+        )
+
+        admitted, engines = [], []
+        while self.decode_queue and self.decode_queue[0][0] < end:
+            done, i = self.decode_queue[0]
+            isl = self.trace.isl[i]
+            candidates = [e for e in ready if kv_tokens[e] + isl <= self.max_kv_tokens]
+            if not candidates:
+                break
+            best = min(candidates, key=lambda e: counts[e])
+            heapq.heappop(self.decode_queue)
+            # the first token is produced by prefill and streamed once decode starts
+            self.first_token[i] = max(done, start)
+            counts[best] += 1
+            kv_tokens[best] += isl
+            admitted.append(i)
+            engines.append(best)
+
+        if admitted:
+            admitted_arr = np.asarray(admitted, dtype=np.intp)
+            self.active_request = np.concatenate([self.active_request, admitted_arr])
+            self.active_engine = np.concatenate(
+                [self.active_engine, np.asarray(engines, dtype=np.intp)]
+            )
+            self.active_context = np.concatenate(
+                [self.active_context, self.trace.isl[admitted_arr].astype(np.float64)]
+            )
+            self.active_remaining = np.concatenate(
+                [
+                    self.active_remaining,
+                    (self.trace.osl[admitted_arr] - 1).astype(np.float64),
+                ]
+            )
+
+    def _advance(self, start: float, end: float):
+        if not len(self.active_request):
+            return
+        num_engines = len(self.engines["decode"])
+        counts = np.bincount(self.active_engine, minlength=num_engines)
+        context = np.bincount(
+            self.active_engine, weights=self.active_context, minlength=num_engines
+        )
+        busy = counts > 0
+        itl = np.ones(num_engines)
+        itl[busy] = self.decode_interpolator.interpolate_itl(
+            concurrency=counts[busy], context_length=context[busy] / counts[busy]
+        )
+
+        request_itl = itl[self.active_engine]
+        decode_start = np.maximum(self.first_token[self.active_request], start)
+        tokens = (end - decode_start) / request_itl
+        self.active_remaining -= tokens
+        self.active_context += tokens
+
+        finished = self.active_remaining <= 0
+        if np.any(finished):
+            # back-date the finish time by the tokens generated in excess
+            self.finish[self.active_request[finished]] = (
+                end + self.active_remaining[finished] * request_itl[finished]
+            )
+            keep = ~finished
+            self.active_request = self.active_request[keep]
+            self.active_engine = self.active_engine[keep]
+            self.active_context = self.active_context[keep]
+            self.active_remaining = self.active_remaining[keep]
+
+            still_busy = np.bincount(self.active_engine, minlength=num_engines) > 0
+            for idx, engine in enumerate(self.engines["decode"]):
+                if (
+                    engine.removed_time is not None
+                    and engine.stop_time is None
+                    and not still_busy[idx]
+                ):
+                    engine.stop_time = end
+
+    def run_until(self, end: float):
+        """Simulate the deployment until `end`, with the current engines"""
+        self._run_prefill(end)
+        t = self.now
+        while t < end:
+            if not len(self.active_request):
+                # nothing to decode, skip to the next request done with prefill
+                if not self.decode_queue or self.decode_queue[0][0] >= end:
+                    break
+                t = max(t, self.decode_queue[0][0])
+            step_end = min(t + self.step, end)
+            self._admit(t, step_end)
+            self._advance(t, step_end)
+            t = step_end
+        self.now = end
+
+    def window_metrics(self, window: float) -> dict[str, float]:
+        """The metrics the planner observes from Prometheus over the last `window`"""
+        start, end = self.now - window, self.now
+        arrival = self.trace.arrival
+
+        def in_window(times):
+            return (times > start) & (times <= end)
+
+        def mean(values):
+            return float(values.mean()) if len(values) else 0.0
+
+        arrived = in_window(arrival)
+        first_token = in_window(self.first_token)
+        finished = in_window(self.finish) & (self.trace.osl > 1)
+        return {
+            "ttft": mean(self.first_token[first_token] - arrival[first_token]),
+            "itl": mean(
+                (self.finish[finished] - self.first_token[finished])
+                / (self.trace.osl[finished] - 1)
+            ),
+            "num_req": float(arrived.sum()),
+            "request_duration": mean(self.finish[finished] - arrival[finished]),
+            "isl": mean(self.trace.isl[arrived].astype(np.float64)),
+            "osl": mean(self.trace.osl[arrived].astype(np.float64)),
+        }
+
+    def gpu_hours(self) -> float:
+        total = 0.0
+        for kind, engines in self.engines.items():
+            for engine in engines:
+                stop = self.now if engine.stop_time is None else engine.stop_time
+                total += (stop - engine.added_time) * self.num_gpu[kind]
+        return total / 3600
+
+
+class SimulatedConnector(PlannerConnector):
+    """Connector scaling the engines of a ServingSimulator"""
+
+    def __init__(self, simulator: ServingSimulator, backend: str):
+        self.simulator = simulator
+        self.kinds = {
+            WORKER_COMPONENT_NAMES[backend].prefill_worker: "prefill",
+            WORKER_COMPONENT_NAMES[backend].decode_worker: "decode",
+        }
+
+    async def add_component(self, component_name, blocking=True):
+        self.simulator.add_engine(self.kinds[component_name])
+        return True
+
+    async def remove_component(self, component_name, blocking=True):
+        return self.simulator.remove_engine(self.kinds[component_name])
+
+
+class SimulatedMetricsClient:
+    """Stands in for PrometheusAPIClient, reading the metrics of a ServingSimulator"""
+
+    def __init__(self, simulator: ServingSimulator, window: float):
+        self.simulator = simulator
+        self.window = window
+
+    async def get_metrics(self, interval: str) -> dict[str, float]:
+        return self.simulator.window_metrics(self.window)
+
+
+class ReplayPlanner(Planner):
+    """The SLA planner, observing and scaling a ServingSimulator"""
+
+    def __init__(self, args: argparse.Namespace, simulator: ServingSimulator):
+        super().__init__(
+            None,  # type: ignore[arg-type]
+            args,
+            connector=SimulatedConnector(simulator, args.backend),
+            prometheus_api_client=SimulatedMetricsClient(  # type: ignore[arg-type]
+                simulator, args.adjustment_interval
+            ),
+        )
+        self.simulator = simulator
+        # time-to-ready is measured in simulated time, at each adjustment
+        assert self.scaling_executor is not None
+        self.scaling_executor.clock = lambda: simulator.now
+
+    async def get_workers_info(self):
+        return (
+            self.simulator.ready_engines("prefill"),
+            self.simulator.ready_engines("decode"),
+        )
+
+    def get_num_ready(self, component: str) -> int:
+        kind = self.connector.kinds[component]  # type: ignore[attr-defined]
+        return len(self.simulator.ready_engines(kind))
+
+
+async def replay(
+    args: argparse.Namespace,
+    trace: Trace,
+    prefill_interpolator: PrefillInterpolator,
+    decode_interpolator: DecodeInterpolator,
+) -> dict[str, float]:
+    """Replay the trace with the planner configured by args, and summarize the run"""
+    simulator = ServingSimulator(
+        trace,
+        prefill_interpolator,
+        decode_interpolator,
+        prefill_engine_num_gpu=args.prefill_engine_num_gpu,
+        decode_engine_num_gpu=args.decode_engine_num_gpu,
+        startup_delay=args.startup_delay,
+        step=args.step,
+    )
+    for _ in range(args.initial_prefill):
+        simulator.add_engine("prefill", startup_delay=0)
+    for _ in range(args.initial_decode):
+        simulator.add_engine("decode", startup_delay=0)
+    planner = ReplayPlanner(args, simulator)
+
+    wall_start = time.perf_counter()
+    interval = args.adjustment_interval
+    max_time = trace.arrival[-1] + args.max_drain_time
+    try:
+        while not simulator.done and simulator.now < max_time:
+            simulator.run_until(simulator.now + interval)
+            await planner.observe_metrics()
+            await planner.make_adjustments()
+    finally:
+        planner.predictor_executor.shutdown(wait=False)
+    wall_time = time.perf_counter() - wall_start
+
+    ttft = simulator.first_token - trace.arrival
+    decoded = trace.osl > 1
+    itl = np.zeros(len(ttft))
+    itl[decoded] = (simulator.finish[decoded] - simulator.first_token[decoded]) / (
+        trace.osl[decoded] - 1
+    )
+    # requests that never finished miss both SLAs, as comparisons with NaN are false
+    itl[np.isnan(simulator.finish)] = np.nan
+    ttft_ok = ttft <= args.ttft
+    itl_ok = itl <= args.itl
+    duration_hours = simulator.now / 3600
+    return {
+        "Finished": int(np.sum(~np.isnan(simulator.finish))),
+        "TTFT SLA (%)": 100 * ttft_ok.mean(),
+        "ITL SLA (%)": 100 * itl_ok.mean(),
+        "Both SLAs (%)": 100 * (ttft_ok & itl_ok).mean(),
+        "P99 TTFT (s)": float(np.nanpercentile(ttft, 99)),
+        "P99 ITL (s)": float(np.nanpercentile(itl, 99)),
+        "GPU Hours": simulator.gpu_hours(),
+        "Avg GPUs": simulator.gpu_hours() / duration_hours,
+        "Replay Time (s)": wall_time,
+    }
+
+
+def _format_table(rows: list[dict]) -> str:
+    headers = list(rows[0])
+    cells = [
+        [f"{v:.3f}" if isinstance(v, float) else str(v) for v in row.values()]
+        for row in rows
+    ]
+    widths = [max(len(h), *(len(c[i]) for c in cells)) for i, h in enumerate(headers)]
+    lines = [" | ".join(h.ljust(w) for h, w in zip(headers, widths))]
+    lines.append("-+-".join("-" * w for w in widths))
+    lines += [" | ".join(c.rjust(w) for c, w in zip(row, widths)) for row in cells]
+    return "\n".join(lines)
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Replay a trace through the SLA planner and a simulated deployment"
+    )
+    parser.add_argument("--trace", type=str, required=True, help="Mooncake trace")
+    parser.add_argument(
+        "--profile-results-dir",
+        type=str,
+        default=SLAPlannerDefaults.profile_results_dir,
+        help="Directory to pre-deployment profiling results",
+    )
+    parser.add_argument(
+        "--load-predictor",
+        type=str,
+        nargs="+",
+        default=[SLAPlannerDefaults.load_predictor],
+        help="Load predictors to compare",
+    )
+    parser.add_argument(
+        "--adjustment-interval",
+        type=int,
+        nargs="+",
+        default=[SLAPlannerDefaults.adjustment_interval],
+        help="Adjustment intervals in seconds to compare",
+    )
+    parser.add_argument(
+        "--load-prediction-window-size",
+        type=int,
+        default=SLAPlannerDefaults.load_prediction_window_size,
+    )
+    parser.add_argument("--ttft", type=float, default=SLAPlannerDefaults.ttft)
+    parser.add_argument("--itl", type=float, default=SLAPlannerDefaults.itl)
+    parser.add_argument(
+        "--max-gpu-budget", type=int, default=SLAPlannerDefaults.max_gpu_budget
+    )
+    parser.add_argument(
+        "--min-endpoint", type=int, default=SLAPlannerDefaults.min_endpoint
+    )
+    parser.add_argument(
+        "--prefill-engine-num-gpu",
+        type=int,
+        default=SLAPlannerDefaults.prefill_engine_num_gpu,
+    )
+    parser.add_argument(
+        "--decode-engine-num-gpu",
+        type=int,
+        default=SLAPlannerDefaults.decode_engine_num_gpu,
+    )
+    parser.add_argument("--initial-prefill", type=int, default=1)
+    parser.add_argument("--initial-decode", type=int, default=1)
+    parser.add_argument(
+        "--startup-delay",
+        type=float,
+        default=60.0,
+        help="Seconds for a new engine to become ready",
+    )
+    parser.add_argument(
+        "--step", type=float, default=0.1, help="Decode time step in seconds"
+    )
+    parser.add_argument(
+        "--max-drain-time",
+        type=float,
+        default=3600.0,
+        help="Seconds to keep simulating after the last arrival for requests to finish",
+    )
+    parser.add_argument(
+        "--verbose", action="store_true", help="Show the logs of the planner"
+    )
+    cli_args = parser.parse_args()
+
+    if not cli_args.verbose:
+        logging.getLogger("dynamo.planner.utils.planner_core").setLevel(logging.ERROR)
+
+    trace = load_trace(cli_args.trace)
+    prefill_interpolator = PrefillInterpolator(cli_args.profile_results_dir)
+    decode_interpolator = DecodeInterpolator(cli_args.profile_results_dir)
+
+    rows = []
+    for load_predictor in cli_args.load_predictor:
+        for adjustment_interval in cli_args.adjustment_interval:
+            args = argparse.Namespace(
+                **{
+                    k: getattr(SLAPlannerDefaults, k)
+                    for k in dir(SLAPlannerDefaults)
+                    if not k.startswith("_")
+                },
+            )
+            args.__dict__.update(vars(cli_args))
+            args.load_predictor = load_predictor
+            args.adjustment_interval = adjustment_interval
+            args.no_operation = False
+            result = asyncio.run(
+                replay(args, trace, prefill_interpolator, decode_interpolator)
+            )
+            rows.append(
+                {
+                    "Predictor": load_predictor,
+                    "Interval (s)": adjustment_interval,
+                    **result,
+                }
+            )
+
+    print(_format_table(rows))
+
+
+if __name__ == "__main__":
+    main()
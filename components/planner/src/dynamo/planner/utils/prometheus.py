@@ -13,8 +13,15 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
+import asyncio
 import logging
+import math
+import re
+import time
+from collections import defaultdict
+from typing import Optional
 
+import httpx
 from prometheus_api_client import PrometheusConnect
 
 from dynamo.runtime.logging import configure_dynamo_logging
@@ -22,76 +29,258 @@ from dynamo.runtime.logging import configure_dynamo_logging
 configure_dynamo_logging()
 logger = logging.getLogger(__name__)
 
+METRIC_PREFIX = "nv_llm_http_service_"
+
+# observed metric -> (series name without METRIC_PREFIX, description used in errors)
+# num_req is the increase of a counter over the interval, the other metrics are the
+# average of a histogram over the interval
+OBSERVED_METRICS = {
+    "ttft": ("time_to_first_token_seconds", "avg time to first token"),
+    "itl": ("inter_token_latency_seconds", "avg inter token latency"),
+    "num_req": ("requests_total", "avg request count"),
+    "request_duration": ("request_duration_seconds", "avg request duration"),
+    "isl": ("input_sequence_tokens", "avg input sequence tokens"),
+    "osl": ("output_sequence_tokens", "avg output sequence tokens"),
+}
+
+_DURATION_UNITS = {
+    "ms": 1e-3,
+    "s": 1,
+    "m": 60,
+    "h": 3600,
+    "d": 86400,
+    "w": 604800,
+}
+
+
+def _metric_query(metric: str) -> str:
+    """Query template of a single observed metric, to be formatted with the interval"""
+    series, _ = OBSERVED_METRICS[metric]
+    name = f"{METRIC_PREFIX}{series}"
+    if metric == "num_req":
+        return f"increase({name}[{{interval}}])"
+    return f"increase({name}_sum[{{interval}}])/increase({name}_count[{{interval}}])"
+
+
+def _batch_selector() -> str:
+    """Selector of the series of all observed metrics"""
+    names = "|".join(
+        series if metric == "num_req" else f"{series}_sum|{series}_count"
+        for metric, (series, _) in OBSERVED_METRICS.items()
+    )
+    return f'{{__name__=~"{METRIC_PREFIX}({names})"}}'
+
+
+def _parse_result(metric: str, result: list) -> float:
+    if metric == "num_req":
+        # count all success/failed and stream/non-stream requests
+        return sum(float(res["value"][1]) for res in result)
+    return float(result[0]["value"][1])
+
+
+def _parse_duration(duration: str) -> float:
+    """Parse a Prometheus duration with a single unit (e.g. "180s") into seconds"""
+    match = re.fullmatch(r"(\d+(?:\.\d+)?)(ms|s|m|h|d|w)", duration)
+    if match is None:
+        raise ValueError(f"Unsupported duration: {duration}")
+    return float(match.group(1)) * _DURATION_UNITS[match.group(2)]
+
+
+def _extrapolated_increase(
+    samples: list[tuple[float, float]], start: float, end: float
+) -> Optional[float]:
+    """
+    Increase of a counter over (start, end] from its samples in that range, handling
+    counter resets and extrapolating to the range boundaries the way PromQL's
+    increase() does. None if there are fewer than two samples, as in PromQL.
+    """
+    if len(samples) < 2:
+        return None
+    (first_time, first_value), (last_time, last_value) = samples[0], samples[-1]
+    sampled_interval = last_time - first_time
+    if sampled_interval <= 0:
+        return None
+
+    increase = last_value - first_value
+    prev_value = first_value
+    for _, value in samples[1:]:
+        if value < prev_value:
+            # the counter was reset
+            increase += prev_value
+        prev_value = value
+
+    avg_sample_interval = sampled_interval / (len(samples) - 1)
+    threshold = avg_sample_interval * 1.1
+    to_start = first_time - start
+    to_end = end - last_time
+    if increase > 0 and first_value >= 0:
+        # do not extrapolate the counter below zero
+        to_start = min(to_start, sampled_interval * first_value / increase)
+    extrapolated_interval = sampled_interval
+    extrapolated_interval += (
+        to_start if to_start < threshold else avg_sample_interval / 2
+    )
+    extrapolated_interval += to_end if to_end < threshold else avg_sample_interval / 2
+    return increase * extrapolated_interval / sampled_interval
+
+
+def _observed_from_increases(increases: dict[str, float]) -> dict[str, float]:
+    """Observed metrics from the total increase of each series (without the prefix)"""
+    metrics = {}
+    for metric, (series, _) in OBSERVED_METRICS.items():
+        if metric == "num_req":
+            metrics[metric] = increases.get(series, 0.0)
+        elif f"{series}_count" not in increases:
+            # no data, as when querying the metric alone fails
+            metrics[metric] = 0.0
+        else:
+            count = increases[f"{series}_count"]
+            total = increases.get(f"{series}_sum", 0.0)
+            metrics[metric] = total / count if count else math.nan
+    return metrics
+
 
 class PrometheusAPIClient:
-    def __init__(self, url: str):
+    def __init__(
+        self,
+        url: str,
+        timeout: float = 10.0,
+        batched: bool = True,
+        cache_ttl: float = 10.0,
+    ):
+        self.url = url.rstrip("/")
+        self.timeout = timeout
+        # fetch all the series in a single query rather than one query per metric
+        self.batched = batched
+        # batched scrapes are reused for cache_ttl seconds, so that the metrics of an
+        # interval are only fetched once however many times they are read
+        self.cache_ttl = cache_ttl
+        self._scrape_cache: dict[str, tuple[float, list]] = {}
         self.prom = PrometheusConnect(url=url, disable_ssl=True)
+        # created lazily, as it must be bound to the running event loop
+        self.async_client: Optional[httpx.AsyncClient] = None
 
-    def get_avg_inter_token_latency(self, interval: str):
+    def _get_metric(self, metric: str, interval: str) -> float:
+        _, description = OBSERVED_METRICS[metric]
         try:
-            return float(
+            return _parse_result(
+                metric,
                 self.prom.custom_query(
-                    query=f"increase(nv_llm_http_service_inter_token_latency_seconds_sum[{interval}])/increase(nv_llm_http_service_inter_token_latency_seconds_count[{interval}])",
-                )[0]["value"][1]
+                    query=_metric_query(metric).format(interval=interval)
+                ),
             )
         except Exception as e:
-            logger.error(f"Error getting avg inter token latency: {e}")
+            logger.error(f"Error getting {description}: {e}")
             return 0
 
+    def get_avg_inter_token_latency(self, interval: str):
+        return self._get_metric("itl", interval)
+
     def get_avg_time_to_first_token(self, interval: str):
-        try:
-            return float(
-                self.prom.custom_query(
-                    query=f"increase(nv_llm_http_service_time_to_first_token_seconds_sum[{interval}])/increase(nv_llm_http_service_time_to_first_token_seconds_count[{interval}])",
-                )[0]["value"][1]
-            )
-        except Exception as e:
-            logger.error(f"Error getting avg time to first token: {e}")
-            return 0
+        return self._get_metric("ttft", interval)
 
     def get_avg_request_duration(self, interval: str):
-        try:
-            return float(
-                self.prom.custom_query(
-                    query=f"increase(nv_llm_http_service_request_duration_seconds_sum[{interval}])/increase(nv_llm_http_service_request_duration_seconds_count[{interval}])",
-                )[0]["value"][1]
-            )
-        except Exception as e:
-            logger.error(f"Error getting avg request duration: {e}")
-            return 0
+        return self._get_metric("request_duration", interval)
 
     def get_avg_request_count(self, interval: str):
-        try:
-            raw_res = self.prom.custom_query(
-                query=f"increase(nv_llm_http_service_requests_total[{interval}])"
-            )
-            total_count = 0.0
-            for res in raw_res:
-                # count all success/failed and stream/non-stream requests
-                total_count += float(res["value"][1])
-            return total_count
-        except Exception as e:
-            logger.error(f"Error getting avg request count: {e}")
-            return 0
+        return self._get_metric("num_req", interval)
 
     def get_avg_input_sequence_tokens(self, interval: str):
+        return self._get_metric("isl", interval)
+
+    def get_avg_output_sequence_tokens(self, interval: str):
+        return self._get_metric("osl", interval)
+
+    def _get_async_client(self) -> httpx.AsyncClient:
+        if self.async_client is None:
+            self.async_client = httpx.AsyncClient(timeout=self.timeout)
+        return self.async_client
+
+    async def _query(self, query: str, **params) -> list:
+        response = await self._get_async_client().get(
+            f"{self.url}/api/v1/query", params={"query": query, **params}
+        )
+        response.raise_for_status()
+        return response.json()["data"]["result"]
+
+    async def _aget_metric(self, metric: str, interval: str) -> float:
+        _, description = OBSERVED_METRICS[metric]
         try:
-            return float(
-                self.prom.custom_query(
-                    query=f"increase(nv_llm_http_service_input_sequence_tokens_sum[{interval}])/increase(nv_llm_http_service_input_sequence_tokens_count[{interval}])",
-                )[0]["value"][1]
-            )
+            result = await self._query(_metric_query(metric).format(interval=interval))
+            return _parse_result(metric, result)
         except Exception as e:
-            logger.error(f"Error getting avg input sequence tokens: {e}")
+            logger.error(f"Error getting {description}: {e}")
             return 0
 
-    def get_avg_output_sequence_tokens(self, interval: str):
-        try:
-            return float(
-                self.prom.custom_query(
-                    query=f"increase(nv_llm_http_service_output_sequence_tokens_sum[{interval}])/increase(nv_llm_http_service_output_sequence_tokens_count[{interval}])",
-                )[0]["value"][1]
+    async def _scrape(self, interval: str) -> list[tuple[dict[str, str], float]]:
+        """
+        Fetch the raw samples of all the series of the observed metrics over the
+        interval in a single query, and compute the increase of each series.
+
+        Returns:
+            list[tuple[dict[str, str], float]]: The labels (including __name__) and
+                increase over the interval of each series.
+        """
+        now = time.time()
+        cached = self._scrape_cache.get(interval)
+        if cached is not None and now - cached[0] < self.cache_ttl:
+            return cached[1]
+
+        result = await self._query(f"{_batch_selector()}[{interval}]", time=now)
+        start = now - _parse_duration(interval)
+        series = []
+        for res in result:
+            samples = [(float(t), float(v)) for t, v in res["values"]]
+            increase = _extrapolated_increase(samples, start, now)
+            if increase is not None:
+                series.append((res["metric"], increase))
+
+        self._scrape_cache = {interval: (now, series)}
+        return series
+
+    async def get_metrics_breakdown(
+        self, interval: str, by: tuple[str, ...] = ("model",)
+    ) -> dict[tuple[str, ...], dict[str, float]]:
+        """
+        Observed metrics over the interval, broken down by the given labels, e.g.
+        ("model",) for a per-model breakdown or ("model", "instance") for a per-model
+        and per-frontend breakdown. Always uses a single batched query.
+
+        Returns:
+            dict[tuple[str, ...], dict[str, float]]: The observed metrics by values of
+                the labels, with "" for series missing a label.
+        """
+        increases: dict[tuple[str, ...], dict[str, float]] = defaultdict(
+            lambda: defaultdict(float)
+        )
+        for labels, increase in await self._scrape(interval):
+            group = tuple(labels.get(label, "") for label in by)
+            increases[group][labels["__name__"].removeprefix(METRIC_PREFIX)] += increase
+        return {
+            group: _observed_from_increases(group_increases)
+            for group, group_increases in increases.items()
+        }
+
+    async def get_metrics(self, interval: str) -> dict[str, float]:
+        """
+        Query all the metrics in OBSERVED_METRICS without blocking the event loop,
+        either in a single batched query or with one concurrent query per metric.
+        Metrics that cannot be queried are 0, as with the synchronous getters.
+        """
+        if not self.batched:
+            values = await asyncio.gather(
+                *(self._aget_metric(metric, interval) for metric in OBSERVED_METRICS)
             )
+            return dict(zip(OBSERVED_METRICS, values))
+
+        try:
+            breakdown = await self.get_metrics_breakdown(interval, by=())
         except Exception as e:
-            logger.error(f"Error getting avg output sequence tokens: {e}")
-            return 0
+            logger.error(f"Error getting metrics: {e}")
+            breakdown = {}
+        return breakdown.get((), _observed_from_increases({}))
+
+    async def close(self):
+        if self.async_client is not None:
+            await self.async_client.aclose()
+            self.async_client = None
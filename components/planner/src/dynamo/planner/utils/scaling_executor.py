@@ -0,0 +1,216 @@
+# SPDX-FileCopyrightText: Copyright (c) 2025 NVIDIA CORPORATION & AFFILIATES. All rights reserved.
+# SPDX-License-Identifier: Apache-2.0
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import asyncio
+import logging
+import time
+from collections import defaultdict
+from typing import Callable, Optional
+
+from dynamo.planner.planner_connector import PlannerConnector
+from dynamo.runtime.logging import configure_dynamo_logging
+
+configure_dynamo_logging()
+logger = logging.getLogger(__name__)
+
+
+class ScalingExecutor:
+    """
+    Scales components to a target number of replicas, issuing all the add/remove
+    operations of an adjustment concurrently.
+
+    Replicas that were added but are not ready yet are tracked as pending, and count
+    towards the current number of replicas, so that an adjustment does not add them
+    again while they start. The time each replica takes to become ready is recorded,
+    as finely as observe is called with the number of ready replicas.
+    """
+
+    def __init__(
+        self,
+        connector: PlannerConnector,
+        pending_timeout: float = 600.0,
+        clock: Callable[[], float] = time.time,
+    ):
+        """
+        Args:
+            connector: Connector issuing the add/remove operations
+            pending_timeout: Seconds after which a replica still not ready is no
+                longer considered pending
+            clock: Time source, in seconds
+        """
+        self.connector = connector
+        self.pending_timeout = pending_timeout
+        self.clock = clock
+
+        # issue times of the added replicas not ready yet, oldest first
+        self.pending_adds: dict[str, list[float]] = defaultdict(list)
+        # number of removed replicas that are still ready
+        self.pending_removes: dict[str, int] = defaultdict(int)
+        self.last_ready: dict[str, int] = {}
+        # time the last ready count of each component was read at
+        self.last_observed_at: dict[str, float] = {}
+        # (component, seconds) of the replicas that became ready since the last pop
+        self.ready_times: list[tuple[str, float]] = []
+
+    def observe(
+        self, component: str, ready: int, observed_at: Optional[float] = None
+    ) -> int:
+        """
+        Update the pending replicas of a component from its number of ready replicas.
+
+        Args:
+            component: Name of the component
+            ready: Number of ready replicas
+            observed_at: Time the count was read at, now by default. A count read
+                before the last observed one is stale and ignored.
+
+        Returns:
+            int: The number of ready replicas, the last observed one if ready is stale
+        """
+        now = self.clock()
+        observed_at = now if observed_at is None else observed_at
+        last_observed_at = self.last_observed_at.get(component, observed_at)
+        if observed_at < last_observed_at:
+            # e.g. replicas became ready while an adjustment computed its targets
+            ready = self.last_ready[component]
+        else:
+            self.last_observed_at[component] = observed_at
+        previous = self.last_ready.get(component, ready)
+        self.last_ready[component] = ready
+
+        # a net increase resolves the oldest pending additions, a net decrease the
+        # pending removals
+        delta = ready - previous
+        pending = self.pending_adds[component]
+        while delta > 0 and pending:
+            time_to_ready = now - pending.pop(0)
+            self.ready_times.append((component, time_to_ready))
+            logger.info(f"New {component} replica ready after {time_to_ready:.1f}s")
+            delta -= 1
+        while delta < 0 and self.pending_removes[component] > 0:
+            self.pending_removes[component] -= 1
+            delta += 1
+
+        expired = [t for t in pending if now - t > self.pending_timeout]
+        if expired:
+            logger.warning(
+                f"{len(expired)} {component} replica(s) not ready after {self.pending_timeout}s, no longer waiting for them"
+            )
+            del pending[: len(expired)]
+        self.pending_removes[component] = min(self.pending_removes[component], ready)
+        return ready
+
+    def num_replicas(self, component: str, ready: int) -> int:
+        """Number of replicas of a component once the pending operations complete"""
+        return (
+            ready + len(self.pending_adds[component]) - self.pending_removes[component]
+        )
+
+    def pop_ready_times(self) -> list[tuple[str, float]]:
+        ready_times, self.ready_times = self.ready_times, []
+        return ready_times
+
+    async def scale_to(
+        self,
+        component: str,
+        target: int,
+        ready: int,
+        observed_at: Optional[float] = None,
+    ) -> int:
+        """
+        Add or remove replicas of a component concurrently so that, counting the
+        pending operations, it has target replicas.
+
+        Args:
+            component: Name of the component
+            target: Target number of replicas
+            ready: Current number of ready replicas
+            observed_at: Time ready was read at, as in observe
+
+        Returns:
+            int: The change in the number of replicas that was successfully requested
+        """
+        ready = self.observe(component, ready, observed_at)
+        delta = target - self.num_replicas(component, ready)
+        if delta == 0:
+            return 0
+
+        operation = (
+            self.connector.add_component
+            if delta > 0
+            else self.connector.remove_component
+        )
+        logger.info(
+            f"{'Adding' if delta > 0 else 'Removing'} {abs(delta)} {component} replica(s)"
+        )
+        results = await asyncio.gather(
+            *(operation(component, blocking=False) for _ in range(abs(delta))),
+            return_exceptions=True,
+        )
+
+        now = self.clock()
+        succeeded = 0
+        for result in results:
+            # connectors return False or raise on failure, some return None on success
+            if isinstance(result, BaseException) or result is False:
+                logger.error(f"Failed to scale {component}: {result}")
+                continue
+            succeeded += 1
+            if delta > 0:
+                self.pending_adds[component].append(now)
+            elif self.pending_adds[component]:
+                # the newest replica is removed, which is the one still starting
+                self.pending_adds[component].pop()
+            else:
+                self.pending_removes[component] += 1
+
+        return succeeded if delta > 0 else -succeeded
+
+    async def scale_all(
+        self,
+        targets: dict[str, tuple[int, int]],
+        observed_at: Optional[float] = None,
+    ) -> dict[str, int]:
+        """
+        Scale several components concurrently, in a single transaction of the
+        connector so that connectors able to do so apply all the changes at once.
+
+        Args:
+            targets: (target, ready) replicas of each component, as in scale_to
+            observed_at: Time the ready replicas were read at, as in observe
+
+        Returns:
+            dict[str, int]: The change in the number of replicas of each component
+        """
+        pending = (
+            {component: list(adds) for component, adds in self.pending_adds.items()},
+            dict(self.pending_removes),
+        )
+        try:
+            async with self.connector.transaction():
+                changes = await asyncio.gather(
+                    *(
+                        self.scale_to(component, target, ready, observed_at)
+                        for component, (target, ready) in targets.items()
+                    )
+                )
+        except Exception as e:
+            # nothing is applied when the transaction fails, as connectors apply the
+            # operations when it ends or undo those already applied
+            logger.error(f"Failed to scale {', '.join(targets)}: {e}")
+            self.pending_adds = defaultdict(list, pending[0])
+            self.pending_removes = defaultdict(int, pending[1])
+            return {component: 0 for component in targets}
+        return dict(zip(targets, changes))
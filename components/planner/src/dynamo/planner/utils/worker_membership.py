@@ -0,0 +1,161 @@
+# SPDX-FileCopyrightText: Copyright (c) 2025 NVIDIA CORPORATION & AFFILIATES. All rights reserved.
+# SPDX-License-Identifier: Apache-2.0
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import asyncio
+import logging
+from collections import defaultdict
+from typing import Any, Callable, Optional
+
+from dynamo.runtime.logging import configure_dynamo_logging
+
+configure_dynamo_logging()
+logger = logging.getLogger(__name__)
+
+# etcd root of the instances of the endpoints, as in the runtime
+INSTANCE_ROOT_PATH = "instances"
+
+# (component, joined, instance_id), joined is False when the instance left
+MembershipCallback = Callable[[str, bool, int], None]
+
+
+def _instance_id(key: str) -> Optional[int]:
+    """Instance ID of an instance key "instances/{ns}/{component}/{endpoint}:{lease_id:x}"""
+    _, sep, lease_id = key.rpartition(":")
+    if not sep:
+        # static endpoints are not registered with a lease
+        return None
+    try:
+        return int(lease_id, 16)
+    except ValueError:
+        return None
+
+
+class WorkerMembership:
+    """
+    Instances of the components of a namespace, kept up to date by watching their
+    etcd keys. Joins and leaves are pushed to the subscribed callbacks as soon as
+    they are seen, and wait_for_count completes as soon as enough instances are
+    registered, rather than on the next poll of the instance IDs.
+    """
+
+    def __init__(self, etcd_client: Any, namespace: str):
+        self.etcd_client = etcd_client
+        self.namespace = namespace
+        self.instances: dict[str, set[int]] = defaultdict(set)
+        # instances seen leaving. Instance IDs are lease IDs, which are never reused,
+        # so a put of one of them is a replayed event.
+        self.left: dict[str, set[int]] = defaultdict(set)
+        self.callbacks: list[MembershipCallback] = []
+        self._watch_tasks: dict[str, asyncio.Task] = {}
+        self._changed = asyncio.Condition()
+
+    def subscribe(self, callback: MembershipCallback):
+        self.callbacks.append(callback)
+
+    async def watch(self, component: str, endpoint: str):
+        """
+        Start watching the instances of an endpoint of a component, if not watched
+        already. Returns once the registered instances are known.
+        """
+        if component in self._watch_tasks:
+            return
+        prefix = f"{INSTANCE_ROOT_PATH}/{self.namespace}/{component}/{endpoint}"
+        # the watch starts before the snapshot is read, so that the events after the
+        # snapshot are not missed. The events before it are replayed in order, so the
+        # instances converge to the same ones, and the replayed puts of the instances
+        # seen leaving are ignored.
+        stream = await self.etcd_client.kv_get_and_watch_prefix(prefix)
+        instance_ids = (
+            _instance_id(kv["key"])
+            for kv in await self.etcd_client.kv_get_prefix(prefix)
+        )
+        snapshot = {i for i in instance_ids if i is not None}
+        # instances left while a previous watch was down
+        for instance_id in self.instances[component] - snapshot:
+            self._apply(component, False, instance_id)
+        for instance_id in snapshot:
+            self._apply(component, True, instance_id)
+        self._watch_tasks[component] = asyncio.create_task(
+            self._consume(component, stream)
+        )
+        await self._notify()
+
+    def instance_ids(self, component: str) -> list[int]:
+        return sorted(self.instances[component])
+
+    async def wait_for_count(
+        self, component: str, count: int, timeout: Optional[float] = None
+    ) -> int:
+        """
+        Wait until a component has at least count instances.
+
+        Returns:
+            int: The number of instances of the component
+        """
+
+        async def wait():
+            async with self._changed:
+                await self._changed.wait_for(
+                    lambda: len(self.instances[component]) >= count
+                )
+
+        await asyncio.wait_for(wait(), timeout)
+        return len(self.instances[component])
+
+    async def close(self):
+        for task in self._watch_tasks.values():
+            task.cancel()
+        await asyncio.gather(*self._watch_tasks.values(), return_exceptions=True)
+        self._watch_tasks.clear()
+
+    def _apply(self, component: str, joined: bool, instance_id: int):
+        instances = self.instances[component]
+        if not joined:
+            self.left[component].add(instance_id)
+        elif instance_id in self.left[component]:
+            return
+        if joined == (instance_id in instances):
+            return
+        if joined:
+            instances.add(instance_id)
+        else:
+            instances.discard(instance_id)
+        logger.info(
+            f"{component} instance {instance_id:x} {'joined' if joined else 'left'}, {len(instances)} instance(s)"
+        )
+        for callback in self.callbacks:
+            try:
+                callback(component, joined, instance_id)
+            except Exception as e:
+                logger.error(f"Membership callback failed: {e}")
+
+    async def _notify(self):
+        async with self._changed:
+            self._changed.notify_all()
+
+    async def _consume(self, component: str, stream: Any):
+        try:
+            async for event in stream:
+                instance_id = _instance_id(event["key"])
+                if instance_id is not None:
+                    self._apply(component, event["event"] == "put", instance_id)
+                    await self._notify()
+            logger.warning(f"Stopped watching the {component} instances")
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.error(f"Failed to watch the {component} instances: {e}")
+        finally:
+            self._watch_tasks.pop(component, None)
@@ -0,0 +1,105 @@
+# SPDX-FileCopyrightText: Copyright (c) 2025 NVIDIA CORPORATION & AFFILIATES. All rights reserved.
+# SPDX-License-Identifier: Apache-2.0
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+Benchmark of the SLA planner load predictors.
+
+Replays synthetic load traces (one value per adjustment interval) through each
+predictor the way the planner does, adding the observed value and predicting the
+next one, and reports the latency of each step and the one-step forecast error.
+
+Example usage:
+PYTHONPATH=components/planner/src python components/planner/test/benchmark_load_predictor.py \
+    --predictors constant ewma holt_winters kalman online_arima arima
+"""
+
+import argparse
+import time
+
+import numpy as np
+from tabulate import tabulate
+
+from dynamo.planner.utils.load_predictor import LOAD_PREDICTORS
+
+
+def generate_traces(num_steps: int, seed: int = 0) -> dict[str, np.ndarray]:
+    """Synthetic number of requests per adjustment interval, with Poisson noise"""
+    rng = np.random.default_rng(seed)
+    t = np.arange(num_steps)
+    # random load levels, each held for 20 intervals
+    levels = rng.choice([20.0, 100.0, 300.0], size=num_steps // 20 + 1)
+    rates = {
+        "constant": np.full(num_steps, 100.0),
+        "ramp": 20.0 + 200.0 * t / num_steps,
+        "periodic": 100.0 + 60.0 * np.sin(2 * np.pi * t / 60),
+        "bursty": levels.repeat(20)[:num_steps],
+    }
+    return {name: rng.poisson(rate).astype(float) for name, rate in rates.items()}
+
+
+def run_predictor(name: str, trace: np.ndarray, window_size: int) -> dict[str, float]:
+    predictor = LOAD_PREDICTORS[name](window_size=window_size)
+    predictions = np.empty(len(trace) - 1)
+    latencies = np.empty(len(trace) - 1)
+    for i, value in enumerate(trace[:-1]):
+        start = time.perf_counter()
+        predictor.add_data_point(value)
+        predictions[i] = predictor.predict_next()
+        latencies[i] = time.perf_counter() - start
+
+    errors = np.abs(predictions - trace[1:])
+    return {
+        "Mean Latency (ms)": 1e3 * latencies.mean(),
+        "P99 Latency (ms)": 1e3 * np.percentile(latencies, 99),
+        "MAE": errors.mean(),
+        "Relative MAE": errors.mean() / trace[1:].mean(),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark load predictors")
+    parser.add_argument(
+        "--predictors",
+        nargs="+",
+        choices=list(LOAD_PREDICTORS),
+        default=["constant", "ewma", "holt_winters", "kalman", "online_arima"],
+        help="Predictors to benchmark (default: the incremental predictors)",
+    )
+    parser.add_argument(
+        "--num-steps",
+        type=int,
+        default=1000,
+        help="Number of adjustment intervals in each trace (default: 1000)",
+    )
+    parser.add_argument(
+        "--window-size",
+        type=int,
+        default=50,
+        help="Window size passed to the predictors (default: 50)",
+    )
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    rows = []
+    for trace_name, trace in generate_traces(args.num_steps, args.seed).items():
+        for predictor in args.predictors:
+            result = run_predictor(predictor, trace, args.window_size)
+            rows.append({"Trace": trace_name, "Predictor": predictor, **result})
+
+    print(tabulate(rows, headers="keys", tablefmt="github", floatfmt=".3f"))
+
+
+if __name__ == "__main__":
+    main()
@@ -152,3 +152,26 @@ async def test_wait_for_graph_deployment_ready_on_second_attempt(
     )
 
     assert k8s_api.get_graph_deployment.call_count == 2
+
+
+@pytest.mark.asyncio
+async def test_update_graph_replicas_batch_single_patch(k8s_api, mock_custom_api):
+    await k8s_api.update_graph_replicas_batch(
+        "test-deployment", {"prefill-component": 3, "decode-component": 5}
+    )
+
+    mock_custom_api.patch_namespaced_custom_object.assert_called_once_with(
+        group="nvidia.com",
+        version="v1alpha1",
+        namespace=k8s_api.current_namespace,
+        plural="dynamographdeployments",
+        name="test-deployment",
+        body={
+            "spec": {
+                "services": {
+                    "prefill-component": {"replicas": 3},
+                    "decode-component": {"replicas": 5},
+                }
+            }
+        },
+    )
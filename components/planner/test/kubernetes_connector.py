@@ -13,6 +13,7 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
+import asyncio
 from unittest.mock import AsyncMock, Mock
 
 import pytest
@@ -25,6 +26,7 @@ def mock_kube_api():
     mock_api = Mock()
     mock_api.get_graph_deployment = AsyncMock()
     mock_api.update_graph_replicas = AsyncMock()
+    mock_api.update_graph_replicas_batch = AsyncMock()
     mock_api.wait_for_graph_deployment_ready = AsyncMock()
     return mock_api
 
@@ -142,3 +144,116 @@ async def test_remove_component_with_zero_replicas(kubernetes_connector, mock_ku
     # Assert
     mock_kube_api.update_graph_replicas.assert_not_called()
     mock_kube_api.wait_for_graph_deployment_ready.assert_not_called()
+
+
+@pytest.mark.asyncio
+async def test_apply_targets_patches_each_graph_once(
+    kubernetes_connector, mock_kube_api
+):
+    # Arrange
+    mock_deployment = {
+        "metadata": {"name": "test-graph"},
+        "spec": {
+            "services": {
+                "prefill-component": {"replicas": 1},
+                "decode-component": {"replicas": 2},
+            }
+        },
+    }
+    mock_kube_api.get_graph_deployment.return_value = mock_deployment
+
+    # Act
+    changes = await kubernetes_connector.apply_targets(
+        {"prefill-component": 9, "decode-component": 1}
+    )
+
+    # Assert
+    assert changes == {"prefill-component": 8, "decode-component": -1}
+    mock_kube_api.update_graph_replicas_batch.assert_called_once_with(
+        "test-graph", {"prefill-component": 9, "decode-component": 1}
+    )
+    mock_kube_api.update_graph_replicas.assert_not_called()
+    mock_kube_api.wait_for_graph_deployment_ready.assert_called_once_with("test-graph")
+
+
+@pytest.mark.asyncio
+async def test_apply_targets_skips_unchanged_components(
+    kubernetes_connector, mock_kube_api
+):
+    # Arrange
+    mock_deployment = {
+        "metadata": {"name": "test-graph"},
+        "spec": {
+            "services": {
+                "prefill-component": {"replicas": 1},
+                "decode-component": {"replicas": 2},
+            }
+        },
+    }
+    mock_kube_api.get_graph_deployment.return_value = mock_deployment
+
+    # Act
+    changes = await kubernetes_connector.apply_targets(
+        {"prefill-component": 1, "decode-component": 3}, blocking=False
+    )
+
+    # Assert
+    assert changes == {"prefill-component": 0, "decode-component": 1}
+    mock_kube_api.update_graph_replicas_batch.assert_called_once_with(
+        "test-graph", {"decode-component": 3}
+    )
+    mock_kube_api.wait_for_graph_deployment_ready.assert_not_called()
+
+
+@pytest.mark.asyncio
+async def test_set_replicas_without_change(kubernetes_connector, mock_kube_api):
+    # Arrange
+    component_name = "test-component"
+    mock_deployment = {
+        "metadata": {"name": "test-graph"},
+        "spec": {"services": {"test-component": {"replicas": 2}}},
+    }
+    mock_kube_api.get_graph_deployment.return_value = mock_deployment
+
+    # Act
+    change = await kubernetes_connector.set_replicas(component_name, 2)
+
+    # Assert
+    assert change == 0
+    mock_kube_api.update_graph_replicas_batch.assert_not_called()
+    mock_kube_api.wait_for_graph_deployment_ready.assert_not_called()
+
+
+@pytest.mark.asyncio
+async def test_transaction_applies_operations_in_one_patch(
+    kubernetes_connector, mock_kube_api
+):
+    # Arrange
+    mock_deployment = {
+        "metadata": {"name": "test-graph"},
+        "spec": {
+            "services": {
+                "prefill-component": {"replicas": 1},
+                "decode-component": {"replicas": 4},
+            }
+        },
+    }
+    mock_kube_api.get_graph_deployment.return_value = mock_deployment
+
+    # Act
+    async with kubernetes_connector.transaction():
+        await asyncio.gather(
+            *(
+                kubernetes_connector.add_component("prefill-component", blocking=False)
+                for _ in range(8)
+            ),
+            kubernetes_connector.remove_component("decode-component", blocking=False),
+        )
+        mock_kube_api.update_graph_replicas_batch.assert_not_called()
+
+    # Assert
+    mock_kube_api.update_graph_replicas_batch.assert_called_once_with(
+        "test-graph", {"prefill-component": 9, "decode-component": 3}
+    )
+    mock_kube_api.update_graph_replicas.assert_not_called()
+    mock_kube_api.wait_for_graph_deployment_ready.assert_not_called()
@@ -0,0 +1,218 @@
+# SPDX-FileCopyrightText: Copyright (c) 2025 NVIDIA CORPORATION & AFFILIATES. All rights reserved.
+# SPDX-License-Identifier: Apache-2.0
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import math
+
+import numpy as np
+import pytest
+
+from dynamo.planner.utils.load_predictor import (
+    EWMAPredictor,
+    HoltWintersPredictor,
+    KalmanPredictor,
+    OnlineARIMAPredictor,
+)
+
+CONSTANT = [7.0] * 20
+LINEAR = [10.0 + 3.0 * t for t in range(40)]
+SEASONAL = [20.0 + [5.0, -3.0, 1.0, -3.0][t % 4] for t in range(80)]
+
+
+def _feed(predictor, series):
+    for value in series:
+        predictor.add_data_point(value)
+    return predictor
+
+
+def _ewma_direct(series, alpha):
+    # the first value initializes the level, so it keeps the remaining weight
+    n = len(series)
+    weights = [(1 - alpha) ** (n - 1)]
+    weights += [alpha * (1 - alpha) ** (n - 1 - i) for i in range(1, n)]
+    return float(np.dot(weights, series))
+
+
+def _holt_winters_direct(series, alpha, beta, gamma, season_length):
+    # textbook equations over arrays indexed by time, seasonal components start at 0
+    n = len(series)
+    level, trend = np.zeros(n), np.zeros(n)
+    season = np.zeros(n + season_length)
+    level[0] = series[0]
+    for t in range(1, n):
+        prev_season = season[t] if season_length else 0.0
+        level[t] = alpha * (series[t] - prev_season) + (1 - alpha) * (
+            level[t - 1] + trend[t - 1]
+        )
+        trend[t] = beta * (level[t] - level[t - 1]) + (1 - beta) * trend[t - 1]
+        if season_length:
+            season[t + season_length] = (
+                gamma * (series[t] - level[t]) + (1 - gamma) * prev_season
+            )
+    # season[t] is the component of step t, updated season_length steps before
+    next_season = season[n] if season_length else 0.0
+    return level[-1] + trend[-1] + next_season
+
+
+def _kalman_direct(series, process_noise, trend_noise):
+    # local linear trend model in matrix form, with a measurement noise of 1
+    F = np.array([[1.0, 1.0], [0.0, 1.0]])
+    H = np.array([[1.0, 0.0]])
+    Q = np.diag([process_noise, trend_noise])
+    x = np.array([series[0], 0.0])
+    P = np.diag([1.0, 1e4])
+    for value in series[1:]:
+        x = F @ x
+        P = F @ P @ F.T + Q
+        S = H @ P @ H.T + 1.0
+        K = P @ H.T / S
+        x = x + (K * (value - H @ x)).ravel()
+        P = (np.eye(2) - K @ H) @ P
+    return float(x[0] + x[1])
+
+
+def _online_arima_direct(series, window_size, p, d, ridge):
+    # weighted least squares of the differenced series on its p lags and a drift,
+    # with the weight of each row decaying by 1 - 1 / window_size per data point
+    diffs = np.asarray(series, dtype=float)
+    levels = []
+    for _ in range(d):
+        levels.append(diffs[-1])
+        diffs = np.diff(diffs)
+    rows = [
+        (np.array([1.0, *diffs[t - p : t][::-1]]), diffs[t])
+        for t in range(p, len(diffs))
+    ]
+    forgetting = 1 - 1 / window_size
+    weights = forgetting ** np.arange(len(rows) - 1, -1, -1)
+    X = np.array([x for x, _ in rows])
+    y = np.array([target for _, target in rows])
+    xtx = X.T @ (weights[:, None] * X)
+    xty = X.T @ (weights * y)
+    coefficients = np.linalg.solve(xtx + np.diag(ridge * np.diag(xtx) + 1e-12), xty)
+    prediction = float(coefficients @ np.array([1.0, *diffs[-p:][::-1]]))
+    return prediction + sum(levels)
+
+
+@pytest.mark.parametrize("series", [CONSTANT, LINEAR, SEASONAL])
+@pytest.mark.parametrize("alpha", [0.2, 0.5, 1.0])
+def test_ewma_matches_direct_computation(series, alpha):
+    predictor = _feed(EWMAPredictor(alpha=alpha), series)
+    assert predictor.predict_next() == pytest.approx(_ewma_direct(series, alpha))
+
+
+@pytest.mark.parametrize("series", [CONSTANT, LINEAR, SEASONAL])
+@pytest.mark.parametrize("season_length", [0, 4])
+def test_holt_winters_matches_direct_computation(series, season_length):
+    params = dict(alpha=0.5, beta=0.3, gamma=0.4, season_length=season_length)
+    predictor = _feed(HoltWintersPredictor(**params), series)
+    assert predictor.predict_next() == pytest.approx(
+        _holt_winters_direct(series, **params)
+    )
+
+
+def test_holt_winters_converges():
+    # constant is exact, trend and season are learnt from the data
+    assert _feed(HoltWintersPredictor(), CONSTANT).predict_next() == pytest.approx(7.0)
+    linear = _feed(HoltWintersPredictor(alpha=0.5, beta=0.3), LINEAR)
+    assert linear.predict_next() == pytest.approx(10.0 + 3.0 * 40, rel=1e-3)
+    seasonal = _feed(
+        HoltWintersPredictor(alpha=0.3, beta=0.05, gamma=0.5, season_length=4),
+        SEASONAL,
+    )
+    assert seasonal.predict_next() == pytest.approx(SEASONAL[0], rel=2e-2)
+
+
+@pytest.mark.parametrize("series", [CONSTANT, LINEAR, SEASONAL])
+def test_kalman_matches_direct_computation(series):
+    predictor = _feed(KalmanPredictor(process_noise=0.1, trend_noise=0.01), series)
+    assert predictor.predict_next() == pytest.approx(_kalman_direct(series, 0.1, 0.01))
+
+
+def test_kalman_converges():
+    assert _feed(KalmanPredictor(), CONSTANT).predict_next() == pytest.approx(7.0)
+    linear = _feed(KalmanPredictor(), LINEAR)
+    assert linear.predict_next() == pytest.approx(10.0 + 3.0 * 40, rel=1e-3)
+    # the filter is scale-free, so scaling the series scales the forecast
+    scaled = _feed(KalmanPredictor(), [1000 * value for value in SEASONAL])
+    assert scaled.predict_next() == pytest.approx(
+        1000 * _feed(KalmanPredictor(), SEASONAL).predict_next()
+    )
+
+
+@pytest.mark.parametrize("series", [LINEAR, SEASONAL])
+@pytest.mark.parametrize("p,d", [(1, 0), (3, 1), (4, 1), (2, 2)])
+def test_online_arima_matches_direct_computation(series, p, d):
+    params = dict(window_size=20, p=p, d=d, ridge=1e-2)
+    predictor = _feed(OnlineARIMAPredictor(**params), series)
+    assert predictor.predict_next() == pytest.approx(
+        _online_arima_direct(series, **params)
+    )
+
+
+def test_online_arima_converges():
+    # a flat differenced series is fitted by the drift alone
+    constant = _feed(OnlineARIMAPredictor(), CONSTANT)
+    assert constant.predict_next() == pytest.approx(7.0)
+    linear = _feed(OnlineARIMAPredictor(), LINEAR)
+    assert linear.predict_next() == pytest.approx(10.0 + 3.0 * 40, rel=1e-3)
+    # the differences of a season of 4 follow an exact AR(4)
+    seasonal = _feed(OnlineARIMAPredictor(p=4, d=1), SEASONAL)
+    assert seasonal.predict_next() == pytest.approx(SEASONAL[0], rel=2e-2)
+
+
+@pytest.mark.parametrize(
+    "predictor_class,minimum_data_points",
+    [
+        (EWMAPredictor, 1),
+        (HoltWintersPredictor, 2),
+        (KalmanPredictor, 2),
+        (OnlineARIMAPredictor, 5),
+    ],
+)
+def test_warm_up_returns_last_value(predictor_class, minimum_data_points):
+    predictor = predictor_class()
+    assert predictor.predict_next() == 0
+    for t in range(minimum_data_points - 1):
+        predictor.add_data_point(100.0 * (t + 1))
+        assert predictor.predict_next() == 100.0 * (t + 1)
+    predictor.add_data_point(100.0 * minimum_data_points)
+    assert predictor.num_data_points == minimum_data_points
+
+
+def test_online_arima_returns_last_value_until_lags_are_filled():
+    # p + d data points are needed for a first row of lags
+    predictor = _feed(OnlineARIMAPredictor(p=3, d=1, minimum_data_points=1), LINEAR[:3])
+    assert predictor.predict_next() == LINEAR[2]
+
+
+@pytest.mark.parametrize(
+    "predictor_class",
+    [EWMAPredictor, HoltWintersPredictor, KalmanPredictor, OnlineARIMAPredictor],
+)
+def test_nan_is_zero(predictor_class):
+    with_nan = _feed(predictor_class(), [5.0, 8.0, math.nan, 6.0, 9.0, math.nan])
+    with_zero = _feed(predictor_class(), [5.0, 8.0, 0.0, 6.0, 9.0, 0.0])
+    assert with_nan.get_last_value() == 0
+    assert with_nan.predict_next() == pytest.approx(with_zero.predict_next())
+    assert not math.isnan(with_nan.predict_next())
+
+
+@pytest.mark.parametrize(
+    "predictor_class",
+    [HoltWintersPredictor, KalmanPredictor, OnlineARIMAPredictor],
+)
+def test_forecast_is_not_negative(predictor_class):
+    decreasing = [100.0 - 30.0 * t for t in range(4)] + [0.0] * 3
+    assert _feed(predictor_class(), decreasing).predict_next() >= 0.0
@@ -0,0 +1,225 @@
+# SPDX-FileCopyrightText: Copyright (c) 2025 NVIDIA CORPORATION & AFFILIATES. All rights reserved.
+# SPDX-License-Identifier: Apache-2.0
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import asyncio
+import json
+from unittest.mock import AsyncMock, Mock
+
+import pytest
+
+from dynamo.planner.local_connector import LocalConnector
+from dynamo.planner.local_state import GpuBitmap, LocalStateStore
+
+NAMESPACE = "dynamo"
+
+
+def _state(gpus=("0", "1", "2", "3"), allocated=("0",)):
+    return {
+        "environment": {
+            "DYNAMO_SERVICE_CONFIG": "{}",
+            "SYSTEM_RESOURCES": {"gpu_info": list(gpus)},
+        },
+        "components": {
+            f"{NAMESPACE}_VllmWorker": {
+                "watcher_name": f"{NAMESPACE}_VllmWorker",
+                "cmd": "dynamo serve --worker-env '[{}]'",
+                "resources": {"allocated_gpus": list(allocated)},
+            }
+        },
+    }
+
+
+@pytest.fixture
+def state_file(tmp_path):
+    path = tmp_path / f"{NAMESPACE}.json"
+    path.write_text(json.dumps(_state()))
+    return path
+
+
+@pytest.fixture
+def store(state_file, monkeypatch):
+    store = LocalStateStore(state_file)
+    # count the writes of the state file
+    store.saves = 0  # type: ignore[attr-defined]
+    save = store.save
+
+    def counted_save(state):
+        store.saves += 1  # type: ignore[attr-defined]
+        save(state)
+
+    monkeypatch.setattr(store, "save", counted_save)
+    return store
+
+
+def test_gpu_bitmap_allocates_lowest_free_gpu():
+    gpus = GpuBitmap(["3", "1", "0", "2", "1"])
+    assert gpus.gpus == ["0", "1", "2", "3"]
+    gpus.mark(["1", "7"])  # unknown GPUs are ignored
+    assert gpus.allocate() == "0"
+    assert gpus.allocate() == "2"
+    gpus.release(["0"])
+    assert gpus.available() == ["0", "3"]
+    assert gpus.allocate() == "0"
+    assert gpus.allocate() == "3"
+    assert gpus.allocate() is None
+
+
+def test_gpu_bitmap_from_state_and_copy():
+    gpus = GpuBitmap.from_state(_state(allocated=("0", "2")))
+    assert gpus.available() == ["1", "3"]
+    copied = gpus.copy()
+    assert copied.allocate() == "1"
+    # the copy does not change the original
+    assert gpus.available() == ["1", "3"]
+    assert GpuBitmap.from_state({}).allocate() is None
+
+
+@pytest.mark.asyncio
+async def test_transaction_writes_once(store, state_file):
+    async with store.transaction() as transaction:
+        for name in ("a", "b", "c"):
+            transaction.state["components"][name] = {"resources": {}}
+    assert store.saves == 1
+    assert set(json.loads(state_file.read_text())["components"]) >= {"a", "b", "c"}
+
+    # nothing changed, nothing written
+    async with store.transaction():
+        pass
+    assert store.saves == 1
+
+
+@pytest.mark.asyncio
+async def test_nested_and_concurrent_transactions_join(store):
+    async def allocate():
+        async with store.transaction() as transaction:
+            await asyncio.sleep(0)
+            gpu = transaction.gpus.allocate()
+            transaction.state["components"][f"worker_{gpu}"] = {
+                "resources": {"allocated_gpus": [gpu]}
+            }
+            return transaction
+
+    async with store.transaction() as outer:
+        inner = await asyncio.gather(allocate(), allocate(), allocate())
+        assert all(transaction is outer for transaction in inner)
+        # the state seen within the transaction is the working copy
+        assert store.available_gpus() == []
+        assert "worker_3" in store.load()["components"]
+
+    assert store.saves == 1
+    assert store.available_gpus() == []
+    assert {"worker_1", "worker_2", "worker_3"} <= set(store.load()["components"])
+
+
+@pytest.mark.asyncio
+async def test_transaction_is_discarded_and_undone_on_exception(store, state_file):
+    before = state_file.read_text()
+    undone = []
+
+    async def undo(name):
+        undone.append(name)
+
+    with pytest.raises(RuntimeError):
+        async with store.transaction() as transaction:
+            transaction.gpus.allocate()
+            transaction.state["components"]["a"] = {}
+            transaction.on_rollback(lambda: undo("a"))
+            async with store.transaction() as nested:
+                nested.on_rollback(lambda: undo("b"))
+            raise RuntimeError("failed")
+
+    assert undone == ["b", "a"]
+    assert store.saves == 0
+    assert state_file.read_text() == before
+    assert store.available_gpus() == ["1", "2", "3"]
+    assert "a" not in store.load()["components"]
+
+
+@pytest.mark.asyncio
+async def test_transaction_is_undone_when_save_fails(store, monkeypatch):
+    undo = AsyncMock()
+    monkeypatch.setattr(store, "save", Mock(side_effect=OSError("disk full")))
+    with pytest.raises(OSError):
+        async with store.transaction() as transaction:
+            transaction.state["components"]["a"] = {}
+            transaction.on_rollback(undo)
+    undo.assert_awaited_once()
+
+
+@pytest.mark.asyncio
+async def test_store_reads_the_file_again_when_it_changes(store, state_file):
+    assert store.available_gpus() == ["1", "2", "3"]
+    state_file.write_text(json.dumps(_state(allocated=("0", "1", "2"))))
+    assert store.available_gpus() == ["3"]
+
+
+@pytest.fixture
+def connector(state_file, tmp_path, monkeypatch):
+    (tmp_path / ".dynamo" / "state").mkdir(parents=True)
+    state_file.rename(tmp_path / ".dynamo" / "state" / state_file.name)
+    monkeypatch.setenv("HOME", str(tmp_path))
+    circus = Mock()
+    circus.add_watcher = AsyncMock(return_value=True)
+    circus.remove_watcher = AsyncMock(return_value=True)
+    mock_circus_class = Mock()
+    mock_circus_class.from_state_file.return_value = circus
+    monkeypatch.setattr(
+        "dynamo.planner.local_connector.CircusController", mock_circus_class
+    )
+    connector = LocalConnector(NAMESPACE, None)  # type: ignore[arg-type]
+    monkeypatch.setattr(connector, "_count_instance_ids", AsyncMock(return_value=1))
+    return connector
+
+
+@pytest.mark.asyncio
+async def test_failed_transaction_stops_the_launched_watchers(connector):
+    with pytest.raises(RuntimeError):
+        async with connector.transaction():
+            await asyncio.gather(
+                connector.add_component("VllmWorker", blocking=False),
+                connector.add_component("VllmWorker", blocking=False),
+            )
+            raise RuntimeError("failed")
+
+    assert connector.circus.add_watcher.await_count == 2
+    removed = {
+        call.kwargs["name"] for call in connector.circus.remove_watcher.await_args_list
+    }
+    assert removed == {f"{NAMESPACE}_VllmWorker_1", f"{NAMESPACE}_VllmWorker_2"}
+    # the GPUs of the stopped watchers are handed out again
+    assert connector.store.available_gpus() == ["1", "2", "3"]
+
+    assert await connector.add_component("VllmWorker", blocking=False)
+    env = connector.circus.add_watcher.await_args.kwargs["env"]
+    assert env["CUDA_VISIBLE_DEVICES"] == "1"
+    assert connector.store.available_gpus() == ["2", "3"]
+
+
+@pytest.mark.asyncio
+async def test_failed_transaction_restarts_the_removed_watchers(connector):
+    async with connector.transaction():
+        await connector.add_component("VllmWorker", blocking=False)
+    connector.circus.add_watcher.reset_mock()
+
+    with pytest.raises(RuntimeError):
+        async with connector.transaction():
+            assert await connector.remove_component("VllmWorker", blocking=False)
+            raise RuntimeError("failed")
+
+    connector.circus.add_watcher.assert_awaited_once()
+    kwargs = connector.circus.add_watcher.await_args.kwargs
+    assert kwargs["name"] == f"{NAMESPACE}_VllmWorker_1"
+    assert kwargs["env"]["CUDA_VISIBLE_DEVICES"] == "1"
+    assert connector.store.available_gpus() == ["2", "3"]
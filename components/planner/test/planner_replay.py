@@ -0,0 +1,185 @@
+# SPDX-FileCopyrightText: Copyright (c) 2025 NVIDIA CORPORATION & AFFILIATES. All rights reserved.
+# SPDX-License-Identifier: Apache-2.0
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import argparse
+import math
+
+import numpy as np
+import pytest
+
+from dynamo.planner.defaults import SLAPlannerDefaults
+from dynamo.planner.utils import planner_replay
+from dynamo.planner.utils.perf_interpolation import (
+    DecodeInterpolator,
+    PrefillInterpolator,
+)
+from dynamo.planner.utils.planner_replay import ServingSimulator, Trace, replay
+
+INTERVAL = 60
+ISL = 1000
+OSL = 40
+ITL = 0.02  # in seconds, whatever the batch
+DECODE_THPT_PER_GPU = 100.0  # output tokens/s/GPU at the ITL SLA
+
+
+class FakePrefillInterpolator(PrefillInterpolator):
+    def __init__(self):
+        pass
+
+    def interpolate_ttft(self, isl):
+        # in ms, as profiled
+        return 0.05 * np.asarray(isl, dtype=np.float64)
+
+    def interpolate_thpt_per_gpu(self, isl):
+        return np.asarray(isl) / self.interpolate_ttft(isl) * 1000
+
+
+class FakeDecodeInterpolator(DecodeInterpolator):
+    def __init__(self):
+        self.max_kv_tokens = 10**6
+
+    def interpolate_itl(self, concurrency, context_length):
+        return np.full_like(np.asarray(concurrency, dtype=np.float64), ITL)
+
+    def find_best_throughput_per_gpu(self, itl, context_length):
+        return DECODE_THPT_PER_GPU
+
+
+def _trace(phases):
+    """Evenly spaced arrivals of (duration, rate) phases"""
+    phase_arrivals, start = [], 0.0
+    for duration, rate in phases:
+        phase_arrivals.append(start + np.arange(duration * rate) / rate)
+        start += duration
+    arrival = np.concatenate(phase_arrivals)
+    return Trace(
+        arrival=arrival,
+        isl=np.full(len(arrival), ISL, dtype=np.int64),
+        osl=np.full(len(arrival), OSL, dtype=np.int64),
+    )
+
+
+def _args(**overrides):
+    args = argparse.Namespace(
+        **{
+            k: getattr(SLAPlannerDefaults, k)
+            for k in dir(SLAPlannerDefaults)
+            if not k.startswith("_")
+        },
+    )
+    args.__dict__.update(
+        load_predictor="constant",
+        adjustment_interval=INTERVAL,
+        prefill_engine_num_gpu=1,
+        decode_engine_num_gpu=1,
+        initial_prefill=1,
+        initial_decode=1,
+        startup_delay=30.0,
+        step=0.1,
+        max_drain_time=60.0,
+        no_operation=False,
+    )
+    args.__dict__.update(overrides)
+    return args
+
+
+@pytest.fixture
+def decisions(monkeypatch):
+    """Replicas of each pool after every adjustment of a replay, excluding removed"""
+    monkeypatch.setattr(
+        "dynamo.planner.utils.planner_core.PrefillInterpolator",
+        lambda _: FakePrefillInterpolator(),
+    )
+    monkeypatch.setattr(
+        "dynamo.planner.utils.planner_core.DecodeInterpolator",
+        lambda _: FakeDecodeInterpolator(),
+    )
+    recorded: list[tuple[float, int, int]] = []
+    make_adjustments = planner_replay.ReplayPlanner.make_adjustments
+
+    async def record(self):
+        await make_adjustments(self)
+        engines = self.simulator.engines
+        recorded.append(
+            (
+                self.simulator.now,
+                sum(e.removed_time is None for e in engines["prefill"]),
+                sum(e.removed_time is None for e in engines["decode"]),
+            )
+        )
+
+    monkeypatch.setattr(planner_replay.ReplayPlanner, "make_adjustments", record)
+    return recorded
+
+
+def _expected_decode(num_req, args):
+    # constant predictor: the next load is the last observed one. The observed ITL
+    # is the profiled one, so the ITL correction factor is 1.
+    return max(
+        args.min_endpoint,
+        math.ceil(num_req * OSL / INTERVAL / DECODE_THPT_PER_GPU),
+    )
+
+
+@pytest.mark.asyncio
+async def test_replay_follows_hand_computed_targets(decisions):
+    # 2 req/s, 8 req/s, then 2 req/s: 120 and 480 arrivals per interval
+    trace = _trace([(180, 2), (240, 8), (180, 2)])
+    args = _args()
+    result = await replay(
+        args, trace, FakePrefillInterpolator(), FakeDecodeInterpolator()
+    )
+
+    assert result["Finished"] == len(trace.arrival)
+    observed = {now: (p, d) for now, p, d in decisions}
+    for now in range(INTERVAL, 600 + 1, INTERVAL):
+        window = (trace.arrival > now - INTERVAL) & (trace.arrival <= now)
+        num_req = int(window.sum())
+        assert num_req in (119, 120, 480)
+        # TTFT is observed in seconds and profiled in ms, which keeps the TTFT
+        # correction factor, and so prefill, at its minimum at this load
+        assert observed[now] == (args.min_endpoint, _expected_decode(num_req, args))
+
+    # 1 replica at 120 req/interval (0.8 GPUs), 4 at 480 (3.2 GPUs)
+    assert [d for _, _, d in decisions[:10]] == [1, 1, 1, 4, 4, 4, 4, 1, 1, 1]
+
+
+@pytest.mark.asyncio
+async def test_replay_does_not_add_starting_replicas_again(decisions):
+    # replicas take longer than an interval to start, the following adjustment must
+    # count them as pending rather than adding them again
+    trace = _trace([(60, 2), (180, 8)])
+    args = _args(startup_delay=90.0)
+    await replay(args, trace, FakePrefillInterpolator(), FakeDecodeInterpolator())
+
+    assert [d for _, _, d in decisions[:4]] == [1, 4, 4, 4]
+
+
+def test_simulator_removes_the_newest_engine():
+    simulator = ServingSimulator(
+        _trace([(60, 1)]),
+        FakePrefillInterpolator(),
+        FakeDecodeInterpolator(),
+        startup_delay=30.0,
+    )
+    simulator.add_engine("decode", startup_delay=0)
+    simulator.now = 10.0
+    simulator.add_engine("decode")
+
+    assert simulator.ready_engines("decode") == [0]
+    assert simulator.remove_engine("decode")
+    # the engine still starting is stopped right away
+    assert simulator.engines["decode"][1].stop_time == 10.0
+    assert simulator.ready_engines("decode", at=60.0) == [0]
@@ -0,0 +1,176 @@
+# SPDX-FileCopyrightText: Copyright (c) 2025 NVIDIA CORPORATION & AFFILIATES. All rights reserved.
+# SPDX-License-Identifier: Apache-2.0
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+from contextlib import asynccontextmanager
+
+import pytest
+
+from dynamo.planner.planner_connector import PlannerConnector
+from dynamo.planner.utils.scaling_executor import ScalingExecutor
+
+
+class FakeConnector(PlannerConnector):
+    def __init__(self, fail_transaction=False):
+        self.fail_transaction = fail_transaction
+        self.added = 0
+        self.removed = 0
+        # results of the next add_component calls, True once exhausted
+        self.add_results: list = []
+
+    async def add_component(self, component_name, blocking=True):
+        self.added += 1
+        result = self.add_results.pop(0) if self.add_results else True
+        if isinstance(result, Exception):
+            raise result
+        return result
+
+    async def remove_component(self, component_name, blocking=True):
+        self.removed += 1
+        return True
+
+    @asynccontextmanager
+    async def transaction(self):
+        yield
+        if self.fail_transaction:
+            raise RuntimeError("failed to persist the transaction")
+
+
+class Clock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock():
+    return Clock()
+
+
+@pytest.fixture
+def connector():
+    return FakeConnector()
+
+
+@pytest.fixture
+def executor(connector, clock):
+    return ScalingExecutor(connector, pending_timeout=100.0, clock=clock)
+
+
+@pytest.mark.asyncio
+async def test_pending_adds_are_not_requested_again(executor, connector, clock):
+    assert await executor.scale_to("P", 3, ready=1) == 2
+    assert connector.added == 2
+    assert executor.num_replicas("P", 1) == 3
+
+    # the replicas are still starting
+    assert await executor.scale_to("P", 3, ready=1) == 0
+    assert connector.added == 2
+
+    clock.now = 30.0
+    executor.observe("P", 2)
+    assert executor.pending_adds["P"] == [0.0]
+    clock.now = 45.0
+    executor.observe("P", 3)
+    assert executor.pending_adds["P"] == []
+    assert executor.pop_ready_times() == [("P", 30.0), ("P", 45.0)]
+    assert executor.pop_ready_times() == []
+
+
+@pytest.mark.asyncio
+async def test_pending_adds_expire(executor, connector, clock):
+    await executor.scale_to("P", 2, ready=1)
+    clock.now = 101.0
+    # the replica never became ready, so it is requested again
+    assert await executor.scale_to("P", 2, ready=1) == 1
+    assert executor.pending_adds["P"] == [101.0]
+    assert connector.added == 2
+
+
+@pytest.mark.asyncio
+async def test_pending_removes(executor, connector):
+    assert await executor.scale_to("D", 1, ready=3) == -2
+    assert executor.pending_removes["D"] == 2
+    # the removed replicas are still ready, they are not removed again
+    assert await executor.scale_to("D", 1, ready=3) == 0
+    executor.observe("D", 2)
+    assert executor.pending_removes["D"] == 1
+    executor.observe("D", 1)
+    assert executor.pending_removes["D"] == 0
+    assert connector.removed == 2
+
+
+@pytest.mark.asyncio
+async def test_remove_cancels_pending_add(executor, connector):
+    await executor.scale_to("D", 3, ready=1)
+    assert await executor.scale_to("D", 2, ready=1) == -1
+    assert len(executor.pending_adds["D"]) == 1
+    assert executor.pending_removes["D"] == 0
+
+
+@pytest.mark.asyncio
+async def test_failed_operations_are_not_pending(executor, connector):
+    connector.add_results = [True, False, RuntimeError("no GPU"), None]
+    assert await executor.scale_to("P", 5, ready=1) == 2
+    assert len(executor.pending_adds["P"]) == 2
+
+
+@pytest.mark.asyncio
+async def test_stale_count_does_not_add_a_replica_again(executor, connector, clock):
+    # 2 ready, target 3, one add pending
+    executor.observe("P", 2)
+    await executor.scale_to("P", 3, ready=2)
+    assert connector.added == 1
+
+    # the adjustment counts the replicas, then the new worker joins while it
+    # computes the targets
+    counted_at = clock.now = 10.0
+    clock.now = 20.0
+    executor.observe("P", 3)
+    assert executor.pending_adds["P"] == []
+
+    clock.now = 30.0
+    assert await executor.scale_all({"P": (3, 2)}, observed_at=counted_at) == {"P": 0}
+    assert connector.added == 1
+    assert executor.last_ready["P"] == 3
+
+
+@pytest.mark.asyncio
+async def test_count_after_last_observation_is_applied(executor, connector, clock):
+    executor.observe("P", 3)
+    clock.now = 10.0
+    # a replica failed since, the count is not stale
+    assert await executor.scale_all({"P": (3, 2)}, observed_at=5.0) == {"P": 1}
+    assert connector.added == 1
+
+
+@pytest.mark.asyncio
+async def test_scale_all_rolls_back_pending_on_failure(clock):
+    connector = FakeConnector(fail_transaction=True)
+    executor = ScalingExecutor(connector, clock=clock)
+    await executor.scale_to("D", 2, ready=3)
+    pending_adds = dict(executor.pending_adds)
+    pending_removes = dict(executor.pending_removes)
+
+    changes = await executor.scale_all({"P": (3, 1), "D": (1, 3)})
+    assert changes == {"P": 0, "D": 0}
+    assert connector.added == 2
+    assert dict(executor.pending_adds) == pending_adds
+    assert dict(executor.pending_removes) == pending_removes
+
+    # nothing was applied, so the next adjustment requests the replicas again
+    connector.fail_transaction = False
+    assert await executor.scale_all({"P": (3, 1), "D": (1, 3)}) == {"P": 2, "D": -1}
@@ -0,0 +1,171 @@
+# SPDX-FileCopyrightText: Copyright (c) 2025 NVIDIA CORPORATION & AFFILIATES. All rights reserved.
+# SPDX-License-Identifier: Apache-2.0
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import asyncio
+
+import pytest
+
+from dynamo.planner.utils.worker_membership import WorkerMembership
+
+COMPONENT = "VllmWorker"
+ENDPOINT = "generate"
+
+
+def _key(instance_id):
+    return f"instances/dynamo/{COMPONENT}/{ENDPOINT}:{instance_id:x}"
+
+
+def _event(event, instance_id):
+    return {"event": event, "key": _key(instance_id)}
+
+
+class FakeWatchStream:
+    def __init__(self):
+        self.queue: asyncio.Queue = asyncio.Queue()
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        event = await self.queue.get()
+        if event is None:
+            raise StopAsyncIteration
+        return event
+
+
+class FakeEtcdClient:
+    """The watch replays the events of `replayed`, then those put on its stream"""
+
+    def __init__(self, snapshot=(), replayed=()):
+        self.snapshot = list(snapshot)
+        self.replayed = list(replayed)
+        self.streams: list[FakeWatchStream] = []
+
+    async def kv_get_and_watch_prefix(self, prefix):
+        stream = FakeWatchStream()
+        for event in self.replayed:
+            stream.queue.put_nowait(event)
+        self.streams.append(stream)
+        return stream
+
+    async def kv_get_prefix(self, prefix):
+        return [{"key": _key(instance_id)} for instance_id in self.snapshot]
+
+
+async def _drain(stream):
+    # let the consumer apply the queued events
+    while not stream.queue.empty():
+        await asyncio.sleep(0)
+    await asyncio.sleep(0)
+
+
+@pytest.fixture
+def changes():
+    return []
+
+
+def _membership(etcd_client, changes):
+    membership = WorkerMembership(etcd_client, "dynamo")
+    membership.subscribe(
+        lambda component, joined, instance_id: changes.append((joined, instance_id))
+    )
+    return membership
+
+
+@pytest.mark.asyncio
+async def test_watch_returns_with_the_snapshot(changes):
+    etcd_client = FakeEtcdClient(
+        snapshot=[1, 2], replayed=[_event("put", 1), _event("put", 2)]
+    )
+    membership = _membership(etcd_client, changes)
+    await membership.watch(COMPONENT, ENDPOINT)
+    assert membership.instance_ids(COMPONENT) == [1, 2]
+
+    # the replayed puts of the snapshot are not joins again
+    await _drain(etcd_client.streams[0])
+    assert sorted(changes) == [(True, 1), (True, 2)]
+    await membership.close()
+
+
+@pytest.mark.asyncio
+async def test_replayed_events_converge_to_the_snapshot(changes):
+    # 2 left and 3 joined between the start of the watch and the snapshot
+    etcd_client = FakeEtcdClient(
+        snapshot=[1, 3],
+        replayed=[
+            _event("put", 1),
+            _event("put", 2),
+            _event("delete", 2),
+            _event("put", 3),
+        ],
+    )
+    membership = _membership(etcd_client, changes)
+    await membership.watch(COMPONENT, ENDPOINT)
+    await _drain(etcd_client.streams[0])
+    assert membership.instance_ids(COMPONENT) == [1, 3]
+    assert membership.left[COMPONENT] == {2}
+    await membership.close()
+
+
+@pytest.mark.asyncio
+async def test_rewatch_ignores_replayed_puts_of_instances_that_left(changes):
+    etcd_client = FakeEtcdClient(snapshot=[1, 2])
+    membership = _membership(etcd_client, changes)
+    await membership.watch(COMPONENT, ENDPOINT)
+    # the watch stops, then 2 leaves and 4 joins before it is restarted
+    etcd_client.streams[0].queue.put_nowait(None)
+    await _drain(etcd_client.streams[0])
+    etcd_client.snapshot = [1, 4]
+    etcd_client.replayed = [_event("put", 1), _event("put", 2), _event("put", 4)]
+
+    await membership.watch(COMPONENT, ENDPOINT)
+    assert membership.instance_ids(COMPONENT) == [1, 4]
+    await _drain(etcd_client.streams[1])
+    assert membership.instance_ids(COMPONENT) == [1, 4]
+    assert changes[2:] == [(False, 2), (True, 4)]
+    await membership.close()
+
+
+@pytest.mark.asyncio
+async def test_wait_for_count_completes_on_join(changes):
+    etcd_client = FakeEtcdClient(snapshot=[1])
+    membership = _membership(etcd_client, changes)
+    await membership.watch(COMPONENT, ENDPOINT)
+    # enough instances already
+    assert await membership.wait_for_count(COMPONENT, 1, timeout=1) == 1
+
+    waiter = asyncio.create_task(membership.wait_for_count(COMPONENT, 2, timeout=5))
+    stream = etcd_client.streams[0]
+    # a leave and a replayed put of the instance that left do not count
+    stream.queue.put_nowait(_event("put", 5))
+    stream.queue.put_nowait(_event("delete", 5))
+    stream.queue.put_nowait(_event("put", 5))
+    await _drain(stream)
+    assert not waiter.done()
+
+    stream.queue.put_nowait(_event("put", 6))
+    assert await waiter == 2
+    assert membership.instance_ids(COMPONENT) == [1, 6]
+    await membership.close()
+
+
+@pytest.mark.asyncio
+async def test_wait_for_count_times_out(changes):
+    etcd_client = FakeEtcdClient(snapshot=[1])
+    membership = _membership(etcd_client, changes)
+    await membership.watch(COMPONENT, ENDPOINT)
+    with pytest.raises(asyncio.TimeoutError):
+        await membership.wait_for_count(COMPONENT, 2, timeout=0.01)
+    await membership.close()
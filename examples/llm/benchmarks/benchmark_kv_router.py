@@ -0,0 +1,242 @@
+# SPDX-FileCopyrightText: Copyright (c) 2025 NVIDIA CORPORATION & AFFILIATES. All rights reserved.
+# SPDX-License-Identifier: Apache-2.0
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+Micro-benchmark of the cost function of the Router, reporting the decisions per
+second against the number of workers, for the WorkerTable and for the previous
+per-worker dictionaries. No runtime or workers are needed. From examples/llm:
+
+    python -m benchmarks.benchmark_kv_router --num-workers 8 64 512
+"""
+
+import argparse
+import logging
+import random
+import time
+from types import SimpleNamespace
+
+import numpy as np
+from utils.worker_table import WorkerTable
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_METRICS = {
+    "kv_active_blocks": 0,
+    "kv_total_blocks": 1,
+    "num_requests_waiting": 0.0,
+    "gpu_cache_usage_perc": 0.0,
+    "gpu_prefix_cache_hit_rate": 0.0,
+}
+
+
+class ReferenceRouter:
+    """The per-worker cost function that WorkerTable replaced"""
+
+    def __init__(self, worker_ids: list[int], block_size: int):
+        self.worker_ids = worker_ids
+        self.block_size = block_size
+        self.active_blocks_dict = {worker_id: [0, 0] for worker_id in worker_ids}
+
+    def instance_ids(self) -> list[int]:
+        return list(self.worker_ids)
+
+    def _update_and_get_active_blocks(self, worker_id: int, polled_value: int) -> int:
+        if worker_id not in self.active_blocks_dict:
+            self.active_blocks_dict[worker_id] = [polled_value, polled_value]
+            return polled_value
+        old_value, predictive_value = self.active_blocks_dict[worker_id]
+        if polled_value != old_value:
+            self.active_blocks_dict[worker_id] = [polled_value, polled_value]
+            return polled_value
+        return predictive_value
+
+    def cost_function(self, scores: dict[int, int], metrics, token_length: int):
+        worker_ids = self.instance_ids()
+        request_blocks = (token_length + self.block_size - 1) // self.block_size
+
+        overlap_blocks_dict = {worker_id: 0 for worker_id in worker_ids}
+        new_blocks_dict = {worker_id: request_blocks for worker_id in worker_ids}
+        for worker_id, score in scores.items():
+            overlap_blocks_dict[worker_id] = score
+            new_blocks_dict[worker_id] = request_blocks - score
+
+        worker_metrics = {}
+        for endpoint in metrics.endpoints:
+            worker_id = endpoint.worker_id
+            worker_metrics[worker_id] = {
+                key: getattr(endpoint, key, DEFAULT_METRICS[key])
+                for key in DEFAULT_METRICS.keys()
+            }
+            polled_active_blocks = int(worker_metrics[worker_id]["kv_active_blocks"])
+            worker_metrics[worker_id][
+                "kv_active_blocks"
+            ] = self._update_and_get_active_blocks(worker_id, polled_active_blocks)
+
+        worker_logits = {}
+        for worker_id in worker_ids:
+            metrics_dict = worker_metrics.get(worker_id, DEFAULT_METRICS)
+            kv_total_blocks = metrics_dict["kv_total_blocks"]
+            new_blocks = new_blocks_dict[worker_id]
+            normalized_new_blocks = new_blocks / kv_total_blocks
+            gpu_cache_usage = metrics_dict["kv_active_blocks"] / kv_total_blocks
+            num_requests_waiting = metrics_dict["num_requests_waiting"]
+            worker_logits[worker_id] = (
+                normalized_new_blocks + gpu_cache_usage + num_requests_waiting
+            )
+            logger.info(
+                f"Formula for {worker_id}: {worker_logits[worker_id]:.3f} = {normalized_new_blocks:.3f} + {gpu_cache_usage:.3f} + {num_requests_waiting:.3f}"
+            )
+
+        min_logit = min(worker_logits.values())
+        best_workers = [
+            wid for wid, logit in worker_logits.items() if logit == min_logit
+        ]
+        best_worker_id = random.choice(best_workers)
+
+        metrics_dict = worker_metrics.get(best_worker_id, DEFAULT_METRICS)
+        for message in (
+            f"Selected worker: {best_worker_id}, logit: {worker_logits[best_worker_id]:.3f}",
+            f"Score: {scores.get(best_worker_id, 0.0):.3f}",
+            f"GPU Cache Hit Rate: {metrics_dict['gpu_prefix_cache_hit_rate']:.3f}",
+            f"GPU Cache Usage: {metrics_dict['kv_active_blocks'] / metrics_dict['kv_total_blocks']:.3f}",
+            f"Requests Waiting: {metrics_dict['num_requests_waiting']}",
+        ):
+            logger.info(message)
+        self.active_blocks_dict[best_worker_id][1] += new_blocks_dict[best_worker_id]
+
+        return (
+            best_worker_id,
+            overlap_blocks_dict[best_worker_id] * self.block_size / token_length,
+        )
+
+
+def make_metrics(worker_ids: list[int], rng: np.random.Generator):
+    """AggregatedMetrics-like metrics of the workers"""
+    return SimpleNamespace(
+        endpoints=[
+            SimpleNamespace(
+                worker_id=worker_id,
+                kv_active_blocks=int(rng.integers(0, 1000)),
+                kv_total_blocks=1000,
+                num_requests_waiting=int(rng.integers(0, 4)),
+                gpu_cache_usage_perc=float(rng.random()),
+                gpu_prefix_cache_hit_rate=float(rng.random()),
+            )
+            for worker_id in worker_ids
+        ]
+    )
+
+
+def make_requests(
+    worker_ids: list[int], num_requests: int, block_size: int, rng: np.random.Generator
+) -> list[tuple[dict[int, int], int]]:
+    """Requests of up to 64 blocks, each partially cached on a few workers"""
+    requests = []
+    for _ in range(num_requests):
+        num_blocks = int(rng.integers(1, 65))
+        cached_on = rng.choice(
+            worker_ids,
+            size=min(len(worker_ids), int(rng.integers(0, 5))),
+            replace=False,
+        )
+        scores = {
+            int(worker_id): int(rng.integers(1, num_blocks + 1))
+            for worker_id in cached_on
+        }
+        requests.append((scores, num_blocks * block_size))
+    return requests
+
+
+def decisions_per_second(decide, requests, metrics, decisions_per_refresh) -> float:
+    start = time.perf_counter()
+    for idx, (scores, token_length) in enumerate(requests):
+        decide(scores, token_length, metrics, idx % decisions_per_refresh == 0)
+    return len(requests) / (time.perf_counter() - start)
+
+
+def benchmark(args: argparse.Namespace):
+    rng = np.random.default_rng(args.seed)
+    print(
+        f"{'Workers':>8} | {'WorkerTable (decisions/s)':>25} | {'Reference (decisions/s)':>23} | {'Speedup':>7}"
+    )
+    for num_workers in args.num_workers:
+        worker_ids = [
+            int(worker_id) for worker_id in rng.integers(1, 2**62, num_workers)
+        ]
+        metrics = make_metrics(worker_ids, rng)
+        requests = make_requests(worker_ids, args.num_decisions, args.block_size, rng)
+
+        table = WorkerTable(args.block_size)
+
+        def decide_table(scores, token_length, metrics, refresh):
+            # the Router refreshes the table once per metrics refresh
+            if refresh:
+                table.set_workers(worker_ids)
+                table.update_metrics(metrics)
+            overlaps = table.overlaps(scores)
+            idx = table.select(table.costs(overlaps, token_length))
+            table.route(idx, table.request_blocks(token_length) - overlaps[idx])
+            return table.worker_ids[idx]
+
+        reference = ReferenceRouter(worker_ids, args.block_size)
+
+        def decide_reference(scores, token_length, metrics, refresh):
+            return reference.cost_function(scores, metrics, token_length)
+
+        vectorized = decisions_per_second(
+            decide_table, requests, metrics, args.decisions_per_refresh
+        )
+        previous = decisions_per_second(
+            decide_reference, requests, metrics, args.decisions_per_refresh
+        )
+        print(
+            f"{num_workers:>8} | {vectorized:>25,.0f} | {previous:>23,.0f} | {vectorized / previous:>6.1f}x"
+        )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Router cost function micro-benchmark")
+    parser.add_argument(
+        "--num-workers",
+        type=int,
+        nargs="+",
+        default=[8, 64, 512],
+        help="Numbers of workers to benchmark",
+    )
+    parser.add_argument(
+        "--num-decisions",
+        type=int,
+        default=5000,
+        help="Routing decisions per number of workers",
+    )
+    parser.add_argument(
+        "--decisions-per-refresh",
+        type=int,
+        default=100,
+        help="Routing decisions between refreshes of the worker table",
+    )
+    parser.add_argument("--block-size", type=int, default=64, help="KV block size")
+    parser.add_argument("--seed", type=int, default=0, help="Random seed")
+    args = parser.parse_args()
+
+    # the per-decision lines of the reference are formatted but not emitted, so that
+    # the comparison is of the cost function itself
+    logging.basicConfig(level=logging.WARNING)
+
+    benchmark(args)
+
+
+if __name__ == "__main__":
+    main()
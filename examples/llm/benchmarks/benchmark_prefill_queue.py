@@ -0,0 +1,201 @@
+# SPDX-FileCopyrightText: Copyright (c) 2025 NVIDIA CORPORATION & AFFILIATES. All rights reserved.
+# SPDX-License-Identifier: Apache-2.0
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+Throughput of the PrefillConsumer of the PrefillWorker against the number of prefills
+in flight, with a simulated engine and prefill queue, so that no GPU or NATS server is
+needed. From examples/llm:
+
+    python -m benchmarks.benchmark_prefill_queue --max-in-flight 1 2 4 8 16
+
+The engine runs steps of the prefills waiting in it, up to --max-batched-tokens prompt
+tokens per step, each taking --step-overhead-ms plus --per-token-us per prompt token.
+Each fetch from the queue takes --fetch-latency-ms. One prefill in flight and one
+request per fetch is the consumer that dequeued and prefilled one request at a time.
+"""
+
+import argparse
+import asyncio
+import time
+
+import numpy as np
+from utils.prefill_consumer import PrefillConsumer
+
+
+class SimulatedEngine:
+    """An engine batching the prompts waiting in it, at most max_batched_tokens per step"""
+
+    def __init__(self, max_batched_tokens: int, step_overhead: float, per_token: float):
+        self.max_batched_tokens = max_batched_tokens
+        self.step_overhead = step_overhead
+        self.per_token = per_token
+        self.waiting: list[tuple[int, asyncio.Future]] = []
+        self.has_waiting = asyncio.Event()
+        self.steps = 0
+
+    async def prefill(self, num_tokens: int):
+        done = asyncio.get_running_loop().create_future()
+        self.waiting.append((num_tokens, done))
+        self.has_waiting.set()
+        await done
+
+    async def run(self):
+        while True:
+            await self.has_waiting.wait()
+            batch: list[asyncio.Future] = []
+            batch_tokens = 0
+            while self.waiting and (
+                not batch
+                or batch_tokens + self.waiting[0][0] <= self.max_batched_tokens
+            ):
+                num_tokens, done = self.waiting.pop(0)
+                batch.append(done)
+                batch_tokens += num_tokens
+            if not self.waiting:
+                self.has_waiting.clear()
+            await asyncio.sleep(self.step_overhead + self.per_token * batch_tokens)
+            self.steps += 1
+            for done in batch:
+                done.set_result(None)
+
+
+class SimulatedQueue:
+    """A prefill queue of prompt lengths, each fetch taking fetch_latency"""
+
+    def __init__(self, prompt_lengths: list[int], fetch_latency: float):
+        self.prompt_lengths = list(prompt_lengths)
+        self.fetch_latency = fetch_latency
+        self.fetches = 0
+
+    async def dequeue(self, max_requests: int) -> list[int]:
+        await asyncio.sleep(self.fetch_latency)
+        self.fetches += 1
+        requests = self.prompt_lengths[:max_requests]
+        del self.prompt_lengths[:max_requests]
+        return requests
+
+
+async def run_consumer(
+    args: argparse.Namespace,
+    prompt_lengths: list[int],
+    max_in_flight: int,
+    fetch_batch_size: int,
+) -> tuple[float, float, int]:
+    """Prefills per second, prompt tokens per second and fetches of a queue drain"""
+    engine = SimulatedEngine(
+        args.max_batched_tokens, args.step_overhead_ms / 1e3, args.per_token_us / 1e6
+    )
+    queue = SimulatedQueue(prompt_lengths, args.fetch_latency_ms / 1e3)
+    consumer: PrefillConsumer[int] = PrefillConsumer(
+        queue.dequeue,
+        engine.prefill,
+        max_in_flight=max_in_flight,
+        fetch_batch_size=fetch_batch_size,
+    )
+
+    async def stop_when_drained():
+        while queue.prompt_lengths or consumer.in_flight:
+            await asyncio.sleep(0.001)
+        consumer.stop()
+
+    engine_task = asyncio.create_task(engine.run())
+    start = time.perf_counter()
+    await asyncio.gather(consumer.run(), stop_when_drained())
+    elapsed = time.perf_counter() - start
+    engine_task.cancel()
+    await asyncio.gather(engine_task, return_exceptions=True)
+    return (
+        consumer.completed / elapsed,
+        sum(prompt_lengths) / elapsed,
+        queue.fetches,
+    )
+
+
+async def benchmark(args: argparse.Namespace):
+    rng = np.random.default_rng(args.seed)
+    prompt_lengths = [
+        int(length)
+        for length in rng.integers(
+            args.min_prompt_length, args.max_prompt_length + 1, args.num_requests
+        )
+    ]
+
+    baseline = None
+    print(
+        f"{'In flight':>9} | {'Per fetch':>9} | {'Prefills/s':>10} | {'Tokens/s':>10} | {'Fetches':>7} | {'Speedup':>7}"
+    )
+    for max_in_flight in args.max_in_flight:
+        fetch_batch_size = min(max_in_flight, args.fetch_batch_size)
+        prefills, tokens, fetches = await run_consumer(
+            args, prompt_lengths, max_in_flight, fetch_batch_size
+        )
+        baseline = baseline or prefills
+        print(
+            f"{max_in_flight:>9} | {fetch_batch_size:>9} | {prefills:>10,.1f} | {tokens:>10,.0f} | {fetches:>7} | {prefills / baseline:>6.1f}x"
+        )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Prefill queue consumer benchmark")
+    parser.add_argument(
+        "--max-in-flight",
+        type=int,
+        nargs="+",
+        default=[1, 2, 4, 8, 16],
+        help="Numbers of prefills in flight to benchmark, the first is the baseline",
+    )
+    parser.add_argument(
+        "--fetch-batch-size",
+        type=int,
+        default=4,
+        help="Maximum number of requests per fetch",
+    )
+    parser.add_argument(
+        "--num-requests", type=int, default=400, help="Prefill requests to drain"
+    )
+    parser.add_argument("--min-prompt-length", type=int, default=256)
+    parser.add_argument("--max-prompt-length", type=int, default=2048)
+    parser.add_argument(
+        "--max-batched-tokens",
+        type=int,
+        default=8192,
+        help="Maximum prompt tokens per engine step",
+    )
+    parser.add_argument(
+        "--step-overhead-ms",
+        type=float,
+        default=10.0,
+        help="Fixed time of an engine step",
+    )
+    parser.add_argument(
+        "--per-token-us",
+        type=float,
+        default=5.0,
+        help="Time per prompt token of an engine step",
+    )
+    parser.add_argument(
+        "--fetch-latency-ms",
+        type=float,
+        default=1.0,
+        help="Time of a fetch from the prefill queue",
+    )
+    parser.add_argument("--seed", type=int, default=0, help="Random seed")
+    args = parser.parse_args()
+
+    asyncio.run(benchmark(args))
+
+
+if __name__ == "__main__":
+    main()
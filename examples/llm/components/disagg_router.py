@@ -15,7 +15,8 @@
 
 import logging
 
-from dynamo.runtime import EtcdKvCache
+from utils.watched_config import WatchedConfig
+
 from dynamo.sdk import dynamo_context
 
 logger = logging.getLogger(__name__)
@@ -36,24 +37,20 @@ class PyDisaggregatedRouter:
 
     async def async_init(self):
         runtime = dynamo_context["runtime"]
-        self.etcd_kv_cache = await EtcdKvCache.create(
+        self.config = await WatchedConfig.create(
             runtime.etcd_client(),
             f"/{self.namespace}/disagg_router/",
             {
-                "max_local_prefill_length": str(self.max_local_prefill_length),
-                "max_prefill_queue_size": str(self.max_prefill_queue_size),
+                "max_local_prefill_length": self.max_local_prefill_length,
+                "max_prefill_queue_size": self.max_prefill_queue_size,
             },
         )
 
-    async def prefill_remote(
+    def prefill_remote(
         self, prompt_length: int, prefix_hit_rate: float, queue_size: int
     ):
-        max_local_prefill_length = int(
-            await self.etcd_kv_cache.get("max_local_prefill_length")
-        )
-        max_prefill_queue_size = int(
-            await self.etcd_kv_cache.get("max_prefill_queue_size")
-        )
+        max_local_prefill_length = self.config.max_local_prefill_length
+        max_prefill_queue_size = self.config.max_prefill_queue_size
         absolute_prefill_length = int(prompt_length * (1 - prefix_hit_rate))
         # TODO: consider size of each request in the queue when making the decision
         decision = (
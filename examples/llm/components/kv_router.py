@@ -20,11 +20,13 @@ import random
 from argparse import Namespace
 from typing import AsyncIterator, Tuple
 
-import numpy as np  # Add numpy import
+import numpy as np
 from components.worker import VllmWorker
 from utils.check_worker import check_required_workers
-from utils.protocol import LocalBlockHashes
+from utils.metrics_snapshot import MetricsSnapshot
+from utils.protocol import LocalBlockHashes, MetricsRequest
 from utils.vllm import RouterType
+from utils.worker_table import WorkerTable
 
 from dynamo.llm import (
     AggregatedMetrics,
@@ -33,6 +35,7 @@ from dynamo.llm import (
     KvMetricsAggregator,
     OverlapScores,
 )
+from dynamo.llm.routing_log import RoutingRecorder
 from dynamo.sdk import async_on_start, depends, dynamo_context, endpoint, service
 from dynamo.sdk.lib.config import ServiceConfig
 
@@ -42,35 +45,6 @@ fallback_msg = "Will fallback to random routing."
 logger = logging.getLogger(__name__)
 
 
-def softmax_sample_from_logits(
-    logits: dict[str, float], temperature: float = 1.0, lower_is_better: bool = True
-) -> str:
-    if not logits:
-        raise ValueError("Empty logits dictionary")
-
-    keys = list(logits.keys())
-    values = np.array(list(logits.values()))
-
-    min_val = np.min(values)
-    max_val = np.max(values)
-
-    if min_val == max_val:
-        # All values are the same, uniform probability
-        probabilities = np.ones(len(keys)) / len(keys)
-    else:
-        normalized = values / (max_val - min_val)
-        if lower_is_better:
-            normalized = -1 * normalized
-
-        scaled = normalized / temperature
-
-        exp_values = np.exp(scaled - np.max(scaled))
-        probabilities = exp_values / np.sum(exp_values)
-
-    # Sample from the probability distribution
-    return np.random.choice(keys, p=probabilities)
-
-
 def parse_args(service_name, prefix) -> Namespace:
     parser = argparse.ArgumentParser()
     parser.add_argument(
@@ -109,6 +83,24 @@ def parse_args(service_name, prefix) -> Namespace:
         action="store_true",
         help="Whether to do softmax sampling based on worker logits (default is to pick smallest)",
     )
+    parser.add_argument(
+        "--metrics-refresh-interval",
+        type=float,
+        default=0.1,
+        help="Seconds between refreshes of the worker metrics used for routing, as often as they are scraped by default",
+    )
+    parser.add_argument(
+        "--metrics-max-staleness",
+        type=float,
+        default=1.0,
+        help="Seconds after which the worker metrics are no longer used for routing if not refreshed",
+    )
+    parser.add_argument(
+        "--record-decisions",
+        type=str,
+        default=None,
+        help="File to record the routing decisions to, for examples/router_standalone/replay_routing.py",
+    )
     config = ServiceConfig.get_instance()
     config_args = config.as_args(service_name, prefix=prefix)
     args = parser.parse_args(config_args)
@@ -133,13 +125,16 @@ class Router:
         logger.info("Initializing Custom Router")
         self.args = parse_args(self.__class__.__name__, "")
 
-        self.default_metrics = {
-            "kv_active_blocks": 0,
-            "kv_total_blocks": 1,
-            "num_requests_waiting": 0.0,
-            "gpu_cache_usage_perc": 0.0,
-            "gpu_prefix_cache_hit_rate": 0.0,
-        }
+        self.worker_table = WorkerTable(self.args.block_size)
+
+        self.recorder = None
+        if self.args.record_decisions:
+            logger.info(
+                f"Recording the routing decisions to {self.args.record_decisions}"
+            )
+            self.recorder = RoutingRecorder(
+                self.args.record_decisions, self.args.block_size, source="llm"
+            )
 
     @async_on_start
     async def async_init(self):
@@ -164,201 +159,125 @@ class Router:
             self.indexer = ApproxKvIndexer(kv_listener, self.args.block_size, 120.0)
 
         self.metrics_aggregator = KvMetricsAggregator(kv_listener)
+        self.metrics_snapshot = MetricsSnapshot(
+            self.metrics_aggregator,
+            refresh_interval=self.args.metrics_refresh_interval,
+            max_staleness=self.args.metrics_max_staleness,
+        )
+        self.metrics_snapshot.subscribe(self._update_worker_table)
 
-        self.active_blocks_dict = {}
-        worker_ids = self.workers_client.instance_ids()
-        for worker_id in worker_ids:
-            # [old_value, predictive_value]
-            self.active_blocks_dict[worker_id] = [0, 0]
+        self.worker_table.set_workers(self.workers_client.instance_ids())
+        await self.metrics_snapshot.refresh()
+        self.metrics_snapshot.start()
 
         logger.info("KV Router initialized")
 
-    def _update_and_get_active_blocks(self, worker_id: str, polled_value: int) -> int:
-        """Helper routine to update waiting dict and return the desired waiting value.
-
-        This method implements a predictive mechanism for tracking waiting requests:
-        - If a new polled value is detected (different from the stored old value),
-          it updates both the old and predictive values to this new measurement and returns it
-        - If no change is detected (polled value equals old value), it returns the
-          predictive value which has been incremented based on previous routing decisions
-
-        This allows the router to account for requests that have been dispatched but
-        not yet reflected in the polled metrics.
-        """
-        # Initialize if worker_id is not present
-        if worker_id not in self.active_blocks_dict:
-            logger.warning(f"New Worker added: {worker_id}")
-            self.active_blocks_dict[worker_id] = [polled_value, polled_value]
-            return polled_value
-
-        old_value, predictive_value = self.active_blocks_dict[worker_id]
+    def _update_worker_table(self, metrics: AggregatedMetrics):
+        """Update the worker table from each new metrics snapshot"""
+        self.worker_table.set_workers(self.workers_client.instance_ids())
+        self.worker_table.update_metrics(metrics)
 
-        # Check if polled value is different from old value
-        if polled_value != old_value:
-            self.active_blocks_dict[worker_id] = [polled_value, polled_value]
-            return polled_value
-        else:
-            return predictive_value
+    def _check_metrics_staleness(self):
+        # metrics older than the staleness bound are not used for routing
+        if self.metrics_snapshot.get() is None and self.worker_table.has_metrics.any():
+            self.worker_table.update_metrics(None)
 
     def _cost_function(
         self,
         scores: OverlapScores | None,
-        metrics: AggregatedMetrics | None,
         token_length: int,
+        local_hashes: list[int] | None = None,
     ):
         """The cost function for deciding the best worker to route a request to.
         If there are multiple workers sharing the same optimal cost, then
         one of them is randomly selected.
 
+        The costs of all the workers are computed at once from the worker table,
+        including the workers without scores or metrics.
+
         Args:
             scores (OverlapScores | None): The number of matching blocks between
                 the request and the prefix cache of each worker.
-            metrics (AggregatedMetrics | None): Several worker metrics polled
-                by the `KvMetricsAggregator`, currently including the
-                GPU cache usage, number of waiting requests, and the
-                GPU prefix cache hit rate.
             token_length (int): The number of tokens in the request.
+            local_hashes (list[int] | None): The block hashes of the request, only
+                used to record the decision.
 
         Returns:
             (str, float): The best worker id and the corresponding score.
         """
-
-        # Get all worker IDs from the client. This is needed because scores / metrics may not have values for all workers
-        # and we want all workers to be considered in the logit calculation
-        worker_ids = self.workers_client.instance_ids()
-        request_blocks = (
-            token_length + self.args.block_size - 1
-        ) // self.args.block_size
-
-        overlap_blocks_dict = {worker_id: 0 for worker_id in worker_ids}
-        new_blocks_dict = {worker_id: request_blocks for worker_id in worker_ids}
-
-        if scores:
-            for worker_id, score in scores.scores.items():
-                # score is number of matching blocks we multiply by block_size to get tokens
-                # and compare to token_length. The larger the cache hit the better
-                overlap_blocks_dict[worker_id] = score
-                new_blocks_dict[worker_id] = request_blocks - score
-        else:
+        table = self.worker_table
+        if not scores:
             logger.warning("Cannot get KV scores")
-
-        worker_metrics = {}
-        if metrics:
-            for endpoint in metrics.endpoints:
-                worker_id = endpoint.worker_id
-                worker_metrics[worker_id] = {
-                    key: getattr(endpoint, key, self.default_metrics[key])
-                    for key in self.default_metrics.keys()
-                }
-
-                # Update waiting value using helper routine
-                polled_active_blocks = int(
-                    worker_metrics[worker_id]["kv_active_blocks"]
+        overlaps = table.overlaps(scores.scores if scores else {})
+        costs = table.costs(overlaps, token_length)
+
+        if logger.isEnabledFor(logging.DEBUG):
+            active_blocks, kv_total_blocks, num_requests_waiting = table.load()
+            request_blocks = table.request_blocks(token_length)
+            for idx, worker_id in enumerate(table.worker_ids):
+                logger.debug(
+                    f"Formula for {worker_id}: {costs[idx]:.3f} = {(request_blocks - overlaps[idx]) / kv_total_blocks[idx]:.3f} + {active_blocks[idx] / kv_total_blocks[idx]:.3f} + {num_requests_waiting[idx]:.3f}"
                 )
-                worker_metrics[worker_id][
-                    "kv_active_blocks"
-                ] = self._update_and_get_active_blocks(worker_id, polled_active_blocks)
-        else:
-            logger.warning("Cannot get metrics")
-
-        worker_logits = {}
-        for worker_id in worker_ids:
-            # Use default values if worker not in scores or metrics
-            metrics_dict = worker_metrics.get(worker_id, self.default_metrics)
-            kv_total_blocks = metrics_dict["kv_total_blocks"]
-
-            new_blocks = new_blocks_dict[worker_id]
-            normalized_new_blocks = new_blocks / kv_total_blocks
-            gpu_cache_usage = metrics_dict["kv_active_blocks"] / kv_total_blocks
-
-            # Use raw waiting value without normalization
-            num_requests_waiting = metrics_dict["num_requests_waiting"]
-
-            # Have 1 metric that weights towards cache hit
-            # 2 metrics that penalize overloaded worker and queuing
-            worker_logits[worker_id] = (
-                normalized_new_blocks + gpu_cache_usage + num_requests_waiting
-            )
-            logger.info(
-                f"Formula for {worker_id}: {worker_logits[worker_id]:.3f} = {normalized_new_blocks:.3f} + {gpu_cache_usage:.3f} + {num_requests_waiting:.3f}"
-            )
 
-        if not worker_logits or not any(worker_logits.values()):
+        idx = table.select(costs, softmax=self.args.softmax_sample)
+        if idx is None:
             logger.warning(f"All worker logits are zero. {fallback_msg}.")
             return "", 0.0
+        best_worker_id = table.worker_ids[idx]
+
+        if self.recorder is not None:
+            active_blocks, kv_total_blocks, num_requests_waiting = table.load()
+            self.recorder.record(
+                local_hashes or [],
+                token_length,
+                table.worker_ids,
+                overlaps,
+                active_blocks / kv_total_blocks,
+                num_requests_waiting,
+                best_worker_id,
+                kv_total_blocks=kv_total_blocks,
+            )
+
+        logger.debug(
+            f"Selected worker: {best_worker_id}, cost: {costs[idx]:.3f}, overlap blocks: {overlaps[idx]:.0f}, GPU cache hit rate: {table.gpu_prefix_cache_hit_rate[idx]:.3f}"
+        )
 
-        # Select the worker with the highest logit
-        if self.args.softmax_sample:
-            best_worker_id = int(softmax_sample_from_logits(worker_logits))
-        else:
-            min_logit = min(worker_logits.values())
-            best_workers = [
-                wid for wid, logit in worker_logits.items() if logit == min_logit
-            ]
-            best_worker_id = random.choice(best_workers)
-
-        # Log the metrics for the selected worker
-        if best_worker_id:
-            metrics_dict = worker_metrics.get(best_worker_id, self.default_metrics)
-
-            # Create log messages
-            log_messages = [
-                f"Selected worker: {best_worker_id}, logit: {worker_logits[best_worker_id]:.3f}",
-                f"Score: {scores.scores.get(best_worker_id, 0.0) if scores else 0.0:.3f}",
-                f"GPU Cache Hit Rate: {metrics_dict['gpu_prefix_cache_hit_rate']:.3f}",
-                f"GPU Cache Usage: {metrics_dict['kv_active_blocks'] / metrics_dict['kv_total_blocks']:.3f}",
-                f"Requests Waiting: {metrics_dict['num_requests_waiting']}",
-            ]
-
-            # Log to vllm_logger
-            for message in log_messages:
-                logger.info(message)
-
-            # Increment predictive waiting for the selected worker before returning
-            self.active_blocks_dict[best_worker_id][1] += new_blocks_dict[
-                best_worker_id
-            ]
+        # Increment predictive active blocks for the selected worker before returning
+        table.route(idx, table.request_blocks(token_length) - overlaps[idx])
 
         return (
             best_worker_id,
-            overlap_blocks_dict[best_worker_id] * self.args.block_size / token_length,
+            float(overlaps[idx]) * self.args.block_size / token_length,
         )
 
-    def _get_underloaded_worker(self, metrics: AggregatedMetrics | None):
-        if not metrics:
+    def _get_underloaded_worker(self):
+        table = self.worker_table
+        if not table.has_metrics.any():
             logger.warning(f"Cannot get metrics. {fallback_msg}")
             return "", 0.0
 
-        kv_load = {
-            endpoint.worker_id: getattr(endpoint, "gpu_cache_usage_perc", 0.0)
-            for endpoint in metrics.endpoints
-        }
-
-        if not kv_load or not any(kv_load.values()):
+        kv_load = np.where(table.has_metrics, table.gpu_cache_usage_perc, np.inf)
+        if not kv_load[table.has_metrics].any():
             logger.warning(f"All KV loads are zero. {fallback_msg}")
             return "", 0.0
 
-        min_load = min(kv_load.values())
-        min_load_workers = [
-            worker_id for worker_id, load in kv_load.items() if load == min_load
-        ]
-        best_worker_id = random.choice(min_load_workers)
+        min_load_workers = np.flatnonzero(kv_load == kv_load.min())
+        idx = min_load_workers[table.rng.integers(len(min_load_workers))]
+        best_worker_id = table.worker_ids[idx]
 
-        logger.info(
-            f"Selected worker: {best_worker_id}, KV load: {kv_load[best_worker_id]:.3f}"
-        )
-        return best_worker_id, kv_load[best_worker_id]
+        logger.info(f"Selected worker: {best_worker_id}, KV load: {kv_load[idx]:.3f}")
+        return best_worker_id, float(kv_load[idx])
 
     @endpoint()
     async def generate(
         self, request: LocalBlockHashes
     ) -> AsyncIterator[Tuple[WorkerId, float]]:
-        metrics = await self.metrics_aggregator.get_metrics()
+        self._check_metrics_staleness()
 
         # Quick return for KV_LOAD mode
         if self.router_type == RouterType.KV_LOAD:
             try:
-                yield self._get_underloaded_worker(metrics)
+                yield self._get_underloaded_worker()
             except Exception as e:
                 logger.exception(
                     f"Error finding underloaded worker: {e}. {fallback_msg}"
@@ -379,7 +298,7 @@ class Router:
             return
 
         worker_id, prefix_hit_rate = self._cost_function(
-            scores, metrics, request.num_tokens
+            scores, request.num_tokens, request.hashes
         )
 
         if self.router_type == RouterType.APPROX_KV:
@@ -399,6 +318,11 @@ class Router:
 
         yield worker_id, prefix_hit_rate
 
+    @endpoint()
+    async def metrics(self, request: MetricsRequest) -> AsyncIterator[dict]:
+        """Refresh rate and staleness of the metrics snapshot used for routing"""
+        yield self.metrics_snapshot.stats()
+
     async def log_router_decision(self, tokens: list[int], worker_id: str):
         if self.router_type == RouterType.APPROX_KV:
             try:
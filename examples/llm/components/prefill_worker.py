@@ -22,6 +22,7 @@ import sys
 
 from pydantic import BaseModel
 from utils.nixl import NixlMetadataStore
+from utils.prefill_consumer import PrefillConsumer
 from utils.prefill_queue import PrefillQueue
 from utils.vllm import parse_vllm_args
 from vllm.entrypoints.openai.api_server import (
@@ -50,7 +51,9 @@ class PrefillWorker:
     def __init__(self):
         class_name = self.__class__.__name__
         self.engine_args = parse_vllm_args(class_name, "")
-        self._loaded_metadata = set()
+        # engine ID to the task loading its nixl metadata, shared by concurrent prefills
+        self._loaded_metadata: dict[str, asyncio.Task] = {}
+        self.consumer = None
         self.initialized = False
         if self.engine_args.enable_chunked_prefill is not False:
             logger.info("Chunked prefill is not supported yet, setting to False")
@@ -118,6 +121,8 @@ class PrefillWorker:
         logger.info("Received shutdown signal, shutting down DistributedRuntime")
         # first shutdown the vllm engine
         self.shutdown_requested = True
+        if self.consumer is not None:
+            self.consumer.stop()
         await asyncio.wait_for(self.task, timeout=None)
 
         # then shutdown the mock endpoint
@@ -151,29 +156,37 @@ class PrefillWorker:
             stream_name=prefill_queue_stream_name,
         ) as prefill_queue:
             logger.info("prefill queue handler started")
+            self.consumer = PrefillConsumer(
+                prefill_queue.dequeue_prefill_requests,
+                self._prefill,
+                max_in_flight=self.engine_args.prefill_max_in_flight,
+                fetch_batch_size=self.engine_args.prefill_fetch_batch_size,
+            )
+            if self.shutdown_requested:
+                self.consumer.stop()
+            await self.consumer.run()
+
+            logger.info(
+                "Shutdown requested, checking if engine has any pending prefill sending requests"
+            )
             while True:
-                # TODO: this might add a small overhead to pull prefill from nats
-                # need to test and check how much overhead it is
-                prefill_request = await prefill_queue.dequeue_prefill_request()
-                if prefill_request is not None:
-                    logger.info(
-                        f"Dequeued prefill request: {prefill_request.request_id}"
-                    )
-                    async for _ in self.generate(prefill_request):
-                        pass
-                if self.shutdown_requested:
-                    logger.info(
-                        "Shutdown requested, checking if engine has any pending prefill sending requests"
-                    )
-                    while True:
-                        if not await self.engine_client.has_unfinished_requests():
-                            break
-                        logger.info(
-                            "Engine has pending prefill sending requests, rechecking in 1 second..."
-                        )
-                        await asyncio.sleep(1)
-                    self.shutdown_vllm_engine()
+                if not await self.engine_client.has_unfinished_requests():
                     break
+                logger.info(
+                    "Engine has pending prefill sending requests, rechecking in 1 second..."
+                )
+                await asyncio.sleep(1)
+            self.shutdown_vllm_engine()
+
+    async def _prefill(self, prefill_request: RemotePrefillRequest):
+        logger.info(f"Dequeued prefill request: {prefill_request.request_id}")
+        try:
+            async for _ in self.generate(prefill_request):
+                pass
+        except Exception as e:
+            raise RuntimeError(
+                f"Prefill request {prefill_request.request_id} failed: {e!r}"
+            ) from e
 
     async def generate(self, request: RemotePrefillRequest):
         sampling_params = request.sampling_params
@@ -189,14 +202,20 @@ class PrefillWorker:
 
         # TODO check if metadata has changed
         # and reload - currently only loading once
-        if request.engine_id not in self._loaded_metadata:
-            remote_metadata = await self._metadata_store.get(request.engine_id)
-            await self.engine_client.add_remote_nixl_metadata(remote_metadata)
-            logger.info(
-                f"Loaded nixl metadata from engine {request.engine_id} into "
-                f"engine {self.engine_client.nixl_metadata.engine_id}"
+        load_task = self._loaded_metadata.get(request.engine_id)
+        if load_task is None:
+            load_task = asyncio.create_task(
+                self._load_remote_metadata(request.engine_id)
             )
-            self._loaded_metadata.add(request.engine_id)
+            self._loaded_metadata[request.engine_id] = load_task
+        try:
+            # shielded, the load is shared with the other prefills of the engine
+            await asyncio.shield(load_task)
+        except Exception:
+            if self._loaded_metadata.get(request.engine_id) is load_task:
+                # retried by the next prefill of the engine
+                del self._loaded_metadata[request.engine_id]
+            raise
 
         async for _ in self.engine_client.generate(
             request_id=request.request_id,
@@ -206,6 +225,14 @@ class PrefillWorker:
         ):
             yield
 
+    async def _load_remote_metadata(self, engine_id: str):
+        remote_metadata = await self._metadata_store.get(engine_id)
+        await self.engine_client.add_remote_nixl_metadata(remote_metadata)
+        logger.info(
+            f"Loaded nixl metadata from engine {engine_id} into "
+            f"engine {self.engine_client.nixl_metadata.engine_id}"
+        )
+
     @endpoint()
     async def mock(self, req: RequestType):
         yield f"mock_response: {req}"
@@ -24,15 +24,21 @@ from components.worker import VllmWorker
 from transformers import AutoTokenizer
 from utils.chat_processor import ChatProcessor, CompletionsProcessor, ProcessMixIn
 from utils.check_worker import check_required_workers
-from utils.protocol import LocalBlockHashes, MyRequestOutput, vLLMGenerateRequest
+from utils.metrics_snapshot import MetricsSnapshot
+from utils.protocol import (
+    LocalBlockHashes,
+    MetricsRequest,
+    MyRequestOutput,
+    vLLMGenerateRequest,
+)
 from utils.vllm import RouterType, parse_vllm_args
+from utils.watched_config import WatchedConfig
 from vllm.engine.arg_utils import AsyncEngineArgs
 from vllm.entrypoints.openai.protocol import ChatCompletionRequest, CompletionRequest
 from vllm.outputs import RequestOutput
 from vllm.transformers_utils.tokenizer import AnyTokenizer
 
 from dynamo.llm import KvMetricsAggregator, compute_block_hash_for_seq_py
-from dynamo.runtime import EtcdKvCache
 from dynamo.sdk import async_on_start, depends, dynamo_context, endpoint, service
 
 logger = logging.getLogger(__name__)
@@ -121,8 +127,14 @@ class Processor(ProcessMixIn):
         kv_listener = runtime.namespace("dynamo").component("VllmWorker")
         await kv_listener.create_service()
         self.metrics_aggregator = KvMetricsAggregator(kv_listener)
+        self.metrics_snapshot = MetricsSnapshot(
+            self.metrics_aggregator,
+            refresh_interval=self.engine_args.metrics_refresh_interval,
+            max_staleness=self.engine_args.metrics_max_staleness,
+        )
+        # not started here, the first read of the KV loads starts the refreshes
 
-        self.etcd_kv_cache = await EtcdKvCache.create(
+        self.config = await WatchedConfig.create(
             runtime.etcd_client(),
             f"/{comp_ns}/processor/",
             {"router": self.engine_args.router},
@@ -174,21 +186,23 @@ class Processor(ProcessMixIn):
                 # Sleep briefly to avoid tight error loops
                 await asyncio.sleep(0.1)
 
-    async def _get_kv_load(self):
-        metrics = await self.metrics_aggregator.get_metrics()
-        kv_load = {}
-        for end_point in metrics.endpoints:
-            worker_id = end_point.worker_id
-            kv_load[worker_id] = getattr(end_point, "gpu_cache_usage_perc", 0.0)
-        return kv_load
-
-    async def _get_pending_requests(self):
-        metrics = await self.metrics_aggregator.get_metrics()
-        pending_requests = {}
-        for end_point in metrics.endpoints:
-            worker_id = end_point.worker_id
-            pending_requests[worker_id] = getattr(endpoint, "num_requests_waiting", 0)
-        return pending_requests
+    def _get_kv_load(self):
+        metrics = self.metrics_snapshot.get()
+        if metrics is None:
+            return {}
+        return {
+            end_point.worker_id: end_point.gpu_cache_usage_perc
+            for end_point in metrics.endpoints
+        }
+
+    def _get_pending_requests(self):
+        metrics = self.metrics_snapshot.get()
+        if metrics is None:
+            return {}
+        return {
+            end_point.worker_id: end_point.num_requests_waiting
+            for end_point in metrics.endpoints
+        }
 
     async def _generate(
         self,
@@ -240,7 +254,7 @@ class Processor(ProcessMixIn):
             # Create an async generator function to process this request
             async def process_and_stream():
                 # TODO: queue request at processor when engines are full
-                router_mode = (await self.etcd_kv_cache.get("router")).decode()
+                router_mode = self.config.router
 
                 self.use_router = router_mode in (
                     RouterType.KV,
@@ -340,6 +354,11 @@ class Processor(ProcessMixIn):
                     f"Request type {request_type} not implemented"
                 )
 
+    @endpoint()
+    async def metrics(self, request: MetricsRequest) -> AsyncIterator[dict]:
+        """Refresh rate and staleness of the metrics snapshot of the workers"""
+        yield self.metrics_snapshot.stats()
+
     @endpoint(name="chat/completions")
     async def chat_completions(self, raw_request: ChatCompletionRequest):
         async for response in self._generate(raw_request, RequestType.CHAT):
@@ -23,6 +23,7 @@ from components.disagg_router import PyDisaggregatedRouter
 from components.prefill_worker import PrefillWorker
 from utils.nixl import NixlMetadataStore
 from utils.prefill_queue import PrefillQueue
+from utils.prefill_queue_depth import PrefillQueueDepth
 from utils.protocol import MyRequestOutput, vLLMGenerateRequest
 from utils.vllm import RouterType, parse_vllm_args
 from vllm.entrypoints.openai.api_server import (
@@ -50,6 +51,7 @@ class VllmWorker:
     def __init__(self):
         self.client = None
         self.disaggregated_router: PyDisaggregatedRouter = None  # type: ignore
+        self.prefill_queue_depth: PrefillQueueDepth = None  # type: ignore
         class_name = self.__class__.__name__
         self.engine_args = parse_vllm_args(class_name, "")
         self.do_remote_prefill = self.engine_args.remote_prefill
@@ -146,6 +148,12 @@ class VllmWorker:
                 max_prefill_queue_size=self.engine_args.max_prefill_queue_size,
             )
             await self.disaggregated_router.async_init()
+            self.prefill_queue_depth = PrefillQueueDepth(
+                self._get_prefill_queue_size,
+                sample_interval=self.engine_args.prefill_queue_sample_interval,
+            )
+            await self.prefill_queue_depth.refresh()
+            self.prefill_queue_depth.start()
         else:
             self.disaggregated_router = None
 
@@ -184,6 +192,13 @@ class VllmWorker:
         logger.info("Creating metrics publisher endpoint with primary lease")
         await self.metrics_publisher.create_endpoint(component)
 
+    async def _get_prefill_queue_size(self) -> int:
+        async with PrefillQueue.get_instance(
+            nats_server=self._prefill_queue_nats_server,
+            stream_name=self._prefill_queue_stream_name,
+        ) as prefill_queue:
+            return await prefill_queue.get_queue_size()
+
     def get_remote_prefill_request_callback(self):
         # TODO: integrate prefill_queue to dynamo endpoint
         async def callback(request: RemotePrefillRequest):
@@ -201,15 +216,10 @@ class VllmWorker:
         # TODO: consider prefix hit when deciding prefill locally or remotely
 
         if self.disaggregated_router is not None:
-            async with PrefillQueue.get_instance(
-                nats_server=self._prefill_queue_nats_server,
-                stream_name=self._prefill_queue_stream_name,
-            ) as prefill_queue:
-                prefill_queue_size = await prefill_queue.get_queue_size()
-            disagg_router_decision = await self.disaggregated_router.prefill_remote(
+            disagg_router_decision = self.disaggregated_router.prefill_remote(
                 len(request.engine_prompt["prompt_token_ids"]),
                 request.prefix_hit_rate,
-                prefill_queue_size,
+                self.prefill_queue_depth.depth,
             )
         else:
             # always prefill remotely if no disaggregated router is provided
@@ -220,6 +230,8 @@ class VllmWorker:
                 is_remote_prefill=True,
                 remote_prefill_request_callback=self.get_remote_prefill_request_callback(),
             )
+            if self.prefill_queue_depth is not None:
+                self.prefill_queue_depth.increment()
             logger.info(
                 f"Prefilling remotely for request {request.request_id} with length {len(request.engine_prompt['prompt_token_ids'])}"
             )
@@ -0,0 +1,126 @@
+# SPDX-FileCopyrightText: Copyright (c) 2025 NVIDIA CORPORATION & AFFILIATES. All rights reserved.
+# SPDX-License-Identifier: Apache-2.0
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import logging
+import time
+from typing import Any, Callable, Optional
+
+from utils.periodic_refresh import PeriodicRefresh
+
+logger = logging.getLogger(__name__)
+
+
+class MetricsSnapshot(PeriodicRefresh):
+    """
+    Latest AggregatedMetrics of a KvMetricsAggregator, refreshed by a background task
+    and swapped at once, so that hot paths read it without awaiting. The subscribed
+    callbacks are pushed each new snapshot.
+
+    A snapshot older than max_staleness is not returned, so that routing falls back
+    to its behavior without metrics rather than use outdated loads.
+
+    The background task is started by start(), or else by the first read, so that
+    the metrics are not polled for a component that never reads them.
+    """
+
+    def __init__(
+        self,
+        metrics_aggregator: Any,
+        refresh_interval: float = 0.1,
+        max_staleness: float = 1.0,
+        stats_interval: float = 60.0,
+    ):
+        """
+        Args:
+            metrics_aggregator: KvMetricsAggregator of the workers
+            refresh_interval: Seconds between refreshes
+            max_staleness: Age in seconds above which the snapshot is not returned
+            stats_interval: Seconds between logs of the refresh rate and staleness
+        """
+        super().__init__(refresh_interval, "refresh the metrics snapshot")
+        self.metrics_aggregator = metrics_aggregator
+        self.max_staleness = max_staleness
+        self.stats_interval = stats_interval
+
+        self.metrics: Optional[Any] = None
+        self.refreshed_at = float("-inf")
+        self.callbacks: list[Callable[[Any], None]] = []
+        self.refreshes = 0
+        self.stale_reads = 0
+        # start time and refreshes of the window of the refresh rate
+        self._stats_window = (time.monotonic(), 0)
+        self._next_stats = time.monotonic() + stats_interval
+
+    def subscribe(self, callback: Callable[[Any], None]):
+        self.callbacks.append(callback)
+
+    @property
+    def staleness(self) -> float:
+        """Age of the snapshot, in seconds"""
+        return time.monotonic() - self.refreshed_at
+
+    def is_stale(self) -> bool:
+        return self.staleness > self.max_staleness
+
+    def get(self) -> Optional[Any]:
+        """The latest metrics, None if not available or older than max_staleness"""
+        self.start()
+        if self.is_stale():
+            self.stale_reads += 1
+            return None
+        return self.metrics
+
+    def stats(self, reset: bool = False) -> dict[str, Optional[float]]:
+        """
+        Refresh rate since the creation of the snapshot or the last reset, staleness
+        (None before the first refresh), and counts. Only a reset starts a new window
+        for the refresh rate, reading the stats does not. The refresh task resets it
+        every stats_interval, when it logs the stats.
+        """
+        now = time.monotonic()
+        start_time, start_refreshes = self._stats_window
+        if reset:
+            self._stats_window = (now, self.refreshes)
+        return {
+            "refreshes_per_second": (self.refreshes - start_refreshes)
+            / max(now - start_time, 1e-9),
+            "staleness_seconds": self.staleness if self.refreshes else None,
+            "refreshes_total": self.refreshes,
+            "failed_refreshes_total": self.failed_refreshes,
+            "stale_reads_total": self.stale_reads,
+        }
+
+    async def refresh(self):
+        metrics = await self.metrics_aggregator.get_metrics()
+        # swap the whole snapshot, readers never see a partial update
+        self.metrics, self.refreshed_at = metrics, time.monotonic()
+        self.refreshes += 1
+        for callback in self.callbacks:
+            try:
+                callback(metrics)
+            except Exception as e:
+                logger.error(f"Metrics snapshot callback failed: {e}")
+
+    def after_refresh(self):
+        if time.monotonic() < self._next_stats:
+            return
+        self._next_stats += self.stats_interval
+        stats = self.stats(reset=True)
+        logger.info(
+            f"Metrics snapshot: {stats['refreshes_per_second']:.1f} refreshes/s, "
+            f"staleness {self.staleness * 1000:.0f}ms, "
+            f"{stats['failed_refreshes_total']} failed refreshes, "
+            f"{stats['stale_reads_total']} stale reads"
+        )
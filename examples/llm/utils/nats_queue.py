@@ -85,6 +85,12 @@ class NATSQueue:
     async def dequeue_task(self, timeout: Optional[float] = None) -> Optional[bytes]:
         return await self.nats_q.dequeue_task(timeout)
 
+    async def dequeue_tasks(
+        self, max_messages: int, timeout: Optional[float] = None
+    ) -> list[bytes]:
+        """Up to max_messages tasks in a single fetch, waiting up to timeout for the first"""
+        return await self.nats_q.dequeue_tasks(max_messages, timeout)
+
     async def get_queue_size(self) -> int:
         return await self.nats_q.get_queue_size()
 
@@ -0,0 +1,76 @@
+# SPDX-FileCopyrightText: Copyright (c) 2025 NVIDIA CORPORATION & AFFILIATES. All rights reserved.
+# SPDX-License-Identifier: Apache-2.0
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import asyncio
+import logging
+from typing import Optional
+
+logger = logging.getLogger(__name__)
+
+
+class PeriodicRefresh:
+    """
+    Base of the values refreshed by a background task every refresh_interval, so that
+    hot paths read them without awaiting. Subclasses implement refresh().
+
+    The task is started by start() and stopped for good by close(). A refresh that
+    raises is counted in failed_refreshes, and only the first of consecutive failures
+    is logged, so that an unavailable source does not flood the logs.
+    """
+
+    def __init__(self, refresh_interval: float, description: str):
+        """
+        Args:
+            refresh_interval: Seconds between refreshes
+            description: What a refresh does, for the logs, e.g. "sample the queue"
+        """
+        self.refresh_interval = refresh_interval
+        self.description = description
+        self.failed_refreshes = 0
+        self._task: Optional[asyncio.Task] = None
+        self._closed = False
+
+    def start(self):
+        if self._task is None and not self._closed:
+            self._task = asyncio.create_task(self._refresh_loop())
+
+    async def close(self):
+        self._closed = True
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+    async def refresh(self):
+        raise NotImplementedError
+
+    def after_refresh(self):
+        """Called after each refresh, whether it succeeded or not"""
+
+    async def _refresh_loop(self):
+        failing = False
+        while True:
+            try:
+                await self.refresh()
+                failing = False
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                self.failed_refreshes += 1
+                if not failing:
+                    logger.warning(f"Failed to {self.description}: {e}")
+                failing = True
+            self.after_refresh()
+            await asyncio.sleep(self.refresh_interval)
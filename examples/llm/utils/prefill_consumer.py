@@ -0,0 +1,89 @@
+# SPDX-FileCopyrightText: Copyright (c) 2025 NVIDIA CORPORATION & AFFILIATES. All rights reserved.
+# SPDX-License-Identifier: Apache-2.0
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import asyncio
+import logging
+from typing import Awaitable, Callable, Generic, TypeVar
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+
+class PrefillConsumer(Generic[T]):
+    """
+    Consumer of a prefill queue that keeps up to max_in_flight prefills in the engine,
+    so that the engine batches them, rather than running one prefill at a time.
+
+    Each fetch dequeues up to fetch_batch_size requests, and no more than the free
+    slots. The prefills in flight are those submitted to the engine and not finished,
+    i.e. queued or running in the engine, so that no more requests are dequeued while
+    the engine is max_in_flight deep and they stay in the queue for other workers.
+    """
+
+    def __init__(
+        self,
+        dequeue: Callable[[int], Awaitable[list[T]]],
+        handle: Callable[[T], Awaitable[None]],
+        max_in_flight: int = 8,
+        fetch_batch_size: int = 4,
+    ):
+        """
+        Args:
+            dequeue: Dequeues up to the given number of requests, waiting a bounded
+                time for the first one
+            handle: Runs the prefill of a request
+            max_in_flight: Maximum number of prefills in the engine
+            fetch_batch_size: Maximum number of requests dequeued per fetch
+        """
+        if max_in_flight < 1 or fetch_batch_size < 1:
+            raise ValueError("max_in_flight and fetch_batch_size must be positive")
+        self.dequeue = dequeue
+        self.handle = handle
+        self.max_in_flight = max_in_flight
+        self.fetch_batch_size = fetch_batch_size
+        self.in_flight: set[asyncio.Task] = set()
+        self.completed = 0
+        self.failed = 0
+        self._stopping = False
+
+    def stop(self):
+        """Stop dequeuing, run returns once the prefills in flight are done"""
+        self._stopping = True
+
+    async def run(self):
+        while not self._stopping:
+            free_slots = self.max_in_flight - len(self.in_flight)
+            if free_slots <= 0:
+                await asyncio.wait(self.in_flight, return_when=asyncio.FIRST_COMPLETED)
+                continue
+            for request in await self.dequeue(min(free_slots, self.fetch_batch_size)):
+                task = asyncio.create_task(self._handle(request))
+                self.in_flight.add(task)
+                task.add_done_callback(self.in_flight.discard)
+
+        if self.in_flight:
+            logger.info(f"Draining {len(self.in_flight)} prefill(s) in flight")
+            await asyncio.gather(*self.in_flight, return_exceptions=True)
+
+    async def _handle(self, request: T):
+        try:
+            await self.handle(request)
+            self.completed += 1
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            self.failed += 1
+            logger.error(f"Prefill failed: {e!r}")
@@ -54,3 +54,12 @@ class PrefillQueue(NATSQueue):
             return prefill_request
         else:
             return None
+
+    async def dequeue_prefill_requests(
+        self, max_requests: int, timeout: Optional[float] = None
+    ) -> list[RemotePrefillRequest]:
+        encoded_requests = await self.dequeue_tasks(max_requests, timeout)
+        return [
+            msgspec.json.decode(encoded_request, type=RemotePrefillRequest)
+            for encoded_request in encoded_requests
+        ]
@@ -0,0 +1,56 @@
+# SPDX-FileCopyrightText: Copyright (c) 2025 NVIDIA CORPORATION & AFFILIATES. All rights reserved.
+# SPDX-License-Identifier: Apache-2.0
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+from typing import Awaitable, Callable
+
+from utils.periodic_refresh import PeriodicRefresh
+
+
+class PrefillQueueDepth(PeriodicRefresh):
+    """
+    Estimate of the depth of the prefill queue, sampled by a background task, so that
+    the disaggregated router reads it without a NATS round trip per request.
+
+    Between samples, the requests enqueued locally are added to the estimate as soon
+    as they are routed remotely, so that a burst of requests does not see the same
+    depth. The enqueues made while a sample is in flight are added to its result.
+    """
+
+    def __init__(
+        self,
+        get_queue_size: Callable[[], Awaitable[int]],
+        sample_interval: float = 0.1,
+    ):
+        """
+        Args:
+            get_queue_size: Returns the number of requests in the prefill queue
+            sample_interval: Seconds between samples of the queue size
+        """
+        super().__init__(sample_interval, "sample the prefill queue size")
+        self.get_queue_size = get_queue_size
+        self.depth = 0
+        self.samples = 0
+        self._enqueued = 0
+
+    def increment(self, count: int = 1):
+        """Count requests enqueued locally until the next sample"""
+        self.depth += count
+        self._enqueued += count
+
+    async def refresh(self):
+        enqueued = self._enqueued
+        queue_size = await self.get_queue_size()
+        self.depth = queue_size + self._enqueued - enqueued
+        self.samples += 1
@@ -50,6 +50,10 @@ class Response(BaseModel):
     text: str
 
 
+class MetricsRequest(BaseModel):
+    """Request of the metrics of a component, which has no parameters"""
+
+
 class PrefillResponse(BaseModel):
     prefilled: bool
 
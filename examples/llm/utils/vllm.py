@@ -71,6 +71,36 @@ def parse_vllm_args(service_name, prefix) -> AsyncEngineArgs:
         default=3,
         help="Maximum queue size for remote prefill. If the prefill queue size is greater than this value, prefill phase of the incoming request will be executed locally.",
     )
+    parser.add_argument(
+        "--prefill-queue-sample-interval",
+        type=float,
+        default=0.1,
+        help="Seconds between samples of the prefill queue size used by the disaggregated router. Requests sent for remote prefill are added to the sampled size until the next sample.",
+    )
+    parser.add_argument(
+        "--prefill-max-in-flight",
+        type=int,
+        default=8,
+        help="Maximum number of remote prefills a prefill worker runs concurrently. No more prefill requests are dequeued while this many are queued or running in the engine.",
+    )
+    parser.add_argument(
+        "--prefill-fetch-batch-size",
+        type=int,
+        default=4,
+        help="Maximum number of prefill requests a prefill worker dequeues per fetch",
+    )
+    parser.add_argument(
+        "--metrics-refresh-interval",
+        type=float,
+        default=0.1,
+        help="Seconds between refreshes of the snapshot of the worker metrics",
+    )
+    parser.add_argument(
+        "--metrics-max-staleness",
+        type=float,
+        default=1.0,
+        help="Seconds after which the snapshot of the worker metrics is no longer used if not refreshed",
+    )
     parser = AsyncEngineArgs.add_cli_args(parser)
     args = parser.parse_args(vllm_args)
     engine_args = AsyncEngineArgs.from_cli_args(args)
@@ -80,4 +110,9 @@ def parse_vllm_args(service_name, prefix) -> AsyncEngineArgs:
     engine_args.conditional_disagg = args.conditional_disagg
     engine_args.max_local_prefill_length = args.max_local_prefill_length
     engine_args.max_prefill_queue_size = args.max_prefill_queue_size
+    engine_args.prefill_queue_sample_interval = args.prefill_queue_sample_interval
+    engine_args.prefill_max_in_flight = args.prefill_max_in_flight
+    engine_args.prefill_fetch_batch_size = args.prefill_fetch_batch_size
+    engine_args.metrics_refresh_interval = args.metrics_refresh_interval
+    engine_args.metrics_max_staleness = args.metrics_max_staleness
     return engine_args
@@ -0,0 +1,159 @@
+# SPDX-FileCopyrightText: Copyright (c) 2025 NVIDIA CORPORATION & AFFILIATES. All rights reserved.
+# SPDX-License-Identifier: Apache-2.0
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import asyncio
+import logging
+from typing import Any, Callable, Optional
+
+logger = logging.getLogger(__name__)
+
+# (key, value) of a setting that changed
+ConfigCallback = Callable[[str, Any], None]
+
+
+class WatchedConfig:
+    """
+    Runtime-tunable settings of a component, stored in etcd under a prefix and held
+    locally as plain attributes, so that hot paths read them without awaiting. A watch
+    of the prefix updates the attributes as soon as a setting is put in etcd, e.g.
+
+        etcdctl put /dynamo/disagg_router/max_local_prefill_length 2000
+
+    The type of each setting is the type of its default. A value that cannot be
+    parsed is ignored, and a deleted setting reverts to its default. A watch that
+    ends or fails is re-established, with backoff, after re-reading the settings.
+    """
+
+    # seconds to wait before re-establishing a watch that ended or failed, doubled
+    # after each failed attempt
+    RETRY_DELAY = 1.0
+    MAX_RETRY_DELAY = 30.0
+
+    def __init__(self, etcd_client: Any, prefix: str, defaults: dict[str, Any]):
+        """
+        Args:
+            etcd_client: EtcdClient of the runtime
+            prefix: etcd prefix of the settings, e.g. "/dynamo/processor/"
+            defaults: Default value of each setting, written to etcd if not set
+        """
+        self.etcd_client = etcd_client
+        self.prefix = prefix
+        self.defaults = dict(defaults)
+        self.callbacks: list[ConfigCallback] = []
+        self._watch_task: Optional[asyncio.Task] = None
+        for key, value in self.defaults.items():
+            setattr(self, key, value)
+
+    @classmethod
+    async def create(
+        cls, etcd_client: Any, prefix: str, defaults: dict[str, Any]
+    ) -> "WatchedConfig":
+        config = cls(etcd_client, prefix, defaults)
+        await config.start()
+        return config
+
+    def subscribe(self, callback: ConfigCallback):
+        self.callbacks.append(callback)
+
+    async def start(self):
+        """Write the missing defaults, read the settings and start watching them"""
+        if self._watch_task is not None:
+            return
+        existing = {
+            kv["key"] for kv in await self.etcd_client.kv_get_prefix(self.prefix)
+        }
+        for key, value in self.defaults.items():
+            if self.prefix + key not in existing:
+                try:
+                    await self.etcd_client.kv_create(
+                        self.prefix + key, str(value).encode(), None
+                    )
+                except Exception as e:
+                    # created by another instance in the meantime
+                    logger.debug(f"Did not create {self.prefix + key}: {e}")
+
+        stream = await self._watch()
+        self._watch_task = asyncio.create_task(self._consume(stream))
+
+    async def close(self):
+        if self._watch_task is not None:
+            self._watch_task.cancel()
+            await asyncio.gather(self._watch_task, return_exceptions=True)
+            self._watch_task = None
+
+    async def _watch(self) -> Any:
+        """Watch the prefix and apply the current settings"""
+        # the watch starts with the current settings as put events, which are applied
+        # before returning so that the attributes are up to date
+        stream = await self.etcd_client.kv_get_and_watch_prefix(self.prefix)
+        missing = set(self.defaults)
+        for kv in await self.etcd_client.kv_get_prefix(self.prefix):
+            self._apply(kv["key"], kv["value"])
+            missing.discard(kv["key"][len(self.prefix) :])
+        # settings deleted while the prefix was not watched revert to their default
+        for key in missing:
+            self._apply(self.prefix + key, None)
+        return stream
+
+    def _apply(self, full_key: str, raw_value: Optional[bytes]):
+        key = full_key[len(self.prefix) :]
+        if key not in self.defaults:
+            return
+        default = self.defaults[key]
+        if raw_value is None:
+            value = default
+        else:
+            try:
+                value = type(default)(raw_value.decode())
+            except (UnicodeDecodeError, ValueError) as e:
+                logger.warning(
+                    f"Ignoring invalid value {raw_value!r} of {full_key}: {e}"
+                )
+                return
+        if value == getattr(self, key):
+            return
+        setattr(self, key, value)
+        logger.info(f"{full_key} set to {value}")
+        for callback in self.callbacks:
+            try:
+                callback(key, value)
+            except Exception as e:
+                logger.error(f"Config callback failed: {e}")
+
+    async def _consume(self, stream: Any):
+        delay = self.RETRY_DELAY
+        while True:
+            try:
+                async for event in stream:
+                    self._apply(
+                        event["key"],
+                        event["value"] if event["event"] == "put" else None,
+                    )
+                    delay = self.RETRY_DELAY
+                logger.warning(f"Watch of {self.prefix} ended")
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Failed to watch {self.prefix}: {e}")
+
+            stream = None
+            while stream is None:
+                await asyncio.sleep(delay)
+                delay = min(2 * delay, self.MAX_RETRY_DELAY)
+                try:
+                    stream = await self._watch()
+                    logger.info(f"Watching {self.prefix} again")
+                except Exception as e:
+                    logger.error(f"Failed to watch {self.prefix} again: {e}")
@@ -0,0 +1,215 @@
+# SPDX-FileCopyrightText: Copyright (c) 2025 NVIDIA CORPORATION & AFFILIATES. All rights reserved.
+# SPDX-License-Identifier: Apache-2.0
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import logging
+from typing import Any, Optional, Sequence
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+
+def softmax_sample(
+    values: np.ndarray,
+    temperature: float = 1.0,
+    lower_is_better: bool = True,
+    rng: Optional[np.random.Generator] = None,
+) -> int:
+    """Sample the index of a value, with softmax probabilities over the values"""
+    if len(values) == 0:
+        raise ValueError("Empty values")
+    rng = rng or np.random.default_rng()
+
+    min_val = values.min()
+    max_val = values.max()
+    if min_val == max_val:
+        # All values are the same, uniform probability
+        return int(rng.integers(len(values)))
+
+    normalized = values / (max_val - min_val)
+    if lower_is_better:
+        normalized = -normalized
+    scaled = normalized / temperature
+    exp_values = np.exp(scaled - scaled.max())
+    return int(rng.choice(len(values), p=exp_values / exp_values.sum()))
+
+
+class WorkerTable:
+    """
+    State of the workers of the Router, in NumPy arrays indexed by the position of
+    the workers in worker_ids, so that the costs of all the workers are computed at
+    once. The table is updated from the instance IDs and aggregated metrics when they
+    are refreshed, rather than for each request.
+
+    The active blocks of a worker are predicted: each request routed to it adds its
+    new blocks, until different active blocks are polled from the worker.
+    """
+
+    def __init__(self, block_size: int, rng: Optional[np.random.Generator] = None):
+        self.block_size = block_size
+        self.rng = rng or np.random.default_rng()
+        self.worker_ids: list[int] = []
+        self.index: dict[int, int] = {}
+        self._resize(0)
+
+    def _resize(self, num_workers: int):
+        self.has_metrics = np.zeros(num_workers, dtype=bool)
+        self.polled_active_blocks = np.zeros(num_workers, dtype=np.float64)
+        self.predicted_active_blocks = np.zeros(num_workers, dtype=np.float64)
+        self.kv_total_blocks = np.ones(num_workers, dtype=np.float64)
+        self.num_requests_waiting = np.zeros(num_workers, dtype=np.float64)
+        self.gpu_cache_usage_perc = np.zeros(num_workers, dtype=np.float64)
+        self.gpu_prefix_cache_hit_rate = np.zeros(num_workers, dtype=np.float64)
+        self._overlaps = np.zeros(num_workers, dtype=np.float64)
+
+    def __len__(self) -> int:
+        return len(self.worker_ids)
+
+    def set_workers(self, worker_ids: Sequence[int]):
+        """Track the given workers, keeping the state of those already tracked"""
+        worker_ids = list(worker_ids)
+        if worker_ids == self.worker_ids:
+            return
+
+        previous = (
+            self.index,
+            self.has_metrics,
+            self.polled_active_blocks,
+            self.predicted_active_blocks,
+            self.kv_total_blocks,
+            self.num_requests_waiting,
+            self.gpu_cache_usage_perc,
+            self.gpu_prefix_cache_hit_rate,
+        )
+        self.worker_ids = worker_ids
+        self.index = {worker_id: idx for idx, worker_id in enumerate(worker_ids)}
+        self._resize(len(worker_ids))
+
+        kept = [
+            (idx, previous[0][worker_id])
+            for idx, worker_id in enumerate(worker_ids)
+            if worker_id in previous[0]
+        ]
+        if kept:
+            new_idx, old_idx = (np.array(indices) for indices in zip(*kept))
+            for array, previous_array in zip(
+                (
+                    self.has_metrics,
+                    self.polled_active_blocks,
+                    self.predicted_active_blocks,
+                    self.kv_total_blocks,
+                    self.num_requests_waiting,
+                    self.gpu_cache_usage_perc,
+                    self.gpu_prefix_cache_hit_rate,
+                ),
+                previous[1:],
+            ):
+                array[new_idx] = previous_array[old_idx]
+        if len(kept) < len(worker_ids):
+            logger.info(f"Tracking {len(worker_ids) - len(kept)} new worker(s)")
+
+    def update_metrics(self, metrics: Any):
+        """Update the table from the AggregatedMetrics of the workers, None if unavailable"""
+        self.has_metrics[:] = False
+        if not metrics:
+            logger.warning("Cannot get metrics")
+            return
+
+        rows = [
+            (
+                self.index[endpoint.worker_id],
+                endpoint.kv_active_blocks,
+                endpoint.kv_total_blocks,
+                endpoint.num_requests_waiting,
+                endpoint.gpu_cache_usage_perc,
+                endpoint.gpu_prefix_cache_hit_rate,
+            )
+            for endpoint in metrics.endpoints
+            if endpoint.worker_id in self.index
+        ]
+        if not rows:
+            return
+        columns = np.array(rows, dtype=np.float64).T
+        idx = columns[0].astype(np.intp)
+        self.has_metrics[idx] = True
+
+        polled = columns[1]
+        # a new polled value replaces the prediction, which otherwise keeps growing
+        changed = idx[polled != self.polled_active_blocks[idx]]
+        self.polled_active_blocks[idx] = polled
+        self.predicted_active_blocks[changed] = self.polled_active_blocks[changed]
+
+        self.kv_total_blocks[idx] = columns[2]
+        self.num_requests_waiting[idx] = columns[3]
+        self.gpu_cache_usage_perc[idx] = columns[4]
+        self.gpu_prefix_cache_hit_rate[idx] = columns[5]
+
+    def overlaps(self, scores: dict[int, int]) -> np.ndarray:
+        """Overlapping blocks of each worker, from the OverlapScores scores"""
+        overlaps = self._overlaps
+        overlaps.fill(0.0)
+        for worker_id, score in scores.items():
+            idx = self.index.get(worker_id)
+            if idx is not None:
+                overlaps[idx] = score
+        return overlaps
+
+    def request_blocks(self, token_length: int) -> int:
+        return (token_length + self.block_size - 1) // self.block_size
+
+    def load(self) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """
+        Predicted active blocks, total KV blocks and waiting requests of each worker.
+        Workers without metrics have no active blocks and waiting requests, and a
+        single KV block.
+        """
+        return (
+            np.where(self.has_metrics, self.predicted_active_blocks, 0.0),
+            np.where(self.has_metrics, np.maximum(self.kv_total_blocks, 1.0), 1.0),
+            np.where(self.has_metrics, self.num_requests_waiting, 0.0),
+        )
+
+    def costs(self, overlaps: np.ndarray, token_length: int) -> np.ndarray:
+        """
+        The cost of routing a request to each worker, lower is better:
+
+            new_blocks / kv_total_blocks + active_blocks / kv_total_blocks + waiting
+        """
+        active_blocks, kv_total_blocks, num_requests_waiting = self.load()
+        return (
+            (self.request_blocks(token_length) - overlaps) / kv_total_blocks
+            + active_blocks / kv_total_blocks
+            + num_requests_waiting
+        )
+
+    def select(
+        self, costs: np.ndarray, softmax: bool = False, temperature: float = 1.0
+    ) -> Optional[int]:
+        """
+        Index of the worker to route to, the one of lowest cost (at random among ties)
+        or sampled with softmax probabilities. None if all costs are zero.
+        """
+        if len(costs) == 0 or not costs.any():
+            return None
+        if softmax:
+            return softmax_sample(costs, temperature, rng=self.rng)
+        best = np.flatnonzero(costs == costs.min())
+        if len(best) == 1:
+            return int(best[0])
+        return int(best[self.rng.integers(len(best))])
+
+    def route(self, idx: int, new_blocks: float):
+        """Predict the active blocks of a worker once a request is routed to it"""
+        self.predicted_active_blocks[idx] += new_blocks
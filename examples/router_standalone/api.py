@@ -25,7 +25,14 @@ import httpx
 import uvicorn
 from fastapi import FastAPI
 from fastapi.responses import StreamingResponse
-from router import RouterAPI, RouterRequest, RouterResponse  # Add this import
+from router import (
+    KvRouter,
+    RouterAPI,
+    RouterRequest,
+    RouterResponse,
+    RouterRpcClient,
+    make_recorder,
+)
 from transformers import PreTrainedTokenizerBase
 from vllm.config import ModelConfig
 from vllm.entrypoints.openai.protocol import (
@@ -52,6 +59,10 @@ class ServingParams:
     base_metrics_port: int
     router_port: int
     http_port: int
+    router_transport: str = "embedded"
+    router_rpc_port: int = 7001
+    router_host: str = "localhost"
+    record_decisions: Optional[str] = None
 
 
 class ServiceAPI:
@@ -65,10 +76,25 @@ class ServiceAPI:
         self.openai_serving_chat: Optional[OpenAIServingChat] = None
         self.model_config: Optional[ModelConfig] = None
         self.http_client: Optional[httpx.AsyncClient] = None
+        self.router_client: Optional[RouterRpcClient] = None
+        self.router: Optional[KvRouter] = None
 
         self.setup_routes()
 
     def setup_routes(self):
+        @self.app.get("/router/metrics")
+        async def router_metrics(reset: bool = False):
+            if self.router is None:
+                return ErrorResponse(
+                    message="Router is not embedded",
+                    type="not_found",
+                    code=404,
+                )
+            snapshot = self.router.ingest_stats.snapshot()
+            if reset:
+                self.router.ingest_stats.reset()
+            return snapshot
+
         @self.app.post("/v1/chat/completions")
         async def chat_completions(request: ChatCompletionRequest):
             if (
@@ -143,22 +169,16 @@ class ServiceAPI:
                     tokens, self.init_params.block_size
                 )
 
-                # Call router via HTTP
                 try:
-                    router_request = RouterRequest(
-                        local_hashes=local_hashes, num_tokens=num_tokens
+                    best_worker_id = await self.find_best_worker(
+                        local_hashes, num_tokens
                     )
-                    router_response = await self.http_client.post(
-                        f"http://localhost:{self.init_params.router_port}/find_best_worker",
-                        json=router_request.model_dump(),
-                        timeout=1,
-                    )
-
-                    router_response.raise_for_status()
-                    router_data = RouterResponse.model_validate(router_response.json())
-                    best_worker_id = router_data.worker_id
-
-                except (httpx.RequestError, httpx.HTTPStatusError) as e:
+                except (
+                    httpx.RequestError,
+                    httpx.HTTPStatusError,
+                    asyncio.TimeoutError,
+                    RuntimeError,
+                ) as e:
                     logger.error(f"Router request failed: {e}")
                     return ErrorResponse(
                         message="Router service unavailable",
@@ -197,6 +217,26 @@ class ServiceAPI:
                 logger.error(f"Error processing request: {e}")
                 return ErrorResponse(message=str(e), type="internal_error", code=500)
 
+    async def find_best_worker(self, local_hashes: list[int], num_tokens: int) -> int:
+        # Call the embedded router directly
+        if self.router is not None:
+            return await self.router.get_best_worker(local_hashes, num_tokens)
+
+        # Call router via the binary RPC, pipelined with the other requests
+        if self.router_client is not None:
+            return await self.router_client.find_best_worker(local_hashes, num_tokens)
+
+        # Call router via HTTP
+        assert self.http_client is not None
+        router_request = RouterRequest(local_hashes=local_hashes, num_tokens=num_tokens)
+        router_response = await self.http_client.post(
+            f"http://{self.init_params.router_host}:{self.init_params.router_port}/find_best_worker",
+            json=router_request.model_dump(),
+            timeout=1,
+        )
+        router_response.raise_for_status()
+        return RouterResponse.model_validate(router_response.json()).worker_id
+
     async def initialize_services(self):
         """Initialize workers, HTTP client, and OpenAI serving components"""
         logger.info("Initializing VllmWorkers...")
@@ -210,6 +250,22 @@ class ServiceAPI:
 
         # Initialize HTTP client for router communication
         self.http_client = httpx.AsyncClient()
+        if self.init_params.router_transport == "embedded":
+            logger.info("Initializing embedded KvRouter...")
+            self.router = KvRouter(
+                block_size=self.init_params.block_size,
+                num_workers=self.init_params.num_workers,
+                base_kv_events_port=self.init_params.base_kv_events_port,
+                base_metrics_port=self.init_params.base_metrics_port,
+                recorder=make_recorder(
+                    self.init_params.record_decisions, self.init_params.block_size
+                ),
+            )
+            await self.router.start_background_tasks()
+        elif self.init_params.router_transport == "zmq":
+            self.router_client = RouterRpcClient(
+                f"tcp://{self.init_params.router_host}:{self.init_params.router_rpc_port}"
+            )
 
         logger.info("Initializing OpenAI serving components...")
         # Initialize tokenizer and model config
@@ -267,6 +323,10 @@ class ServiceAPI:
 
         if self.http_client:
             await self.http_client.aclose()
+        if self.router_client:
+            await self.router_client.close()
+        if self.router:
+            await self.router.shutdown()
 
         logger.info("API shutdown completed")
 
@@ -301,6 +361,31 @@ def main():
         default=7000,
         help="Port for router service",
     )
+    parser.add_argument(
+        "--router-transport",
+        type=str,
+        choices=["embedded", "http", "zmq"],
+        default="embedded",
+        help="How to query the router: embedded in this process, or as a router service, over JSON over HTTP or the binary RPC over ZMQ",
+    )
+    parser.add_argument(
+        "--router-host",
+        type=str,
+        default="localhost",
+        help="Host of the router service. The router service is started in this process if localhost",
+    )
+    parser.add_argument(
+        "--router-rpc-port",
+        type=int,
+        default=7001,
+        help="Port of the binary routing RPC, with --router-transport zmq",
+    )
+    parser.add_argument(
+        "--record-decisions",
+        type=str,
+        default=None,
+        help="File to record the routing decisions to, for replay_routing.py (not with a remote router)",
+    )
     parser.add_argument(
         "--http-port", type=int, default=8000, help="Port to serve the API on"
     )
@@ -318,24 +403,31 @@ def main():
         base_metrics_port=args.base_metrics_port,
         router_port=args.router_port,
         http_port=args.http_port,
+        router_transport=args.router_transport,
+        router_rpc_port=args.router_rpc_port,
+        router_host=args.router_host,
+        record_decisions=args.record_decisions,
     )
 
-    # Create both services
+    # Create both services, unless the router is embedded or remote
     api = ServiceAPI(init_params=init_params)
-    router_api = RouterAPI(
-        block_size=args.block_size,
-        num_workers=args.num_workers,
-        base_kv_events_port=args.base_kv_events_port,
-        base_metrics_port=args.base_metrics_port,
-        port=args.router_port,
-    )
+    services = [api.start()]
+    if args.router_transport != "embedded" and args.router_host == "localhost":
+        router_api = RouterAPI(
+            block_size=args.block_size,
+            num_workers=args.num_workers,
+            base_kv_events_port=args.base_kv_events_port,
+            base_metrics_port=args.base_metrics_port,
+            port=args.router_port,
+            rpc_port=args.router_rpc_port if args.router_transport == "zmq" else None,
+            record_path=args.record_decisions,
+        )
+        services.append(router_api.start())
 
     async def run_with_shutdown():
         try:
-            # Start both services concurrently
-            await asyncio.gather(
-                api.start(), router_api.start(), return_exceptions=True
-            )
+            # Start the services concurrently
+            await asyncio.gather(*services, return_exceptions=True)
         except KeyboardInterrupt:
             logger.info("Received KeyboardInterrupt, shutting down services...")
         except Exception as e:
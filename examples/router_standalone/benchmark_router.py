@@ -0,0 +1,149 @@
+# SPDX-FileCopyrightText: Copyright (c) 2025 NVIDIA CORPORATION & AFFILIATES. All rights reserved.
+# SPDX-License-Identifier: Apache-2.0
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+Micro-benchmark of the routing decisions of KvRouter, reporting the decisions per
+second against the number of workers, for the vectorized scoring and for the
+previous per-worker Python scoring.
+
+    python benchmark_router.py --num-workers 4 16 64 256
+"""
+
+import argparse
+import asyncio
+import logging
+import time
+
+import numpy as np
+from router import KvRouter
+
+logger = logging.getLogger(__name__)
+
+
+def select_worker_reference(
+    router: KvRouter, raw_scores: dict[int, int], num_tokens: int
+) -> int:
+    """The per-worker scoring that KvRouter.select_worker replaced"""
+    overlap_scores = {
+        worker_id: raw_scores.get(worker_id, 0) * router.block_size / num_tokens
+        for worker_id in range(router.num_workers)
+    }
+
+    kv_usages = list(router.kv_usages)
+    waitings = list(router.waitings)
+
+    max_waiting = max(waitings) if waitings else 0
+    waitings_normalized = [
+        waiting / max_waiting if max_waiting else 0.0 for waiting in waitings
+    ]
+
+    logits = []
+    for worker_id in range(router.num_workers):
+        overlap = overlap_scores[worker_id]
+        usage = kv_usages[worker_id]
+        waiting = waitings_normalized[worker_id]
+        logit = 2 * overlap - usage - waiting
+        logits.append(logit)
+        logger.info(
+            f"worker_id: {worker_id}, logit = 2 * {overlap:.3f} - {usage:.3f} - {waiting:.3f} = {logit:.3f}"
+        )
+
+    logits_array = np.array(logits)
+    return int(np.random.choice(np.flatnonzero(logits_array == logits_array.max())))
+
+
+def make_requests(
+    num_workers: int, num_requests: int, block_size: int, rng: np.random.Generator
+) -> list[tuple[dict[int, int], int]]:
+    """Requests of up to 64 blocks, each partially cached on a few workers"""
+    requests = []
+    for _ in range(num_requests):
+        num_blocks = int(rng.integers(1, 65))
+        cached_on = rng.choice(
+            num_workers, size=min(num_workers, int(rng.integers(0, 5))), replace=False
+        )
+        raw_scores = {
+            int(worker_id): int(rng.integers(1, num_blocks + 1))
+            for worker_id in cached_on
+        }
+        requests.append((raw_scores, num_blocks * block_size))
+    return requests
+
+
+def decisions_per_second(select, requests) -> float:
+    start = time.perf_counter()
+    for raw_scores, num_tokens in requests:
+        select(raw_scores, num_tokens)
+    return len(requests) / (time.perf_counter() - start)
+
+
+async def benchmark(args: argparse.Namespace):
+    rng = np.random.default_rng(args.seed)
+    print(
+        f"{'Workers':>8} | {'Vectorized (decisions/s)':>24} | {'Reference (decisions/s)':>23} | {'Speedup':>7}"
+    )
+    for num_workers in args.num_workers:
+        router = KvRouter(block_size=args.block_size, num_workers=num_workers)
+        try:
+            router.kv_usages[:] = rng.random(num_workers)
+            router.waitings[:] = rng.integers(0, 16, num_workers)
+            requests = make_requests(
+                num_workers, args.num_decisions, args.block_size, rng
+            )
+
+            vectorized = decisions_per_second(router.select_worker, requests)
+            reference = decisions_per_second(
+                lambda raw_scores, num_tokens: select_worker_reference(
+                    router, raw_scores, num_tokens
+                ),
+                requests,
+            )
+            print(
+                f"{num_workers:>8} | {vectorized:>24,.0f} | {reference:>23,.0f} | {vectorized / reference:>6.1f}x"
+            )
+        finally:
+            await router.shutdown()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="KvRouter scoring micro-benchmark")
+    parser.add_argument(
+        "--num-workers",
+        type=int,
+        nargs="+",
+        default=[4, 16, 64, 256],
+        help="Numbers of workers to benchmark",
+    )
+    parser.add_argument(
+        "--num-decisions",
+        type=int,
+        default=20000,
+        help="Routing decisions per number of workers",
+    )
+    parser.add_argument(
+        "--block-size", type=int, default=64, help="Block size for caching"
+    )
+    parser.add_argument("--seed", type=int, default=0, help="Random seed")
+    args = parser.parse_args()
+
+    # the per-decision lines of the reference are formatted but not emitted, so that
+    # the comparison is of the scoring itself
+    logging.basicConfig(level=logging.WARNING)
+
+    asyncio.run(benchmark(args))
+
+
+if __name__ == "__main__":
+    main()
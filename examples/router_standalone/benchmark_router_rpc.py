@@ -0,0 +1,173 @@
+# SPDX-FileCopyrightText: Copyright (c) 2025 NVIDIA CORPORATION & AFFILIATES. All rights reserved.
+# SPDX-License-Identifier: Apache-2.0
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+Benchmark of the routing latency of the router, for JSON over HTTP and for the
+binary RPC over ZMQ, reporting the p50/p99 latencies of the routing queries and
+their throughput at each concurrency. The router is started in a subprocess.
+
+    python benchmark_router_rpc.py --num-tokens 8192 --concurrency 1 16 64
+"""
+
+import argparse
+import asyncio
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+import httpx
+import numpy as np
+from router import RouterRpcClient
+
+Query = tuple[list[int], int]
+
+
+def make_queries(
+    num_queries: int, num_tokens: int, block_size: int, rng: np.random.Generator
+) -> list[Query]:
+    num_blocks = num_tokens // block_size
+    hashes = rng.integers(0, 2**63, size=(num_queries, num_blocks), dtype=np.uint64)
+    return [(row.tolist(), num_tokens) for row in hashes]
+
+
+async def run_queries(route, queries: list[Query], concurrency: int):
+    """Latencies of the queries in seconds, and the total time taken"""
+    latencies: list[float] = []
+    remaining = iter(queries)
+
+    async def client():
+        for local_hashes, num_tokens in remaining:
+            start = time.perf_counter()
+            await route(local_hashes, num_tokens)
+            latencies.append(time.perf_counter() - start)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(client() for _ in range(concurrency)))
+    return np.array(latencies), time.perf_counter() - start
+
+
+async def wait_for_router(http_client: httpx.AsyncClient, url: str, timeout: float):
+    deadline = time.monotonic() + timeout
+    while True:
+        try:
+            response = await http_client.post(
+                url, json={"local_hashes": [], "num_tokens": 1}, timeout=1
+            )
+            if response.status_code < 500:
+                return
+        except httpx.RequestError:
+            pass
+        if time.monotonic() > deadline:
+            raise TimeoutError("Router did not start")
+        await asyncio.sleep(0.5)
+
+
+async def benchmark(args: argparse.Namespace):
+    url = f"http://localhost:{args.port}/find_best_worker"
+    http_client = httpx.AsyncClient()
+    rpc_client = RouterRpcClient(f"tcp://localhost:{args.rpc_port}")
+
+    async def route_http(local_hashes: list[int], num_tokens: int) -> int:
+        response = await http_client.post(
+            url, json={"local_hashes": local_hashes, "num_tokens": num_tokens}
+        )
+        response.raise_for_status()
+        return response.json()["worker_id"]
+
+    transports = {"http": route_http, "zmq": rpc_client.find_best_worker}
+    queries = make_queries(
+        args.num_queries,
+        args.num_tokens,
+        args.block_size,
+        np.random.default_rng(args.seed),
+    )
+
+    try:
+        await wait_for_router(http_client, url, args.startup_timeout)
+        print(
+            f"{'Transport':>9} | {'Concurrency':>11} | {'p50 (us)':>9} | {'p99 (us)':>9} | {'Queries/s':>10}"
+        )
+        for concurrency in args.concurrency:
+            for name, route in transports.items():
+                # warm up the connections
+                await run_queries(route, queries[: args.num_queries // 10], 1)
+                latencies, elapsed = await run_queries(route, queries, concurrency)
+                p50, p99 = np.percentile(latencies, [50, 99]) * 1e6
+                print(
+                    f"{name:>9} | {concurrency:>11} | {p50:>9,.0f} | {p99:>9,.0f} | {len(queries) / elapsed:>10,.0f}"
+                )
+    finally:
+        await http_client.aclose()
+        await rpc_client.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Router transport latency benchmark")
+    parser.add_argument(
+        "--num-tokens", type=int, default=8192, help="Prompt length of the queries"
+    )
+    parser.add_argument(
+        "--concurrency",
+        type=int,
+        nargs="+",
+        default=[1, 16, 64],
+        help="Numbers of queries in flight to benchmark",
+    )
+    parser.add_argument(
+        "--num-queries", type=int, default=5000, help="Queries per measurement"
+    )
+    parser.add_argument(
+        "--block-size", type=int, default=64, help="Block size for caching"
+    )
+    parser.add_argument(
+        "--num-workers", type=int, default=8, help="Number of workers of the router"
+    )
+    parser.add_argument(
+        "--port", type=int, default=7100, help="HTTP port of the router"
+    )
+    parser.add_argument(
+        "--rpc-port", type=int, default=7101, help="Binary RPC port of the router"
+    )
+    parser.add_argument(
+        "--startup-timeout",
+        type=float,
+        default=30.0,
+        help="Seconds to wait for the router to start",
+    )
+    parser.add_argument("--seed", type=int, default=0, help="Random seed")
+    args = parser.parse_args()
+
+    router = subprocess.Popen(
+        [
+            sys.executable,
+            str(Path(__file__).parent / "router.py"),
+            f"--block-size={args.block_size}",
+            f"--num-workers={args.num_workers}",
+            f"--port={args.port}",
+            f"--rpc-port={args.rpc_port}",
+        ],
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+    )
+    try:
+        asyncio.run(benchmark(args))
+    finally:
+        router.terminate()
+        router.wait()
+
+
+if __name__ == "__main__":
+    main()
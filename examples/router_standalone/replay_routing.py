@@ -0,0 +1,172 @@
+# SPDX-FileCopyrightText: Copyright (c) 2025 NVIDIA CORPORATION & AFFILIATES. All rights reserved.
+# SPDX-License-Identifier: Apache-2.0
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+Replay of recorded routing decisions with alternative cost functions, to tune their
+weights offline against real traffic.
+
+Each cost function and weights is re-run over the recorded inputs of every decision,
+and reported with how often it agrees with the recorded choice, and the prefix hit
+rate, GPU cache usage and waiting requests of the workers it chooses. The recorded
+loads are those that followed the recorded decisions, so the replay does not capture
+how alternative decisions would have changed the loads.
+
+    python replay_routing.py decisions.bin --cost standalone --weights 2,1,1 1,1,1
+"""
+
+import argparse
+from typing import Callable
+
+import numpy as np
+
+from dynamo.llm.routing_log import RoutingDecision, read_routing_log
+
+# logits of the workers of a decision, higher is better, given the block size and the
+# weights of the terms of the cost function
+CostFunction = Callable[[RoutingDecision, int, tuple[float, ...]], np.ndarray]
+
+
+def standalone_logits(
+    decision: RoutingDecision, block_size: int, weights: tuple[float, ...]
+) -> np.ndarray:
+    """
+    The cost function of router_standalone KvRouter, with weights (2, 1, 1):
+
+        logit = w0 * overlap - w1 * usage - w2 * waiting / max_waiting
+    """
+    w_overlap, w_usage, w_waiting = weights
+    overlaps = decision.overlaps * block_size / decision.num_tokens
+    max_waiting = decision.num_waiting.max(initial=0.0)
+    waitings_normalized = (
+        decision.num_waiting / max_waiting if max_waiting else decision.num_waiting
+    )
+    return (
+        w_overlap * overlaps
+        - w_usage * decision.gpu_cache_usages
+        - w_waiting * waitings_normalized
+    )
+
+
+def llm_logits(
+    decision: RoutingDecision, block_size: int, weights: tuple[float, ...]
+) -> np.ndarray:
+    """
+    The cost function of the examples/llm Router, with weights (1, 1, 1), negated so
+    that higher is better:
+
+        cost = w0 * new_blocks / kv_total_blocks + w1 * usage + w2 * waiting
+    """
+    w_new_blocks, w_usage, w_waiting = weights
+    request_blocks = (decision.num_tokens + block_size - 1) // block_size
+    new_blocks = request_blocks - decision.overlaps.astype(np.float64)
+    kv_total_blocks = np.maximum(decision.kv_total_blocks, 1)
+    return -(
+        w_new_blocks * new_blocks / kv_total_blocks
+        + w_usage * decision.gpu_cache_usages
+        + w_waiting * decision.num_waiting
+    )
+
+
+COST_FUNCTIONS: dict[str, CostFunction] = {
+    "standalone": standalone_logits,
+    "llm": llm_logits,
+}
+
+
+def replay(
+    decisions: list[RoutingDecision],
+    block_size: int,
+    cost_function: CostFunction,
+    weights: tuple[float, ...],
+) -> dict[str, float]:
+    agreements = 0
+    prefix_hit_rates = []
+    usages = []
+    waitings = []
+    for decision in decisions:
+        logits = cost_function(decision, block_size, weights)
+        best = np.flatnonzero(logits == logits.max())
+        # ties are broken at random when routing, so any of the best workers agrees
+        if np.isin(decision.worker_ids[best], decision.chosen_worker_id).any():
+            agreements += 1
+        # the first of the best workers, for the replay to be deterministic
+        chosen = best[0]
+        prefix_hit_rates.append(
+            min(decision.overlaps[chosen] * block_size / decision.num_tokens, 1.0)
+        )
+        usages.append(decision.gpu_cache_usages[chosen])
+        waitings.append(decision.num_waiting[chosen])
+
+    return {
+        "agreement": agreements / len(decisions),
+        "prefix_hit_rate": float(np.mean(prefix_hit_rates)),
+        "gpu_cache_usage": float(np.mean(usages)),
+        "num_waiting": float(np.mean(waitings)),
+    }
+
+
+def parse_weights(value: str) -> tuple[float, ...]:
+    weights = tuple(float(weight) for weight in value.split(","))
+    if len(weights) != 3:
+        raise argparse.ArgumentTypeError("weights must be 3 comma-separated numbers")
+    return weights
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Replay recorded routing decisions")
+    parser.add_argument("log", type=str, help="Routing decisions log")
+    parser.add_argument(
+        "--cost",
+        type=str,
+        choices=list(COST_FUNCTIONS),
+        default="standalone",
+        help="Cost function to replay",
+    )
+    parser.add_argument(
+        "--weights",
+        type=parse_weights,
+        nargs="+",
+        default=None,
+        help="Comma-separated weights of the terms of the cost function to replay, "
+        "(2,1,1) for standalone and (1,1,1) for llm by default",
+    )
+    args = parser.parse_args()
+
+    header, decisions_iter = read_routing_log(args.log)
+    decisions = list(decisions_iter)
+    if not decisions:
+        print(f"No routing decisions in {args.log}")
+        return
+    weights_list = args.weights or [
+        (2.0, 1.0, 1.0) if args.cost == "standalone" else (1.0, 1.0, 1.0)
+    ]
+    print(
+        f"{len(decisions)} decisions from {header['source']}, block size {header['block_size']}"
+    )
+
+    print(
+        f"{'Weights':>15} | {'Agreement':>9} | {'Prefix hit rate':>15} | {'GPU cache usage':>15} | {'Waiting':>8}"
+    )
+    for weights in weights_list:
+        stats = replay(
+            decisions, header["block_size"], COST_FUNCTIONS[args.cost], weights
+        )
+        print(
+            f"{','.join(f'{w:g}' for w in weights):>15} | {stats['agreement']:>9.1%} | {stats['prefix_hit_rate']:>15.3f} | {stats['gpu_cache_usage']:>15.3f} | {stats['num_waiting']:>8.2f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -15,18 +15,21 @@
 
 import argparse
 import asyncio
-import json
 import logging
+import struct
+import time
 from contextlib import asynccontextmanager
-from typing import List
+from typing import List, Optional, Sequence
 
 import numpy as np
 import uvicorn
 import zmq
+import zmq.asyncio
 from fastapi import FastAPI, HTTPException
 from pydantic import BaseModel
 
 from dynamo._core import RadixTree, ZmqKvEventListener
+from dynamo.llm.routing_log import RoutingRecorder
 
 logger = logging.getLogger(__name__)
 
@@ -43,6 +46,68 @@ class RouterResponse(BaseModel):
 class LoadMetrics(BaseModel):
     gpu_cache_usage: float
     num_waiting_reqs: int
+    # publication time, in seconds since the epoch
+    timestamp: Optional[float] = None
+
+
+class IngestStats:
+    """
+    Throughput of the ingestion of the KV events and load metrics, and staleness of
+    the router's view of the workers: the delay from the ZMQ messages of the KV
+    events being received to the events being applied to the index, and from the
+    load metrics being published to being applied.
+
+    The rates and maxima cover the current window, which starts when the stats are
+    created and is only restarted by an explicit reset, so reading the stats does not
+    change them.
+    """
+
+    def __init__(self):
+        self.kv_events = 0
+        self.kv_event_bursts = 0
+        self.load_updates = 0
+        self.kv_index_staleness = 0.0
+        self.load_staleness = 0.0
+        self.reset()
+
+    def reset(self):
+        """Start a new window for the rates and maxima"""
+        self.max_kv_index_staleness = 0.0
+        self.max_load_staleness = 0.0
+        # start time and counts of the window, for the rates
+        self._window_start = (time.monotonic(), self.kv_events, self.load_updates)
+
+    def record_kv_events(self, num_events: int, received_at: float):
+        self.kv_events += num_events
+        self.kv_event_bursts += 1
+        self.kv_index_staleness = max(time.time() - received_at, 0.0)
+        self.max_kv_index_staleness = max(
+            self.max_kv_index_staleness, self.kv_index_staleness
+        )
+
+    def record_load(self, published_at: Optional[float]):
+        self.load_updates += 1
+        if published_at is not None:
+            self.load_staleness = max(time.time() - published_at, 0.0)
+            self.max_load_staleness = max(self.max_load_staleness, self.load_staleness)
+
+    def snapshot(self) -> dict[str, float]:
+        """Current stats, with the rates and maxima of the current window"""
+        start_time, start_kv_events, start_load_updates = self._window_start
+        elapsed = max(time.monotonic() - start_time, 1e-9)
+        return {
+            "kv_events_total": self.kv_events,
+            "kv_event_bursts_total": self.kv_event_bursts,
+            "load_updates_total": self.load_updates,
+            "window_seconds": elapsed,
+            "kv_events_per_second": (self.kv_events - start_kv_events) / elapsed,
+            "load_updates_per_second": (self.load_updates - start_load_updates)
+            / elapsed,
+            "kv_index_staleness_seconds": self.kv_index_staleness,
+            "max_kv_index_staleness_seconds": self.max_kv_index_staleness,
+            "load_staleness_seconds": self.load_staleness,
+            "max_load_staleness_seconds": self.max_load_staleness,
+        }
 
 
 def setup_zmq_subscriber(context: zmq.Context, endpoint: str) -> zmq.Socket[bytes]:
@@ -50,7 +115,6 @@ def setup_zmq_subscriber(context: zmq.Context, endpoint: str) -> zmq.Socket[byte
     socket.connect(endpoint)
     socket.setsockopt(zmq.SUBSCRIBE, b"")  # Subscribe to all messages
     socket.setsockopt(zmq.CONFLATE, 1)  # Only keep latest message
-    socket.setsockopt(zmq.RCVTIMEO, 1)  # 1ms timeout (very short)
     return socket
 
 
@@ -61,16 +125,28 @@ class KvRouter:
         num_workers: int = 4,
         base_kv_events_port: int = 5557,
         base_metrics_port: int = 5657,
+        recorder: Optional[RoutingRecorder] = None,
     ):
         self.num_workers = num_workers
         self.block_size = block_size
+        # records the inputs and outcome of each routing decision, for replay
+        self.recorder = recorder
+        self._worker_ids = np.arange(num_workers)
 
         self.radix_tree = RadixTree()
 
-        self.kv_usages = [0.0] * num_workers
-        self.waitings = [0] * num_workers
+        # worker state is held in preallocated arrays indexed by worker_id, so that
+        # scoring is vectorized over the workers
+        self.kv_usages = np.zeros(num_workers, dtype=np.float64)
+        self.waitings = np.zeros(num_workers, dtype=np.float64)
+        self._overlaps = np.zeros(num_workers, dtype=np.float64)
+        self._waitings_normalized = np.zeros(num_workers, dtype=np.float64)
+        self._logits = np.zeros(num_workers, dtype=np.float64)
+        self.rng = np.random.default_rng()
 
-        self.context = zmq.Context()
+        self.ingest_stats = IngestStats()
+
+        self.context = zmq.asyncio.Context()
         self.load_listeners = [
             setup_zmq_subscriber(
                 self.context, f"tcp://localhost:{base_metrics_port + worker_id}"
@@ -90,54 +166,74 @@ class KvRouter:
     async def start_background_tasks(self):
         """Start background tasks for load and indexer updates"""
         logger.info("Starting router background tasks...")
-        self.background_tasks.append(asyncio.create_task(self.periodic_update_load()))
-        self.background_tasks.append(
-            asyncio.create_task(self.periodic_update_indexer())
-        )
-
-    async def periodic_update_load(self):
-        async def update_load(worker_id: int):
-            while True:
+        self.background_tasks.append(asyncio.create_task(self.ingest_load_metrics()))
+        self.background_tasks.append(asyncio.create_task(self.ingest_kv_events()))
+
+    async def ingest_load_metrics(self):
+        """Apply the load metrics of all workers as they are published, with a single poller"""
+        poller = zmq.asyncio.Poller()
+        worker_ids = {}
+        for worker_id, listener in enumerate(self.load_listeners):
+            poller.register(listener, zmq.POLLIN)
+            worker_ids[listener] = worker_id
+
+        while True:
+            for listener, _ in await poller.poll():
+                worker_id = worker_ids[listener]
                 try:
-                    metrics_dict = self.load_listeners[worker_id].recv_json(zmq.NOBLOCK)
-                    metrics = LoadMetrics.model_validate(metrics_dict)
+                    # conflated, so only the latest metrics are pending
+                    metrics = LoadMetrics.model_validate_json(await listener.recv())
                     self.kv_usages[worker_id] = metrics.gpu_cache_usage
                     self.waitings[worker_id] = metrics.num_waiting_reqs
-                except zmq.Again:
-                    pass
+                    self.ingest_stats.record_load(metrics.timestamp)
                 except Exception as e:
                     logger.warning(
                         f"Error receiving metrics for worker {worker_id}: {e}"
                     )
 
-                await asyncio.sleep(0.1)
-
-        for worker_id in range(self.num_workers):
-            asyncio.create_task(update_load(worker_id))
-
-    async def periodic_update_indexer(self):
-        async def update_tree(worker_id: int):
-            while True:
-                try:
-                    kv_events: list[str] = await self.kv_listeners[
-                        worker_id
-                    ].get_events()
-                    for event in kv_events:
-                        event = json.loads(event)
-                        self.radix_tree.apply_event(
-                            worker_id, json.dumps(event).encode("utf-8")
+    async def ingest_kv_events(self):
+        """
+        Apply the KV events of all workers to the index as they arrive, draining the
+        events of a listener in bursts. The events are passed to the index as the
+        JSON bytes received from the listener.
+        """
+        pending = {
+            asyncio.ensure_future(listener.wait_events()): worker_id
+            for worker_id, listener in enumerate(self.kv_listeners)
+        }
+        try:
+            while pending:
+                done, _ = await asyncio.wait(
+                    pending, return_when=asyncio.FIRST_COMPLETED
+                )
+                for future in done:
+                    worker_id = pending.pop(future)
+                    try:
+                        events, received_at = future.result()
+                    except Exception as e:
+                        logger.warning(
+                            f"Error receiving KV events for worker {worker_id}: {e}"
                         )
-                except zmq.Again:
-                    pass
-                except Exception as e:
-                    logger.warning(
-                        f"Error receiving KV events for worker {worker_id}: {e}"
-                    )
-
-                await asyncio.sleep(0.1)
-
-        for worker_id in range(self.num_workers):
-            asyncio.create_task(update_tree(worker_id))
+                    else:
+                        if not events:
+                            logger.warning(
+                                f"KV event listener of worker {worker_id} shut down"
+                            )
+                            continue
+                        for event in events:
+                            try:
+                                self.radix_tree.apply_event(worker_id, event)
+                            except ValueError as e:
+                                logger.warning(
+                                    f"Error applying KV event of worker {worker_id}: {e}"
+                                )
+                        self.ingest_stats.record_kv_events(len(events), received_at)
+
+                    listener = self.kv_listeners[worker_id]
+                    pending[asyncio.ensure_future(listener.wait_events())] = worker_id
+        finally:
+            for future in pending:
+                future.cancel()
 
     async def get_best_worker(self, local_hashes: list[int], num_tokens: int) -> int:
         try:
@@ -146,37 +242,19 @@ class KvRouter:
 
             # local_hashes can be empty
             raw_scores = self.radix_tree.find_matches(local_hashes).scores
-
-            overlap_scores = {
-                worker_id: raw_scores.get(worker_id, 0) * self.block_size / num_tokens
-                for worker_id in range(self.num_workers)
-            }
-
-            kv_usages = self.kv_usages[:]
-            waitings = self.waitings[:]
-
-            max_waiting = max(waitings) if waitings else 0
-            waitings_normalized = [
-                waiting / max_waiting if max_waiting else 0.0 for waiting in waitings
-            ]
-
-            logits = []
-            for worker_id in range(self.num_workers):
-                overlap = overlap_scores[worker_id]
-                usage = kv_usages[worker_id]
-                waiting = waitings_normalized[worker_id]
-                logit = 2 * overlap - usage - waiting
-                logits.append(logit)
-                logger.info(
-                    f"worker_id: {worker_id}, logit = 2 * {overlap:.3f} - {usage:.3f} - {waiting:.3f} = {logit:.3f}"
+            best_worker_id = self.select_worker(raw_scores, num_tokens)
+            if self.recorder is not None:
+                self.recorder.record(
+                    local_hashes,
+                    num_tokens,
+                    self._worker_ids,
+                    raw_scores,
+                    self.kv_usages,
+                    self.waitings,
+                    best_worker_id,
                 )
 
-            logits_array = np.array(logits)
-            best_worker_id = int(
-                np.random.choice(np.flatnonzero(logits_array == logits_array.max()))
-            )
-
-            # this is a predictive update which will be reset as new metrics are polled
+            # this is a predictive update which will be reset as new metrics are received
             # but it is helpful for handling short bursts of highly concurrent requests
             # we omit updating the gpu_usage_perc as done in the rusty router for simplicity
             # as this requires obtaining num_gpu_blocks from the engines and can be intrusive
@@ -189,6 +267,51 @@ class KvRouter:
             logger.error(f"Error in get_best_worker: {e}")
             raise
 
+    def select_worker(self, raw_scores: dict[int, int], num_tokens: int) -> int:
+        """
+        Select the worker with the highest logit, breaking ties at random, where
+
+            logit = 2 * overlap - usage - waiting / max_waiting
+
+        and overlap is the fraction of the request tokens cached on the worker.
+        The logits of all workers are computed at once, in preallocated arrays.
+        """
+        overlaps = self._overlaps
+        overlaps.fill(0.0)
+        if raw_scores:
+            worker_ids = np.fromiter(
+                raw_scores.keys(), dtype=np.int64, count=len(raw_scores)
+            )
+            scores = np.fromiter(
+                raw_scores.values(), dtype=np.float64, count=len(raw_scores)
+            )
+            known = worker_ids < self.num_workers
+            overlaps[worker_ids[known]] = scores[known]
+            overlaps *= self.block_size / num_tokens
+
+        waitings_normalized = self._waitings_normalized
+        max_waiting = self.waitings.max()
+        if max_waiting > 0:
+            np.divide(self.waitings, max_waiting, out=waitings_normalized)
+        else:
+            waitings_normalized.fill(0.0)
+
+        logits = self._logits
+        np.multiply(overlaps, 2.0, out=logits)
+        logits -= self.kv_usages
+        logits -= waitings_normalized
+
+        if logger.isEnabledFor(logging.DEBUG):
+            for worker_id in range(self.num_workers):
+                logger.debug(
+                    f"worker_id: {worker_id}, logit = 2 * {overlaps[worker_id]:.3f} - {self.kv_usages[worker_id]:.3f} - {waitings_normalized[worker_id]:.3f} = {logits[worker_id]:.3f}"
+                )
+
+        best_worker_ids = np.flatnonzero(logits == logits.max())
+        if len(best_worker_ids) == 1:
+            return int(best_worker_ids[0])
+        return int(best_worker_ids[self.rng.integers(len(best_worker_ids))])
+
     async def shutdown(self):
         """Shutdown ZMQ listeners, context, and background tasks"""
         logger.info("Shutting down KvRouter...")
@@ -207,6 +330,10 @@ class KvRouter:
             except Exception as e:
                 logger.error(f"Error closing load listener: {e}")
 
+        if self.recorder is not None:
+            self.recorder.close()
+            logger.info(f"Recorded {self.recorder.num_records} routing decisions")
+
         # Terminate ZMQ context
         try:
             self.context.term()
@@ -217,6 +344,173 @@ class KvRouter:
         logger.info("KvRouter shutdown completed")
 
 
+# Binary routing RPC. A message is a batch of queries, each a header followed by the
+# block hashes as little-endian u64, and is answered by one message of a reply per
+# query, in the same order. The worker ID of a query that could not be routed is -1.
+QUERY_HEADER = struct.Struct("<QII")  # query_id, num_tokens, num_hashes
+REPLY_DTYPE = np.dtype([("query_id", "<u8"), ("worker_id", "<i8")])
+
+
+def encode_queries(queries: Sequence[tuple[int, Sequence[int], int]]) -> bytes:
+    """Encode (query_id, local_hashes, num_tokens) queries into one message"""
+    parts = []
+    for query_id, local_hashes, num_tokens in queries:
+        parts.append(QUERY_HEADER.pack(query_id, num_tokens, len(local_hashes)))
+        parts.append(np.asarray(local_hashes, dtype="<u8").tobytes())
+    return b"".join(parts)
+
+
+def decode_queries(message: bytes) -> list[tuple[int, list[int], int]]:
+    queries = []
+    offset = 0
+    while offset < len(message):
+        query_id, num_tokens, num_hashes = QUERY_HEADER.unpack_from(message, offset)
+        offset += QUERY_HEADER.size
+        local_hashes = np.frombuffer(message, "<u8", num_hashes, offset).tolist()
+        offset += 8 * num_hashes
+        queries.append((query_id, local_hashes, num_tokens))
+    return queries
+
+
+class RouterRpcServer:
+    """Serves the routing queries of the binary RPC on a ZMQ ROUTER socket"""
+
+    def __init__(self, router: KvRouter, endpoint: str):
+        self.router = router
+        self.context = zmq.asyncio.Context()
+        self.socket = self.context.socket(zmq.ROUTER)
+        self.socket.bind(endpoint)
+        logger.info(f"Router RPC listening on {endpoint}")
+
+    async def serve(self):
+        while True:
+            identity, message = await self.socket.recv_multipart()
+            try:
+                queries = decode_queries(message)
+            except (struct.error, ValueError) as e:
+                logger.error(f"Dropping malformed routing queries: {e}")
+                continue
+
+            replies = np.empty(len(queries), dtype=REPLY_DTYPE)
+            for idx, (query_id, local_hashes, num_tokens) in enumerate(queries):
+                try:
+                    worker_id = await self.router.get_best_worker(
+                        local_hashes, num_tokens
+                    )
+                except Exception as e:
+                    logger.error(f"Error finding best worker: {e}")
+                    worker_id = -1
+                replies[idx] = (query_id, worker_id)
+            await self.socket.send_multipart([identity, replies.tobytes()])
+
+    def close(self):
+        self.socket.close(linger=0)
+        self.context.term()
+
+
+class RouterRpcClient:
+    """
+    Client of the binary routing RPC, over a persistent ZMQ DEALER connection.
+
+    Queries are pipelined: they do not wait for the replies to the previous ones, and
+    the queries issued in the same iteration of the event loop are sent as a single
+    batch message.
+    """
+
+    def __init__(self, endpoint: str, timeout: float = 1.0):
+        self.timeout = timeout
+        self.context = zmq.asyncio.Context()
+        self.socket = self.context.socket(zmq.DEALER)
+        self.socket.connect(endpoint)
+        self.next_query_id = 0
+        self.pending: dict[int, asyncio.Future] = {}
+        self.outbox: list[tuple[int, Sequence[int], int]] = []
+        self.receive_task: Optional[asyncio.Task] = None
+
+    async def find_best_worker(
+        self, local_hashes: Sequence[int], num_tokens: int
+    ) -> int:
+        return (await self.find_best_workers([(local_hashes, num_tokens)]))[0]
+
+    async def find_best_workers(
+        self, queries: Sequence[tuple[Sequence[int], int]]
+    ) -> list[int]:
+        """Worker IDs for (local_hashes, num_tokens) queries, routed in order"""
+        loop = asyncio.get_running_loop()
+        if self.receive_task is None or self.receive_task.done():
+            self.receive_task = asyncio.create_task(self._receive())
+            self.receive_task.add_done_callback(self._fail_pending)
+        if not self.outbox:
+            loop.call_soon(self._flush)
+
+        futures = []
+        for local_hashes, num_tokens in queries:
+            query_id = self.next_query_id
+            self.next_query_id += 1
+            future = loop.create_future()
+            self.pending[query_id] = future
+            self.outbox.append((query_id, local_hashes, num_tokens))
+            futures.append((query_id, future))
+
+        try:
+            worker_ids = await asyncio.wait_for(
+                asyncio.gather(*(future for _, future in futures)), self.timeout
+            )
+        finally:
+            for query_id, _ in futures:
+                self.pending.pop(query_id, None)
+        if -1 in worker_ids:
+            raise RuntimeError("Router failed to route the request")
+        return worker_ids
+
+    def _flush(self):
+        queries, self.outbox = self.outbox, []
+        if queries:
+            sent = asyncio.ensure_future(self.socket.send(encode_queries(queries)))
+            sent.add_done_callback(self._check_sent)
+
+    def _check_sent(self, sent: asyncio.Future):
+        if not sent.cancelled() and sent.exception() is not None:
+            logger.error(f"Failed to send routing queries: {sent.exception()}")
+
+    async def _receive(self):
+        while True:
+            replies = np.frombuffer(await self.socket.recv(), dtype=REPLY_DTYPE)
+            for query_id, worker_id in replies.tolist():
+                future = self.pending.get(query_id)
+                # replies to the queries that timed out are dropped
+                if future is not None and not future.done():
+                    future.set_result(worker_id)
+
+    def _fail_pending(self, receive_task: asyncio.Task):
+        # the queries waiting for a reply would otherwise only fail on their timeout;
+        # the receive task is restarted by the next query
+        if receive_task.cancelled():
+            error: BaseException = ConnectionError("Router RPC client closed")
+        else:
+            error = receive_task.exception() or ConnectionError(
+                "Router RPC receive task exited"
+            )
+            logger.error(f"Failed to receive routing replies: {error}")
+        for future in self.pending.values():
+            if not future.done():
+                future.set_exception(error)
+
+    async def close(self):
+        if self.receive_task is not None:
+            self.receive_task.cancel()
+            await asyncio.gather(self.receive_task, return_exceptions=True)
+        self.socket.close(linger=0)
+        self.context.term()
+
+
+def make_recorder(record_path: Optional[str], block_size: int):
+    if record_path is None:
+        return None
+    logger.info(f"Recording the routing decisions to {record_path}")
+    return RoutingRecorder(record_path, block_size, source="router_standalone")
+
+
 class RouterAPI:
     def __init__(
         self,
@@ -225,13 +519,18 @@ class RouterAPI:
         base_kv_events_port: int = 5557,
         base_metrics_port: int = 5657,
         port: int = 7000,
+        rpc_port: Optional[int] = None,
+        record_path: Optional[str] = None,
     ):
         self.port = port
+        self.rpc_port = rpc_port
+        self.record_path = record_path
+        self.rpc_server: Optional[RouterRpcServer] = None
         self.block_size = block_size
         self.num_workers = num_workers
         self.base_kv_events_port = base_kv_events_port
         self.base_metrics_port = base_metrics_port
-        self.router = None
+        self.router: Optional[KvRouter] = None
         self.app = FastAPI(
             title="KV Router API", version="0.0.1", lifespan=self.lifespan
         )
@@ -240,13 +539,18 @@ class RouterAPI:
     @asynccontextmanager
     async def lifespan(self, app: FastAPI):
         # Startup
-        self.router = KvRouter(
+        router = KvRouter(
             block_size=self.block_size,
             num_workers=self.num_workers,
             base_kv_events_port=self.base_kv_events_port,
             base_metrics_port=self.base_metrics_port,
+            recorder=make_recorder(self.record_path, self.block_size),
         )
-        await self.router.start_background_tasks()
+        self.router = router
+        await router.start_background_tasks()
+        if self.rpc_port is not None:
+            self.rpc_server = RouterRpcServer(router, f"tcp://*:{self.rpc_port}")
+            router.background_tasks.append(asyncio.create_task(self.rpc_server.serve()))
         logger.info("Router API started successfully")
 
         yield
@@ -254,8 +558,19 @@ class RouterAPI:
         # Shutdown
         if self.router:
             await self.router.shutdown()
+        if self.rpc_server:
+            self.rpc_server.close()
 
     def setup_routes(self):
+        @self.app.get("/metrics")
+        async def metrics(reset: bool = False):
+            if self.router is None:
+                raise HTTPException(status_code=503, detail="Router not initialized")
+            snapshot = self.router.ingest_stats.snapshot()
+            if reset:
+                self.router.ingest_stats.reset()
+            return snapshot
+
         @self.app.post("/find_best_worker", response_model=RouterResponse)
         async def find_best_worker(request: RouterRequest):
             if self.router is None:
@@ -300,6 +615,18 @@ def main():
     parser.add_argument(
         "--port", type=int, default=7000, help="Port to serve the Router API on"
     )
+    parser.add_argument(
+        "--rpc-port",
+        type=int,
+        default=None,
+        help="Port to also serve the binary routing RPC on (disabled if not set)",
+    )
+    parser.add_argument(
+        "--record-decisions",
+        type=str,
+        default=None,
+        help="File to record the routing decisions to, for replay_routing.py",
+    )
 
     args = parser.parse_args()
 
@@ -312,6 +639,8 @@ def main():
         base_kv_events_port=args.base_kv_events_port,
         base_metrics_port=args.base_metrics_port,
         port=args.port,
+        rpc_port=args.rpc_port,
+        record_path=args.record_decisions,
     )
 
     async def run_with_shutdown():
@@ -16,6 +16,7 @@
 
 import logging
 import os
+import time
 import uuid
 from typing import AsyncGenerator, Optional
 
@@ -48,6 +49,8 @@ class MetricsPublisher(StatLoggerBase):
         metrics_data = {
             "num_waiting_reqs": scheduler_stats.num_waiting_reqs,
             "gpu_cache_usage": scheduler_stats.gpu_cache_usage,
+            # for the router to measure the staleness of its view of the load
+            "timestamp": time.time(),
         }
 
         self.socket.send_json(metrics_data)
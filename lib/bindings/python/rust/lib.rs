@@ -99,6 +99,7 @@ fn _core(m: &Bound<'_, PyModule>) -> PyResult<()> {
     m.add_class::<http::HttpError>()?;
     m.add_class::<http::HttpAsyncEngine>()?;
     m.add_class::<EtcdKvCache>()?;
+    m.add_class::<EtcdWatchStream>()?;
     m.add_class::<ModelType>()?;
     m.add_class::<llm::kv::ForwardPassMetrics>()?;
     m.add_class::<llm::kv::WorkerStats>()?;
@@ -192,6 +193,11 @@ struct EtcdClient {
     inner: rs::transports::etcd::Client,
 }
 
+#[pyclass]
+struct EtcdWatchStream {
+    rx: Arc<Mutex<tokio::sync::mpsc::Receiver<rs::transports::etcd::WatchEvent>>>,
+}
+
 #[pyclass]
 #[derive(Clone)]
 struct CancellationToken {
@@ -613,6 +619,26 @@ impl EtcdClient {
         })
     }
 
+    /// Get all keys with a given prefix as put events, followed by the put and delete
+    /// events of the keys with that prefix
+    fn kv_get_and_watch_prefix<'p>(
+        &self,
+        py: Python<'p>,
+        prefix: String,
+    ) -> PyResult<Bound<'p, PyAny>> {
+        let client = self.inner.clone();
+        pyo3_async_runtimes::tokio::future_into_py(py, async move {
+            let watcher = client
+                .kv_get_and_watch_prefix(prefix)
+                .await
+                .map_err(to_pyerr)?;
+            let (_prefix, _watcher, rx) = watcher.dissolve();
+            Ok(EtcdWatchStream {
+                rx: Arc::new(Mutex::new(rx)),
+            })
+        })
+    }
+
     fn revoke_lease<'p>(&self, py: Python<'p>, lease_id: i64) -> PyResult<Bound<'p, PyAny>> {
         let client = self.inner.clone();
         pyo3_async_runtimes::tokio::future_into_py(py, async move {
@@ -843,6 +869,37 @@ impl AsyncResponseStream {
     }
 }
 
+#[pymethods]
+impl EtcdWatchStream {
+    /// This method is required to implement the `AsyncIterator` protocol.
+    #[pyo3(name = "__aiter__")]
+    fn aiter(slf: PyRef<Self>, py: Python) -> PyResult<Py<PyAny>> {
+        slf.into_py_any(py)
+    }
+    /// This method is required to implement the `AsyncIterator` protocol.
+    #[pyo3(name = "__anext__")]
+    fn next<'p>(&self, py: Python<'p>) -> PyResult<Bound<'p, PyAny>> {
+        let rx = self.rx.clone();
+
+        pyo3_async_runtimes::tokio::future_into_py(py, async move {
+            let (event, kv) = match rx.lock().await.recv().await {
+                Some(rs::transports::etcd::WatchEvent::Put(kv)) => ("put", kv),
+                Some(rs::transports::etcd::WatchEvent::Delete(kv)) => ("delete", kv),
+                None => return Err(PyStopAsyncIteration::new_err("Watch stream closed")),
+            };
+            Python::with_gil(|py| {
+                let dict = PyDict::new(py);
+                dict.set_item("event", event)?;
+                dict.set_item("key", String::from_utf8_lossy(kv.key()).to_string())?;
+                dict.set_item("value", PyBytes::new(py, kv.value()))?;
+                dict.set_item("mod_revision", kv.mod_revision())?;
+                dict.set_item("lease", kv.lease())?;
+                Ok::<Py<PyDict>, PyErr>(dict.into())
+            })
+        })
+    }
+}
+
 #[pyclass]
 struct Annotated {
     inner: RsAnnotated<PyObject>,
@@ -15,6 +15,7 @@
 
 use std::collections::HashMap;
 use std::sync::atomic::AtomicU32;
+use std::time::{SystemTime, UNIX_EPOCH};
 
 use super::*;
 use llm_rs::kv_router::indexer::compute_block_hash_for_seq;
@@ -149,7 +150,8 @@ impl ZmqKvEventPublisher {
 /// of the dynamo runtime or event plane infrastructure.
 #[pyclass]
 pub(crate) struct ZmqKvEventListener {
-    event_receiver: Arc<tokio::sync::Mutex<tokio::sync::mpsc::UnboundedReceiver<KvCacheEvent>>>,
+    event_receiver:
+        Arc<tokio::sync::Mutex<tokio::sync::mpsc::UnboundedReceiver<(KvCacheEvent, SystemTime)>>>,
     shutdown_token: tokio_util::sync::CancellationToken,
 }
 
@@ -163,10 +165,10 @@ impl ZmqKvEventListener {
 
         let runtime = pyo3_async_runtimes::tokio::get_runtime();
         runtime.block_on(async {
-            let (tx, rx) = tokio::sync::mpsc::unbounded_channel::<KvCacheEvent>();
+            let (tx, rx) = tokio::sync::mpsc::unbounded_channel::<(KvCacheEvent, SystemTime)>();
             let shutdown_token = tokio_util::sync::CancellationToken::new();
 
-            tokio::spawn(llm_rs::kv_router::publisher::start_zmq_listener(
+            tokio::spawn(llm_rs::kv_router::publisher::start_timed_zmq_listener(
                 zmq_endpoint,
                 zmq_topic,
                 tx,
@@ -188,7 +190,7 @@ impl ZmqKvEventListener {
             let mut events = Vec::new();
 
             // Drain all available events
-            while let Ok(event) = rx.try_recv() {
+            while let Ok((event, _)) = rx.try_recv() {
                 events.push(event);
             }
 
@@ -205,6 +207,51 @@ impl ZmqKvEventListener {
             }
         })
     }
+
+    /// Wait until at least one event is available, then drain all the available
+    /// events. Returns the events as JSON bytes, which can be passed as is to
+    /// RadixTree.apply_event, and the time (seconds since the epoch) at which the ZMQ
+    /// message of the first, so oldest, event was received. The list is empty once the
+    /// listener is shut down.
+    fn wait_events<'p>(&self, py: Python<'p>) -> PyResult<Bound<'p, PyAny>> {
+        let receiver = self.event_receiver.clone();
+        pyo3_async_runtimes::tokio::future_into_py(py, async move {
+            let mut rx = receiver.lock().await;
+            let mut events = Vec::new();
+            let mut received_at = 0.0;
+            if let Some((event, first_received_at)) = rx.recv().await {
+                events.push(event);
+                received_at = first_received_at
+                    .duration_since(UNIX_EPOCH)
+                    .map(|elapsed| elapsed.as_secs_f64())
+                    .unwrap_or_default();
+            }
+
+            // Drain all available events
+            while let Ok((event, _)) = rx.try_recv() {
+                events.push(event);
+            }
+
+            let json_events = events
+                .iter()
+                .map(serde_json::to_vec)
+                .collect::<Result<Vec<_>, _>>()
+                .map_err(|e| {
+                    PyErr::new::<pyo3::exceptions::PyValueError, _>(format!(
+                        "Failed to serialize events to JSON: {}",
+                        e
+                    ))
+                })?;
+
+            Python::with_gil(|py| {
+                let events: Vec<Py<PyBytes>> = json_events
+                    .iter()
+                    .map(|event| PyBytes::new(py, event).unbind())
+                    .collect();
+                Ok((events, received_at))
+            })
+        })
+    }
 }
 
 // manual shutdown needed as it's not tied to the dynamo DRT
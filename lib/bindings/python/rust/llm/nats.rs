@@ -100,6 +100,28 @@ impl NatsQueue {
         })
     }
 
+    #[pyo3(signature = (max_messages, timeout=None))]
+    fn dequeue_tasks<'p>(
+        &mut self,
+        py: Python<'p>,
+        max_messages: usize,
+        timeout: Option<f64>,
+    ) -> PyResult<Bound<'p, PyAny>> {
+        let queue = self.inner.clone();
+        pyo3_async_runtimes::tokio::future_into_py(py, async move {
+            let timeout_duration = timeout.map(std::time::Duration::from_secs_f64);
+            Ok(queue
+                .lock()
+                .await
+                .dequeue_tasks(max_messages, timeout_duration)
+                .await
+                .map_err(to_pyerr)?
+                .into_iter()
+                .map(|bytes| bytes.to_vec())
+                .collect::<Vec<_>>())
+        })
+    }
+
     fn get_queue_size<'p>(&mut self, py: Python<'p>) -> PyResult<Bound<'p, PyAny>> {
         let queue = self.inner.clone();
         pyo3_async_runtimes::tokio::future_into_py(py, async move {
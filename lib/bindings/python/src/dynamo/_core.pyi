@@ -21,6 +21,7 @@ from typing import (
     Dict,
     List,
     Optional,
+    Tuple,
     Union,
 )
 
@@ -110,6 +111,25 @@ class EtcdClient:
         """
         ...
 
+    async def kv_get_and_watch_prefix(self, prefix: str) -> EtcdWatchStream:
+        """
+        Get all keys with a given prefix as put events, followed by the put and delete
+        events of the keys with that prefix
+        """
+        ...
+
+class EtcdWatchStream:
+    """
+    The events of the keys with a given prefix, as dictionaries with the "event" ("put"
+    or "delete"), "key", "value", "mod_revision" and "lease" of the key
+    """
+
+    def __aiter__(self) -> AsyncIterator[Dict[str, JsonLike]]:
+        ...
+
+    async def __anext__(self) -> Dict[str, JsonLike]:
+        ...
+
 class EtcdKvCache:
     """
     A cache for key-value pairs stored in etcd.
@@ -907,6 +927,23 @@ class NatsQueue:
         """
         ...
 
+    async def dequeue_tasks(
+        self, max_messages: int, timeout: Optional[float] = None
+    ) -> List[bytes]:
+        """
+        Dequeue up to max_messages tasks from the NATS JetStream in a single fetch
+
+        Args:
+            max_messages: Maximum number of tasks to dequeue
+            timeout: Optional timeout in seconds to wait for the first task.
+                    If None, uses the default timeout specified during initialization.
+
+        Returns:
+            The first task and the tasks already queued with it, up to max_messages,
+            empty if no task is available
+        """
+        ...
+
     async def get_queue_size(self) -> int:
         """
         Get the current size of the queue
@@ -1157,6 +1194,22 @@ class ZmqKvEventListener:
         """
         ...
 
+    async def wait_events(self) -> Tuple[List[bytes], float]:
+        """
+        Wait until at least one KV cache event is available, then get all the
+        available events.
+
+        Returns:
+            List of JSON-serialized KV cache events as bytes, which can be passed
+            as is to RadixTree.apply_event (empty once the listener is shut down),
+            and the time in seconds since the epoch at which the ZMQ message of the
+            first, so oldest, event was received
+
+        Raises:
+            ValueError: If events cannot be serialized to JSON
+        """
+        ...
+
 class EntrypointArgs:
     """
     Settings to connect an input to a worker and run them.
@@ -0,0 +1,180 @@
+# SPDX-FileCopyrightText: Copyright (c) 2025 NVIDIA CORPORATION & AFFILIATES. All rights reserved.
+# SPDX-License-Identifier: Apache-2.0
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+Binary log of the routing decisions of a KV router, for replaying them offline.
+
+It is written by the routers of examples/router_standalone and examples/llm, and
+read by examples/router_standalone/replay_routing.py. This module requires numpy.
+
+The log starts with MAGIC, which ends with FORMAT_VERSION, and a length-prefixed
+JSON header (block size, source), followed by one record per decision, all
+little-endian:
+
+    RECORD_HEADER    timestamp (f64), num_tokens (u32), num_hashes (u32),
+                     num_workers (u32), chosen worker ID (i64)
+    num_hashes       block hashes of the request (u64)
+    num_workers      worker IDs (i64)
+    num_workers      overlapping blocks of each worker (u32)
+    num_workers      GPU cache usage of each worker, in [0, 1] (f32)
+    num_workers      waiting requests of each worker (f32)
+    num_workers      total KV blocks of each worker, 0 if unknown (u32)
+"""
+
+import json
+import struct
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import BinaryIO, Iterator, Mapping, Optional, Sequence
+
+import numpy as np
+
+FORMAT_VERSION = 1
+MAGIC = b"DYNRLOG%d" % FORMAT_VERSION
+HEADER_LENGTH = struct.Struct("<I")
+RECORD_HEADER = struct.Struct("<dIIIq")
+
+
+@dataclass
+class RoutingDecision:
+    timestamp: float
+    num_tokens: int
+    local_hashes: np.ndarray
+    worker_ids: np.ndarray
+    overlaps: np.ndarray
+    gpu_cache_usages: np.ndarray
+    num_waiting: np.ndarray
+    kv_total_blocks: np.ndarray
+    chosen_worker_id: int
+
+
+class RoutingRecorder:
+    """Appends the routing decisions to a binary log, flushed every flush_every decisions"""
+
+    def __init__(
+        self, path: Path | str, block_size: int, source: str, flush_every: int = 256
+    ):
+        self.file: BinaryIO = open(path, "wb")
+        self.flush_every = flush_every
+        header = json.dumps({"block_size": block_size, "source": source}).encode()
+        self.file.write(MAGIC + HEADER_LENGTH.pack(len(header)) + header)
+        self.num_records = 0
+
+    def record(
+        self,
+        local_hashes: Sequence[int],
+        num_tokens: int,
+        worker_ids: Sequence[int],
+        overlaps: Sequence[int] | Mapping[int, int],
+        gpu_cache_usages: Sequence[float],
+        num_waiting: Sequence[float],
+        chosen_worker_id: int,
+        kv_total_blocks: Optional[Sequence[int]] = None,
+    ):
+        """
+        Record a decision. The per-worker inputs are in the order of worker_ids,
+        except overlaps, which can also map the worker IDs with overlapping blocks to
+        their number of blocks.
+        """
+        if isinstance(overlaps, Mapping):
+            overlaps = [overlaps.get(worker_id, 0) for worker_id in worker_ids]
+        if kv_total_blocks is None:
+            kv_total_blocks = [0] * len(worker_ids)
+        self.file.write(
+            b"".join(
+                (
+                    RECORD_HEADER.pack(
+                        time.time(),
+                        num_tokens,
+                        len(local_hashes),
+                        len(worker_ids),
+                        chosen_worker_id,
+                    ),
+                    np.asarray(local_hashes, dtype="<u8").tobytes(),
+                    np.asarray(worker_ids, dtype="<i8").tobytes(),
+                    np.asarray(overlaps, dtype="<u4").tobytes(),
+                    np.asarray(gpu_cache_usages, dtype="<f4").tobytes(),
+                    np.asarray(num_waiting, dtype="<f4").tobytes(),
+                    np.asarray(kv_total_blocks, dtype="<u4").tobytes(),
+                )
+            )
+        )
+        self.num_records += 1
+        if self.num_records % self.flush_every == 0:
+            self.file.flush()
+
+    def close(self):
+        self.file.close()
+
+
+def read_routing_log(path: Path | str) -> tuple[dict, Iterator[RoutingDecision]]:
+    """Header of a routing log, and an iterator over its decisions"""
+    data = Path(path).read_bytes()
+    if not data.startswith(MAGIC):
+        raise ValueError(f"{path} is not a routing log")
+    offset = len(MAGIC)
+    (header_length,) = HEADER_LENGTH.unpack_from(data, offset)
+    offset += HEADER_LENGTH.size
+    header = json.loads(data[offset : offset + header_length])
+    offset += header_length
+
+    def decisions() -> Iterator[RoutingDecision]:
+        position = offset
+        while position < len(data):
+            try:
+                (
+                    timestamp,
+                    num_tokens,
+                    num_hashes,
+                    num_workers,
+                    chosen_worker_id,
+                ) = RECORD_HEADER.unpack_from(data, position)
+                position += RECORD_HEADER.size
+                arrays = []
+                for dtype, count in (
+                    ("<u8", num_hashes),
+                    ("<i8", num_workers),
+                    ("<u4", num_workers),
+                    ("<f4", num_workers),
+                    ("<f4", num_workers),
+                    ("<u4", num_workers),
+                ):
+                    arrays.append(np.frombuffer(data, dtype, count, position))
+                    position += arrays[-1].nbytes
+            except (struct.error, ValueError):
+                # the last record of a log that was not closed may be partial
+                return
+            (
+                local_hashes,
+                worker_ids,
+                overlaps,
+                gpu_cache_usages,
+                num_waiting,
+                kv_total_blocks,
+            ) = arrays
+            yield RoutingDecision(
+                timestamp,
+                num_tokens,
+                local_hashes,
+                worker_ids,
+                overlaps,
+                gpu_cache_usages,
+                num_waiting,
+                kv_total_blocks,
+                chosen_worker_id,
+            )
+
+    return header, decisions()
@@ -0,0 +1,89 @@
+# SPDX-FileCopyrightText: Copyright (c) 2025 NVIDIA CORPORATION & AFFILIATES. All rights reserved.
+# SPDX-License-Identifier: Apache-2.0
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+
+import numpy as np
+import pytest
+
+from dynamo.llm.routing_log import MAGIC, RoutingRecorder, read_routing_log
+
+pytestmark = pytest.mark.pre_merge
+
+
+def _record_two_decisions(path):
+    recorder = RoutingRecorder(path, block_size=16, source="test")
+    recorder.record(
+        [11, 2**64 - 1],
+        40,
+        [3, 7],
+        [2, 0],
+        [0.5, 0.25],
+        [1, 4],
+        7,
+        kv_total_blocks=[100, 200],
+    )
+    # overlaps given as the scores of the workers with overlapping blocks
+    recorder.record([], 8, [3, 7, 9], {9: 1}, [0.0, 1.0, 0.125], [0, 0, 2], -1)
+    recorder.close()
+    return recorder
+
+
+def test_routing_log_round_trip(tmp_path):
+    path = tmp_path / "routing.log"
+    recorder = _record_two_decisions(path)
+    assert recorder.num_records == 2
+
+    header, decisions_iter = read_routing_log(path)
+    assert header == {"block_size": 16, "source": "test"}
+    first, second = list(decisions_iter)
+
+    assert first.num_tokens == 40
+    assert first.local_hashes.tolist() == [11, 2**64 - 1]
+    assert first.worker_ids.tolist() == [3, 7]
+    assert first.overlaps.tolist() == [2, 0]
+    assert first.gpu_cache_usages.tolist() == [0.5, 0.25]
+    assert first.num_waiting.tolist() == [1, 4]
+    assert first.kv_total_blocks.tolist() == [100, 200]
+    assert first.chosen_worker_id == 7
+
+    assert second.num_tokens == 8
+    assert len(second.local_hashes) == 0
+    assert second.worker_ids.tolist() == [3, 7, 9]
+    assert second.overlaps.tolist() == [0, 0, 1]
+    assert second.gpu_cache_usages.tolist() == [0.0, 1.0, 0.125]
+    assert second.kv_total_blocks.tolist() == [0, 0, 0]
+    assert second.chosen_worker_id == -1
+    assert first.timestamp <= second.timestamp
+
+
+@pytest.mark.parametrize("missing_bytes", [1, 8, 30, 80])
+def test_truncated_last_record_is_skipped(tmp_path, missing_bytes):
+    # a log that was not closed may end within its last record
+    path = tmp_path / "routing.log"
+    _record_two_decisions(path)
+    path.write_bytes(path.read_bytes()[:-missing_bytes])
+
+    _, decisions_iter = read_routing_log(path)
+    decisions = list(decisions_iter)
+    assert len(decisions) == 1
+    assert decisions[0].worker_ids.tolist() == [3, 7]
+    assert isinstance(decisions[0].overlaps, np.ndarray)
+
+
+def test_not_a_routing_log(tmp_path):
+    path = tmp_path / "routing.log"
+    path.write_bytes(MAGIC[:-1] + b"0" + b"\0" * 8)
+    with pytest.raises(ValueError):
+        read_routing_log(path)
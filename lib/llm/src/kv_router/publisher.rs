@@ -38,7 +38,7 @@ use rmp_serde as rmps;
 use serde::Deserialize;
 use serde::Serialize;
 use std::sync::atomic::{AtomicU32, Ordering};
-use std::time::Duration;
+use std::time::{Duration, SystemTime};
 use zeromq::{Socket, SocketRecv, SubSocket};
 
 // -------------------------------------------------------------------------
@@ -224,6 +224,44 @@ pub async fn start_zmq_listener(
     tx: mpsc::UnboundedSender<KvCacheEvent>,
     cancellation_token: CancellationToken,
     kv_block_size: u32,
+) {
+    run_zmq_listener(
+        zmq_endpoint,
+        zmq_topic,
+        cancellation_token,
+        kv_block_size,
+        |event, _| tx.send(event).is_ok(),
+    )
+    .await
+}
+
+/// Same as [`start_zmq_listener`], but each event is sent along with the time at which
+/// its ZMQ message was received, so that consumers can measure their ingestion lag.
+pub async fn start_timed_zmq_listener(
+    zmq_endpoint: String,
+    zmq_topic: String,
+    tx: mpsc::UnboundedSender<(KvCacheEvent, SystemTime)>,
+    cancellation_token: CancellationToken,
+    kv_block_size: u32,
+) {
+    run_zmq_listener(
+        zmq_endpoint,
+        zmq_topic,
+        cancellation_token,
+        kv_block_size,
+        |event, received_at| tx.send((event, received_at)).is_ok(),
+    )
+    .await
+}
+
+/// Receive the KV event batches of a ZMQ endpoint and pass each event to `send`, with
+/// the receive time of its message, until cancelled or `send` returns false.
+async fn run_zmq_listener(
+    zmq_endpoint: String,
+    zmq_topic: String,
+    cancellation_token: CancellationToken,
+    kv_block_size: u32,
+    mut send: impl FnMut(KvCacheEvent, SystemTime) -> bool,
 ) {
     tracing::debug!(
         "KVEventPublisher connecting to ZMQ endpoint {} (topic '{}')",
@@ -291,6 +329,7 @@ pub async fn start_zmq_listener(
                     tokio::time::sleep(Duration::from_millis(backoff_ms)).await;
                     continue;
                 };
+                let received_at = SystemTime::now();
                 // Reset error count on successful message
                 consecutive_errors = 0;
 
@@ -329,7 +368,7 @@ pub async fn start_zmq_listener(
                 );
                 for raw_event in batch.events.into_iter() {
                     let event = convert_event(raw_event, seq, kv_block_size, &warning_count);
-                    if tx.send(event).is_err() {
+                    if !send(event, received_at) {
                         tracing::warn!("Failed to send message to channel - receiver dropped");
                         exit_reason = "channel receiver dropped";
                         break 'main;
@@ -442,6 +442,20 @@ impl NatsQueue {
 
     /// Dequeue and return a task as raw bytes
     pub async fn dequeue_task(&mut self, timeout: Option<time::Duration>) -> Result<Option<Bytes>> {
+        Ok(self.dequeue_tasks(1, timeout).await?.pop())
+    }
+
+    /// Dequeue up to max_messages tasks as raw bytes, in a single fetch that waits up to
+    /// the timeout for the first task and returns it with the tasks already queued.
+    ///
+    /// Each task is acked as it is received, so an error after the first task stops the
+    /// fetch and returns the tasks already acked rather than losing them. The message
+    /// that failed is not acked and is delivered again.
+    pub async fn dequeue_tasks(
+        &mut self,
+        max_messages: usize,
+        timeout: Option<time::Duration>,
+    ) -> Result<Vec<Bytes>> {
         self.ensure_connection().await?;
 
         if let Some(subscriber) = &self.subscriber {
@@ -449,21 +463,31 @@ impl NatsQueue {
             let mut batch = subscriber
                 .fetch()
                 .expires(timeout_duration)
-                .max_messages(1)
+                .max_messages(max_messages)
                 .messages()
                 .await?;
 
-            if let Some(message) = batch.next().await {
-                let message =
-                    message.map_err(|e| anyhow::anyhow!("Failed to get message: {}", e))?;
-                message
-                    .ack()
-                    .await
-                    .map_err(|e| anyhow::anyhow!("Failed to ack message: {}", e))?;
-                Ok(Some(message.payload.clone()))
-            } else {
-                Ok(None)
+            let mut tasks = Vec::with_capacity(max_messages);
+            while let Some(message) = batch.next().await {
+                let acked = match message {
+                    Ok(message) => message
+                        .ack()
+                        .await
+                        .map(|_| message.payload.clone())
+                        .map_err(|e| anyhow::anyhow!("Failed to ack message: {}", e)),
+                    Err(e) => Err(anyhow::anyhow!("Failed to get message: {}", e)),
+                };
+                match acked {
+                    Ok(payload) => tasks.push(payload),
+                    // nothing was acked yet, so nothing is lost
+                    Err(e) if tasks.is_empty() => return Err(e),
+                    Err(e) => {
+                        log::warn!("Stopped dequeuing after {} acked tasks: {}", tasks.len(), e);
+                        break;
+                    }
+                }
             }
+            Ok(tasks)
         } else {
             Err(anyhow::anyhow!("Subscriber not initialized"))
         }